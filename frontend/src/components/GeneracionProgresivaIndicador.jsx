@@ -9,27 +9,53 @@ const GeneracionProgresivaIndicador = ({ itinerarioId, onCompletado }) => {
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    // Verificar estado cada 3 segundos
-    const interval = setInterval(async () => {
-      try {
-        const data = await itinerariosAPI.obtenerEstadoGeneracion(itinerarioId);
-        setEstado(data);
-        setLoading(false);
+    let interval = null;
+
+    const finalizar = (data) => {
+      setEstado({ ...data, completado: true, porcentaje_completado: 100 });
+      setLoading(false);
+      if (onCompletado) {
+        onCompletado();
+      }
+    };
+
+    // Respaldo: verificar estado cada 3 segundos si el stream falla
+    const iniciarPolling = () => {
+      interval = setInterval(async () => {
+        try {
+          const data = await itinerariosAPI.obtenerEstadoGeneracion(itinerarioId);
+          setEstado(data);
+          setLoading(false);
 
-        // Si está completado, detener polling y notificar
-        if (data.completado) {
-          clearInterval(interval);
-          if (onCompletado) {
-            onCompletado();
+          // Si está completado, detener polling y notificar
+          if (data.completado) {
+            clearInterval(interval);
+            finalizar(data);
           }
+        } catch (error) {
+          console.error('Error verificando estado:', error);
         }
-      } catch (error) {
-        console.error('Error verificando estado:', error);
-      }
-    }, 3000); // Cada 3 segundos
+      }, 3000);
+    };
+
+    // 🔥 Stream SSE: el servidor avisa cada área en cuanto se genera
+    const source = itinerariosAPI.suscribirGeneracion(itinerarioId, {
+      progreso: (data) => {
+        setEstado(data);
+        setLoading(false);
+      },
+      completado: finalizar,
+      error: () => {
+        console.warn('Stream de generación no disponible, usando polling');
+        iniciarPolling();
+      },
+    });
 
-    // Limpiar interval al desmontar
-    return () => clearInterval(interval);
+    // Cerrar stream / interval al desmontar
+    return () => {
+      source.close();
+      if (interval) clearInterval(interval);
+    };
   }, [itinerarioId, onCompletado]);
 
   if (loading || !estado) {
@@ -231,7 +231,24 @@ export const itinerariosAPI = {
     }
   },
 
-  // 🔥 NUEVO: Obtener estado de generación (para polling)
+  // 🔥 NUEVO: Stream SSE de la generación (reemplaza el polling)
+  // Eventos: "area" (contenido de cada área), "progreso" y "completado"
+  suscribirGeneracion: (itinerarioId, handlers = {}) => {
+    const source = new EventSource(`${API_URL}/ia/itinerario/${itinerarioId}/eventos`);
+    ['area', 'progreso', 'completado'].forEach((tipo) => {
+      source.addEventListener(tipo, (event) => {
+        if (handlers[tipo]) handlers[tipo](JSON.parse(event.data));
+        if (tipo === 'completado') source.close();
+      });
+    });
+    source.onerror = (error) => {
+      source.close();
+      if (handlers.error) handlers.error(error);
+    };
+    return source;
+  },
+
+  // Obtener estado de generación (polling, respaldo si no hay SSE)
   obtenerEstadoGeneracion: async (itinerarioId) => {
     try {
       const response = await api.get(`/ia/itinerario/${itinerarioId}/estado-generacion`);
@@ -0,0 +1,123 @@
+# benchmark_itinerarios.py
+# 🔥 Mide las lecturas de itinerarios tal como las sirve la API: llama a los
+# endpoints reales con TestClient (routers/itinerarios.py) y al cargador de
+# persistencia_itinerarios que usa /ia, así los números siguen al código.
+# Cuenta las sentencias que llegan a la base de datos y el tiempo por petición;
+# con carga anticipada las consultas no crecen con la cantidad de detalles.
+#
+# Uso (contra la base configurada en .env):
+#   python benchmark_itinerarios.py --itinerario 12
+#   python benchmark_itinerarios.py --visitante 5 --repeticiones 20
+#   python benchmark_itinerarios.py --itinerario 12 --max-consultas 3   # falla si hay N+1
+
+import argparse
+import time
+import sys
+sys.path.append('.')
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from config import get_settings
+from database import SessionLocal, engine
+from main import app
+from services.persistencia_itinerarios import persistencia_itinerarios
+
+settings = get_settings()
+PREFIJO = f"{settings.API_V1_PREFIX}/itinerarios"
+
+
+class ContadorConsultas:
+    """Cuenta las sentencias ejecutadas por el engine mientras está activo"""
+
+    def __init__(self):
+        self.total = 0
+
+    def _contar(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += 1
+
+    def __enter__(self):
+        event.listen(engine, "before_cursor_execute", self._contar)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self._contar)
+
+
+# ============================================
+# LECTURAS MEDIDAS
+# ============================================
+
+def endpoint(cliente: TestClient, ruta: str):
+    """GET real (dependencias, serialización con response_model incluida)"""
+    def pedir(_identificador):
+        respuesta = cliente.get(ruta)
+        respuesta.raise_for_status()
+        return respuesta.json()
+    return pedir
+
+
+def cargador_completo(itinerario_id: int):
+    """persistencia_itinerarios.cargar_itinerario_completo + serialización de la respuesta de /ia"""
+    from schemas import ItinerarioCompleto
+
+    with SessionLocal() as db:
+        itinerario = persistencia_itinerarios.cargar_itinerario_completo(db, itinerario_id)
+        return ItinerarioCompleto.model_validate(itinerario).model_dump() if itinerario else None
+
+
+def medir(nombre, funcion, identificador, repeticiones) -> int:
+    consultas, inicio = 0, time.perf_counter()
+    for _ in range(repeticiones):
+        with ContadorConsultas() as contador:
+            funcion(identificador)
+        consultas = max(consultas, contador.total)
+    promedio_ms = (time.perf_counter() - inicio) * 1000 / repeticiones
+    print(f"   {nombre:<34} {consultas:>4} consultas   {promedio_ms:8.2f} ms/petición")
+    return consultas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de lectura de itinerarios (consultas por petición)")
+    parser.add_argument("--itinerario", type=int, help="ID de itinerario para GET /itinerarios/{id}")
+    parser.add_argument("--visitante", type=int, help="ID de visitante para GET /itinerarios/visitante/{id}")
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--max-consultas", type=int, help="Salir con error si alguna lectura supera este número")
+    args = parser.parse_args()
+
+    if args.itinerario is None and args.visitante is None:
+        parser.error("indica --itinerario y/o --visitante")
+
+    cliente = TestClient(app)  # Sin "with": no arranca los workers del lifespan
+    medidas = {}
+
+    if args.itinerario is not None:
+        print(f"\n{'='*70}")
+        print(f"🧪 Itinerario {args.itinerario}")
+        print(f"{'='*70}")
+        medidas["GET /itinerarios/{id}"] = medir(
+            "GET /itinerarios/{id}", endpoint(cliente, f"{PREFIJO}/{args.itinerario}"),
+            args.itinerario, args.repeticiones
+        )
+        medidas["cargar_itinerario_completo"] = medir(
+            "cargar_itinerario_completo", cargador_completo, args.itinerario, args.repeticiones
+        )
+
+    if args.visitante is not None:
+        print(f"\n{'='*70}")
+        print(f"🧪 Visitante {args.visitante}")
+        print(f"{'='*70}")
+        medidas["GET /itinerarios/visitante/{id}"] = medir(
+            "GET /itinerarios/visitante/{id}", endpoint(cliente, f"{PREFIJO}/visitante/{args.visitante}"),
+            args.visitante, args.repeticiones
+        )
+
+    if args.max_consultas is not None:
+        excedidas = {nombre: total for nombre, total in medidas.items() if total > args.max_consultas}
+        if excedidas:
+            print(f"\n❌ Más de {args.max_consultas} consultas: {excedidas}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
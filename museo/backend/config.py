@@ -2,7 +2,7 @@
 # ✅ ACTUALIZADO: Soporte para Ollama (local) + DeepSeek API (producción)
 
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 from functools import lru_cache
 import os
 from pathlib import Path
@@ -75,6 +75,100 @@ class Settings(BaseSettings):
     AI_TEMPERATURE: float = 0.25
     AI_MAX_TOKENS: int = 4000
 
+    # ============================================
+    # 🔥 NUEVO: POOL HTTP DE PROVEEDORES DE IA
+    # ============================================
+    AI_MAX_CONEXIONES: int = 100  # Conexiones simultáneas por proveedor
+    AI_MAX_KEEPALIVE: int = 20  # Conexiones ociosas que se mantienen abiertas
+    AI_KEEPALIVE_EXPIRY: float = 30.0  # Segundos antes de cerrar una conexión ociosa
+
+    # ============================================
+    # 🔥 NUEVO: CONCURRENCIA DE GENERACIÓN POR PROVEEDOR
+    # ============================================
+    AI_MAX_PARALELO: int = 4  # Por defecto para proveedores sin valor propio
+    AI_MAX_PARALELO_OLLAMA: int = 2  # Ollama local: pocas llamadas simultáneas
+    AI_MAX_PARALELO_DEEPSEEK: int = 8
+    AI_MAX_REQUESTS_POR_MINUTO_OLLAMA: int = 0  # 0 = sin límite
+    AI_MAX_REQUESTS_POR_MINUTO_DEEPSEEK: int = 60
+
+    # ============================================
+    # 🔥 NUEVO: ENRUTADOR MULTI-PROVEEDOR (hedging y failover)
+    # ============================================
+    AI_PROVEEDORES: List[str] = []  # Orden de preferencia, p. ej. ["deepseek", "ollama"]; vacío = solo AI_PROVIDER
+    AI_HEDGE_ACTIVO: bool = True
+    AI_HEDGE_PERCENTIL: float = 0.95  # Se duplica la petición si no respondió en este percentil
+    AI_HEDGE_MIN_SEGUNDOS: float = 2.0
+    AI_HEDGE_INICIAL_SEGUNDOS: float = 30.0  # Plazo mientras no hay latencias medidas
+    AI_EWMA_ALFA: float = 0.2
+    AI_SALUD_MINIMA: float = 0.5  # Por debajo, el proveedor pasa al final del orden
+
+    # ============================================
+    # 🔥 NUEVO: CIRCUIT BREAKER Y TIMEOUTS ADAPTATIVOS
+    # ============================================
+    AI_CIRCUITO_FALLOS: int = 3  # Fallos seguidos (5xx, 429, timeout, caída) que abren el circuito
+    AI_CIRCUITO_ENFRIAMIENTO_SEGUNDOS: float = 30.0  # Abierto antes de la llamada de prueba
+    AI_CIRCUITO_ENFRIAMIENTO_MAX_SEGUNDOS: float = 300.0  # Se duplica con cada prueba fallida hasta este tope
+    AI_CIRCUITO_PRUEBAS: int = 1  # Llamadas simultáneas en semiabierto
+    AI_TOKENS_POR_SEGUNDO_INICIAL: float = 15.0  # Mientras no hay velocidad medida
+    AI_TIMEOUT_BASE_SEGUNDOS: float = 15.0  # Conexión + primer token
+    AI_TIMEOUT_MARGEN: float = 1.5  # Holgura sobre max_tokens / tokens_por_segundo
+    AI_TIMEOUT_MIN_SEGUNDOS: float = 20.0  # El máximo es el AI_TIMEOUT del proveedor
+
+    # ============================================
+    # 🔥 NUEVO: COLA PERSISTENTE DE GENERACIÓN
+    # ============================================
+    GENERACION_WORKERS_EMBEBIDOS: int = 1  # Workers dentro de la API (0 = solo worker_generacion.py)
+    GENERACION_WORKERS: int = 4  # Workers por proceso de worker_generacion.py
+    GENERACION_POLL_SEGUNDOS: float = 1.0
+    GENERACION_LEASE_SEGUNDOS: int = 600  # Un trabajo sin latido se reclama tras este tiempo
+    GENERACION_MAX_INTENTOS: int = 3
+    GENERACION_BACKOFF_SEGUNDOS: int = 10
+    SSE_KEEPALIVE_SEGUNDOS: float = 15.0  # Comentario keep-alive (y revisión de respaldo) en los streams SSE
+
+    # ============================================
+    # 🔥 NUEVO: CACHE DE CONTENIDO DE ÁREAS
+    # ============================================
+    CACHE_CONTENIDO_ACTIVO: bool = True
+    CACHE_CONTENIDO_TTL_SEGUNDOS: int = 7 * 24 * 3600  # 7 días
+    CACHE_CONTENIDO_MAX_MEMORIA: int = 512  # Entradas en memoria por proceso
+    CACHE_CONTENIDO_MAX_BD: int = 20000  # Filas en cache_contenido_areas
+
+    # ============================================
+    # 🔥 NUEVO: PLANIFICADOR DE ESTRUCTURA
+    # ============================================
+    PLANIFICADOR_ESTRUCTURA: str = "local"  # "local" (determinístico) o "ia" (selección con el LLM)
+
+    # ============================================
+    # 🔥 NUEVO: PLANTILLAS DE ITINERARIO PRECALCULADAS
+    # ============================================
+    PLANTILLAS_ACTIVAS: bool = True  # /itinerarios/generar sirve la plantilla si existe
+    PLANTILLAS_TOP_K: int = 20  # Combinaciones más frecuentes que precalcula precalcular_plantillas.py
+    PLANTILLAS_TIEMPOS: List[int] = [30, 60, 90, 120]  # Presupuestos estándar (más "sin límite")
+    PLANTILLAS_SALUDO_IA: bool = True  # Pedir a la IA el saludo si la plantilla no trae el nombre
+
+    # ============================================
+    # 🔥 NUEVO: CALENDARIO DEL MUSEO (horarios y feriados)
+    # ============================================
+    HORARIOS_MESES_PRECALCULO: int = 6  # Meses de intervalos de apertura precalculados
+    HORARIOS_RECARGA_SEGUNDOS: float = 300.0  # Cada cuánto releer horarios y excepciones de la BD
+
+    # ============================================
+    # 🔥 NUEVO: ÍNDICE DEL KNOWLEDGE BASE (recuperación por intereses)
+    # ============================================
+    KB_INDICE_DIR: str = "indice_kb"  # Relativo a la carpeta backend
+    KB_RUTA: Optional[str] = None  # Ruta de museo_knowledge.json (None = buscar en las rutas habituales)
+    KB_RECARGA_SEGUNDOS: float = 5.0  # Cada cuánto revisar si el archivo cambió
+    KB_EMBEDDINGS_MODELO: str = ""  # sentence-transformers local; vacío = TF-IDF
+    KB_PASAJES_CONTEXTO: int = 2  # Párrafos de información detallada elegidos según los intereses
+    KB_PRESUPUESTO_TOKENS: int = 350  # Tope del contexto del área en el prompt (services/compilador_prompts.py)
+
+    # ============================================
+    # 🔥 NUEVO: ESTADÍSTICAS MATERIALIZADAS (panel administrativo)
+    # ============================================
+    ESTADISTICAS_REFRESCO_ACTIVO: bool = True  # Refrescador embebido en la API
+    ESTADISTICAS_REFRESCO_SEGUNDOS: float = 10.0  # Cada cuánto revisar vistas pendientes
+    ESTADISTICAS_MAX_ANTIGUEDAD_SEGUNDOS: int = 300  # Refresco programado aunque no haya escrituras
+
     # ============================================
     # SMTP
     # ============================================
@@ -102,6 +196,19 @@ class Settings(BaseSettings):
     LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     LOG_DATE_FORMAT: str = "%Y-%m-%d %H:%M:%S"
     
+    # 🔥 NUEVO: logging de producción (utils/registro.py)
+    LOG_JSON: bool = False  # Una línea JSON por registro (python-json-logger)
+    LOG_NIVELES_MODULOS: Dict[str, str] = {  # JSON en .env, p. ej. {"routers": "WARNING"}
+        "sqlalchemy.engine": "WARNING",
+        "httpx": "WARNING",
+        "httpcore": "WARNING",
+    }
+    LOG_MUESTREO: Dict[str, float] = {}  # Fracción de INFO/DEBUG que se escribe, p. ej. {"routers": 0.1}
+    DB_ECHO: bool = False  # SQL de cada query en el log (antes seguía a DEBUG)
+    
+    # 🔥 NUEVO: MÉTRICAS (GET /metrics, formato Prometheus)
+    METRICAS_ACTIVAS: bool = True
+    
     # ============================================
     # CONFIGURACIÓN DE PAGINACIÓN
     # ============================================
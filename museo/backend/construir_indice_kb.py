@@ -0,0 +1,40 @@
+# construir_indice_kb.py
+# 🔥 Construye offline el knowledge base compilado y su índice vectorial
+# Genera en KB_INDICE_DIR: kb_<checksum>.bin (áreas compiladas, mmap),
+# vectores.npy (mmap), pasajes.json, meta.json (con la huella del JSON de
+# origen) y, con TF-IDF, vocabulario.json + idf.npy.
+# Volver a ejecutarlo cada vez que cambie museo_knowledge.json: mientras no
+# coincida, cada worker lo vuelve a leer y compilar por su cuenta.
+#
+# Uso:
+#   python construir_indice_kb.py                      # TF-IDF (o KB_EMBEDDINGS_MODELO)
+#   python construir_indice_kb.py --modelo paraphrase-multilingual-MiniLM-L12-v2
+#   python construir_indice_kb.py --kb ../museo_knowledge.json --salida indice_kb
+
+import argparse
+import logging
+from pathlib import Path
+
+from config import get_settings
+from services.almacen_kb import almacen_kb
+from utils.registro import configurar_logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compilar el knowledge base y construir su índice vectorial")
+    parser.add_argument("--kb", default=str(Path(__file__).parent.parent / "museo_knowledge.json"))
+    parser.add_argument("--salida", default=None, help=f"Carpeta de salida (por defecto {settings.KB_INDICE_DIR})")
+    parser.add_argument("--modelo", default=None, help="Modelo de sentence-transformers; vacío = TF-IDF")
+    args = parser.parse_args()
+
+    configurar_logging("INFO")
+
+    directorio = almacen_kb.construir(Path(args.kb), directorio=args.salida, modelo=args.modelo)
+    logger.info("✅ Índice listo en %s", directorio)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,26 +5,43 @@
 from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 import logging
+import time
 from config import get_settings
+from utils.metricas import metricas, db_espera_conexion
 
 # Obtener configuraciones
 settings = get_settings()
 
-# Configuración de logging
-logging.basicConfig(
-    level=getattr(logging, settings.LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# El logging se configura en utils/registro.py (main.py / worker_generacion.py)
 logger = logging.getLogger(__name__)
 
 # ============================================
 # CREAR ENGINE
 # ============================================
 
+class PoolCronometrado(QueuePool):
+    """
+    QueuePool que mide cuánto espera cada checkout (cola del pool o apertura
+    de una conexión nueva). SQLAlchemy no tiene evento "antes del checkout"
+    (checkout/connect se disparan cuando la conexión ya está lista), así que
+    se envuelve connect(), el método público con el que el Engine pide
+    conexiones al pool.
+    """
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            db_espera_conexion.observar(time.perf_counter() - inicio)
+
+
 engine = create_engine(
     settings.DATABASE_URL_COMPUTED,
-    echo=settings.DEBUG,  # Mostrar SQL queries solo en debug
+    poolclass=PoolCronometrado,
+    echo=settings.DB_ECHO,  # 🔥 Independiente de DEBUG: con echo cada query se escribe en el log
     future=True,
     pool_size=10,  # Número de conexiones en el pool
     max_overflow=20,  # Conexiones adicionales permitidas
@@ -32,6 +49,16 @@ engine = create_engine(
     pool_recycle=3600,  # Recicla conexiones cada hora
 )
 
+# 🔥 Uso del pool en /metrics
+metricas.medidor(
+    "museo_db_pool_conexiones", "Conexiones del pool de SQLAlchemy por estado", ("estado",),
+    lambda: {
+        ("en_uso",): engine.pool.checkedout(),
+        ("disponibles",): engine.pool.checkedin(),
+        ("desborde",): max(engine.pool.overflow(), 0),
+    }
+)
+
 # ============================================
 # SESSION MAKER
 # ============================================
@@ -171,13 +198,8 @@ def set_postgresql_params(dbapi_conn, connection_record):
     cursor.close()
     logger.debug("Parámetros de conexión PostgreSQL configurados")
 
-@event.listens_for(engine, "before_cursor_execute")
-def receive_before_cursor_execute(conn, cursor, statement, params, context, executemany):
-    """
-    Se ejecuta antes de cada query. Útil para logging detallado.
-    """
-    if settings.DEBUG and logger.level == logging.DEBUG:
-        logger.debug(f"Ejecutando SQL: {statement[:100]}...")
+# 🔥 Sin listener before_cursor_execute: corría en cada query aunque no
+# escribiera nada. Para ver el SQL usar DB_ECHO=True.
 
 # ============================================
 # CONTEXT MANAGER PARA SESIONES
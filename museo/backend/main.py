@@ -3,18 +3,19 @@
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 import logging
 from datetime import datetime
 
 from config import get_settings
+from utils.registro import configurar_logging
+
+# 🔥 Logging no bloqueante (QueueHandler), JSON opcional, niveles por módulo
+configurar_logging()
+
 from database import engine, Base
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 settings = get_settings()
@@ -44,7 +45,7 @@ async def lifespan(app: FastAPI):
     # Verificar IA
     try:
         from services.ia_service import ia_service
-        estado_ia = ia_service.verificar_conexion()
+        estado_ia = await ia_service.verificar_conexion()
         if estado_ia["conectado"]:
             logger.info(f"✅ IA conectada [{estado_ia.get('provider', '?')}] - Modelo: {estado_ia.get('modelo', '?')}")
         else:
@@ -52,9 +53,42 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"⚠️ No se pudo verificar IA: {e}")
     
+    # Calendario del museo (horarios y feriados) precalculado antes del primer request
+    from utils.calendario_museo import calendario_museo
+    calendario_museo.recargar()
+    
+    # Avisos de áreas generadas (LISTEN/NOTIFY) para los streams SSE
+    from services.eventos_generacion import bus_eventos
+    bus_eventos.iniciar()
+    
+    # Workers de la cola de generación embebidos en la API
+    pool_generacion = None
+    if settings.GENERACION_WORKERS_EMBEBIDOS > 0:
+        from services.cola_generacion import PoolTrabajadores
+        pool_generacion = PoolTrabajadores(settings.GENERACION_WORKERS_EMBEBIDOS)
+        await pool_generacion.iniciar()
+    
+    # Refresco de las estadísticas materializadas del panel administrativo
+    from services.estadisticas_materializadas import estadisticas_materializadas
+    await estadisticas_materializadas.iniciar()
+    
     yield
     
     logger.info("🛑 Cerrando aplicación...")
+    
+    await estadisticas_materializadas.detener()
+    
+    if pool_generacion:
+        await pool_generacion.detener()
+    
+    bus_eventos.detener()
+    
+    # Cerrar pool HTTP de la IA
+    try:
+        from services.ia_service import ia_service
+        await ia_service.cerrar()
+    except Exception as e:
+        logger.warning("⚠️ No se pudo cerrar el cliente de IA: %s", e)
 
 # ============================================
 # CREAR APLICACIÓN
@@ -96,10 +130,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 🔥 Cabeceras de paginación por keyset (utils/paginacion.py)
+    expose_headers=["X-Siguiente-Cursor", "X-Total-Estimado"],
 )
 
 logger.info(f"✅ CORS configurado para: {cors_origins}")
 
+# 🔥 Latencia por ruta para /metrics (middleware ASGI, no bufferiza los streams SSE)
+if settings.METRICAS_ACTIVAS:
+    from utils.metricas import MiddlewareMetricas
+    app.add_middleware(MiddlewareMetricas)
+
 # ============================================
 # ENDPOINTS PRINCIPALES
 # ============================================
@@ -157,6 +198,14 @@ async def info():
         }
     }
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Métricas en formato de texto de Prometheus (def: la profundidad de la cola consulta la BD)"""
+    if not settings.METRICAS_ACTIVAS:
+        raise HTTPException(status_code=404, detail="Métricas desactivadas")
+    from utils.metricas import metricas, MEDIA_TYPE
+    return PlainTextResponse(metricas.exponer(), media_type=MEDIA_TYPE)
+
 # ============================================
 # MANEJO DE ERRORES
 # ============================================
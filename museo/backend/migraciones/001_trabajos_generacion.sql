@@ -0,0 +1,30 @@
+-- ========================================
+-- MIGRACIÓN 001: Cola persistente de generación
+-- ========================================
+-- Reemplaza el thread daemon de generar_itinerario_progresivo.
+-- Los workers (embebidos en la API o `python worker_generacion.py`)
+-- reclaman trabajos con SELECT ... FOR UPDATE SKIP LOCKED.
+
+CREATE TABLE IF NOT EXISTS trabajos_generacion (
+    id SERIAL PRIMARY KEY,
+    itinerario_id INTEGER NOT NULL REFERENCES itinerarios(id) ON DELETE CASCADE,
+    tipo VARCHAR(50) NOT NULL DEFAULT 'areas_pendientes',
+    estado VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+    payload JSONB NOT NULL,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    max_intentos INTEGER NOT NULL DEFAULT 3,
+    error TEXT,
+    worker VARCHAR(100),
+    bloqueado_hasta TIMESTAMPTZ,
+    disponible_desde TIMESTAMPTZ NOT NULL DEFAULT now(),
+    fecha_creacion TIMESTAMPTZ DEFAULT now(),
+    fecha_actualizacion TIMESTAMPTZ DEFAULT now(),
+    CONSTRAINT check_estado_trabajo
+        CHECK (estado IN ('pendiente', 'en_proceso', 'completado', 'fallido'))
+);
+
+CREATE INDEX IF NOT EXISTS ix_trabajos_generacion_itinerario_id
+    ON trabajos_generacion (itinerario_id);
+
+CREATE INDEX IF NOT EXISTS ix_trabajos_generacion_cola
+    ON trabajos_generacion (estado, disponible_desde, id);
@@ -0,0 +1,26 @@
+-- ========================================
+-- MIGRACIÓN 002: Cache de contenido generado por área
+-- ========================================
+-- Segundo nivel (compartido entre workers) del cache de
+-- services/cache_contenido.py. Clave = sha256 del prompt normalizado.
+
+CREATE TABLE IF NOT EXISTS cache_contenido_areas (
+    clave VARCHAR(64) PRIMARY KEY,
+    area_codigo VARCHAR(20) NOT NULL,
+    proveedor VARCHAR(20),
+    modelo VARCHAR(50),
+    contenido JSONB NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    fecha_creacion TIMESTAMPTZ DEFAULT now(),
+    ultimo_acceso TIMESTAMPTZ DEFAULT now(),
+    expira_en TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_cache_contenido_areas_area_codigo
+    ON cache_contenido_areas (area_codigo);
+
+CREATE INDEX IF NOT EXISTS ix_cache_contenido_areas_ultimo_acceso
+    ON cache_contenido_areas (ultimo_acceso);
+
+CREATE INDEX IF NOT EXISTS ix_cache_contenido_areas_expira_en
+    ON cache_contenido_areas (expira_en);
@@ -0,0 +1,237 @@
+-- ========================================
+-- MIGRACIÓN 003: Estadísticas materializadas para el panel administrativo
+-- ========================================
+-- Una vista materializada de una sola fila por dashboard: cada endpoint de
+-- estadísticas lee esa fila por su índice único en lugar de agregar tablas
+-- completas en cada petición.
+--
+-- Refresco (services/estadisticas_materializadas.py):
+--   - Triggers por sentencia marcan como "pendiente" la vista afectada en
+--     estadisticas_vistas al escribir en las tablas de origen.
+--   - Un refrescador en la API ejecuta REFRESH MATERIALIZED VIEW CONCURRENTLY
+--     de las pendientes, y de todas cada ESTADISTICAS_MAX_ANTIGUEDAD_SEGUNDOS
+--     (las ventanas "hoy", "semana" y "mes" dependen de la fecha).
+
+-- ----------------------------------------
+-- Itinerarios
+-- ----------------------------------------
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_estadisticas_itinerarios AS
+SELECT
+    1 AS id,
+    count(*) AS total_itinerarios,
+    count(*) FILTER (WHERE i.modelo_ia_usado IS NOT NULL) AS generados_con_ia,
+    count(*) FILTER (WHERE i.estado = 'completado') AS completados,
+    count(*) FILTER (WHERE i.estado = 'activo') AS en_progreso,
+    avg(i.duracion_total) AS duracion_promedio,
+    avg(i.puntuacion) AS puntuacion_promedio,
+    COALESCE((
+        SELECT jsonb_object_agg(e.estado, e.cantidad)
+        FROM (
+            SELECT estado, count(*) AS cantidad
+            FROM itinerarios
+            WHERE estado IS NOT NULL
+            GROUP BY estado
+        ) e
+    ), '{}'::jsonb) AS por_estado,
+    now() AS calculado_en
+FROM itinerarios i;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_estadisticas_itinerarios
+    ON mv_estadisticas_itinerarios (id);
+
+-- ----------------------------------------
+-- Visitantes
+-- ----------------------------------------
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_estadisticas_visitantes AS
+SELECT
+    1 AS id,
+    count(*) AS total_visitantes,
+    count(*) FILTER (WHERE v.activo) AS visitantes_activos,
+    count(*) FILTER (WHERE v.total_visitas > 0) AS visitantes_con_visitas,
+    count(*) FILTER (WHERE v.fecha_registro >= now() - interval '30 days') AS visitantes_recientes_30dias,
+    COALESCE(sum(v.total_visitas), 0) AS total_visitas_realizadas,
+    COALESCE((
+        SELECT jsonb_object_agg(t.tipo_visitante, t.cantidad)
+        FROM (
+            SELECT tipo_visitante, count(*) AS cantidad
+            FROM visitantes
+            WHERE tipo_visitante IS NOT NULL
+            GROUP BY tipo_visitante
+        ) t
+    ), '{}'::jsonb) AS por_tipo_visitante,
+    -- tipo_entrada se guarda por itinerario: visitantes distintos por tipo
+    COALESCE((
+        SELECT jsonb_object_agg(t.tipo_entrada, t.cantidad)
+        FROM (
+            SELECT i.tipo_entrada, count(DISTINCT p.visitante_id) AS cantidad
+            FROM itinerarios i
+            JOIN perfiles p ON p.id = i.perfil_id
+            WHERE i.tipo_entrada IS NOT NULL
+            GROUP BY i.tipo_entrada
+        ) t
+    ), '{}'::jsonb) AS por_tipo_entrada,
+    now() AS calculado_en
+FROM visitantes v;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_estadisticas_visitantes
+    ON mv_estadisticas_visitantes (id);
+
+-- ----------------------------------------
+-- Evaluaciones
+-- ----------------------------------------
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_estadisticas_evaluaciones AS
+SELECT
+    1 AS id,
+    count(*) AS total_evaluaciones,
+    avg(calificacion_general) AS calificacion_promedio,
+    count(*) FILTER (WHERE personalizado) AS personalizado,
+    count(*) FILTER (WHERE buenas_decisiones) AS buenas_decisiones,
+    count(*) FILTER (WHERE acompaniamiento) AS acompaniamiento,
+    count(*) FILTER (WHERE comprension) AS comprension,
+    count(*) FILTER (WHERE relevante) AS relevante,
+    count(*) FILTER (WHERE usaria_nuevamente) AS usaria_nuevamente,
+    now() AS calculado_en
+FROM evaluaciones;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_estadisticas_evaluaciones
+    ON mv_estadisticas_evaluaciones (id);
+
+-- ----------------------------------------
+-- Intereses de los perfiles
+-- ----------------------------------------
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_estadisticas_intereses AS
+SELECT
+    1 AS id,
+    (SELECT count(*) FROM perfiles) AS total_perfiles,
+    COALESCE((
+        SELECT jsonb_agg(
+            jsonb_build_object('interes', c.interes, 'cantidad', c.cantidad)
+            ORDER BY c.cantidad DESC, c.interes
+        )
+        FROM (
+            SELECT interes, count(*) AS cantidad
+            FROM perfiles p, unnest(p.intereses) AS interes
+            GROUP BY interes
+        ) c
+    ), '[]'::jsonb) AS intereses_populares,
+    now() AS calculado_en;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_estadisticas_intereses
+    ON mv_estadisticas_intereses (id);
+
+-- ----------------------------------------
+-- Historial de visitas (hoy, horas pico, semana, mes)
+-- ----------------------------------------
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_estadisticas_historial AS
+SELECT
+    1 AS id,
+    current_date AS fecha_calculo,
+    -- Hoy
+    count(DISTINCT h.visitante_id) FILTER (WHERE h.fecha_visita = current_date) AS visitantes_hoy,
+    (
+        SELECT count(*)
+        FROM itinerarios
+        WHERE estado = 'activo' AND fecha_inicio::date = current_date
+    ) AS itinerarios_activos_hoy,
+    avg(extract(hour FROM h.hora_entrada) + extract(minute FROM h.hora_entrada) / 60.0)
+        FILTER (WHERE h.fecha_visita = current_date) AS hora_entrada_promedio_hoy,
+    avg(h.duracion_total) FILTER (WHERE h.fecha_visita = current_date) AS duracion_promedio_hoy,
+    -- Horas pico (5 horas con más entradas)
+    COALESCE((
+        SELECT jsonb_agg(jsonb_build_object('hora', hp.hora, 'visitantes', hp.visitantes) ORDER BY hp.visitantes DESC)
+        FROM (
+            SELECT extract(hour FROM hora_entrada)::int AS hora, count(*) AS visitantes
+            FROM historial_visitas
+            WHERE hora_entrada IS NOT NULL
+            GROUP BY 1
+            ORDER BY 2 DESC
+            LIMIT 5
+        ) hp
+    ), '[]'::jsonb) AS horas_pico,
+    -- Últimos 7 días
+    count(*) FILTER (WHERE h.fecha_visita BETWEEN current_date - 7 AND current_date) AS visitas_semana,
+    COALESCE((
+        SELECT jsonb_object_agg(to_char(d.fecha_visita, 'YYYY-MM-DD'), d.cantidad)
+        FROM (
+            SELECT fecha_visita, count(*) AS cantidad
+            FROM historial_visitas
+            WHERE fecha_visita BETWEEN current_date - 7 AND current_date
+            GROUP BY fecha_visita
+        ) d
+    ), '{}'::jsonb) AS visitas_por_dia_semana,
+    avg(NULLIF(h.satisfaccion_general, 0))
+        FILTER (WHERE h.fecha_visita BETWEEN current_date - 7 AND current_date) AS satisfaccion_semana,
+    -- Últimos 30 días
+    count(*) FILTER (WHERE h.fecha_visita BETWEEN current_date - 30 AND current_date) AS visitas_mes,
+    count(DISTINCT h.visitante_id)
+        FILTER (WHERE h.fecha_visita BETWEEN current_date - 30 AND current_date) AS visitantes_unicos_mes,
+    avg(NULLIF(h.satisfaccion_general, 0))
+        FILTER (WHERE h.fecha_visita BETWEEN current_date - 30 AND current_date) AS satisfaccion_mes,
+    avg(NULLIF(h.duracion_total, 0))
+        FILTER (WHERE h.fecha_visita BETWEEN current_date - 30 AND current_date) AS duracion_mes,
+    now() AS calculado_en
+FROM historial_visitas h;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_estadisticas_historial
+    ON mv_estadisticas_historial (id);
+
+-- ----------------------------------------
+-- Control de refresco
+-- ----------------------------------------
+CREATE TABLE IF NOT EXISTS estadisticas_vistas (
+    vista VARCHAR(64) PRIMARY KEY,
+    pendiente BOOLEAN NOT NULL DEFAULT TRUE,
+    refrescada_en TIMESTAMPTZ
+);
+
+INSERT INTO estadisticas_vistas (vista, pendiente, refrescada_en) VALUES
+    ('mv_estadisticas_itinerarios', FALSE, now()),
+    ('mv_estadisticas_visitantes', FALSE, now()),
+    ('mv_estadisticas_evaluaciones', FALSE, now()),
+    ('mv_estadisticas_intereses', FALSE, now()),
+    ('mv_estadisticas_historial', FALSE, now())
+ON CONFLICT (vista) DO NOTHING;
+
+-- Solo escribe cuando la vista pasa de "al día" a "pendiente", así las
+-- escrituras concurrentes no compiten por la misma fila
+CREATE OR REPLACE FUNCTION marcar_estadisticas_pendientes() RETURNS trigger AS $$
+BEGIN
+    UPDATE estadisticas_vistas
+       SET pendiente = TRUE
+     WHERE vista = ANY (TG_ARGV)
+       AND NOT pendiente;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_estadisticas_itinerarios ON itinerarios;
+CREATE TRIGGER trg_estadisticas_itinerarios
+    AFTER INSERT OR UPDATE OR DELETE ON itinerarios
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION marcar_estadisticas_pendientes(
+        'mv_estadisticas_itinerarios', 'mv_estadisticas_visitantes', 'mv_estadisticas_historial'
+    );
+
+DROP TRIGGER IF EXISTS trg_estadisticas_visitantes ON visitantes;
+CREATE TRIGGER trg_estadisticas_visitantes
+    AFTER INSERT OR UPDATE OR DELETE ON visitantes
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION marcar_estadisticas_pendientes('mv_estadisticas_visitantes');
+
+DROP TRIGGER IF EXISTS trg_estadisticas_perfiles ON perfiles;
+CREATE TRIGGER trg_estadisticas_perfiles
+    AFTER INSERT OR UPDATE OR DELETE ON perfiles
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION marcar_estadisticas_pendientes('mv_estadisticas_intereses', 'mv_estadisticas_visitantes');
+
+DROP TRIGGER IF EXISTS trg_estadisticas_evaluaciones ON evaluaciones;
+CREATE TRIGGER trg_estadisticas_evaluaciones
+    AFTER INSERT OR UPDATE OR DELETE ON evaluaciones
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION marcar_estadisticas_pendientes('mv_estadisticas_evaluaciones');
+
+DROP TRIGGER IF EXISTS trg_estadisticas_historial ON historial_visitas;
+CREATE TRIGGER trg_estadisticas_historial
+    AFTER INSERT OR UPDATE OR DELETE ON historial_visitas
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION marcar_estadisticas_pendientes('mv_estadisticas_historial');
@@ -0,0 +1,10 @@
+-- ========================================
+-- MIGRACIÓN 004: Índice GIN sobre perfiles.intereses
+-- ========================================
+-- Acelera /perfiles/buscar/intereses (intereses @> ARRAY['...']).
+-- CONCURRENTLY no bloquea escrituras en perfiles, pero no puede
+-- ejecutarse dentro de una transacción: correr este archivo solo, p. ej.
+--   psql "$DATABASE_URL" -f migraciones/004_indice_intereses_perfiles.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_perfiles_intereses_gin
+    ON perfiles USING gin (intereses);
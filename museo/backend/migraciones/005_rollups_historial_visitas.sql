@@ -0,0 +1,155 @@
+-- ========================================
+-- MIGRACIÓN 005: Rollups diarios del historial de visitas
+-- ========================================
+-- Agregados por día y por (día, hora) mantenidos por trigger en cada
+-- escritura de historial_visitas. Las series de services/analitica_visitas.py
+-- (día / semana / mes / hora del día) leen estas tablas: un rango de años
+-- son unos pocos miles de filas, no todo el historial.
+--
+-- Los promedios se guardan como suma + cantidad para poder agregarlos en
+-- cualquier granularidad con date_trunc.
+
+CREATE TABLE IF NOT EXISTS historial_visitas_diario (
+    fecha DATE PRIMARY KEY,
+    visitas INTEGER NOT NULL DEFAULT 0,
+    suma_satisfaccion INTEGER NOT NULL DEFAULT 0,
+    n_satisfaccion INTEGER NOT NULL DEFAULT 0,
+    suma_duracion BIGINT NOT NULL DEFAULT 0,
+    n_duracion INTEGER NOT NULL DEFAULT 0,
+    suma_minuto_entrada BIGINT NOT NULL DEFAULT 0,  -- minutos desde medianoche
+    n_entrada INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS historial_visitas_horas (
+    fecha DATE NOT NULL,
+    hora SMALLINT NOT NULL,
+    visitas INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, hora)
+);
+
+-- Visitantes únicos de un rango: index-only scan en lugar de leer filas
+CREATE INDEX IF NOT EXISTS ix_historial_visitas_fecha_visitante
+    ON historial_visitas (fecha_visita, visitante_id);
+
+-- ----------------------------------------
+-- Mantenimiento en escritura
+-- ----------------------------------------
+CREATE OR REPLACE FUNCTION sumar_historial_visita(v historial_visitas, signo INTEGER) RETURNS void AS $$
+DECLARE
+    satisfaccion INTEGER := NULLIF(v.satisfaccion_general, 0);
+    duracion INTEGER := NULLIF(v.duracion_total, 0);
+    minuto_entrada INTEGER := (extract(hour FROM v.hora_entrada) * 60 + extract(minute FROM v.hora_entrada))::int;
+BEGIN
+    IF v.fecha_visita IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO historial_visitas_diario AS d (
+        fecha, visitas, suma_satisfaccion, n_satisfaccion,
+        suma_duracion, n_duracion, suma_minuto_entrada, n_entrada
+    ) VALUES (
+        v.fecha_visita,
+        signo,
+        signo * COALESCE(satisfaccion, 0), signo * (satisfaccion IS NOT NULL)::int,
+        signo * COALESCE(duracion, 0), signo * (duracion IS NOT NULL)::int,
+        signo * COALESCE(minuto_entrada, 0), signo * (minuto_entrada IS NOT NULL)::int
+    )
+    ON CONFLICT (fecha) DO UPDATE SET
+        visitas = d.visitas + EXCLUDED.visitas,
+        suma_satisfaccion = d.suma_satisfaccion + EXCLUDED.suma_satisfaccion,
+        n_satisfaccion = d.n_satisfaccion + EXCLUDED.n_satisfaccion,
+        suma_duracion = d.suma_duracion + EXCLUDED.suma_duracion,
+        n_duracion = d.n_duracion + EXCLUDED.n_duracion,
+        suma_minuto_entrada = d.suma_minuto_entrada + EXCLUDED.suma_minuto_entrada,
+        n_entrada = d.n_entrada + EXCLUDED.n_entrada;
+
+    IF minuto_entrada IS NOT NULL THEN
+        INSERT INTO historial_visitas_horas AS h (fecha, hora, visitas)
+        VALUES (v.fecha_visita, minuto_entrada / 60, signo)
+        ON CONFLICT (fecha, hora) DO UPDATE SET visitas = h.visitas + EXCLUDED.visitas;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION acumular_historial_visitas() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM sumar_historial_visita(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM sumar_historial_visita(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_rollups_historial_visitas ON historial_visitas;
+CREATE TRIGGER trg_rollups_historial_visitas
+    AFTER INSERT OR DELETE
+       OR UPDATE OF fecha_visita, hora_entrada, duracion_total, satisfaccion_general
+    ON historial_visitas
+    FOR EACH ROW
+    EXECUTE FUNCTION acumular_historial_visitas();
+
+-- ----------------------------------------
+-- Carga inicial (se puede volver a ejecutar: reconstruye los rollups)
+-- ----------------------------------------
+BEGIN;
+LOCK TABLE historial_visitas IN SHARE MODE;
+TRUNCATE historial_visitas_diario, historial_visitas_horas;
+
+INSERT INTO historial_visitas_diario (
+    fecha, visitas, suma_satisfaccion, n_satisfaccion,
+    suma_duracion, n_duracion, suma_minuto_entrada, n_entrada
+)
+SELECT
+    fecha_visita,
+    count(*),
+    COALESCE(sum(NULLIF(satisfaccion_general, 0)), 0),
+    count(NULLIF(satisfaccion_general, 0)),
+    COALESCE(sum(NULLIF(duracion_total, 0)), 0),
+    count(NULLIF(duracion_total, 0)),
+    COALESCE(sum((extract(hour FROM hora_entrada) * 60 + extract(minute FROM hora_entrada))::int), 0),
+    count(hora_entrada)
+FROM historial_visitas
+WHERE fecha_visita IS NOT NULL
+GROUP BY fecha_visita;
+
+INSERT INTO historial_visitas_horas (fecha, hora, visitas)
+SELECT fecha_visita, extract(hour FROM hora_entrada)::int, count(*)
+FROM historial_visitas
+WHERE fecha_visita IS NOT NULL AND hora_entrada IS NOT NULL
+GROUP BY 1, 2;
+COMMIT;
+
+-- ----------------------------------------
+-- mv_estadisticas_historial: ya no agrega historial_visitas completo;
+-- solo horas pico (desde el rollup por hora) e itinerarios activos hoy.
+-- Hoy / semana / mes se leen directamente de los rollups.
+-- ----------------------------------------
+DROP MATERIALIZED VIEW IF EXISTS mv_estadisticas_historial;
+
+CREATE MATERIALIZED VIEW mv_estadisticas_historial AS
+SELECT
+    1 AS id,
+    current_date AS fecha_calculo,
+    (
+        SELECT count(*)
+        FROM itinerarios
+        WHERE estado = 'activo' AND fecha_inicio::date = current_date
+    ) AS itinerarios_activos_hoy,
+    COALESCE((
+        SELECT jsonb_agg(jsonb_build_object('hora', hp.hora, 'visitantes', hp.visitantes) ORDER BY hp.visitantes DESC)
+        FROM (
+            SELECT hora, sum(visitas) AS visitantes
+            FROM historial_visitas_horas
+            GROUP BY hora
+            HAVING sum(visitas) > 0
+            ORDER BY 2 DESC
+            LIMIT 5
+        ) hp
+    ), '[]'::jsonb) AS horas_pico,
+    now() AS calculado_en;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_estadisticas_historial
+    ON mv_estadisticas_historial (id);
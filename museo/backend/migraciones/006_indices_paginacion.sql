@@ -0,0 +1,23 @@
+-- ========================================
+-- MIGRACIÓN 006: Índices para paginación por keyset
+-- ========================================
+-- Los listados (utils/paginacion.py) ordenan por (fecha_*, id) y continúan
+-- con WHERE (fecha_*, id) < (:fecha, :id). Con un índice compuesto en el
+-- mismo orden cada página es un recorrido corto del índice, sin OFFSET.
+--
+-- CONCURRENTLY no bloquea escrituras; no ejecutar dentro de una transacción.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_visitantes_fecha_registro_id
+    ON visitantes (fecha_registro, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_itinerarios_fecha_generacion_id
+    ON itinerarios (fecha_generacion, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_historial_visitas_hora_entrada_id
+    ON historial_visitas (hora_entrada, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_areas_orden_recomendado_id
+    ON areas (orden_recomendado, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_evaluaciones_fecha_creacion_id
+    ON evaluaciones (fecha_creacion, id);
@@ -0,0 +1,61 @@
+-- ========================================
+-- MIGRACIÓN 007: Búsqueda de visitantes (pg_trgm + tsvector sin tildes)
+-- ========================================
+-- Reemplaza los cuatro ILIKE '%...%' de /visitantes?buscar= (recorrido
+-- completo de la tabla en cada tecla) por columnas generadas e índices:
+--   - texto_busqueda: nombre, apellido, email y código en minúsculas y sin
+--     tildes; índice GIN de trigramas para LIKE '%...%' y word_similarity() (errores de tipeo)
+--   - busqueda: tsvector con pesos (A = nombre/apellido, B = email/código)
+--     para /visitantes/buscar con ranking
+--   - índices btree COLLATE "C" para el autocompletado por prefijo de
+--     /visitantes/sugerencias: sirven el LIKE 'abc%' y el ORDER BY, así el
+--     LIMIT se corta en el índice sin ordenar todas las coincidencias
+-- Ver services/busqueda_visitantes.py.
+--
+-- Se usa la configuración 'simple' (sin stemming): con 'spanish' apellidos
+-- como "Morales" quedarían como "moral".
+--
+-- ADD COLUMN ... STORED reescribe visitantes con un lock exclusivo:
+-- ejecutar en una ventana de mantenimiento. Los índices se crean con
+-- CONCURRENTLY, así que el archivo no puede correr dentro de una transacción:
+--   psql "$DATABASE_URL" -f migraciones/007_busqueda_visitantes.sql
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() es STABLE (depende del search_path); las columnas generadas y
+-- los índices necesitan una función IMMUTABLE con el diccionario explícito
+CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$;
+
+ALTER TABLE visitantes
+    ADD COLUMN IF NOT EXISTS texto_busqueda TEXT GENERATED ALWAYS AS (
+        f_unaccent(lower(
+            nombre || ' ' || coalesce(apellido, '') || ' ' || email || ' ' || coalesce(codigo_visita, '')
+        ))
+    ) STORED;
+
+ALTER TABLE visitantes
+    ADD COLUMN IF NOT EXISTS busqueda TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple'::regconfig, f_unaccent(nombre || ' ' || coalesce(apellido, ''))), 'A') ||
+        setweight(to_tsvector('simple'::regconfig, email || ' ' || coalesce(codigo_visita, '')), 'B')
+    ) STORED;
+
+-- Búsqueda con ranking y por subcadena
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_visitantes_busqueda
+    ON visitantes USING gin (busqueda);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_visitantes_texto_busqueda_trgm
+    ON visitantes USING gin (texto_busqueda gin_trgm_ops);
+
+-- Autocompletado por prefijo (las expresiones deben coincidir con las de
+-- services/busqueda_visitantes.py)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_visitantes_prefijo_nombre
+    ON visitantes ((f_unaccent(lower(nombre || ' ' || coalesce(apellido, '')))) COLLATE "C");
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_visitantes_prefijo_apellido
+    ON visitantes ((f_unaccent(lower(apellido))) COLLATE "C");
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_visitantes_prefijo_email
+    ON visitantes ((lower(email)) COLLATE "C");
@@ -0,0 +1,14 @@
+-- ========================================
+-- MIGRACIÓN 008: Generación de itinerarios en lote (grupos escolares)
+-- ========================================
+-- POST /itinerarios/generar/lote crea N itinerarios y un solo trabajo de
+-- tipo 'lote' en la cola. itinerario_id del trabajo es el primero del lote;
+-- itinerarios_lote lista todos para que el stream SSE de cualquiera de
+-- ellos sepa si el trabajo sigue activo (itinerarios_lote @> ARRAY[id]).
+
+ALTER TABLE trabajos_generacion
+    ADD COLUMN IF NOT EXISTS itinerarios_lote INTEGER[];
+
+CREATE INDEX IF NOT EXISTS ix_trabajos_generacion_itinerarios_lote
+    ON trabajos_generacion USING GIN (itinerarios_lote)
+    WHERE itinerarios_lote IS NOT NULL;
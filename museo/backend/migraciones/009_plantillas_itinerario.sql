@@ -0,0 +1,24 @@
+-- ========================================
+-- MIGRACIÓN 009: Plantillas de itinerario precalculadas
+-- ========================================
+-- Itinerarios completos (estructura + contenido de todas las áreas) para
+-- las combinaciones de intereses / tiempo / nivel más pedidas. Las genera
+-- `python precalcular_plantillas.py` y /itinerarios/generar las sirve con
+-- una sola lectura por clave. Clave = sha256 de intereses normalizados,
+-- tiempo, nivel, áreas elegibles y versión del knowledge base.
+
+CREATE TABLE IF NOT EXISTS plantillas_itinerario (
+    clave VARCHAR(64) PRIMARY KEY,
+    intereses TEXT[] NOT NULL,
+    tiempo_disponible INTEGER,  -- NULL = sin límite
+    nivel_detalle VARCHAR(20) NOT NULL,
+    version_kb VARCHAR(64),
+    contenido JSONB NOT NULL,  -- titulo, descripcion, duracion_total, areas[]
+    frecuencia INTEGER NOT NULL DEFAULT 0,  -- Itinerarios con esta combinación al precalcular
+    usos INTEGER NOT NULL DEFAULT 0,
+    fecha_creacion TIMESTAMPTZ DEFAULT now(),
+    ultimo_uso TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS ix_plantillas_itinerario_fecha_creacion
+    ON plantillas_itinerario (fecha_creacion);
@@ -0,0 +1,46 @@
+-- ========================================
+-- MIGRACIÓN 010: Calendario del museo (horario semanal + excepciones)
+-- ========================================
+-- Reemplaza el diccionario HORARIOS_MUSEO fijo en utils/horarios_museo.py:
+--   - horarios_semanales: apertura/cierre por día de la semana (0 = lunes);
+--     NULL en ambas columnas = cerrado ese día
+--   - excepciones_horario: feriados y eventos especiales por fecha; cerrado
+--     todo el día o con otro horario (apertura nocturna, jornada reducida)
+-- utils/calendario_museo.py lee ambas tablas cada HORARIOS_RECARGA_SEGUNDOS
+-- y precalcula los intervalos de apertura de los próximos
+-- HORARIOS_MESES_PRECALCULO meses. Si las tablas no existen se usa HORARIOS_MUSEO.
+
+CREATE TABLE IF NOT EXISTS horarios_semanales (
+    dia_semana SMALLINT PRIMARY KEY CHECK (dia_semana BETWEEN 0 AND 6),
+    apertura TIME,
+    cierre TIME,
+    CHECK ((apertura IS NULL AND cierre IS NULL) OR (apertura < cierre))
+);
+
+-- Horario vigente (el mismo que HORARIOS_MUSEO)
+INSERT INTO horarios_semanales (dia_semana, apertura, cierre) VALUES
+    (0, NULL, NULL),
+    (1, '08:00', '17:00'),
+    (2, '08:00', '17:00'),
+    (3, '08:00', '17:00'),
+    (4, '08:00', '17:00'),
+    (5, '10:00', '16:00'),
+    (6, '10:00', '16:00')
+ON CONFLICT (dia_semana) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS excepciones_horario (
+    fecha DATE PRIMARY KEY,
+    tipo VARCHAR(20) NOT NULL DEFAULT 'feriado' CHECK (tipo IN ('feriado', 'evento')),
+    cerrado BOOLEAN NOT NULL DEFAULT TRUE,
+    apertura TIME,  -- Solo si no está cerrado
+    cierre TIME,
+    motivo VARCHAR(200),  -- Se muestra al visitante ("Día de Difuntos", "Noche de museos")
+    fecha_creacion TIMESTAMPTZ DEFAULT now(),
+    CHECK (cerrado OR (apertura IS NOT NULL AND cierre IS NOT NULL AND apertura < cierre))
+);
+
+-- Ejemplos:
+--   INSERT INTO excepciones_horario (fecha, tipo, motivo)
+--       VALUES ('2026-11-03', 'feriado', 'Independencia de Cuenca');
+--   INSERT INTO excepciones_horario (fecha, tipo, cerrado, apertura, cierre, motivo)
+--       VALUES ('2026-05-18', 'evento', FALSE, '08:00', '21:00', 'Día Internacional de los Museos');
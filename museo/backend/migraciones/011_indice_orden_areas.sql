@@ -0,0 +1,15 @@
+-- ========================================
+-- MIGRACIÓN 011: Keyset de áreas sin NULL
+-- ========================================
+-- /areas pagina por (orden_recomendado, id), pero orden_recomendado admite
+-- NULL y en PostgreSQL (NULL, id) > (...) es NULL: las áreas sin orden no
+-- salían después de la primera página. Ahora la clave es
+-- coalesce(orden_recomendado, 2147483647) (Area.orden_paginacion en
+-- models.py) y este índice reemplaza al de migraciones/006.
+--
+-- CONCURRENTLY no bloquea escrituras; no ejecutar dentro de una transacción.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_areas_orden_paginacion_id
+    ON areas ((coalesce(orden_recomendado, 2147483647)), id);
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_areas_orden_recomendado_id;
@@ -0,0 +1,42 @@
+-- ========================================
+-- MIGRACIÓN 012: Versión de la tabla evaluaciones
+-- ========================================
+-- services/estadisticas_evaluaciones.py guarda en memoria las estadísticas
+-- con la versión de los datos como parte de la clave. Antes la versión era
+-- max(id): editar o borrar una evaluación no la cambiaba y las estadísticas
+-- quedaban viejas hasta la siguiente inserción.
+--
+-- Un trigger por sentencia incrementa el contador en INSERT, UPDATE, DELETE
+-- y TRUNCATE. Es una fila (no una secuencia) a propósito: el nuevo valor
+-- solo se ve cuando la escritura hace commit, así nadie guarda en cache
+-- estadísticas calculadas sin esa escritura bajo la versión nueva. Las
+-- evaluaciones llegan de a una por visita, el lock de la fila no molesta.
+
+CREATE TABLE IF NOT EXISTS versiones_tablas (
+    tabla VARCHAR(63) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO versiones_tablas (tabla, version) VALUES ('evaluaciones', 0)
+ON CONFLICT (tabla) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION incrementar_version_tabla() RETURNS trigger AS $$
+BEGIN
+    UPDATE versiones_tablas
+       SET version = version + 1
+     WHERE tabla = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_version_evaluaciones ON evaluaciones;
+CREATE TRIGGER trg_version_evaluaciones
+    AFTER INSERT OR UPDATE OR DELETE ON evaluaciones
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION incrementar_version_tabla();
+
+DROP TRIGGER IF EXISTS trg_version_evaluaciones_truncate ON evaluaciones;
+CREATE TRIGGER trg_version_evaluaciones_truncate
+    AFTER TRUNCATE ON evaluaciones
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION incrementar_version_tabla();
@@ -0,0 +1,32 @@
+-- ========================================
+-- MIGRACIÓN 013: Keyset de los listados sin NULL
+-- ========================================
+-- /visitantes, /itinerarios, /historial y /evaluaciones/todas paginan por
+-- (fecha, id), pero esas fechas admiten NULL (evaluaciones.fecha_creacion ni
+-- siquiera tiene DEFAULT en la BD). En orden descendente las filas con NULL
+-- salen primero y, si el cursor cae en una, (NULL, id) < (...) es NULL: las
+-- páginas siguientes venían vacías y el listado se cortaba en silencio.
+--
+-- Ahora la clave es coalesce(fecha, año 1) (utils/paginacion.clave_orden):
+-- las filas sin fecha van al final. Estos índices reemplazan a los de
+-- migraciones/006. El literal va sin tipo para que PostgreSQL lo convierta al
+-- tipo de la columna, igual que en las consultas.
+--
+-- CONCURRENTLY no bloquea escrituras; no ejecutar dentro de una transacción.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_visitantes_paginacion_id
+    ON visitantes ((coalesce(fecha_registro, '0001-01-01 00:00:00+00')), id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_itinerarios_paginacion_id
+    ON itinerarios ((coalesce(fecha_generacion, '0001-01-01 00:00:00+00')), id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_historial_visitas_paginacion_id
+    ON historial_visitas ((coalesce(hora_entrada, '0001-01-01 00:00:00+00')), id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_evaluaciones_paginacion_id
+    ON evaluaciones ((coalesce(fecha_creacion, '0001-01-01 00:00:00+00')), id);
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_visitantes_fecha_registro_id;
+DROP INDEX CONCURRENTLY IF EXISTS ix_itinerarios_fecha_generacion_id;
+DROP INDEX CONCURRENTLY IF EXISTS ix_historial_visitas_hora_entrada_id;
+DROP INDEX CONCURRENTLY IF EXISTS ix_evaluaciones_fecha_creacion_id;
@@ -3,14 +3,17 @@
 
 from sqlalchemy import (
     Column, Integer, String, Text, Boolean, DateTime, Date, 
-    ForeignKey, CheckConstraint, ARRAY, DECIMAL
+    ForeignKey, CheckConstraint, ARRAY, DECIMAL, Index, BigInteger, SmallInteger, Computed, Time,
+    DDL, event
 )
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from datetime import datetime, timezone
 
 from database import Base
+from utils.paginacion import clave_orden
 
 # ============================================
 # MODELO: VISITANTES (CORREGIDO)
@@ -42,6 +45,17 @@ class Visitante(Base):
     total_visitas = Column(Integer, default=0)
     activo = Column(Boolean, default=True)
     
+    # 🔥 Búsqueda (columnas generadas, migraciones/007); deferred: no se cargan en los listados
+    texto_busqueda = deferred(Column(Text, Computed(
+        "f_unaccent(lower(nombre || ' ' || coalesce(apellido, '') || ' ' || email || ' ' || coalesce(codigo_visita, '')))",
+        persisted=True
+    )))
+    busqueda = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple'::regconfig, f_unaccent(nombre || ' ' || coalesce(apellido, ''))), 'A') || "
+        "setweight(to_tsvector('simple'::regconfig, email || ' ' || coalesce(codigo_visita, '')), 'B')",
+        persisted=True
+    )))
+    
     # Relaciones
     perfil = relationship("Perfil", back_populates="visitante", uselist=False, cascade="all, delete-orphan")
     historial = relationship("HistorialVisita", back_populates="visitante", cascade="all, delete-orphan")
@@ -52,12 +66,32 @@ class Visitante(Base):
             "tipo_visitante IN ('local', 'nacional', 'internacional')",
             name='check_tipo_visitante'
         ),
+        # 🔥 Paginación por keyset (fecha_registro sin NULL, id), migraciones/013
+        Index('ix_visitantes_paginacion_id', clave_orden(fecha_registro), id),
+        Index('ix_visitantes_busqueda', 'busqueda', postgresql_using='gin'),
+        Index(
+            'ix_visitantes_texto_busqueda_trgm', 'texto_busqueda',
+            postgresql_using='gin', postgresql_ops={'texto_busqueda': 'gin_trgm_ops'}
+        ),
     )
     
     def __repr__(self):
         return f"<Visitante {self.codigo_visita}: {self.nombre} {self.apellido}>"
 
 
+# 🔥 Las columnas generadas y el índice trigram de visitantes necesitan
+# pg_trgm, unaccent y f_unaccent (las mismas sentencias que migraciones/007):
+# se crean antes de create_all para que init_db funcione en una BD vacía.
+for _sentencia in (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text "
+    "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+    "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$",
+):
+    event.listen(Base.metadata, "before_create", DDL(_sentencia).execute_if(dialect="postgresql"))
+
+
 # ============================================
 # MODELO: PERFILES
 # ============================================
@@ -90,6 +124,8 @@ class Perfil(Base):
             "nivel_detalle IN ('rapido', 'normal', 'profundo')",
             name='check_nivel_detalle'
         ),
+        # 🔥 GIN: búsquedas intereses @> ARRAY[...] sin recorrer toda la tabla
+        Index('ix_perfiles_intereses_gin', 'intereses', postgresql_using='gin'),
     )
     
     def __repr__(self):
@@ -100,6 +136,9 @@ class Perfil(Base):
 # MODELO: AREAS (CORREGIDO)
 # ============================================
 
+AREA_SIN_ORDEN = 2147483647  # Máximo INTEGER: áreas sin orden_recomendado al final
+
+
 class Area(Base):
     __tablename__ = "areas"
 
@@ -128,6 +167,22 @@ class Area(Base):
     
     # Relaciones
     detalles_itinerario = relationship("ItinerarioDetalle", back_populates="area")
+
+    # 🔥 Clave de paginación: orden_recomendado sin NULL (las áreas sin orden
+    # van al final). Con NULL la comparación de filas del keyset da NULL y
+    # esas áreas nunca aparecían después de la primera página.
+    @hybrid_property
+    def orden_paginacion(self) -> int:
+        return self.orden_recomendado if self.orden_recomendado is not None else AREA_SIN_ORDEN
+
+    @orden_paginacion.expression
+    def orden_paginacion(cls):
+        return func.coalesce(cls.orden_recomendado, AREA_SIN_ORDEN)
+
+    __table_args__ = (
+        # 🔥 Paginación por keyset (orden_paginacion, id), migraciones/011
+        Index('ix_areas_orden_paginacion_id', func.coalesce(orden_recomendado, AREA_SIN_ORDEN), id),
+    )
     
     def __repr__(self):
         return f"<Area {self.codigo}: {self.nombre}>"
@@ -195,6 +250,8 @@ class Itinerario(Base):
             "acompañantes >= 0",
             name='check_acompanantes'
         ),
+        # 🔥 Paginación por keyset (fecha_generacion sin NULL, id), migraciones/013
+        Index('ix_itinerarios_paginacion_id', clave_orden(fecha_generacion), id),
     )
     
     def __repr__(self):
@@ -273,11 +330,54 @@ class HistorialVisita(Base):
     itinerario = relationship("Itinerario", back_populates="historial")
     
     # ✅ Constraints ELIMINADO check_satisfaccion
+    __table_args__ = (
+        # 🔥 Visitantes únicos por rango de fechas (index-only scan)
+        Index('ix_historial_visitas_fecha_visitante', 'fecha_visita', 'visitante_id'),
+        # 🔥 Paginación por keyset (hora_entrada sin NULL, id), migraciones/013
+        Index('ix_historial_visitas_paginacion_id', clave_orden(hora_entrada), id),
+    )
     
     def __repr__(self):
         return f"<Visita {self.fecha_visita} - Visitante {self.visitante_id}>"
 
 
+# ============================================
+# MODELO: ROLLUPS DEL HISTORIAL (mantenidos por trigger)
+# ============================================
+
+class HistorialVisitaDiario(Base):
+    """
+    Agregados de historial_visitas por día. Los mantiene el trigger
+    trg_rollups_historial_visitas (migraciones/005); no escribir desde la app.
+    Los promedios se guardan como suma + cantidad.
+    """
+    __tablename__ = "historial_visitas_diario"
+
+    fecha = Column(Date, primary_key=True)
+    visitas = Column(Integer, nullable=False, default=0)
+    suma_satisfaccion = Column(Integer, nullable=False, default=0)
+    n_satisfaccion = Column(Integer, nullable=False, default=0)
+    suma_duracion = Column(BigInteger, nullable=False, default=0)
+    n_duracion = Column(Integer, nullable=False, default=0)
+    suma_minuto_entrada = Column(BigInteger, nullable=False, default=0)  # Minutos desde medianoche
+    n_entrada = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<HistorialVisitaDiario {self.fecha}: {self.visitas} visitas>"
+
+
+class HistorialVisitaHora(Base):
+    """Entradas por (día, hora); mantenido por el mismo trigger"""
+    __tablename__ = "historial_visitas_horas"
+
+    fecha = Column(Date, primary_key=True)
+    hora = Column(SmallInteger, primary_key=True)
+    visitas = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<HistorialVisitaHora {self.fecha} {self.hora:02d}h: {self.visitas}>"
+
+
 # ============================================
 # MODELO: EVALUACION
 # ============================================
@@ -313,5 +413,143 @@ class Evaluacion(Base):
     # Relación
     itinerario = relationship("Itinerario", back_populates="evaluacion")
 
+    __table_args__ = (
+        # 🔥 Paginación por keyset (fecha_creacion sin NULL, id), migraciones/013
+        Index('ix_evaluaciones_paginacion_id', clave_orden(fecha_creacion), id),
+    )
+
+    def __repr__(self):
+        return f"<Evaluacion {self.id} - Itinerario {self.itinerario_id} - {self.calificacion_general}⭐>"
+
+# ============================================
+# MODELO: TRABAJOS DE GENERACIÓN (cola persistente)
+# ============================================
+
+class TrabajoGeneracion(Base):
+    """
+    Cola durable de generación de contenido de áreas.
+    Los workers reclaman trabajos con SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    __tablename__ = "trabajos_generacion"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    itinerario_id = Column(Integer, ForeignKey("itinerarios.id", ondelete="CASCADE"), nullable=False, index=True)
+    tipo = Column(String(50), nullable=False, default='areas_pendientes')  # areas_pendientes | lote
+    itinerarios_lote = Column(ARRAY(Integer))  # Todos los itinerarios de un trabajo 'lote'
+    
+    # Estado y datos del trabajo
+    estado = Column(String(20), nullable=False, default='pendiente')
+    payload = Column(JSONB, nullable=False)
+    intentos = Column(Integer, nullable=False, default=0)
+    max_intentos = Column(Integer, nullable=False, default=3)
+    error = Column(Text)
+    
+    # Reclamo (lease) por un worker
+    worker = Column(String(100))
+    bloqueado_hasta = Column(DateTime(timezone=True))
+    disponible_desde = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
+    fecha_actualizacion = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Constraints
+    __table_args__ = (
+        CheckConstraint(
+            "estado IN ('pendiente', 'en_proceso', 'completado', 'fallido')",
+            name='check_estado_trabajo'
+        ),
+        Index('ix_trabajos_generacion_cola', 'estado', 'disponible_desde', 'id'),
+        Index(
+            'ix_trabajos_generacion_itinerarios_lote', 'itinerarios_lote',
+            postgresql_using='gin', postgresql_where=itinerarios_lote.isnot(None)
+        ),
+    )
+    
+    def __repr__(self):
+        return f"<TrabajoGeneracion {self.id}: itinerario={self.itinerario_id} estado={self.estado}>"
+
+
+# ============================================
+# MODELO: CACHE DE CONTENIDO DE ÁREAS (2º nivel)
+# ============================================
+
+class CacheContenidoArea(Base):
+    """
+    Contenido generado por la IA para un área, indexado por la huella
+    normalizada del prompt (área + intereses + nivel + proveedor + modelo).
+    """
+    __tablename__ = "cache_contenido_areas"
+
+    clave = Column(String(64), primary_key=True)  # sha256 del prompt normalizado
+    area_codigo = Column(String(20), nullable=False, index=True)
+    proveedor = Column(String(20))
+    modelo = Column(String(50))
+    contenido = Column(JSONB, nullable=False)
+    
+    hits = Column(Integer, nullable=False, default=0)
+    fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
+    ultimo_acceso = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    expira_en = Column(DateTime(timezone=True), nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<CacheContenidoArea {self.area_codigo} {self.clave[:8]}>"
+
+
+# ============================================
+# MODELO: PLANTILLAS DE ITINERARIO PRECALCULADAS
+# ============================================
+
+class PlantillaItinerario(Base):
+    """
+    Itinerario completo (estructura + contenido) para una combinación
+    frecuente de intereses, tiempo y nivel. El nombre del visitante va
+    como marcador y se reemplaza al servirla.
+    """
+    __tablename__ = "plantillas_itinerario"
+
+    clave = Column(String(64), primary_key=True)  # sha256 de la combinación + áreas + versión KB
+    intereses = Column(ARRAY(Text), nullable=False)
+    tiempo_disponible = Column(Integer)  # NULL = sin límite
+    nivel_detalle = Column(String(20), nullable=False)
+    version_kb = Column(String(64))
+    contenido = Column(JSONB, nullable=False)
+    
+    frecuencia = Column(Integer, nullable=False, default=0)
+    usos = Column(Integer, nullable=False, default=0)
+    fecha_creacion = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    ultimo_uso = Column(DateTime(timezone=True))
+    
+    def __repr__(self):
+        return f"<PlantillaItinerario {self.intereses} {self.tiempo_disponible} {self.nivel_detalle}>"
+
+
+# ============================================
+# MODELO: CALENDARIO DEL MUSEO
+# ============================================
+
+class HorarioSemanal(Base):
+    """Horario regular de un día de la semana (0 = lunes); sin horas = cerrado"""
+    __tablename__ = "horarios_semanales"
+
+    dia_semana = Column(SmallInteger, primary_key=True)
+    apertura = Column(Time)
+    cierre = Column(Time)
+    
+    def __repr__(self):
+        return f"<HorarioSemanal {self.dia_semana} {self.apertura}-{self.cierre}>"
+
+
+class ExcepcionHorario(Base):
+    """Feriado o evento especial: cierra el museo o cambia su horario ese día"""
+    __tablename__ = "excepciones_horario"
+
+    fecha = Column(Date, primary_key=True)
+    tipo = Column(String(20), nullable=False, default='feriado')  # feriado | evento
+    cerrado = Column(Boolean, nullable=False, default=True)
+    apertura = Column(Time)
+    cierre = Column(Time)
+    motivo = Column(String(200))
+    fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
+    
     def __repr__(self):
-        return f"<Evaluacion {self.id} - Itinerario {self.itinerario_id} - {self.calificacion_general}⭐>"
\ No newline at end of file
+        return f"<ExcepcionHorario {self.fecha} {self.tipo} {'cerrado' if self.cerrado else f'{self.apertura}-{self.cierre}'}>"
@@ -0,0 +1,52 @@
+# precalcular_plantillas.py
+# 🔥 Genera fuera de línea las plantillas de itinerario (tabla plantillas_itinerario)
+# Toma las combinaciones de intereses / tiempo / nivel más frecuentes y
+# genera para cada una la estructura y el contenido de todas las áreas.
+# Correrlo periódicamente (cron) y después de cambiar museo_knowledge.json.
+#
+# Uso:
+#   python precalcular_plantillas.py                # PLANTILLAS_TOP_K combinaciones
+#   python precalcular_plantillas.py --top 50 --forzar
+#   python precalcular_plantillas.py --purgar       # Además borra las de otras versiones del KB
+
+import argparse
+import asyncio
+import logging
+
+from config import get_settings
+from utils.registro import configurar_logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+async def ejecutar(args):
+    from services.ia_service import ia_service
+    from services.plantillas_itinerario import plantillas_itinerario
+
+    try:
+        resumen = await plantillas_itinerario.precalcular(top_k=args.top, forzar=args.forzar)
+        logger.info(
+            "✅ Plantillas: %s generadas, %s ya existían, %s fallidas (%s combinaciones)",
+            resumen['generadas'], resumen['existentes'], resumen['fallidas'], resumen['combinaciones']
+        )
+        if args.purgar:
+            eliminadas = await asyncio.to_thread(plantillas_itinerario.purgar_obsoletas)
+            logger.info("🧹 %s plantillas de otras versiones del KB eliminadas", eliminadas)
+    finally:
+        await ia_service.cerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precalcular plantillas de itinerario")
+    parser.add_argument("--top", type=int, default=settings.PLANTILLAS_TOP_K, help="Combinaciones más frecuentes a generar")
+    parser.add_argument("--forzar", action="store_true", help="Regenerar aunque la plantilla ya exista")
+    parser.add_argument("--purgar", action="store_true", help="Borrar plantillas de versiones anteriores del KB")
+    args = parser.parse_args()
+
+    configurar_logging("INFO")
+    asyncio.run(ejecutar(args))
+
+
+if __name__ == "__main__":
+    main()
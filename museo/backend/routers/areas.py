@@ -2,7 +2,7 @@
 # CRUD para gestión de áreas del museo
 # Sistema Museo Pumapungo
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional
@@ -11,6 +11,8 @@ import logging
 from database import get_db
 from models import Area
 from schemas import AreaCreate, AreaUpdate, AreaResponse
+from services.cache_contenido import cache_contenido
+from utils.paginacion import paginar_keyset
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -40,8 +42,11 @@ async def crear_area(area: AreaCreate, db: Session = Depends(get_db)):
 
 @router.get("/", response_model=List[AreaResponse])
 async def listar_areas(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor de X-Siguiente-Cursor (paginación por keyset)"),
+    total: bool = Query(False, description="Agregar X-Total-Estimado (estimación del planificador)"),
     categoria: Optional[str] = None,
     activa: Optional[bool] = True,
     db: Session = Depends(get_db)
@@ -55,7 +60,10 @@ async def listar_areas(
     if activa is not None:
         query = query.filter(Area.activa == activa)
     
-    return query.order_by(Area.orden_recomendado).offset(skip).limit(limit).all()
+    return paginar_keyset(
+        query, [Area.orden_paginacion, Area.id], limit, response,
+        cursor=cursor, skip=skip, descendente=False, total=total
+    )
 
 @router.get("/{area_id}", response_model=AreaResponse)
 async def obtener_area(area_id: int, db: Session = Depends(get_db)):
@@ -93,6 +101,7 @@ async def actualizar_area(
     
     db.commit()
     db.refresh(area)
+    cache_contenido.invalidar_area(area.codigo)
     logger.info(f"✅ Área actualizada: {area.codigo}")
     return area
 
@@ -107,9 +116,11 @@ async def eliminar_area(area_id: int, db: Session = Depends(get_db)):
     if not area:
         raise HTTPException(status_code=404, detail="Área no encontrada")
     
+    codigo = area.codigo
     db.delete(area)
     db.commit()
-    logger.info(f"✅ Área eliminada: {area.codigo}")
+    cache_contenido.invalidar_area(codigo)
+    logger.info("✅ Área eliminada: %s", codigo)
 
 # ============================================
 # ENDPOINTS ESPECIALES
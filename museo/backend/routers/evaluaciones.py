@@ -1,14 +1,18 @@
 # routers/evaluaciones.py
 # 🔥 VERSIÓN SIN DEPENDENCIES (sin autenticación)
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import date
 import logging
 
 from database import get_db
 from models import Evaluacion, Itinerario, Visitante, Perfil
-from schemas import EvaluacionCreate, EvaluacionResponse, EstadisticasEvaluacion
+from schemas import EvaluacionCreate, EvaluacionResponse, EstadisticasEvaluacion, EstadisticasEvaluacionArea
+from services.estadisticas_materializadas import estadisticas_materializadas
+from services.estadisticas_evaluaciones import estadisticas_evaluaciones
+from utils.paginacion import paginar_keyset
 
 logger = logging.getLogger(__name__)
 
@@ -100,69 +104,48 @@ def obtener_evaluacion_itinerario(
 
 @router.get("/estadisticas", response_model=EstadisticasEvaluacion)
 def obtener_estadisticas_evaluaciones(
+    desde: Optional[date] = Query(None, description="Fecha inicial (inclusive)"),
+    hasta: Optional[date] = Query(None, description="Fecha final (inclusive)"),
     db: Session = Depends(get_db)
 ):
     """
     Obtener estadísticas agregadas de todas las evaluaciones
     (Útil para administradores y para la tesis)
+    🔥 Sin rango: una lectura de mv_estadisticas_evaluaciones.
+    Con rango: una consulta agregada en PostgreSQL, cacheada hasta la próxima evaluación.
     """
-    evaluaciones = db.query(Evaluacion).all()
+    if desde is None and hasta is None:
+        stats = estadisticas_materializadas.leer(db, "mv_estadisticas_evaluaciones")
+        return estadisticas_evaluaciones.armar(stats)
     
-    if not evaluaciones:
-        return EstadisticasEvaluacion(
-            total_evaluaciones=0,
-            calificacion_promedio=0.0,
-            porcentaje_personalizado=0.0,
-            porcentaje_buenas_decisiones=0.0,
-            porcentaje_acompaniamiento=0.0,
-            porcentaje_comprension=0.0,
-            porcentaje_relevante=0.0,
-            porcentaje_usaria_nuevamente=0.0,
-            satisfaccion_general="Sin datos"
-        )
-    
-    total = len(evaluaciones)
-    
-    # Calcular promedios
-    calificacion_promedio = sum(e.calificacion_general for e in evaluaciones) / total
-    
-    porcentaje_personalizado = sum(1 for e in evaluaciones if e.personalizado) / total * 100
-    porcentaje_buenas_decisiones = sum(1 for e in evaluaciones if e.buenas_decisiones) / total * 100
-    porcentaje_acompaniamiento = sum(1 for e in evaluaciones if e.acompaniamiento) / total * 100
-    porcentaje_comprension = sum(1 for e in evaluaciones if e.comprension) / total * 100
-    porcentaje_relevante = sum(1 for e in evaluaciones if e.relevante) / total * 100
-    porcentaje_usaria_nuevamente = sum(1 for e in evaluaciones if e.usaria_nuevamente) / total * 100
-    
-    # Determinar nivel de satisfacción
-    if calificacion_promedio >= 4.5:
-        satisfaccion = "Excelente"
-    elif calificacion_promedio >= 3.5:
-        satisfaccion = "Buena"
-    elif calificacion_promedio >= 2.5:
-        satisfaccion = "Regular"
-    else:
-        satisfaccion = "Necesita mejorar"
-    
-    return EstadisticasEvaluacion(
-        total_evaluaciones=total,
-        calificacion_promedio=round(calificacion_promedio, 2),
-        porcentaje_personalizado=round(porcentaje_personalizado, 2),
-        porcentaje_buenas_decisiones=round(porcentaje_buenas_decisiones, 2),
-        porcentaje_acompaniamiento=round(porcentaje_acompaniamiento, 2),
-        porcentaje_comprension=round(porcentaje_comprension, 2),
-        porcentaje_relevante=round(porcentaje_relevante, 2),
-        porcentaje_usaria_nuevamente=round(porcentaje_usaria_nuevamente, 2),
-        satisfaccion_general=satisfaccion
-    )
+    return estadisticas_evaluaciones.resumen(db, desde, hasta)
+
+@router.get("/estadisticas/por-area", response_model=List[EstadisticasEvaluacionArea])
+def obtener_estadisticas_evaluaciones_por_area(
+    desde: Optional[date] = Query(None, description="Fecha inicial (inclusive)"),
+    hasta: Optional[date] = Query(None, description="Fecha final (inclusive)"),
+    db: Session = Depends(get_db)
+):
+    """
+    🔥 Estadísticas de evaluaciones desglosadas por área del itinerario evaluado
+    """
+    return estadisticas_evaluaciones.por_area(db, desde, hasta)
 
 @router.get("/todas", response_model=List[EvaluacionResponse])
 def obtener_todas_evaluaciones(
+    response: Response,
     db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 100
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor de X-Siguiente-Cursor (paginación por keyset)"),
+    total: bool = Query(False, description="Agregar X-Total-Estimado (estimación del planificador)")
 ):
     """
     Obtener todas las evaluaciones (para análisis)
+    🔥 Más recientes primero, paginadas por keyset (cursor en X-Siguiente-Cursor).
+    Mismo contrato de limit que antes: 100 por defecto y sin tope.
     """
-    evaluaciones = db.query(Evaluacion).offset(skip).limit(limit).all()
-    return evaluaciones
\ No newline at end of file
+    return paginar_keyset(
+        db.query(Evaluacion), [Evaluacion.fecha_creacion, Evaluacion.id], limit, response,
+        cursor=cursor, skip=skip, total=total
+    )
\ No newline at end of file
@@ -3,9 +3,8 @@
 # Sistema Museo Pumapungo
 # ✅ MODIFICADO PARA ADMINPAGE
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, extract, desc
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 import logging
@@ -17,6 +16,9 @@ from schemas import (
     HistorialVisitaUpdate,
     HistorialVisitaResponse
 )
+from services.estadisticas_materializadas import estadisticas_materializadas
+from services.analitica_visitas import analitica_visitas
+from utils.paginacion import paginar_keyset
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -53,8 +55,11 @@ async def registrar_entrada(visita: HistorialVisitaCreate, db: Session = Depends
 
 @router.get("/", response_model=List[HistorialVisitaResponse])
 async def listar_visitas(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor de X-Siguiente-Cursor (paginación por keyset)"),
+    total: bool = Query(False, description="Agregar X-Total-Estimado (estimación del planificador)"),
     fecha_desde: Optional[date] = None,
     fecha_hasta: Optional[date] = None,
     visitante_id: Optional[int] = None,
@@ -72,7 +77,10 @@ async def listar_visitas(
     if fecha_hasta:
         query = query.filter(HistorialVisita.fecha_visita <= fecha_hasta)
     
-    return query.order_by(HistorialVisita.hora_entrada.desc()).offset(skip).limit(limit).all()
+    return paginar_keyset(
+        query, [HistorialVisita.hora_entrada, HistorialVisita.id], limit, response,
+        cursor=cursor, skip=skip, total=total
+    )
 
 @router.get("/{visita_id}", response_model=HistorialVisitaResponse)
 async def obtener_visita(visita_id: int, db: Session = Depends(get_db)):
@@ -205,50 +213,19 @@ async def estadisticas_hoy(db: Session = Depends(get_db)):
     """
     Estadísticas del día actual para AdminPage
     ✅ MODIFICADO: Devuelve formato esperado por AdminPage
+    🔥 Rollup del día + itinerarios activos de mv_estadisticas_historial
     """
     try:
         hoy = date.today()
-        
-        # Visitantes únicos de hoy
-        visitantes_hoy = db.query(
-            func.count(func.distinct(HistorialVisita.visitante_id))
-        ).filter(
-            HistorialVisita.fecha_visita == hoy
-        ).scalar() or 0
-        
-        # Itinerarios activos hoy
-        itinerarios_activos = db.query(func.count(Itinerario.id)).filter(
-            Itinerario.estado == 'activo',
-            func.date(Itinerario.fecha_inicio) == hoy
-        ).scalar() or 0
-        
-        # Hora promedio de entrada (calculada de visitas de hoy)
-        hora_entrada_promedio = None
-        visitas_hoy = db.query(HistorialVisita.hora_entrada).filter(
-            HistorialVisita.fecha_visita == hoy,
-            HistorialVisita.hora_entrada.isnot(None)
-        ).all()
-        
-        if visitas_hoy:
-            horas = [v.hora_entrada.hour + v.hora_entrada.minute/60.0 for v in visitas_hoy if v.hora_entrada]
-            if horas:
-                promedio_decimal = sum(horas) / len(horas)
-                hora = int(promedio_decimal)
-                minuto = int((promedio_decimal - hora) * 60)
-                hora_entrada_promedio = f"{hora:02d}:{minuto:02d}"
-        
-        # Duración promedio de visitas hoy
-        duracion_promedio = db.query(func.avg(HistorialVisita.duracion_total)).filter(
-            HistorialVisita.fecha_visita == hoy,
-            HistorialVisita.duracion_total.isnot(None)
-        ).scalar() or 0
+        resumen = analitica_visitas.resumen(db, hoy, hoy)
+        stats = estadisticas_materializadas.leer(db, "mv_estadisticas_historial")
         
         # ✅ FORMATO QUE ADMINPAGE ESPERA
         return {
-            "visitantes_hoy": visitantes_hoy,
-            "itinerarios_activos": itinerarios_activos,
-            "hora_entrada_promedio": hora_entrada_promedio,
-            "duracion_promedio_minutos": round(float(duracion_promedio), 2) if duracion_promedio else 0
+            "visitantes_hoy": resumen["visitantes_unicos"],
+            "itinerarios_activos": int(stats.get("itinerarios_activos_hoy") or 0),
+            "hora_entrada_promedio": resumen["hora_entrada_promedio"],
+            "duracion_promedio_minutos": resumen["duracion_promedio_minutos"] or 0
         }
         
     except Exception as e:
@@ -264,32 +241,21 @@ async def horas_pico(db: Session = Depends(get_db)):
     """
     Identificar horas pico de visitas para AdminPage
     ✅ MODIFICADO: Devuelve array directo con "visitantes" en lugar de objeto
+    🔥 Las 5 horas con más visitas ya vienen calculadas en mv_estadisticas_historial
     """
     try:
-        # Obtener las 5 horas con más visitas
-        horas_pico = db.query(
-            extract('hour', HistorialVisita.hora_entrada).label('hora'),
-            func.count(HistorialVisita.id).label('visitantes')
-        ).filter(
-            HistorialVisita.hora_entrada.isnot(None)
-        ).group_by(
-            extract('hour', HistorialVisita.hora_entrada)
-        ).order_by(
-            desc('visitantes')
-        ).limit(5).all()
+        stats = estadisticas_materializadas.leer(db, "mv_estadisticas_historial")
         
         # ✅ DEVOLVER ARRAY DIRECTO (no objeto)
         # ✅ USAR "visitantes" (no "cantidad")
-        resultado = [
+        return [
             {
-                "hora": f"{int(hora):02d}:00",
-                "visitantes": visitantes
+                "hora": f"{int(h['hora']):02d}:00",
+                "visitantes": h["visitantes"]
             }
-            for hora, visitantes in horas_pico
+            for h in stats.get("horas_pico") or []
         ]
         
-        return resultado
-        
     except Exception as e:
         logger.error(f"Error obteniendo horas pico: {e}")
         raise HTTPException(
@@ -308,29 +274,14 @@ async def estadisticas_semana(db: Session = Depends(get_db)):
     hoy = date.today()
     hace_7_dias = hoy - timedelta(days=7)
     
-    visitas = db.query(HistorialVisita).filter(
-        and_(
-            HistorialVisita.fecha_visita >= hace_7_dias,
-            HistorialVisita.fecha_visita <= hoy
-        )
-    ).all()
-    
-    # Agrupar por día
-    por_dia = {}
-    for visita in visitas:
-        dia = visita.fecha_visita.strftime("%Y-%m-%d")
-        por_dia[dia] = por_dia.get(dia, 0) + 1
-    
-    satisfaccion_promedio = None
-    satisfacciones = [v.satisfaccion_general for v in visitas if v.satisfaccion_general]
-    if satisfacciones:
-        satisfaccion_promedio = sum(satisfacciones) / len(satisfacciones)
+    resumen = analitica_visitas.resumen(db, hace_7_dias, hoy, unicos=False)
+    por_dia = analitica_visitas.serie(db, hace_7_dias, hoy, "dia")
     
     return {
         "periodo": f"{hace_7_dias} a {hoy}",
-        "total_visitas": len(visitas),
-        "visitas_por_dia": por_dia,
-        "satisfaccion_promedio": round(satisfaccion_promedio, 2) if satisfaccion_promedio else None
+        "total_visitas": resumen["total_visitas"],
+        "visitas_por_dia": {d["periodo"]: d["total_visitas"] for d in por_dia},
+        "satisfaccion_promedio": resumen["satisfaccion_promedio"]
     }
 
 
@@ -340,35 +291,47 @@ async def estadisticas_mes(db: Session = Depends(get_db)):
     hoy = date.today()
     hace_30_dias = hoy - timedelta(days=30)
     
-    visitas = db.query(HistorialVisita).filter(
-        and_(
-            HistorialVisita.fecha_visita >= hace_30_dias,
-            HistorialVisita.fecha_visita <= hoy
-        )
-    ).all()
-    
-    # Calcular estadísticas
-    total_visitas = len(visitas)
-    
-    # Visitantes únicos
-    visitantes_unicos = len(set(v.visitante_id for v in visitas))
-    
-    # Satisfacción promedio
-    satisfaccion_promedio = None
-    satisfacciones = [v.satisfaccion_general for v in visitas if v.satisfaccion_general]
-    if satisfacciones:
-        satisfaccion_promedio = sum(satisfacciones) / len(satisfacciones)
-    
-    # Duración promedio
-    duracion_promedio = None
-    duraciones = [v.duracion_total for v in visitas if v.duracion_total]
-    if duraciones:
-        duracion_promedio = sum(duraciones) / len(duraciones)
+    resumen = analitica_visitas.resumen(db, hace_30_dias, hoy)
     
     return {
         "periodo": f"{hace_30_dias} a {hoy}",
-        "total_visitas": total_visitas,
-        "visitantes_unicos": visitantes_unicos,
-        "satisfaccion_promedio": round(satisfaccion_promedio, 2) if satisfaccion_promedio else None,
-        "duracion_promedio_minutos": round(duracion_promedio, 2) if duracion_promedio else None
-    }
\ No newline at end of file
+        "total_visitas": resumen["total_visitas"],
+        "visitantes_unicos": resumen["visitantes_unicos"],
+        "satisfaccion_promedio": resumen["satisfaccion_promedio"],
+        "duracion_promedio_minutos": resumen["duracion_promedio_minutos"]
+    }
+
+
+# ============================================
+# 🔥 SERIES DE TIEMPO (rollups diarios)
+# ============================================
+
+@router.get("/estadisticas/serie")
+async def serie_visitas(
+    desde: date = Query(..., description="Fecha inicial (inclusive)"),
+    hasta: Optional[date] = Query(None, description="Fecha final (inclusive, por defecto hoy)"),
+    granularidad: str = Query("dia", pattern="^(dia|semana|mes)$"),
+    db: Session = Depends(get_db)
+):
+    """Visitas, satisfacción, duración y hora de entrada promedio por día, semana o mes"""
+    hasta = hasta or date.today()
+    if desde > hasta:
+        raise HTTPException(status_code=400, detail="'desde' debe ser anterior o igual a 'hasta'")
+    
+    return {
+        "desde": desde,
+        "hasta": hasta,
+        "granularidad": granularidad,
+        "resumen": analitica_visitas.resumen(db, desde, hasta),
+        "serie": analitica_visitas.serie(db, desde, hasta, granularidad)
+    }
+
+
+@router.get("/estadisticas/por-hora")
+async def visitas_por_hora(
+    desde: Optional[date] = Query(None, description="Fecha inicial (inclusive)"),
+    hasta: Optional[date] = Query(None, description="Fecha final (inclusive)"),
+    db: Session = Depends(get_db)
+):
+    """Entradas por hora del día en el rango (todo el historial si no se indica)"""
+    return analitica_visitas.por_hora(db, desde, hasta)
@@ -2,16 +2,24 @@
 # ✅ ACTUALIZADO: Compatible con Ollama y DeepSeek
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, joinedload
+from typing import Any, Dict, List, Optional, Set
+import asyncio
+import json
 import time
 import logging
 from datetime import datetime
 
 from config import get_settings
-from database import get_db
+from database import get_db, SessionLocal
 import models
 import schemas
 from services.ia_service import ia_service
+from services.cola_generacion import cola_generacion, PLACEHOLDER_GENERANDO
+from services.cache_contenido import cache_contenido
+from services.persistencia_itinerarios import persistencia_itinerarios
+from services.eventos_generacion import bus_eventos
 
 from utils.horarios_museo import (
     validar_horario_museo,
@@ -28,12 +36,12 @@ logger = logging.getLogger(__name__)
 # ============================================
 
 @router.post("/chat")
-def chat(prompt: str):
+async def chat(prompt: str):
     """
     ✅ Chat simple — usa el proveedor configurado (Ollama o DeepSeek)
     """
     try:
-        respuesta = ia_service._llamar_ia(prompt, max_tokens=1000, json_mode=False)
+        respuesta = await ia_service._llamar_ia(prompt, max_tokens=1000, json_mode=False, tipo="chat")
         return {"respuesta": respuesta}
     except Exception as e:
         return {"error": f"Error al conectar con IA ({ia_service.provider}): {e}"}
@@ -44,6 +52,157 @@ def chat(prompt: str):
 # (Sin cambios — ya usa ia_service internamente)
 # ============================================
 
+def _preparar_generacion(solicitud: schemas.SolicitudItinerario, db: Session) -> Dict[str, Any]:
+    """
+    Valida visitante y horario, obtiene perfil y áreas y crea el itinerario
+    en estado 'en_proceso'. Lanza HTTPException antes de empezar a generar.
+    """
+    # Validar visitante
+    visitante = db.query(models.Visitante).filter(
+        models.Visitante.id == solicitud.visitante_id
+    ).first()
+    
+    if not visitante:
+        raise HTTPException(status_code=404, detail="Visitante no encontrado")
+    
+    # VALIDAR HORARIO DEL MUSEO
+    fecha_hora_actual = datetime.now()
+    
+    puede_generar, duracion_ajustada, mensaje_horario = ajustar_itinerario_por_tiempo(
+        solicitud.tiempo_disponible,
+        fecha_hora_actual
+    )
+    
+    if not puede_generar:
+        logger.warning("⏰ No se puede generar itinerario: %s", mensaje_horario[:100])
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "mensaje": mensaje_horario,
+                "horarios": obtener_mensaje_horarios(),
+                "puede_continuar": False
+            }
+        )
+    
+    if duracion_ajustada != solicitud.tiempo_disponible:
+        logger.info("⏰ Tiempo ajustado: %s -> %s min", solicitud.tiempo_disponible, duracion_ajustada)
+        tiempo_para_itinerario = duracion_ajustada
+    else:
+        tiempo_para_itinerario = solicitud.tiempo_disponible
+    
+    logger.debug("✅ Museo abierto. Tiempo: %s min", tiempo_para_itinerario)
+    
+    # Obtener perfil
+    perfil = db.query(models.Perfil).filter(
+        models.Perfil.visitante_id == solicitud.visitante_id
+    ).first()
+    
+    if not perfil:
+        perfil = models.Perfil(
+            visitante_id=solicitud.visitante_id,
+            intereses=solicitud.intereses,
+            tiempo_disponible=tiempo_para_itinerario,
+            nivel_detalle=solicitud.nivel_detalle,
+            incluir_descansos=solicitud.incluir_descansos
+        )
+        db.add(perfil)
+        db.flush()  # Se confirma junto con el itinerario base
+    
+    # Obtener áreas disponibles
+    areas_query = db.query(models.Area).filter(models.Area.activa == True)
+    
+    if solicitud.intereses and tiempo_para_itinerario:
+        areas_query = areas_query.filter(
+            models.Area.categoria.in_(solicitud.intereses)
+        )
+        logger.debug("🔍 Filtrando por intereses: %s", solicitud.intereses)
+    elif not tiempo_para_itinerario:
+        logger.debug("✅ Sin límite - usando TODAS las áreas")
+    
+    areas_disponibles = areas_query.order_by(models.Area.orden_recomendado).all()
+    
+    if not areas_disponibles:
+        raise HTTPException(
+            status_code=400,
+            detail="No hay áreas disponibles que coincidan con tus intereses"
+        )
+    
+    areas_dict = [
+        {
+            "id": area.id,
+            "codigo": area.codigo,
+            "nombre": area.nombre,
+            "descripcion": area.descripcion,
+            "categoria": area.categoria,
+            "piso": area.piso,
+            "zona": area.zona,
+            "orden_recomendado": area.orden_recomendado,
+            "tiempo_minimo": area.tiempo_minimo,
+            "tiempo_maximo": area.tiempo_maximo
+        }
+        for area in areas_disponibles
+    ]
+    
+    # Crear itinerario base
+    nuevo_itinerario = models.Itinerario(
+        perfil_id=perfil.id,
+        titulo="Generando...",
+        descripcion="Preparando tu itinerario personalizado...",
+        estado='en_proceso',
+        modelo_ia_usado=ia_service.model
+    )
+    db.add(nuevo_itinerario)
+    db.commit()
+    db.refresh(nuevo_itinerario)
+    
+    logger.info("✅ Itinerario %s creado, generando con %s...", nuevo_itinerario.id, ia_service.provider)
+    
+    return {
+        "visitante_nombre": visitante.nombre,
+        "itinerario": nuevo_itinerario,
+        "areas_dict": areas_dict,
+        "tiempo_para_itinerario": tiempo_para_itinerario,
+        "duracion_ajustada": duracion_ajustada,
+        "mensaje_horario": mensaje_horario
+    }
+
+
+def _guardar_resultado(
+    db: Session,
+    nuevo_itinerario: models.Itinerario,
+    itinerario_resultado: Dict[str, Any],
+    contexto: Dict[str, Any],
+    solicitud: schemas.SolicitudItinerario
+):
+    """Guarda estructura, detalles y el trabajo de las áreas pendientes en un solo commit"""
+    titulo_base = itinerario_resultado.get('titulo', 'Tu recorrido personalizado')
+    
+    descripcion_base = itinerario_resultado.get('descripcion', '')
+    if contexto["duracion_ajustada"] != solicitud.tiempo_disponible and contexto["mensaje_horario"]:
+        descripcion_base = f"⏰ {contexto['mensaje_horario']}\n\n{descripcion_base}"
+    
+    nuevo_itinerario.titulo = titulo_base
+    nuevo_itinerario.descripcion = descripcion_base
+    nuevo_itinerario.duracion_total = itinerario_resultado.get('duracion_total')
+    nuevo_itinerario.estado = 'generado'
+    nuevo_itinerario.respuesta_ia = itinerario_resultado.get('metadata', {})
+    nuevo_itinerario.modelo_ia_usado = nuevo_itinerario.respuesta_ia.get('modelo', nuevo_itinerario.modelo_ia_usado)
+    
+    # Crear detalles: mapa en memoria + un solo INSERT
+    mapa_areas = {a["codigo"]: a["id"] for a in contexto["areas_dict"]}
+    persistencia_itinerarios.insertar_detalles(
+        db, nuevo_itinerario.id, itinerario_resultado['areas'], mapa_areas
+    )
+    
+    # Encolar el resto de áreas en el mismo commit que los detalles
+    cola_generacion.encolar_areas_pendientes(
+        db, nuevo_itinerario.id, itinerario_resultado, contexto["areas_dict"],
+        contexto["visitante_nombre"], solicitud.intereses, solicitud.nivel_detalle.value
+    )
+    
+    db.commit()
+
+
 @router.post("/generar-itinerario-progresivo", response_model=schemas.ItinerarioCompleto)
 async def generar_itinerario_progresivo(
     solicitud: schemas.SolicitudItinerario,
@@ -53,173 +212,267 @@ async def generar_itinerario_progresivo(
     🔥 Generación progresiva con validación de horarios
     Funciona con Ollama (local) y DeepSeek (producción)
     """
+    itinerario_id = None
     try:
         tiempo_inicio = time.time()
-        logger.info(f"🚀 PROGRESIVO [{ia_service.provider}]: Iniciado para visitante {solicitud.visitante_id}")
-        
-        # Validar visitante
-        visitante = db.query(models.Visitante).filter(
-            models.Visitante.id == solicitud.visitante_id
-        ).first()
+        logger.info("🚀 PROGRESIVO [%s]: Iniciado para visitante %s", ia_service.provider, solicitud.visitante_id)
         
-        if not visitante:
-            raise HTTPException(status_code=404, detail="Visitante no encontrado")
-        
-        # VALIDAR HORARIO DEL MUSEO
-        fecha_hora_actual = datetime.now()
-        
-        puede_generar, duracion_ajustada, mensaje_horario = ajustar_itinerario_por_tiempo(
-            solicitud.tiempo_disponible,
-            fecha_hora_actual
-        )
-        
-        if not puede_generar:
-            logger.warning(f"⏰ No se puede generar itinerario: {mensaje_horario[:100]}")
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "mensaje": mensaje_horario,
-                    "horarios": obtener_mensaje_horarios(),
-                    "puede_continuar": False
-                }
-            )
-        
-        if duracion_ajustada != solicitud.tiempo_disponible:
-            logger.info(f"⏰ Tiempo ajustado: {solicitud.tiempo_disponible} -> {duracion_ajustada} min")
-            tiempo_para_itinerario = duracion_ajustada
-        else:
-            tiempo_para_itinerario = solicitud.tiempo_disponible
-        
-        logger.info(f"✅ Museo abierto. Tiempo: {tiempo_para_itinerario} min")
-        
-        # Obtener perfil
-        perfil = db.query(models.Perfil).filter(
-            models.Perfil.visitante_id == solicitud.visitante_id
-        ).first()
-        
-        if not perfil:
-            perfil = models.Perfil(
-                visitante_id=solicitud.visitante_id,
-                intereses=solicitud.intereses,
-                tiempo_disponible=tiempo_para_itinerario,
-                nivel_detalle=solicitud.nivel_detalle,
-                incluir_descansos=solicitud.incluir_descansos
-            )
-            db.add(perfil)
-            db.commit()
-            db.refresh(perfil)
-        
-        # Obtener áreas disponibles
-        areas_query = db.query(models.Area).filter(models.Area.activa == True)
-        
-        if solicitud.intereses and tiempo_para_itinerario:
-            areas_query = areas_query.filter(
-                models.Area.categoria.in_(solicitud.intereses)
-            )
-            logger.info(f"🔍 Filtrando por intereses: {solicitud.intereses}")
-        elif not tiempo_para_itinerario:
-            logger.info("✅ Sin límite - usando TODAS las áreas")
-        
-        areas_disponibles = areas_query.order_by(models.Area.orden_recomendado).all()
-        
-        if not areas_disponibles:
-            raise HTTPException(
-                status_code=400,
-                detail="No hay áreas disponibles que coincidan con tus intereses"
-            )
-        
-        areas_dict = [
-            {
-                "id": area.id,
-                "codigo": area.codigo,
-                "nombre": area.nombre,
-                "descripcion": area.descripcion,
-                "categoria": area.categoria,
-                "piso": area.piso,
-                "tiempo_minimo": area.tiempo_minimo,
-                "tiempo_maximo": area.tiempo_maximo
-            }
-            for area in areas_disponibles
-        ]
-        
-        # Crear itinerario base
-        nuevo_itinerario = models.Itinerario(
-            perfil_id=perfil.id,
-            titulo="Generando...",
-            descripcion="Preparando tu itinerario personalizado...",
-            estado='en_proceso',
-            modelo_ia_usado=ia_service.model
-        )
-        db.add(nuevo_itinerario)
-        db.commit()
-        db.refresh(nuevo_itinerario)
-        
-        logger.info(f"✅ Itinerario {nuevo_itinerario.id} creado, generando con {ia_service.provider}...")
+        contexto = _preparar_generacion(solicitud, db)
+        nuevo_itinerario = contexto["itinerario"]
+        itinerario_id = nuevo_itinerario.id
         
         # GENERACIÓN PROGRESIVA
-        itinerario_resultado = ia_service.generar_itinerario_progresivo(
-            visitante_nombre=visitante.nombre,
+        itinerario_resultado = await ia_service.generar_itinerario_progresivo(
+            visitante_nombre=contexto["visitante_nombre"],
             intereses=solicitud.intereses,
-            tiempo_disponible=tiempo_para_itinerario,
+            tiempo_disponible=contexto["tiempo_para_itinerario"],
             nivel_detalle=solicitud.nivel_detalle.value,
-            areas_disponibles=areas_dict,
-            incluir_descansos=solicitud.incluir_descansos,
-            db_session=db,
-            itinerario_id=nuevo_itinerario.id
+            areas_disponibles=contexto["areas_dict"],
+            incluir_descansos=solicitud.incluir_descansos
         )
         
         tiempo_fin = time.time()
         tiempo_generacion = tiempo_fin - tiempo_inicio
         
-        titulo_base = itinerario_resultado.get('titulo', 'Tu recorrido personalizado')
-        
-        descripcion_base = itinerario_resultado.get('descripcion', '')
-        if duracion_ajustada != solicitud.tiempo_disponible and mensaje_horario:
-            descripcion_base = f"⏰ {mensaje_horario}\n\n{descripcion_base}"
-        
-        nuevo_itinerario.titulo = titulo_base
-        nuevo_itinerario.descripcion = descripcion_base
-        nuevo_itinerario.duracion_total = itinerario_resultado.get('duracion_total')
-        nuevo_itinerario.estado = 'generado'
-        nuevo_itinerario.respuesta_ia = itinerario_resultado.get('metadata', {})
-        
-        # Crear detalles
-        for area_data in itinerario_resultado['areas']:
-            area = db.query(models.Area).filter(
-                models.Area.codigo == area_data['area_codigo']
-            ).first()
-            
-            if area:
-                detalle = models.ItinerarioDetalle(
-                    itinerario_id=nuevo_itinerario.id,
-                    area_id=area.id,
-                    orden=area_data['orden'],
-                    tiempo_sugerido=area_data.get('tiempo_sugerido', 20),
-                    introduccion=area_data.get('introduccion'),
-                    recomendacion=area_data.get('recomendacion'),
-                    historia_contextual=area_data.get('historia_contextual'),
-                    datos_curiosos=area_data.get('datos_curiosos', []),
-                    que_observar=area_data.get('que_observar', [])
-                )
-                db.add(detalle)
-        
-        db.commit()
-        db.refresh(nuevo_itinerario)
+        _guardar_resultado(db, nuevo_itinerario, itinerario_resultado, contexto, solicitud)
         
-        logger.info(f"✅ Listo en {tiempo_generacion:.1f}s [{ia_service.provider}]")
+        logger.info("✅ Listo en %.1fs [%s]", tiempo_generacion, ia_service.provider)
         
-        return nuevo_itinerario
+        return persistencia_itinerarios.cargar_itinerario_completo(db, nuevo_itinerario.id)
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Error: {e}", exc_info=True)
+        logger.error("❌ Error: %s", e, exc_info=True)
         db.rollback()
+        if itinerario_id:
+            persistencia_itinerarios.marcar_fallido(db, itinerario_id, str(e))
         raise HTTPException(status_code=500, detail=f"Error generando itinerario: {str(e)}")
 
 
 # ============================================
-# Estado de generación (sin cambios)
+# 🔥 Streaming (Server-Sent Events)
+# ============================================
+
+def _evento_sse(tipo: str, datos: Any) -> str:
+    return f"event: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False, default=str)}\n\n"
+
+
+def _contar_detalles(itinerario_id: int) -> int:
+    with SessionLocal() as db:
+        return db.query(models.ItinerarioDetalle).filter(
+            models.ItinerarioDetalle.itinerario_id == itinerario_id
+        ).count()
+
+
+def _leer_areas_nuevas(itinerario_id: int, enviadas: Set[int]) -> List[Dict[str, Any]]:
+    """Detalles ya generados que aún no se enviaron al cliente"""
+    with SessionLocal() as db:
+        query = db.query(models.ItinerarioDetalle).options(
+            joinedload(models.ItinerarioDetalle.area)
+        ).filter(
+            models.ItinerarioDetalle.itinerario_id == itinerario_id,
+            models.ItinerarioDetalle.introduccion.isnot(None),
+            ~models.ItinerarioDetalle.introduccion.contains(PLACEHOLDER_GENERANDO)
+        )
+        if enviadas:
+            query = query.filter(models.ItinerarioDetalle.orden.notin_(enviadas))
+        
+        return [
+            schemas.ItinerarioDetalleConArea.model_validate(detalle).model_dump(mode="json")
+            for detalle in query.order_by(models.ItinerarioDetalle.orden).all()
+        ]
+
+
+async def _stream_areas_restantes(itinerario_id: int, enviadas: Set[int]):
+    """
+    Emite cada área en cuanto su worker la guarda (aviso por LISTEN/NOTIFY).
+    Cada SSE_KEEPALIVE_SEGUNDOS envía un comentario keep-alive y revisa la BD
+    por si se perdió algún aviso.
+    """
+    total = await asyncio.to_thread(_contar_detalles, itinerario_id)
+    
+    async with bus_eventos.suscribir(itinerario_id) as avisos:
+        fin = False
+        primera_vuelta = True
+        while True:
+            nuevas = await asyncio.to_thread(_leer_areas_nuevas, itinerario_id, enviadas)
+            for detalle in nuevas:
+                enviadas.add(detalle["orden"])
+                yield _evento_sse("area", detalle)
+            
+            if nuevas or primera_vuelta:
+                primera_vuelta = False
+                yield _evento_sse("progreso", {
+                    "itinerario_id": itinerario_id,
+                    "completado": len(enviadas) >= total,
+                    "areas_generadas": len(enviadas),
+                    "total_areas": total,
+                    "porcentaje_completado": round(len(enviadas) / total * 100, 1) if total else 0
+                })
+            
+            if len(enviadas) >= total or fin:
+                yield _evento_sse("completado", {
+                    "itinerario_id": itinerario_id,
+                    "completado": len(enviadas) >= total,
+                    "areas_generadas": len(enviadas),
+                    "total_areas": total
+                })
+                return
+            
+            try:
+                aviso = await asyncio.wait_for(avisos.get(), timeout=settings.SSE_KEEPALIVE_SEGUNDOS)
+                fin = aviso.get("tipo") == "fin"
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                fin = not await asyncio.to_thread(cola_generacion.tiene_trabajo_activo, itinerario_id)
+
+
+_CABECERAS_SSE = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@router.get("/itinerario/{itinerario_id}/eventos")
+async def eventos_generacion(
+    itinerario_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    🔥 Stream SSE de la generación: un evento "area" por cada área lista,
+    "progreso" con el mismo formato que /estado-generacion y "completado" al final.
+    Reemplaza el polling de /estado-generacion.
+    """
+    existe = db.query(models.Itinerario.id).filter(models.Itinerario.id == itinerario_id).first()
+    if not existe:
+        raise HTTPException(status_code=404, detail="Itinerario no encontrado")
+    
+    return StreamingResponse(
+        _stream_areas_restantes(itinerario_id, set()),
+        media_type="text/event-stream",
+        headers=_CABECERAS_SSE
+    )
+
+
+@router.post("/generar-itinerario-progresivo/stream")
+async def generar_itinerario_progresivo_stream(
+    solicitud: schemas.SolicitudItinerario,
+    db: Session = Depends(get_db)
+):
+    """
+    🔥 Igual que /generar-itinerario-progresivo pero transmitido por SSE:
+    "itinerario" (id creado), "estructura", "fragmento" (texto parcial de la
+    primera área vía stream del proveedor), "area" por cada área, "guardado",
+    "progreso" y "completado".
+    """
+    logger.info("🚀 PROGRESIVO STREAM [%s]: Iniciado para visitante %s", ia_service.provider, solicitud.visitante_id)
+    
+    contexto = _preparar_generacion(solicitud, db)
+    itinerario_id = contexto["itinerario"].id
+    eventos: asyncio.Queue = asyncio.Queue()
+    
+    async def al_evento(tipo, datos):
+        await eventos.put((tipo, datos))
+    
+    def guardar(itinerario_resultado):
+        with SessionLocal() as db_stream:
+            itinerario = db_stream.get(models.Itinerario, itinerario_id)
+            _guardar_resultado(db_stream, itinerario, itinerario_resultado, contexto, solicitud)
+    
+    def marcar_fallido(detalle: str):
+        with SessionLocal() as db_stream:
+            persistencia_itinerarios.marcar_fallido(db_stream, itinerario_id, detalle)
+    
+    async def generar_y_guardar():
+        # Corre como tarea propia: si el cliente se desconecta, el itinerario se guarda igual
+        try:
+            itinerario_resultado = await ia_service.generar_itinerario_progresivo(
+                visitante_nombre=contexto["visitante_nombre"],
+                intereses=solicitud.intereses,
+                tiempo_disponible=contexto["tiempo_para_itinerario"],
+                nivel_detalle=solicitud.nivel_detalle.value,
+                areas_disponibles=contexto["areas_dict"],
+                incluir_descansos=solicitud.incluir_descansos,
+                al_evento=al_evento
+            )
+            if not itinerario_resultado.get("areas"):
+                raise ValueError("la generación no devolvió áreas")
+            await asyncio.to_thread(guardar, itinerario_resultado)
+            return itinerario_resultado
+        except Exception as e:
+            await asyncio.to_thread(marcar_fallido, str(e))
+            raise
+        finally:
+            await eventos.put(None)
+    
+    tarea = asyncio.create_task(generar_y_guardar())
+    
+    async def stream():
+        yield _evento_sse("itinerario", {"itinerario_id": itinerario_id})
+        
+        while (evento := await eventos.get()) is not None:
+            yield _evento_sse(*evento)
+        
+        try:
+            itinerario_resultado = await tarea
+        except Exception as e:
+            logger.error("❌ Error en stream del itinerario %s: %s", itinerario_id, e, exc_info=True)
+            yield _evento_sse("error", {"itinerario_id": itinerario_id, "detalle": str(e)})
+            return
+        
+        yield _evento_sse("guardado", {
+            "itinerario_id": itinerario_id,
+            "titulo": itinerario_resultado.get("titulo"),
+            "duracion_total": itinerario_resultado.get("duracion_total")
+        })
+        
+        primera = itinerario_resultado["areas"][0].get("orden")  # generar_y_guardar garantiza al menos un área
+        async for evento in _stream_areas_restantes(itinerario_id, {primera}):
+            yield evento
+    
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=_CABECERAS_SSE)
+
+
+# ============================================
+# Proveedores (enrutador multi-proveedor)
+# ============================================
+
+@router.get("/proveedores/estado")
+async def estado_proveedores():
+    """Salud, latencia EWMA y p95 por proveedor y tipo de prompt"""
+    return ia_service.enrutador.estado()
+
+
+# ============================================
+# Cache de contenido generado
+# ============================================
+
+@router.get("/cache/estadisticas")
+async def estadisticas_cache():
+    """Estado del cache de contenido de áreas (nivel memoria)"""
+    return cache_contenido.estadisticas()
+
+
+@router.delete("/cache")
+def invalidar_cache(area_codigo: Optional[str] = None):
+    """
+    Invalidar el contenido cacheado.
+    Con area_codigo solo esa área; sin parámetros, todo el cache.
+    """
+    if area_codigo:
+        eliminadas = cache_contenido.invalidar_area(area_codigo)
+    else:
+        eliminadas = cache_contenido.invalidar_todo()
+    return {"entradas_eliminadas": eliminadas, "area_codigo": area_codigo}
+
+
+@router.post("/knowledge-base/recargar")
+def recargar_knowledge_base():
+    """Releer museo_knowledge.json ya (sin esperar la revisión periódica)"""
+    return ia_service.recargar_knowledge_base()
+
+
+# ============================================
+# Estado de generación (polling, se mantiene por compatibilidad;
+# los clientes nuevos usan /itinerario/{id}/eventos)
 # ============================================
 
 @router.get("/itinerario/{itinerario_id}/estado-generacion")
@@ -262,5 +515,5 @@ async def obtener_estado_generacion(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Error: {e}")
+        logger.error("❌ Error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,12 +1,13 @@
 # routers/itinerarios.py
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import List, Optional
+import asyncio
 import logging
 from datetime import datetime, timezone
 
+from config import get_settings
 from database import get_db
 from utils.horarios_museo import validar_horario_museo, ajustar_itinerario_por_tiempo
 from models import Itinerario, Perfil, Visitante, Area, ItinerarioDetalle
@@ -16,11 +17,21 @@ from schemas import (
     ItinerarioResponse,
     ItinerarioCompleto,
     SolicitudItinerario,
+    SolicitudItinerarioLote,
+    RespuestaLoteItinerarios,
     ItinerarioDetalleResponse,
     ItinerarioDetalleUpdate
 )
 from services.ia_service import ia_service
-
+from services.cola_generacion import cola_generacion
+from services.persistencia_itinerarios import persistencia_itinerarios
+from services.lotes_itinerarios import generador_lotes
+from services.plantillas_itinerario import plantillas_itinerario
+from services.almacen_kb import almacen_kb
+from services.estadisticas_materializadas import estadisticas_materializadas
+from utils.paginacion import paginar_keyset
+
+settings = get_settings()
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
@@ -31,7 +42,7 @@ router = APIRouter()
 @router.get("/ia/estado")
 async def verificar_estado_ia():
     """Verificar conexión con Ollama y disponibilidad del modelo"""
-    estado = ia_service.verificar_conexion()
+    estado = await ia_service.verificar_conexion()
     
     if not estado["conectado"]:
         return {
@@ -68,6 +79,7 @@ async def generar_itinerario_ia(
     🤖 Generar itinerario personalizado usando IA generativa
     ✅ CON validación de horarios Y generación background
     """
+    itinerario_id = None
     try:
         # 1. Verificar visitante
         visitante = db.query(Visitante).filter(Visitante.id == solicitud.visitante_id).first()
@@ -83,7 +95,7 @@ async def generar_itinerario_ia(
         )
         
         if not puede_generar:
-            logger.warning(f"⏰ Intento fuera de horario")
+            logger.warning("⏰ Intento fuera de horario")
             raise HTTPException(
                 status_code=400,
                 detail={
@@ -96,7 +108,7 @@ async def generar_itinerario_ia(
         tiempo_final = duracion_ajustada if duracion_ajustada is not None else solicitud.tiempo_disponible
         
         if tiempo_final != solicitud.tiempo_disponible:
-            logger.info(f"⏰ Tiempo ajustado: {solicitud.tiempo_disponible} → {tiempo_final} minutos")
+            logger.info("⏰ Tiempo ajustado: %s → %s minutos", solicitud.tiempo_disponible, tiempo_final)
         
         # 3. Obtener o crear perfil
         perfil = db.query(Perfil).filter(Perfil.visitante_id == solicitud.visitante_id).first()
@@ -109,17 +121,16 @@ async def generar_itinerario_ia(
                 incluir_descansos=solicitud.incluir_descansos
             )
             db.add(perfil)
-            db.commit()
-            db.refresh(perfil)
+            db.flush()  # Se confirma junto con el itinerario base
         
         # 4. Obtener áreas disponibles
         query = db.query(Area).filter(Area.activa == True)
         
         if tiempo_final is not None and solicitud.intereses:
             query = query.filter(Area.categoria.in_(solicitud.intereses))
-            logger.info(f"🔍 Filtrando por categorías: {solicitud.intereses}")
+            logger.debug("🔍 Filtrando por categorías: %s", solicitud.intereses)
         elif tiempo_final is None:
-            logger.info(f"♾️ Sin límite de tiempo: incluyendo TODAS las áreas")
+            logger.debug("♾️ Sin límite de tiempo: incluyendo TODAS las áreas")
         
         if solicitud.areas_evitar:
             query = query.filter(~Area.id.in_(solicitud.areas_evitar))
@@ -144,11 +155,20 @@ async def generar_itinerario_ia(
                 "tiempo_minimo": area.tiempo_minimo,
                 "tiempo_maximo": area.tiempo_maximo,
                 "piso": area.piso,
-                "zona": area.zona
+                "zona": area.zona,
+                "orden_recomendado": area.orden_recomendado
             }
             for area in areas_disponibles
         ]
         
+        # 🧩 Plantilla precalculada para esta combinación (una lectura por clave)
+        plantilla = None
+        if settings.PLANTILLAS_ACTIVAS:
+            plantilla = plantillas_itinerario.obtener(db, plantillas_itinerario.clave(
+                solicitud.intereses, tiempo_final, solicitud.nivel_detalle.value,
+                areas_dict, almacen_kb.actual().version
+            ))
+        
         # 5. 🤖 CREAR ITINERARIO EN BD PRIMERO
         nuevo_itinerario = Itinerario(
             perfil_id=perfil.id,
@@ -162,29 +182,35 @@ async def generar_itinerario_ia(
         db.add(nuevo_itinerario)
         db.commit()
         db.refresh(nuevo_itinerario)
+        itinerario_id = nuevo_itinerario.id
         
-        logger.info(f"✅ Itinerario {nuevo_itinerario.id} creado en BD")
+        logger.debug("✅ Itinerario %s creado en BD", nuevo_itinerario.id)
         
-        # 6. 🔥 GENERAR CON BACKGROUND THREAD
-        logger.info(f"🤖 Solicitando generación con background para itinerario {nuevo_itinerario.id}")
+        # 6. 🔥 GENERAR ESTRUCTURA + PRIMERA ÁREA (el resto va a la cola persistente)
+        logger.debug("🤖 Solicitando generación para itinerario %s", nuevo_itinerario.id)
         
         nombre_completo = f"{visitante.nombre} {visitante.apellido or ''}".strip()
         
         try:
-            # ✅✅✅ LLAMAR A generar_itinerario_progresivo CON db_session ✅✅✅
-            resultado_ia = ia_service.generar_itinerario_progresivo(
-                visitante_nombre=nombre_completo,
-                intereses=solicitud.intereses,
-                tiempo_disponible=tiempo_final,
-                nivel_detalle=solicitud.nivel_detalle.value,
-                areas_disponibles=areas_dict,
-                incluir_descansos=solicitud.incluir_descansos,
-                db_session=db,              # ✅ Pasar db_session
-                itinerario_id=nuevo_itinerario.id  # ✅ Pasar itinerario_id
-            )
+            if plantilla:
+                # Copia personalizada: todo el contenido listo, sin trabajo en la cola
+                resultado_ia = await plantillas_itinerario.personalizar(
+                    plantilla, nombre_completo, solicitud.intereses, solicitud.nivel_detalle.value
+                )
+                logger.info("🧩 Itinerario %s servido desde plantilla", nuevo_itinerario.id)
+            else:
+                resultado_ia = await ia_service.generar_itinerario_progresivo(
+                    visitante_nombre=nombre_completo,
+                    intereses=solicitud.intereses,
+                    tiempo_disponible=tiempo_final,
+                    nivel_detalle=solicitud.nivel_detalle.value,
+                    areas_disponibles=areas_dict,
+                    incluir_descansos=solicitud.incluir_descansos
+                )
         except Exception as e:
-            logger.error(f"❌ Error al generar con IA: {e}")
+            logger.error("❌ Error al generar con IA: %s", e)
             db.rollback()
+            persistencia_itinerarios.marcar_fallido(db, itinerario_id, str(e))
             raise HTTPException(
                 status_code=500,
                 detail=f"Error al generar itinerario con IA: {str(e)}"
@@ -198,7 +224,7 @@ async def generar_itinerario_ia(
         
         # Metadata
         nuevo_itinerario.modelo_ia_usado = resultado_ia.get("metadata", {}).get("modelo", "ollama")
-        nuevo_itinerario.prompt_usado = "Itinerario híbrido progresivo generado"
+        nuevo_itinerario.prompt_usado = "Plantilla precalculada" if plantilla else "Itinerario híbrido progresivo generado"
         nuevo_itinerario.respuesta_ia = {
             "temperature": resultado_ia.get("metadata", {}).get("temperature", 0.2),
             "tiempo_primera_area": resultado_ia.get("metadata", {}).get("tiempo_primera_area", "0s"),
@@ -207,50 +233,22 @@ async def generar_itinerario_ia(
             "areas_kb": resultado_ia.get("metadata", {}).get("areas_kb", 0)
         }
         
-        db.commit()
-        db.refresh(nuevo_itinerario)
+        # 8. Crear detalles: mapa código → id en memoria + un solo INSERT
+        mapa_areas = {area.codigo: area.id for area in areas_disponibles}
+        persistencia_itinerarios.insertar_detalles(
+            db, nuevo_itinerario.id, resultado_ia["areas"], mapa_areas
+        )
         
-        # 8. Crear detalles del itinerario
-        mapeo_areas = {area.codigo: area for area in areas_disponibles}
-        
-        for area_ia in resultado_ia["areas"]:
-            area_codigo = area_ia["area_codigo"]
-            
-            if area_codigo not in mapeo_areas:
-                logger.warning(f"⚠️ Área {area_codigo} no encontrada, omitiendo...")
-                continue
-            
-            area = mapeo_areas[area_codigo]
-            
-            def parse_json_field(value):
-                if value is None:
-                    return None
-                if isinstance(value, str):
-                    try:
-                        import json
-                        return json.loads(value)
-                    except:
-                        return None
-                return value
-            
-            detalle = ItinerarioDetalle(
-                itinerario_id=nuevo_itinerario.id,
-                area_id=area.id,
-                orden=area_ia["orden"],
-                tiempo_sugerido=area_ia["tiempo_sugerido"],
-                introduccion=area_ia.get("introduccion", ""),
-                recomendacion=area_ia.get("recomendacion", ""),
-                historia_contextual=area_ia.get("historia_contextual", None),
-                datos_curiosos=parse_json_field(area_ia.get("datos_curiosos", None)),
-                que_observar=parse_json_field(area_ia.get("que_observar", None)),
-                puntos_clave=area_ia.get("puntos_clave", [])
-            )
-            db.add(detalle)
+        # 9. Encolar el resto de áreas: estructura, detalles y trabajo en un solo commit
+        cola_generacion.encolar_areas_pendientes(
+            db, nuevo_itinerario.id, resultado_ia, areas_dict,
+            nombre_completo, solicitud.intereses, solicitud.nivel_detalle.value
+        )
         
         db.commit()
         db.refresh(nuevo_itinerario)
         
-        logger.info(f"✅ Itinerario {nuevo_itinerario.id} generado. Primera área lista, resto generándose en background")
+        logger.info("✅ Itinerario %s generado. Primera área lista, resto encolado para los workers", nuevo_itinerario.id)
         
         return nuevo_itinerario
     
@@ -258,9 +256,83 @@ async def generar_itinerario_ia(
         raise
     except Exception as e:
         db.rollback()
-        logger.error(f"❌ Error al generar itinerario: {e}")
+        logger.error("❌ Error al generar itinerario: %s", e)
+        if itinerario_id:
+            persistencia_itinerarios.marcar_fallido(db, itinerario_id, str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+# ============================================
+# CREATE - Lote (grupos escolares / operadores)
+# ============================================
+
+@router.post("/generar/lote", response_model=RespuestaLoteItinerarios, status_code=status.HTTP_201_CREATED)
+async def generar_itinerarios_lote(
+    lote: SolicitudItinerarioLote,
+    db: Session = Depends(get_db)
+):
+    """
+    👥 Generar los itinerarios de un grupo en una sola llamada.
+    Solicitudes iguales (intereses, tiempo, nivel) comparten estructura y
+    contenido; las estructuras se planifican localmente y el contenido de
+    las áreas lo completa un único trabajo de la cola (trabajo_id).
+    El progreso de cada itinerario se sigue con /ia/itinerario/{id}/eventos
+    y el del lote con GET /itinerarios/lote/{trabajo_id}.
+    """
+    try:
+        # 1. Verificar visitantes (una consulta)
+        ids = [s.visitante_id for s in lote.solicitudes]
+        visitantes = {v.id: v for v in db.query(Visitante).filter(Visitante.id.in_(ids)).all()}
+        faltantes = [i for i in ids if i not in visitantes]
+        if faltantes:
+            raise HTTPException(status_code=404, detail=f"Visitantes no encontrados: {faltantes}")
+        
+        # 2. ✅ Horarios: una validación por cada tiempo distinto
+        tiempos = {}
+        for tiempo in {s.tiempo_disponible for s in lote.solicitudes}:
+            puede_generar, duracion_ajustada, mensaje_horario = ajustar_itinerario_por_tiempo(
+                duracion_solicitada=tiempo,
+                fecha_hora_actual=None
+            )
+            if not puede_generar:
+                logger.warning("⏰ Lote fuera de horario")
+                raise HTTPException(
+                    status_code=400,
+                    detail={
+                        "mensaje": "Museo cerrado o tiempo insuficiente",
+                        "horarios": mensaje_horario
+                    }
+                )
+            tiempos[tiempo] = duracion_ajustada if duracion_ajustada is not None else tiempo
+        
+        # 3. Perfiles, estructuras, itinerarios, detalles y trabajo en una transacción
+        try:
+            resultado = generador_lotes.crear(db, lote.solicitudes, visitantes, tiempos)
+        except LookupError as e:
+            db.rollback()
+            raise HTTPException(status_code=404, detail=str(e))
+        
+        logger.info(
+            "✅ Lote creado: %s itinerarios, %s grupos, trabajo %s",
+            resultado['total_itinerarios'], resultado['grupos_distintos'], resultado['trabajo_id']
+        )
+        return resultado
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error("❌ Error al generar lote: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/lote/{trabajo_id}")
+async def estado_lote(trabajo_id: int):
+    """Estado del trabajo de un lote y áreas pendientes por itinerario"""
+    estado = await asyncio.to_thread(cola_generacion.estado_lote, trabajo_id)
+    if not estado:
+        raise HTTPException(status_code=404, detail="Lote no encontrado")
+    return estado
+
 # ============================================
 # CREATE - Manual
 # ============================================
@@ -280,7 +352,7 @@ async def crear_itinerario_manual(
     db.commit()
     db.refresh(nuevo_itinerario)
     
-    logger.info(f"✅ Itinerario creado manualmente: {nuevo_itinerario.id}")
+    logger.info("✅ Itinerario creado manualmente: %s", nuevo_itinerario.id)
     return nuevo_itinerario
 
 # ============================================
@@ -289,8 +361,11 @@ async def crear_itinerario_manual(
 
 @router.get("/", response_model=List[ItinerarioResponse])
 async def listar_itinerarios(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor de X-Siguiente-Cursor (paginación por keyset)"),
+    total: bool = Query(False, description="Agregar X-Total-Estimado (estimación del planificador)"),
     estado: Optional[str] = None,
     perfil_id: Optional[int] = None,
     db: Session = Depends(get_db)
@@ -304,7 +379,10 @@ async def listar_itinerarios(
     if perfil_id:
         query = query.filter(Itinerario.perfil_id == perfil_id)
     
-    return query.order_by(Itinerario.fecha_generacion.desc()).offset(skip).limit(limit).all()
+    return paginar_keyset(
+        query, [Itinerario.fecha_generacion, Itinerario.id], limit, response,
+        cursor=cursor, skip=skip, total=total
+    )
 
 # ============================================
 # ESTADÍSTICAS - ANTES DE /{itinerario_id}
@@ -312,32 +390,17 @@ async def listar_itinerarios(
 
 @router.get("/estadisticas/general")
 async def estadisticas_itinerarios(db: Session = Depends(get_db)):
-    """Estadísticas generales de itinerarios"""
-    total = db.query(Itinerario).count()
-    
-    por_estado = db.query(
-        Itinerario.estado,
-        func.count(Itinerario.id)
-    ).group_by(Itinerario.estado).all()
-    
-    con_ia = db.query(Itinerario).filter(
-        Itinerario.modelo_ia_usado.isnot(None)
-    ).count()
-    
-    puntuacion_promedio = db.query(
-        func.avg(Itinerario.puntuacion)
-    ).filter(Itinerario.puntuacion.isnot(None)).scalar()
-    
-    duracion_promedio = db.query(
-        func.avg(Itinerario.duracion_total)
-    ).filter(Itinerario.duracion_total.isnot(None)).scalar()
+    """Estadísticas generales de itinerarios (vista materializada)"""
+    stats = estadisticas_materializadas.leer(db, "mv_estadisticas_itinerarios")
+    puntuacion_promedio = stats.get("puntuacion_promedio")
+    duracion_promedio = stats.get("duracion_promedio")
     
     return {
-        "total_itinerarios": total,
-        "generados_con_ia": con_ia,
-        "por_estado": {estado: cant for estado, cant in por_estado},
-        "puntuacion_promedio": round(puntuacion_promedio, 2) if puntuacion_promedio else None,
-        "duracion_promedio_minutos": round(duracion_promedio, 0) if duracion_promedio else None
+        "total_itinerarios": stats.get("total_itinerarios", 0),
+        "generados_con_ia": stats.get("generados_con_ia", 0),
+        "por_estado": stats.get("por_estado") or {},
+        "puntuacion_promedio": round(float(puntuacion_promedio), 2) if puntuacion_promedio else None,
+        "duracion_promedio_minutos": round(float(duracion_promedio), 0) if duracion_promedio else None
     }
 
 
@@ -346,109 +409,27 @@ async def obtener_estadisticas_itinerarios(db: Session = Depends(get_db)):
     """
     Obtiene estadísticas generales de itinerarios para el panel administrativo
     ✅ CORREGIDO: Endpoint movido antes de /{itinerario_id}
+    🔥 Una sola lectura de mv_estadisticas_itinerarios
     """
     try:
-        logger.info("📊 Iniciando cálculo de estadísticas de itinerarios...")
-        
-        # Total de itinerarios
-        total_itinerarios_raw = db.query(func.count(Itinerario.id)).scalar()
-        total_itinerarios = int(total_itinerarios_raw) if total_itinerarios_raw else 0
-        logger.info(f"   Total itinerarios: {total_itinerarios}")
-        
-        # Itinerarios por estado
-        itinerarios_por_estado = {}
-        try:
-            estados_query = db.query(
-                Itinerario.estado,
-                func.count(Itinerario.id).label('cantidad')
-            ).group_by(Itinerario.estado).all()
-            
-            for estado, cantidad in estados_query:
-                if estado:
-                    itinerarios_por_estado[str(estado)] = int(cantidad)
-            
-            logger.info(f"   Itinerarios por estado: {itinerarios_por_estado}")
-        except Exception as e:
-            logger.error(f"   ⚠️ Error calculando por estado: {e}")
-            itinerarios_por_estado = {}
-        
-        # Itinerarios completados
-        try:
-            completados_raw = db.query(func.count(Itinerario.id)).filter(
-                Itinerario.estado == 'completado'
-            ).scalar()
-            completados = int(completados_raw) if completados_raw else 0
-            logger.info(f"   Completados: {completados}")
-        except Exception as e:
-            logger.error(f"   ⚠️ Error calculando completados: {e}")
-            completados = 0
-        
-        # Itinerarios en progreso
-        try:
-            en_progreso_raw = db.query(func.count(Itinerario.id)).filter(
-                Itinerario.estado == 'activo'
-            ).scalar()
-            en_progreso = int(en_progreso_raw) if en_progreso_raw else 0
-            logger.info(f"   En progreso: {en_progreso}")
-        except Exception as e:
-            logger.error(f"   ⚠️ Error calculando en progreso: {e}")
-            en_progreso = 0
+        stats = estadisticas_materializadas.leer(db, "mv_estadisticas_itinerarios")
+        total_itinerarios = int(stats.get("total_itinerarios") or 0)
+        duracion_promedio = stats.get("duracion_promedio")
+        puntuacion_promedio = stats.get("puntuacion_promedio")
         
-        # Duración promedio
-        try:
-            duracion_promedio_raw = db.query(
-                func.avg(Itinerario.duracion_total)
-            ).scalar()
-            
-            if duracion_promedio_raw is not None:
-                duracion_promedio = round(float(duracion_promedio_raw), 2)
-            else:
-                duracion_promedio = 0.0
-            
-            logger.info(f"   Duración promedio: {duracion_promedio}")
-        except Exception as e:
-            logger.error(f"   ⚠️ Error calculando duración promedio: {e}")
-            duracion_promedio = 0.0
-        
-        # Puntuación promedio
-        try:
-            puntuacion_promedio_raw = db.query(
-                func.avg(Itinerario.puntuacion)
-            ).filter(
-                Itinerario.puntuacion.isnot(None)
-            ).scalar()
-            
-            if puntuacion_promedio_raw is not None:
-                puntuacion_promedio = round(float(puntuacion_promedio_raw), 2)
-            else:
-                puntuacion_promedio = None
-            
-            logger.info(f"   Puntuación promedio: {puntuacion_promedio}")
-        except Exception as e:
-            logger.error(f"   ⚠️ Error calculando puntuación: {e}")
-            puntuacion_promedio = None
-        
-        # Generados con IA (todos los itinerarios usan IA)
-        generados_con_ia = total_itinerarios
-        
-        # Construir respuesta
-        resultado = {
+        return {
             "total_itinerarios": total_itinerarios,
-            "itinerarios_por_estado": itinerarios_por_estado,
-            "completados": completados,
-            "en_progreso": en_progreso,
-            "duracion_promedio_minutos": duracion_promedio,
-            "puntuacion_promedio": puntuacion_promedio,
-            "generados_con_ia": generados_con_ia
+            "itinerarios_por_estado": stats.get("por_estado") or {},
+            "completados": int(stats.get("completados") or 0),
+            "en_progreso": int(stats.get("en_progreso") or 0),
+            "duracion_promedio_minutos": round(float(duracion_promedio), 2) if duracion_promedio is not None else 0.0,
+            "puntuacion_promedio": round(float(puntuacion_promedio), 2) if puntuacion_promedio is not None else None,
+            # Generados con IA (todos los itinerarios usan IA)
+            "generados_con_ia": total_itinerarios
         }
         
-        logger.info(f"✅ Estadísticas de itinerarios calculadas: {resultado}")
-        return resultado
-        
     except Exception as e:
-        logger.error(f"❌ ERROR CRÍTICO en estadísticas de itinerarios: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("❌ ERROR CRÍTICO en estadísticas de itinerarios: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Error al obtener estadísticas de itinerarios: {str(e)}"
@@ -461,11 +442,14 @@ async def obtener_itinerarios_visitante(
     db: Session = Depends(get_db)
 ):
     """Obtener todos los itinerarios de un visitante"""
-    perfil = db.query(Perfil).filter(Perfil.visitante_id == visitante_id).first()
-    if not perfil:
-        return {"itinerarios": []}
-    
-    itinerarios = db.query(Itinerario).filter(Itinerario.perfil_id == perfil.id).all()
+    # 🔥 Perfil por JOIN y detalles en una sola consulta adicional (sin N+1)
+    itinerarios = (
+        db.query(Itinerario)
+        .join(Perfil, Itinerario.perfil_id == Perfil.id)
+        .filter(Perfil.visitante_id == visitante_id)
+        .options(selectinload(Itinerario.detalles))
+        .all()
+    )
     
     # 🔥 AGREGAR: Conteo de áreas para cada itinerario
     resultado = []
@@ -499,7 +483,13 @@ async def obtener_itinerarios_visitante(
 @router.get("/{itinerario_id}", response_model=ItinerarioCompleto)
 async def obtener_itinerario(itinerario_id: int, db: Session = Depends(get_db)):
     """Obtener itinerario completo con sus detalles"""
-    itinerario = db.query(Itinerario).filter(Itinerario.id == itinerario_id).first()
+    # 🔥 Itinerario + detalles + áreas en un solo round trip
+    itinerario = (
+        db.query(Itinerario)
+        .options(joinedload(Itinerario.detalles).joinedload(ItinerarioDetalle.area))
+        .filter(Itinerario.id == itinerario_id)
+        .first()
+    )
     if not itinerario:
         raise HTTPException(status_code=404, detail="Itinerario no encontrado")
     return itinerario
@@ -557,13 +547,13 @@ async def actualizar_itinerario(
         db.commit()
         db.refresh(itinerario)
         
-        logger.info(f"Itinerario {itinerario_id} actualizado: estado={itinerario.estado}")
+        logger.info("Itinerario %s actualizado: estado=%s", itinerario_id, itinerario.estado)
         
         return itinerario
         
     except Exception as e:
         db.rollback()
-        logger.error(f"Error actualizando itinerario {itinerario_id}: {e}")
+        logger.error("Error actualizando itinerario %s: %s", itinerario_id, e)
         raise HTTPException(
             status_code=500,
             detail=f"Error actualizando itinerario: {str(e)}"
@@ -583,7 +573,7 @@ async def eliminar_itinerario(itinerario_id: int, db: Session = Depends(get_db))
     
     db.delete(itinerario)
     db.commit()
-    logger.info(f"✅ Itinerario eliminado: {itinerario_id}")
+    logger.info("✅ Itinerario eliminado: %s", itinerario_id)
 
 
 # ============================================
@@ -602,7 +592,7 @@ async def iniciar_itinerario(itinerario_id: int, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(itinerario)
     
-    logger.info(f"✅ Itinerario iniciado: {itinerario_id}")
+    logger.info("✅ Itinerario iniciado: %s", itinerario_id)
     return itinerario
 
 
@@ -618,7 +608,7 @@ async def completar_itinerario(itinerario_id: int, db: Session = Depends(get_db)
     db.commit()
     db.refresh(itinerario)
     
-    logger.info(f"✅ Itinerario completado: {itinerario_id}")
+    logger.info("✅ Itinerario completado: %s", itinerario_id)
     return itinerario
 
 
@@ -652,5 +642,5 @@ async def actualizar_detalle(
     db.commit()
     db.refresh(detalle)
     
-    logger.info(f"✅ Detalle actualizado: {detalle_id}")
+    logger.info("✅ Detalle actualizado: %s", detalle_id)
     return detalle
\ No newline at end of file
@@ -11,6 +11,7 @@ from database import get_db
 from pydantic import BaseModel
 from models import Perfil, Visitante
 from schemas import PerfilCreate, PerfilUpdate, PerfilResponse
+from services.estadisticas_materializadas import estadisticas_materializadas
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -186,43 +187,33 @@ async def eliminar_perfil(perfil_id: int, db: Session = Depends(get_db)):
 @router.get("/buscar/intereses")
 async def buscar_por_intereses(
     interes: str = Query(..., description="Interés a buscar"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db)
 ):
     """Buscar perfiles que contengan un interés específico"""
-    # Usar operador ANY de PostgreSQL para buscar en array
-    perfiles = db.query(Perfil).filter(
+    # intereses @> ARRAY[interes]: resuelto con el índice GIN ix_perfiles_intereses_gin
+    query = db.query(Perfil.id, Perfil.visitante_id).filter(
         Perfil.intereses.contains([interes])
-    ).all()
+    )
+    
+    total = query.count()
+    perfiles = query.order_by(Perfil.id).offset(skip).limit(limit).all()
     
     return {
         "interes_buscado": interes,
-        "total_encontrados": len(perfiles),
+        "total_encontrados": total,
+        "skip": skip,
+        "limit": limit,
         "perfiles": [{"id": p.id, "visitante_id": p.visitante_id} for p in perfiles]
     }
 
 @router.get("/estadisticas/intereses")
 async def estadisticas_intereses(db: Session = Depends(get_db)):
-    """Estadísticas de intereses más populares"""
-    perfiles = db.query(Perfil).all()
-    
-    # Contar intereses
-    contador_intereses = {}
-    for perfil in perfiles:
-        if perfil.intereses:
-            for interes in perfil.intereses:
-                contador_intereses[interes] = contador_intereses.get(interes, 0) + 1
-    
-    # Ordenar por popularidad
-    intereses_ordenados = sorted(
-        contador_intereses.items(),
-        key=lambda x: x[1],
-        reverse=True
-    )
+    """Estadísticas de intereses más populares (vista materializada)"""
+    stats = estadisticas_materializadas.leer(db, "mv_estadisticas_intereses")
     
     return {
-        "total_perfiles": len(perfiles),
-        "intereses_populares": [
-            {"interes": interes, "cantidad": cant}
-            for interes, cant in intereses_ordenados
-        ]
+        "total_perfiles": int(stats.get("total_perfiles") or 0),
+        "intereses_populares": stats.get("intereses_populares") or []
     }
\ No newline at end of file
@@ -3,11 +3,9 @@
 # Sistema Museo Pumapungo
 # ✅ CORREGIDO: Orden de endpoints arreglado + endpoint listar simplificado
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
 from typing import List, Optional
-from datetime import datetime, timedelta  
 import logging
 
 from database import get_db
@@ -16,8 +14,13 @@ from schemas import (
     VisitanteCreate, 
     VisitanteUpdate, 
     VisitanteResponse,
-    VisitanteConPerfil
+    VisitanteConPerfil,
+    VisitanteBusquedaResponse,
+    VisitanteSugerencia
 )
+from services.estadisticas_materializadas import estadisticas_materializadas
+from services.busqueda_visitantes import busqueda_visitantes
+from utils.paginacion import paginar_keyset
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -58,8 +61,11 @@ async def crear_visitante(visitante: VisitanteCreate, db: Session = Depends(get_
 
 @router.get("/", response_model=List[VisitanteResponse])
 async def listar_visitantes(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor de X-Siguiente-Cursor (paginación por keyset)"),
+    total: bool = Query(False, description="Agregar X-Total-Estimado (estimación del planificador)"),
     buscar: Optional[str] = None,
     tipo_visitante: Optional[str] = None,
     activo: Optional[bool] = None,
@@ -69,13 +75,8 @@ async def listar_visitantes(
     query = db.query(Visitante)
     
     if buscar:
-        patron = f"%{buscar}%"
-        query = query.filter(or_(
-            Visitante.nombre.ilike(patron),
-            Visitante.apellido.ilike(patron),
-            Visitante.email.ilike(patron),
-            Visitante.codigo_visita.ilike(patron)
-        ))
+        # 🔥 Subcadena sin tildes sobre el índice de trigramas (migraciones/007)
+        query = query.filter(busqueda_visitantes.filtro(buscar))
     
     if tipo_visitante:
         query = query.filter(Visitante.tipo_visitante == tipo_visitante)
@@ -83,11 +84,42 @@ async def listar_visitantes(
     if activo is not None:
         query = query.filter(Visitante.activo == activo)
     
-    # Ordenar por fecha de registro descendente
-    query = query.order_by(Visitante.fecha_registro.desc())
-    
-    # Devolver solo la lista (sin total)
-    return query.offset(skip).limit(limit).all()
+    # Ordenar por fecha de registro descendente (keyset sobre ix_visitantes_paginacion_id)
+    return paginar_keyset(
+        query, [Visitante.fecha_registro, Visitante.id], limit, response,
+        cursor=cursor, skip=skip, total=total
+    )
+
+# ============================================
+# BÚSQUEDA - ANTES DE /{visitante_id}
+# ============================================
+
+@router.get("/buscar", response_model=List[VisitanteBusquedaResponse])
+async def buscar_visitantes(
+    q: str = Query(..., min_length=1, max_length=100, description="Nombre, apellido, email o código"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Búsqueda con ranking: sin tildes, por prefijo de palabra y tolerante a
+    errores de tipeo (tsvector + pg_trgm)
+    """
+    resultados = busqueda_visitantes.buscar(db, q, limit=limit, skip=skip)
+    return [
+        VisitanteBusquedaResponse(**VisitanteResponse.model_validate(visitante).model_dump(), relevancia=relevancia)
+        for visitante, relevancia in resultados
+    ]
+
+
+@router.get("/sugerencias", response_model=List[VisitanteSugerencia])
+async def sugerir_visitantes(
+    q: str = Query(..., min_length=1, max_length=100, description="Prefijo de nombre, apellido o email"),
+    limit: int = Query(8, ge=1, le=20),
+    db: Session = Depends(get_db)
+):
+    """Autocompletado del buscador del panel (prefijo sobre índices btree)"""
+    return busqueda_visitantes.sugerencias(db, q, limit=limit)
 
 # ============================================
 # ESTADÍSTICAS - ANTES DE /{visitante_id}
@@ -98,70 +130,20 @@ async def obtener_estadisticas_visitantes(db: Session = Depends(get_db)):
     """
     Obtiene estadísticas generales de visitantes para el panel administrativo
     ✅ CORREGIDO: Endpoint movido antes de /{visitante_id}
+    🔥 Una sola lectura de mv_estadisticas_visitantes
     """
     try:
-        logger.info("📊 Iniciando cálculo de estadísticas de visitantes...")
-        
-        # Total de visitantes
-        total_visitantes_raw = db.query(func.count(Visitante.id)).scalar()
-        total_visitantes = int(total_visitantes_raw) if total_visitantes_raw else 0
-        logger.info(f"   Total visitantes: {total_visitantes}")
-        
-        # Visitantes por tipo
-        visitantes_por_tipo = {}
-        try:
-            visitantes_por_tipo_query = db.query(
-                Visitante.tipo_visitante,
-                func.count(Visitante.id).label('cantidad')
-            ).group_by(Visitante.tipo_visitante).all()
-            
-            for tipo, cantidad in visitantes_por_tipo_query:
-                if tipo:
-                    visitantes_por_tipo[str(tipo)] = int(cantidad)
-            
-            logger.info(f"   Visitantes por tipo: {visitantes_por_tipo}")
-        except Exception as e:
-            logger.error(f"   ⚠️ Error calculando por tipo: {e}")
-            visitantes_por_tipo = {}
+        stats = estadisticas_materializadas.leer(db, "mv_estadisticas_visitantes")
         
-        # Visitantes recientes (últimos 30 días)
-        try:
-            hace_30_dias = datetime.now() - timedelta(days=30)
-            visitantes_recientes_raw = db.query(func.count(Visitante.id)).filter(
-                Visitante.fecha_registro >= hace_30_dias
-            ).scalar()
-            visitantes_recientes = int(visitantes_recientes_raw) if visitantes_recientes_raw else 0
-            logger.info(f"   Visitantes recientes (30d): {visitantes_recientes}")
-        except Exception as e:
-            logger.error(f"   ⚠️ Error calculando recientes: {e}")
-            visitantes_recientes = 0
-        
-        # Visitantes activos (con al menos 1 visita)
-        try:
-            visitantes_activos_raw = db.query(func.count(Visitante.id)).filter(
-                Visitante.total_visitas > 0
-            ).scalar()
-            visitantes_activos = int(visitantes_activos_raw) if visitantes_activos_raw else 0
-            logger.info(f"   Visitantes activos: {visitantes_activos}")
-        except Exception as e:
-            logger.error(f"   ⚠️ Error calculando activos: {e}")
-            visitantes_activos = 0
-        
-        # Construir respuesta
-        resultado = {
-            "total_visitantes": total_visitantes,
-            "visitantes_por_tipo": visitantes_por_tipo,
-            "visitantes_recientes_30dias": visitantes_recientes,
-            "visitantes_activos": visitantes_activos
+        return {
+            "total_visitantes": int(stats.get("total_visitantes") or 0),
+            "visitantes_por_tipo": stats.get("por_tipo_visitante") or {},
+            "visitantes_recientes_30dias": int(stats.get("visitantes_recientes_30dias") or 0),
+            "visitantes_activos": int(stats.get("visitantes_con_visitas") or 0)
         }
         
-        logger.info(f"✅ Estadísticas de visitantes calculadas: {resultado}")
-        return resultado
-        
     except Exception as e:
         logger.error(f"❌ ERROR CRÍTICO en estadísticas de visitantes: {e}")
-        import traceback
-        traceback.print_exc()
         raise HTTPException(
             status_code=500,
             detail=f"Error al obtener estadísticas de visitantes: {str(e)}"
@@ -170,26 +152,15 @@ async def obtener_estadisticas_visitantes(db: Session = Depends(get_db)):
 
 @router.get("/estadisticas/resumen")
 async def estadisticas_visitantes(db: Session = Depends(get_db)):
-    """Estadísticas generales de visitantes"""
-    total = db.query(Visitante).count()
-    activos = db.query(Visitante).filter(Visitante.activo == True).count()
-    
-    por_tipo = db.query(
-        Visitante.tipo_visitante,
-        func.count(Visitante.id).label('cantidad')
-    ).group_by(Visitante.tipo_visitante).all()
-    
-    por_entrada = db.query(
-        Visitante.tipo_entrada,
-        func.count(Visitante.id).label('cantidad')
-    ).group_by(Visitante.tipo_entrada).all()
+    """Estadísticas generales de visitantes (vista materializada)"""
+    stats = estadisticas_materializadas.leer(db, "mv_estadisticas_visitantes")
     
     return {
-        "total_visitantes": total,
-        "visitantes_activos": activos,
-        "por_tipo_visitante": {tipo: cant for tipo, cant in por_tipo if tipo},
-        "por_tipo_entrada": {tipo: cant for tipo, cant in por_entrada if tipo},
-        "total_visitas_realizadas": db.query(func.sum(Visitante.total_visitas)).scalar() or 0
+        "total_visitantes": int(stats.get("total_visitantes") or 0),
+        "visitantes_activos": int(stats.get("visitantes_activos") or 0),
+        "por_tipo_visitante": stats.get("por_tipo_visitante") or {},
+        "por_tipo_entrada": stats.get("por_tipo_entrada") or {},
+        "total_visitas_realizadas": int(stats.get("total_visitas_realizadas") or 0)
     }
 
 
@@ -77,6 +77,20 @@ class VisitanteResponse(VisitanteBase):
     class Config:
         from_attributes = True
 
+# 🔥 Búsqueda de visitantes
+class VisitanteBusquedaResponse(VisitanteResponse):
+    relevancia: float
+
+class VisitanteSugerencia(BaseModel):
+    id: int
+    nombre: str
+    apellido: Optional[str] = None
+    email: str
+    codigo_visita: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
 # ============================================
 # SCHEMAS: PERFIL
 # ============================================
@@ -328,6 +342,12 @@ class EstadisticasEvaluacion(BaseModel):
     porcentaje_usaria_nuevamente: float
     satisfaccion_general: str  # "Excelente", "Buena", "Regular", etc.
 
+class EstadisticasEvaluacionArea(EstadisticasEvaluacion):
+    """Estadísticas de las evaluaciones de itinerarios que incluían el área"""
+    area_id: int
+    area_codigo: Optional[str] = None
+    area_nombre: str
+
 # ============================================
 # SCHEMAS COMPUESTOS
 # ============================================
@@ -366,6 +386,17 @@ class SolicitudItinerario(BaseModel):
             raise ValueError('Entrada de grupo debe tener al menos 1 acompañante')
         return self
 
+class SolicitudItinerarioLote(BaseModel):
+    """🔥 Varias solicitudes a la vez (grupo escolar, operador turístico)"""
+    solicitudes: List[SolicitudItinerario] = Field(..., min_length=1, max_length=200)
+    
+    @model_validator(mode='after')
+    def validar_visitantes_unicos(self):
+        ids = [s.visitante_id for s in self.solicitudes]
+        if len(ids) != len(set(ids)):
+            raise ValueError('Cada visitante puede aparecer una sola vez en el lote')
+        return self
+
 class RespuestaIA(BaseModel):
     titulo: str
     descripcion: str
@@ -384,4 +415,10 @@ class MensajeRespuesta(BaseModel):
 class ErrorRespuesta(BaseModel):
     mensaje: str
     error: str
-    codigo: int
\ No newline at end of file
+    codigo: int
+class RespuestaLoteItinerarios(BaseModel):
+    """Itinerarios creados en lote: el contenido lo completa un solo trabajo de la cola"""
+    trabajo_id: Optional[int] = None
+    total_itinerarios: int
+    grupos_distintos: int  # Combinaciones únicas de intereses, tiempo y nivel
+    itinerarios: List[ItinerarioResponse]
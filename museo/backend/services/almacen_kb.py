@@ -0,0 +1,328 @@
+# services/almacen_kb.py
+# 🔥 Almacén del knowledge base con recarga en caliente
+# - construir_indice_kb.py compila museo_knowledge.json a estructuras por área
+#   ya preparadas (listas limpias, conteos y bandera "suficiente") en un
+#   archivo binario dentro de KB_INDICE_DIR, junto al índice vectorial. Cada
+#   worker de gunicorn abre ese binario con mmap la primera vez que lee un
+#   área: el sistema operativo comparte una sola copia de solo lectura.
+# - Los workers no parsean el JSON: comparan la huella de sus bytes con la
+#   guardada en meta.json al construir. Solo si no coincide (artefacto
+#   ausente o viejo) lo compilan ellos mismos, con una advertencia.
+# - Revisa mtime/tamaño del JSON cada KB_RECARGA_SEGUNDOS y, si el checksum
+#   cambió, abre un snapshot nuevo y lo intercambia de una vez
+#   (las lecturas en curso terminan con el snapshot anterior).
+# - snapshot.version (derivada del checksum) es igual en todos los workers y
+#   sirve como parte de las claves de cache.
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import get_settings
+from services.indice_kb import IndiceKB, checksum_kb, huella_archivo
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+MAGIA = b"KBP1"
+CAMPOS_LISTA = ("objetos_destacados", "datos_curiosos", "temas_principales", "informacion_detallada")
+
+
+def compilar_area(codigo: str, area: Dict[str, Any]) -> Dict[str, Any]:
+    """Estructura compacta de un área: solo textos no vacíos y conteos precalculados"""
+    compilada = {
+        "codigo": codigo,
+        "nombre": area.get("nombre", ""),
+        "descripcion": area.get("descripcion", ""),
+        "historia": area.get("historia", ""),
+    }
+    for campo in CAMPOS_LISTA:
+        compilada[campo] = [t.strip() for t in area.get(campo) or [] if isinstance(t, str) and t.strip()]
+
+    compilada["suficiente"] = (
+        len(compilada["datos_curiosos"]) >= 3 and len(compilada["objetos_destacados"]) >= 3
+    )
+    return compilada
+
+
+def _abrir_compilado(ruta: Path) -> Tuple[Dict[str, Tuple[int, int]], mmap.mmap]:
+    with open(ruta, "rb") as f:
+        datos = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if datos[:len(MAGIA)] != MAGIA:
+        raise ValueError(f"Archivo compilado inválido: {ruta}")
+    (largo,) = struct.unpack("<I", datos[len(MAGIA):len(MAGIA) + 4])
+    base = len(MAGIA) + 4 + largo
+    encabezado = json.loads(bytes(datos[len(MAGIA) + 4:base]))
+    offsets = {codigo: (base + inicio, tamano) for codigo, (inicio, tamano) in encabezado.items()}
+    return offsets, datos
+
+
+# ============================================
+# SNAPSHOT (inmutable)
+# ============================================
+
+class SnapshotKB:
+    """
+    Una versión del knowledge base: áreas en mmap + índice vectorial.
+    Con compilado, el binario se abre en la primera lectura de un área.
+    """
+
+    def __init__(self, version: str, checksum: Optional[str], ruta: Optional[Path], indice: IndiceKB,
+                 compilado: Optional[Path] = None, offsets: Optional[Dict[str, Tuple[int, int]]] = None,
+                 datos=b"", huella: Optional[str] = None):
+        self.version = version
+        self.checksum = checksum
+        self.ruta = ruta
+        self.indice = indice
+        self.huella = huella  # sha256 del archivo de origen
+        self.precompilado = compilado is not None and offsets is None
+        self.cargado_en = time.time()
+        self._compilado = compilado
+        self._offsets = offsets
+        self._datos = datos  # mmap (o bytes en memoria)
+        self._areas: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def vacio(cls) -> "SnapshotKB":
+        # Índice sin pasajes: buscar() devuelve [] sin ajustar nada
+        return cls("vacio", None, None, IndiceKB(), offsets={})
+
+    def _posiciones(self) -> Dict[str, Tuple[int, int]]:
+        if self._offsets is None:
+            with self._lock:
+                if self._offsets is None:
+                    try:
+                        offsets, self._datos = _abrir_compilado(self._compilado)
+                    except (OSError, ValueError) as e:
+                        logger.error("❌ No se pudo abrir la KB compilada %s: %s", self._compilado, e)
+                        offsets = {}
+                    self._offsets = offsets
+        return self._offsets
+
+    @property
+    def codigos(self) -> List[str]:
+        return list(self._posiciones())
+
+    def __len__(self) -> int:
+        return len(self._posiciones())
+
+    def __bool__(self) -> bool:
+        return bool(self._posiciones())
+
+    def area(self, codigo: str) -> Dict[str, Any]:
+        """Área compilada (se decodifica del mmap la primera vez)"""
+        area = self._areas.get(codigo)
+        if area is None:
+            posicion = self._posiciones().get(codigo)
+            if posicion is None:
+                return {}
+            inicio, largo = posicion
+            area = json.loads(bytes(self._datos[inicio:inicio + largo]).decode("utf-8"))
+            self._areas[codigo] = area
+        return area
+
+
+# ============================================
+# ALMACÉN
+# ============================================
+
+class AlmacenKnowledgeBase:
+
+    def __init__(self):
+        self._snapshot: Optional[SnapshotKB] = None
+        self._firma: Optional[Tuple[str, int, int]] = None
+        self._ultima_revision = 0.0
+        self._lock = threading.Lock()
+
+    # ============================================
+    # ACCESO
+    # ============================================
+
+    def actual(self) -> SnapshotKB:
+        """Snapshot vigente; revisa el archivo como mucho cada KB_RECARGA_SEGUNDOS"""
+        if self._snapshot is None or time.monotonic() - self._ultima_revision >= settings.KB_RECARGA_SEGUNDOS:
+            self._revisar()
+        return self._snapshot
+
+    def recargar(self) -> SnapshotKB:
+        """Releer el archivo aunque no haya cambiado su mtime"""
+        self._revisar(forzar=True)
+        return self._snapshot
+
+    # ============================================
+    # DETECCIÓN DE CAMBIOS
+    # ============================================
+
+    def _ubicar(self) -> Optional[Path]:
+        posibles_rutas = [
+            Path("museo_knowledge.json"),
+            Path("../museo_knowledge.json"),
+            Path(__file__).parent.parent / "museo_knowledge.json",
+            Path(__file__).parent.parent.parent / "museo_knowledge.json",
+        ]
+        if settings.KB_RUTA:
+            posibles_rutas.insert(0, Path(settings.KB_RUTA))
+        return next((ruta for ruta in posibles_rutas if ruta.exists()), None)
+
+    def _revisar(self, forzar: bool = False):
+        with self._lock:
+            # Otro hilo pudo haber revisado mientras esperábamos el lock
+            if not forzar and self._snapshot is not None and \
+                    time.monotonic() - self._ultima_revision < settings.KB_RECARGA_SEGUNDOS:
+                return
+            self._ultima_revision = time.monotonic()
+
+            ruta = self._ubicar()
+            if ruta is None:
+                if self._snapshot is None:
+                    logger.warning("⚠️ No se encontró museo_knowledge.json")
+                    self._snapshot = SnapshotKB.vacio()
+                return
+
+            anterior = self._snapshot
+            try:
+                estado = ruta.stat()
+                firma = (str(ruta.resolve()), estado.st_mtime_ns, estado.st_size)
+                if not forzar and firma == self._firma:
+                    return
+
+                huella = huella_archivo(ruta)
+                nuevo = self._abrir_construido(ruta, huella, anterior)
+                if nuevo is None:
+                    if anterior is not None and huella == anterior.huella:
+                        self._firma = firma  # Mismos bytes (touch, copia): nada que hacer
+                        return
+                    nuevo = self._compilar_desde_json(ruta, huella, anterior)
+            except (OSError, ValueError) as e:
+                # Archivo a medio escribir o ilegible: se conserva la versión anterior
+                logger.error("❌ Error leyendo knowledge base %s: %s", ruta, e)
+                if self._snapshot is None:
+                    self._snapshot = SnapshotKB.vacio()
+                return
+
+            self._firma = firma
+            if nuevo is anterior:
+                return
+            self._snapshot = nuevo  # Intercambio atómico de la referencia
+
+            origen = "precompilada" if nuevo.precompilado else "compilada en este proceso"
+            if anterior is None:
+                logger.info("📚 Knowledge base cargada: %s (versión %s, %s)", ruta, nuevo.version, origen)
+            else:
+                logger.info("🔄 Knowledge base actualizada: versión %s → %s (%s)", anterior.version, nuevo.version, origen)
+
+    def _abrir_construido(self, ruta: Path, huella: str, anterior: Optional[SnapshotKB]) -> Optional[SnapshotKB]:
+        """Snapshot del artefacto de construir_indice_kb.py si corresponde a estos bytes"""
+        meta = IndiceKB().leer_meta()
+        if not meta or not meta.get("huella_archivo") or meta["huella_archivo"] != huella:
+            return None
+
+        checksum = meta["checksum_kb"]
+        if anterior is not None and anterior.checksum == checksum and anterior.precompilado:
+            return anterior
+
+        destino = self._ruta_compilada(checksum)
+        indice = IndiceKB()
+        if not destino.exists() or not indice.abrir(checksum):
+            return None
+        return SnapshotKB(checksum[:12], checksum, ruta, indice, compilado=destino, huella=huella)
+
+    def _compilar_desde_json(self, ruta: Path, huella: str, anterior: Optional[SnapshotKB]) -> SnapshotKB:
+        with open(ruta, "r", encoding="utf-8") as f:
+            kb = json.load(f)
+
+        checksum = checksum_kb(kb)
+        if anterior is not None and checksum == anterior.checksum:
+            return anterior
+
+        logger.warning("⚠️ %s no coincide con el artefacto de KB_INDICE_DIR: compilando en este proceso "
+                       "(ejecuta construir_indice_kb.py)", ruta)
+        return self._compilar(kb, checksum, ruta, huella)
+
+    # ============================================
+    # COMPILACIÓN + MMAP
+    # ============================================
+
+    def construir(self, ruta: Path, directorio: Optional[Path] = None, modelo: Optional[str] = None) -> Path:
+        """
+        Offline (construir_indice_kb.py): binario compilado + índice vectorial,
+        marcados con la huella del JSON. meta.json se escribe al final, así un
+        worker nunca ve un meta nuevo con el binario a medio escribir.
+        """
+        contenido = Path(ruta).read_bytes()
+        kb = json.loads(contenido)
+        checksum = checksum_kb(kb)
+
+        destino = self._ruta_compilada(checksum, directorio)
+        self._escribir_compilado(kb, destino)
+        return IndiceKB().construir(kb, directorio=destino.parent, modelo=modelo,
+                                    huella=hashlib.sha256(contenido).hexdigest())
+
+    def _ruta_compilada(self, checksum: str, carpeta: Optional[Path] = None) -> Path:
+        carpeta = Path(carpeta or settings.KB_INDICE_DIR)
+        if not carpeta.is_absolute():
+            carpeta = Path(__file__).parent.parent / carpeta
+        return carpeta / f"kb_{checksum[:16]}.bin"
+
+    @staticmethod
+    def _serializar(kb: Dict[str, Any]) -> Tuple[Dict[str, Tuple[int, int]], bytes]:
+        """Un JSON compacto por área, concatenados; offsets relativos al cuerpo"""
+        bloques, offsets, posicion = [], {}, 0
+        for codigo, area in (kb.get("areas") or {}).items():
+            bloque = json.dumps(compilar_area(codigo, area), ensure_ascii=False).encode("utf-8")
+            offsets[codigo] = (posicion, len(bloque))
+            bloques.append(bloque)
+            posicion += len(bloque)
+        return offsets, b"".join(bloques)
+
+    def _escribir_compilado(self, kb: Dict[str, Any], destino: Path):
+        """
+        Formato: MAGIA + largo del encabezado (uint32) + encabezado JSON
+        {codigo: [inicio, largo]} + cuerpo. Escritura atómica: si varios
+        workers lo generan a la vez, todos producen el mismo archivo.
+        """
+        offsets, cuerpo = self._serializar(kb)
+        encabezado = json.dumps(offsets).encode("utf-8")
+
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        temporal = destino.with_name(f"{destino.name}.{os.getpid()}.tmp")
+        with open(temporal, "wb") as f:
+            f.write(MAGIA + struct.pack("<I", len(encabezado)) + encabezado + cuerpo)
+        os.replace(temporal, destino)
+
+        # Borrar versiones anteriores (los mmap ya abiertos siguen siendo válidos)
+        for viejo in destino.parent.glob("kb_*.bin"):
+            if viejo != destino:
+                try:
+                    viejo.unlink()
+                except OSError:
+                    pass  # Windows: en uso por otro worker
+
+    def _compilar(self, kb: Dict[str, Any], checksum: str, ruta: Path, huella: Optional[str] = None) -> SnapshotKB:
+        """Respaldo sin artefacto: compila y, si hace falta, ajusta TF-IDF en este proceso"""
+        destino = self._ruta_compilada(checksum)
+        try:
+            if not destino.exists():
+                self._escribir_compilado(kb, destino)
+            offsets, datos = _abrir_compilado(destino)
+        except (OSError, ValueError) as e:
+            # Sin disco escribible: mismo formato, pero en memoria del proceso
+            logger.warning("⚠️ No se pudo usar %s (%s), KB compilada en memoria", destino, e)
+            offsets, datos = self._serializar(kb)
+
+        indice = IndiceKB()
+        indice.preparar(kb, checksum)
+
+        return SnapshotKB(checksum[:12], checksum, ruta, indice, offsets=offsets, datos=datos, huella=huella)
+
+
+# Instancia
+almacen_kb = AlmacenKnowledgeBase()
@@ -0,0 +1,117 @@
+# services/analitica_visitas.py
+# 🔥 Series de tiempo del historial de visitas
+# Lee los rollups historial_visitas_diario / historial_visitas_horas
+# (migraciones/005, mantenidos por trigger en cada escritura) y los agrupa
+# con date_trunc en la granularidad pedida. El costo depende del número de
+# días del rango, no de cuántas visitas hay en el historial.
+
+import logging
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Date, cast, func, literal_column, select
+from sqlalchemy.orm import Session
+
+from models import HistorialVisita, HistorialVisitaDiario, HistorialVisitaHora
+
+logger = logging.getLogger(__name__)
+
+GRANULARIDADES = {
+    "dia": "day",
+    "semana": "week",
+    "mes": "month",
+}
+
+
+def _promedio(suma, cantidad) -> Optional[float]:
+    return round(float(suma) / int(cantidad), 2) if cantidad else None
+
+
+def _hora_promedio(suma_minutos, cantidad) -> Optional[str]:
+    if not cantidad:
+        return None
+    minutos = int(suma_minutos) // int(cantidad)
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+class AnaliticaVisitas:
+
+    @staticmethod
+    def _sumas():
+        d = HistorialVisitaDiario
+        return [
+            func.coalesce(func.sum(d.visitas), 0).label("visitas"),
+            func.coalesce(func.sum(d.suma_satisfaccion), 0).label("suma_satisfaccion"),
+            func.coalesce(func.sum(d.n_satisfaccion), 0).label("n_satisfaccion"),
+            func.coalesce(func.sum(d.suma_duracion), 0).label("suma_duracion"),
+            func.coalesce(func.sum(d.n_duracion), 0).label("n_duracion"),
+            func.coalesce(func.sum(d.suma_minuto_entrada), 0).label("suma_minuto_entrada"),
+            func.coalesce(func.sum(d.n_entrada), 0).label("n_entrada"),
+        ]
+
+    @staticmethod
+    def _formatear(fila) -> Dict[str, Any]:
+        return {
+            "total_visitas": int(fila["visitas"]),
+            "satisfaccion_promedio": _promedio(fila["suma_satisfaccion"], fila["n_satisfaccion"]),
+            "duracion_promedio_minutos": _promedio(fila["suma_duracion"], fila["n_duracion"]),
+            "hora_entrada_promedio": _hora_promedio(fila["suma_minuto_entrada"], fila["n_entrada"]),
+        }
+
+    # ============================================
+    # CONSULTAS
+    # ============================================
+
+    def resumen(self, db: Session, desde: date, hasta: date, unicos: bool = True) -> Dict[str, Any]:
+        """Totales del rango [desde, hasta]"""
+        fila = db.execute(
+            select(*self._sumas()).where(HistorialVisitaDiario.fecha.between(desde, hasta))
+        ).mappings().one()
+        resultado = self._formatear(fila)
+
+        if unicos:
+            # Distintos no se pueden sumar entre días: index-only scan sobre (fecha_visita, visitante_id)
+            resultado["visitantes_unicos"] = db.execute(
+                select(func.count(func.distinct(HistorialVisita.visitante_id)))
+                .where(HistorialVisita.fecha_visita.between(desde, hasta))
+            ).scalar() or 0
+        return resultado
+
+    def serie(self, db: Session, desde: date, hasta: date, granularidad: str = "dia") -> List[Dict[str, Any]]:
+        """Una fila por día/semana/mes con visitas en el rango"""
+        if granularidad not in GRANULARIDADES:
+            raise ValueError(f"Granularidad inválida: {granularidad} (usa {', '.join(GRANULARIDADES)})")
+
+        # Literal (no parámetro): el mismo texto en SELECT y GROUP BY
+        unidad = literal_column(f"'{GRANULARIDADES[granularidad]}'")
+        periodo = cast(func.date_trunc(unidad, HistorialVisitaDiario.fecha), Date).label("periodo")
+        filas = db.execute(
+            select(periodo, *self._sumas())
+            .where(HistorialVisitaDiario.fecha.between(desde, hasta))
+            .group_by(periodo)
+            .having(func.sum(HistorialVisitaDiario.visitas) > 0)
+            .order_by(periodo)
+        ).mappings().all()
+
+        return [{"periodo": fila["periodo"].isoformat(), **self._formatear(fila)} for fila in filas]
+
+    def por_hora(self, db: Session, desde: Optional[date] = None, hasta: Optional[date] = None) -> List[Dict[str, Any]]:
+        """Entradas por hora del día en el rango (todo el historial si no hay rango)"""
+        consulta = select(
+            HistorialVisitaHora.hora,
+            func.sum(HistorialVisitaHora.visitas).label("visitantes")
+        ).group_by(HistorialVisitaHora.hora).having(func.sum(HistorialVisitaHora.visitas) > 0)
+
+        if desde:
+            consulta = consulta.where(HistorialVisitaHora.fecha >= desde)
+        if hasta:
+            consulta = consulta.where(HistorialVisitaHora.fecha <= hasta)
+
+        return [
+            {"hora": f"{int(fila.hora):02d}:00", "visitantes": int(fila.visitantes)}
+            for fila in db.execute(consulta.order_by(HistorialVisitaHora.hora)).all()
+        ]
+
+
+# Instancia
+analitica_visitas = AnaliticaVisitas()
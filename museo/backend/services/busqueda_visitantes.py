@@ -0,0 +1,152 @@
+# services/busqueda_visitantes.py
+# 🔥 Búsqueda de visitantes sobre índices (migraciones/007_busqueda_visitantes.sql)
+# - filtro(): subcadena sin tildes (LIKE '%...%') servida por el índice de
+#   trigramas de texto_busqueda; lo usa /visitantes?buscar=
+# - buscar(): resultados con relevancia (tsvector con prefijos + similitud
+#   de trigramas, tolera errores de tipeo)
+# - sugerencias(): autocompletado por prefijo de nombre, apellido o email;
+#   cada rama es un recorrido corto de un índice btree COLLATE "C" con LIMIT
+#
+# El texto del usuario se normaliza aquí igual que f_unaccent(lower(...))
+# en la base, y se pasa ya normalizado para que los índices apliquen.
+
+import logging
+import re
+import unicodedata
+from typing import List, Optional, Tuple
+
+from sqlalchemy import String, func, literal, literal_column, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from models import Visitante
+
+logger = logging.getLogger(__name__)
+
+MIN_CARACTERES_TRIGRAMAS = 3  # Con menos, pg_trgm no puede acotar con el índice
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sin tildes y con espacios simples (como f_unaccent(lower(...)))"""
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_tildes.split())
+
+
+def _escapar_like(texto: str) -> str:
+    # Barra invertida es el escape por defecto de LIKE en PostgreSQL
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _tsquery(texto: str) -> Optional[str]:
+    """'ana ram' → 'ana:* & ram:*' (solo letras y dígitos: nada que rompa to_tsquery)"""
+    terminos = re.findall(r"\w+", texto)
+    return " & ".join(f"{t}:*" for t in terminos) if terminos else None
+
+
+# ============================================
+# EXPRESIONES INDEXADAS (iguales a las de la migración 007)
+# ============================================
+
+_ESPACIO = literal_column("' '", String)
+_VACIO = literal_column("''", String)
+
+
+def _prefijo_nombre():
+    return func.f_unaccent(func.lower(Visitante.nombre + _ESPACIO + func.coalesce(Visitante.apellido, _VACIO)))
+
+
+def _prefijo_apellido():
+    return func.f_unaccent(func.lower(Visitante.apellido))
+
+
+def _prefijo_email():
+    return func.lower(Visitante.email)
+
+
+class BusquedaVisitantes:
+
+    def filtro(self, texto: str):
+        """Condición de subcadena para combinar con otros filtros"""
+        patron = f"%{_escapar_like(normalizar(texto))}%"
+        return Visitante.texto_busqueda.like(patron)
+
+    def buscar(self, db: Session, texto: str, limit: int = 20, skip: int = 0) -> List[Tuple[Visitante, float]]:
+        """Visitantes que coinciden con `texto`, más relevantes primero"""
+        normalizado = normalizar(texto)
+        if not normalizado:
+            return []
+
+        condiciones = [Visitante.texto_busqueda.like(f"%{_escapar_like(normalizado)}%")]
+        relevancia = func.word_similarity(literal(normalizado), Visitante.texto_busqueda)
+
+        if len(normalizado) >= MIN_CARACTERES_TRIGRAMAS:
+            # normalizado <% texto_busqueda: similitud por palabra (tolera errores de tipeo)
+            condiciones.append(literal(normalizado).op("<%")(Visitante.texto_busqueda))
+
+        consulta_ts = _tsquery(normalizado)
+        if consulta_ts:
+            tsquery = func.to_tsquery(literal_column("'simple'::regconfig"), consulta_ts)
+            condiciones.append(Visitante.busqueda.op("@@")(tsquery))
+            relevancia = relevancia + func.ts_rank_cd(Visitante.busqueda, tsquery)
+
+        relevancia = relevancia.label("relevancia")
+        filas = (
+            db.query(Visitante, relevancia)
+            .filter(or_(*condiciones))
+            .order_by(relevancia.desc(), Visitante.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        return [(visitante, round(float(valor), 4)) for visitante, valor in filas]
+
+    def sugerencias(self, db: Session, prefijo: str, limit: int = 8) -> List[dict]:
+        """
+        Autocompletado: coincidencias por prefijo de nombre completo, luego
+        apellido y luego email, sin repetidos. Una sola consulta UNION ALL;
+        cada rama lee a lo sumo `limit` entradas de su índice.
+        """
+        normalizado = normalizar(prefijo)
+        if not normalizado:
+            return []
+        patron = f"{_escapar_like(normalizado)}%"
+
+        ramas = []
+        for orden, expresion in enumerate((_prefijo_nombre(), _prefijo_apellido(), _prefijo_email())):
+            clave = expresion.collate("C")
+            ramas.append(
+                select(
+                    Visitante.id, Visitante.nombre, Visitante.apellido,
+                    Visitante.email, Visitante.codigo_visita,
+                    literal(orden).label("rama"), clave.label("clave")
+                )
+                .where(clave.like(patron))
+                .order_by(clave)
+                .limit(limit)
+            )
+
+        todas = union_all(*ramas).subquery()
+        filas = db.execute(
+            select(todas).order_by(todas.c.rama, todas.c.clave)
+        ).mappings().all()
+
+        vistos = set()
+        resultado = []
+        for fila in filas:
+            if fila["id"] in vistos:
+                continue
+            vistos.add(fila["id"])
+            resultado.append({
+                "id": fila["id"],
+                "nombre": fila["nombre"],
+                "apellido": fila["apellido"],
+                "email": fila["email"],
+                "codigo_visita": fila["codigo_visita"],
+            })
+            if len(resultado) >= limit:
+                break
+        return resultado
+
+
+# Instancia
+busqueda_visitantes = BusquedaVisitantes()
@@ -0,0 +1,284 @@
+# services/cache_contenido.py
+# 🔥 Cache de dos niveles para el contenido generado de cada área
+#   Nivel 1: memoria del proceso (LRU + TTL)
+#   Nivel 2: PostgreSQL (tabla cache_contenido_areas, JSONB) compartido entre workers
+#
+# El contenido se genera con MARCADOR_VISITANTE como nombre del visitante
+# (igual que plantillas_itinerario.construir) y se guarda tal cual; el
+# nombre real solo se pone al entregarlo (personalizar). Nunca se buscan
+# nombres en el texto ya generado: "Rosa", "Luz" o "Sol" también son palabras.
+#
+# La clave es la huella sha256 del prompt normalizado más la versión del
+# knowledge base, así que cubre
+# área, intereses, nivel de detalle, proveedor, modelo y el contenido del
+# knowledge base / fila Area usado. Al cambiar el KB las claves viejas dejan
+# de usarse y salen por LRU/TTL.
+
+import hashlib
+import logging
+import random
+import re
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from config import get_settings
+from utils.cache_lru import CacheLRU
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+MARCADOR_VISITANTE = "{{visitante}}"
+
+
+def _nombre(visitante_nombre: str) -> str:
+    return (visitante_nombre or "").strip() or "visitante"
+
+
+class PersonalizadorFragmentos:
+    """
+    Sustituye el marcador en texto que llega por fragmentos (stream). Retiene
+    el final de un fragmento mientras pueda ser el comienzo del marcador.
+    """
+
+    def __init__(self, destino: Callable[[str], Awaitable[None]], visitante_nombre: str):
+        self.destino = destino
+        self.nombre = _nombre(visitante_nombre)
+        self._pendiente = ""
+
+    async def __call__(self, fragmento: str):
+        texto = self._pendiente + fragmento
+        retenido = next(
+            (n for n in range(len(MARCADOR_VISITANTE) - 1, 0, -1) if texto.endswith(MARCADOR_VISITANTE[:n])), 0
+        )
+        listo, self._pendiente = texto[:len(texto) - retenido], texto[len(texto) - retenido:]
+        if listo:
+            await self.destino(listo.replace(MARCADOR_VISITANTE, self.nombre))
+
+    async def vaciar(self):
+        if self._pendiente:
+            pendiente, self._pendiente = self._pendiente, ""
+            await self.destino(pendiente)
+
+
+class CacheContenidoAreas:
+
+    def __init__(self):
+        self.activo = settings.CACHE_CONTENIDO_ACTIVO
+        self.ttl_segundos = settings.CACHE_CONTENIDO_TTL_SEGUNDOS
+        self.memoria = CacheLRU(
+            max_items=settings.CACHE_CONTENIDO_MAX_MEMORIA,
+            ttl_segundos=self.ttl_segundos
+        )
+
+    # ============================================
+    # CLAVE Y PERSONALIZACIÓN
+    # ============================================
+
+    @staticmethod
+    def normalizar_intereses(intereses) -> list:
+        return sorted({i.strip().lower() for i in (intereses or []) if i and i.strip()})
+
+    def huella(self, prompt: str, proveedor: str, modelo: str, max_tokens: int, version_kb: str = "") -> str:
+        """sha256 del prompt normalizado (construido con el marcador) y la versión del knowledge base"""
+        texto = re.sub(r"\s+", " ", prompt).strip()
+        base = f"{version_kb}|{proveedor}|{modelo}|{max_tokens}|{texto}"
+        return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+    def _reemplazar(self, valor: Any, cambio) -> Any:
+        if isinstance(valor, str):
+            return cambio(valor)
+        if isinstance(valor, list):
+            return [self._reemplazar(v, cambio) for v in valor]
+        if isinstance(valor, dict):
+            return {k: self._reemplazar(v, cambio) for k, v in valor.items()}
+        return valor
+
+    def personalizar(self, contenido: Dict[str, Any], visitante_nombre: str) -> Dict[str, Any]:
+        """Copia del contenido con el marcador sustituido por el nombre del visitante"""
+        nombre = _nombre(visitante_nombre)
+        return self._reemplazar(contenido, lambda s: s.replace(MARCADOR_VISITANTE, nombre))
+
+    # ============================================
+    # LECTURA / ESCRITURA
+    # ============================================
+
+    def obtener(self, clave: str, visitante_nombre: str) -> Optional[Dict[str, Any]]:
+        """Buscar en memoria y luego en BD (llamar desde un hilo: usa BD)"""
+        if not self.activo:
+            return None
+
+        entrada = self.memoria.obtener(clave)
+        if entrada is None:
+            entrada = self._obtener_bd(clave)
+            if entrada is not None:
+                self.memoria.guardar(clave, entrada)
+
+        if entrada is None:
+            return None
+
+        return self.personalizar(entrada["contenido"], visitante_nombre)
+
+    def obtener_respaldo(self, area_codigo: str, visitante_nombre: str) -> Optional[Dict[str, Any]]:
+        """
+        Contenido vigente más reciente del área con cualquier clave (otros
+        intereses, nivel o versión del KB). Solo para cuando la IA no está
+        disponible: mejor que el texto genérico. Llamar desde un hilo: usa BD.
+        """
+        if not self.activo:
+            return None
+
+        from database import SessionLocal
+        from models import CacheContenidoArea
+
+        try:
+            with SessionLocal() as db:
+                contenido = (
+                    db.query(CacheContenidoArea.contenido)
+                    .filter(
+                        CacheContenidoArea.area_codigo == area_codigo,
+                        CacheContenidoArea.expira_en > func.now()
+                    )
+                    .order_by(CacheContenidoArea.ultimo_acceso.desc())
+                    .limit(1)
+                    .scalar()
+                )
+        except Exception as e:
+            logger.warning("⚠️ Cache BD no disponible (respaldo): %s", e)
+            return None
+
+        return self.personalizar(contenido, visitante_nombre) if contenido else None
+
+    def guardar(self, clave: str, area_codigo: str, proveedor: str, modelo: str, contenido: Dict[str, Any]):
+        """Guardar en ambos niveles contenido con el marcador (llamar desde un hilo: usa BD)"""
+        if not self.activo:
+            return
+
+        entrada = {
+            "area_codigo": area_codigo,
+            "contenido": contenido
+        }
+        self.memoria.guardar(clave, entrada)
+        self._guardar_bd(clave, area_codigo, proveedor, modelo, entrada["contenido"])
+
+    def _obtener_bd(self, clave: str) -> Optional[Dict[str, Any]]:
+        from database import SessionLocal
+        from models import CacheContenidoArea
+
+        try:
+            with SessionLocal() as db:
+                # Lectura + "touch" LRU en una sola sentencia
+                fila = db.execute(
+                    CacheContenidoArea.__table__.update()
+                    .where(
+                        CacheContenidoArea.clave == clave,
+                        CacheContenidoArea.expira_en > func.now()
+                    )
+                    .values(
+                        hits=CacheContenidoArea.hits + 1,
+                        ultimo_acceso=func.now()
+                    )
+                    .returning(CacheContenidoArea.area_codigo, CacheContenidoArea.contenido)
+                ).first()
+                db.commit()
+
+                if fila is None:
+                    return None
+                return {"area_codigo": fila.area_codigo, "contenido": fila.contenido}
+        except Exception as e:
+            logger.warning("⚠️ Cache BD no disponible (lectura): %s", e)
+            return None
+
+    def _guardar_bd(self, clave: str, area_codigo: str, proveedor: str, modelo: str, contenido: Dict[str, Any]):
+        from database import SessionLocal
+        from models import CacheContenidoArea
+
+        expira = func.now() + timedelta(seconds=self.ttl_segundos)
+        try:
+            with SessionLocal() as db:
+                stmt = insert(CacheContenidoArea).values(
+                    clave=clave,
+                    area_codigo=area_codigo,
+                    proveedor=proveedor,
+                    modelo=modelo,
+                    contenido=contenido,
+                    expira_en=expira
+                )
+                db.execute(stmt.on_conflict_do_update(
+                    index_elements=[CacheContenidoArea.clave],
+                    set_={
+                        "contenido": stmt.excluded.contenido,
+                        "expira_en": stmt.excluded.expira_en,
+                        "ultimo_acceso": func.now()
+                    }
+                ))
+                db.commit()
+
+                # Desalojo LRU esporádico para no pagar el costo en cada escritura
+                if random.random() < 0.02:
+                    self._purgar_bd(db)
+        except Exception as e:
+            logger.warning("⚠️ Cache BD no disponible (escritura): %s", e)
+
+    def _purgar_bd(self, db):
+        from models import CacheContenidoArea
+
+        tabla = CacheContenidoArea.__table__
+        db.execute(tabla.delete().where(tabla.c.expira_en <= func.now()))
+
+        sobrantes = (
+            db.query(CacheContenidoArea.clave)
+            .order_by(CacheContenidoArea.ultimo_acceso.desc())
+            .offset(settings.CACHE_CONTENIDO_MAX_BD)
+            .subquery()
+        )
+        db.execute(tabla.delete().where(tabla.c.clave.in_(select(sobrantes.c.clave))))
+        db.commit()
+
+    # ============================================
+    # INVALIDACIÓN
+    # ============================================
+
+    def invalidar_area(self, area_codigo: str) -> int:
+        """Borrar el contenido cacheado de un área (p. ej. al editar su fila Area)"""
+        from database import SessionLocal
+        from models import CacheContenidoArea
+
+        eliminadas = self.memoria.eliminar_si(lambda _, v: v.get("area_codigo") == area_codigo)
+        try:
+            with SessionLocal() as db:
+                eliminadas += db.query(CacheContenidoArea).filter(
+                    CacheContenidoArea.area_codigo == area_codigo
+                ).delete(synchronize_session=False)
+                db.commit()
+        except Exception as e:
+            logger.warning("⚠️ No se pudo invalidar cache BD de %s: %s", area_codigo, e)
+
+        logger.info("🧹 Cache invalidado para %s: %s entradas", area_codigo, eliminadas)
+        return eliminadas
+
+    def invalidar_todo(self) -> int:
+        """Vaciar ambos niveles (p. ej. al cambiar museo_knowledge.json)"""
+        from database import SessionLocal
+        from models import CacheContenidoArea
+
+        eliminadas = len(self.memoria)
+        self.memoria.limpiar()
+        try:
+            with SessionLocal() as db:
+                eliminadas += db.query(CacheContenidoArea).delete(synchronize_session=False)
+                db.commit()
+        except Exception as e:
+            logger.warning("⚠️ No se pudo vaciar cache BD: %s", e)
+
+        logger.info("🧹 Cache de contenido vaciado: %s entradas", eliminadas)
+        return eliminadas
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {"activo": self.activo, "memoria": self.memoria.estadisticas()}
+
+
+# Instancia
+cache_contenido = CacheContenidoAreas()
@@ -0,0 +1,432 @@
+# services/cola_generacion.py
+# 🔥 Cola persistente de generación (tabla trabajos_generacion en PostgreSQL)
+# Reemplaza el thread daemon: los trabajos sobreviven reinicios y se
+# reclaman con SELECT ... FOR UPDATE SKIP LOCKED desde cualquier proceso.
+
+import asyncio
+import logging
+import os
+import socket
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from config import get_settings
+from database import SessionLocal
+from models import ItinerarioDetalle, TrabajoGeneracion
+from services.eventos_generacion import bus_eventos
+from utils.metricas import metricas
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_GENERANDO = "Generando contenido"
+ESTADOS_TRABAJO = ("pendiente", "en_proceso", "completado", "fallido")
+
+
+class ColaGeneracion:
+    """Operaciones sobre la tabla de trabajos. Cada método abre su propia sesión."""
+
+    # ============================================
+    # ENCOLAR (dentro de la transacción del request)
+    # ============================================
+
+    def encolar_areas_pendientes(
+        self,
+        db: Session,
+        itinerario_id: int,
+        resultado_ia: Dict[str, Any],
+        areas_disponibles: List[Dict[str, Any]],
+        visitante_nombre: str,
+        intereses: List[str],
+        nivel_detalle: str
+    ) -> Optional[TrabajoGeneracion]:
+        """
+        Agrega a la sesión del request el trabajo con las áreas marcadas como
+        "generando". Se confirma en el mismo commit que los detalles, así el
+        worker nunca ve un trabajo sin sus filas de ItinerarioDetalle.
+        """
+        areas_pendientes = [
+            {
+                "area_codigo": a["area_codigo"],
+                "orden": a["orden"],
+                "tiempo_sugerido": a.get("tiempo_sugerido")
+            }
+            for a in resultado_ia.get("areas", [])
+            if a.get("generando")
+        ]
+
+        if not areas_pendientes:
+            return None
+
+        trabajo = TrabajoGeneracion(
+            itinerario_id=itinerario_id,
+            tipo='areas_pendientes',
+            estado='pendiente',
+            max_intentos=settings.GENERACION_MAX_INTENTOS,
+            payload={
+                "areas_pendientes": areas_pendientes,
+                "areas_disponibles": areas_disponibles,
+                "visitante_nombre": visitante_nombre,
+                "intereses": intereses,
+                "nivel_detalle": nivel_detalle
+            }
+        )
+        db.add(trabajo)
+
+        logger.info("📥 Trabajo encolado para itinerario %s: %s áreas", itinerario_id, len(areas_pendientes))
+        return trabajo
+
+    def encolar_lote(
+        self,
+        db: Session,
+        itinerario_ids: List[int],
+        grupos: List[Dict[str, Any]],
+        areas_disponibles: List[Dict[str, Any]]
+    ) -> TrabajoGeneracion:
+        """
+        Un solo trabajo para todos los itinerarios de un lote. Cada grupo
+        (mismos intereses, tiempo y nivel) lleva sus áreas pendientes y sus
+        miembros: el contenido de cada área se genera una vez por grupo.
+        """
+        trabajo = TrabajoGeneracion(
+            itinerario_id=itinerario_ids[0],
+            itinerarios_lote=itinerario_ids,
+            tipo='lote',
+            estado='pendiente',
+            max_intentos=settings.GENERACION_MAX_INTENTOS,
+            payload={"grupos": grupos, "areas_disponibles": areas_disponibles}
+        )
+        db.add(trabajo)
+
+        logger.info("📥 Lote encolado: %s itinerarios en %s grupos", len(itinerario_ids), len(grupos))
+        return trabajo
+
+    # ============================================
+    # RECLAMAR / RENOVAR / TERMINAR (desde los workers)
+    # ============================================
+
+    def reclamar(self, worker: str) -> Optional[Dict[str, Any]]:
+        """
+        Toma el siguiente trabajo disponible. También recupera trabajos
+        'en_proceso' cuyo lease venció (worker caído o reiniciado).
+        """
+        db = SessionLocal()
+        try:
+            trabajo = db.query(TrabajoGeneracion).filter(
+                or_(
+                    and_(
+                        TrabajoGeneracion.estado == 'pendiente',
+                        TrabajoGeneracion.disponible_desde <= func.now()
+                    ),
+                    and_(
+                        TrabajoGeneracion.estado == 'en_proceso',
+                        TrabajoGeneracion.bloqueado_hasta < func.now()
+                    )
+                )
+            ).order_by(
+                TrabajoGeneracion.disponible_desde, TrabajoGeneracion.id
+            ).with_for_update(skip_locked=True).first()
+
+            if not trabajo:
+                db.rollback()
+                return None
+
+            if trabajo.estado == 'en_proceso':
+                logger.warning("♻️ Recuperando trabajo %s (lease vencido de %s)", trabajo.id, trabajo.worker)
+
+            trabajo.estado = 'en_proceso'
+            trabajo.worker = worker
+            trabajo.intentos += 1
+            trabajo.bloqueado_hasta = func.now() + timedelta(seconds=settings.GENERACION_LEASE_SEGUNDOS)
+            db.commit()
+
+            return {
+                "id": trabajo.id,
+                "tipo": trabajo.tipo,
+                "itinerario_id": trabajo.itinerario_id,
+                "itinerarios_lote": trabajo.itinerarios_lote,
+                "intentos": trabajo.intentos,
+                "max_intentos": trabajo.max_intentos,
+                "payload": trabajo.payload
+            }
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def renovar(self, trabajo_id: int, worker: str):
+        """Extender el lease mientras el trabajo sigue en curso"""
+        with SessionLocal() as db:
+            db.query(TrabajoGeneracion).filter(
+                TrabajoGeneracion.id == trabajo_id,
+                TrabajoGeneracion.worker == worker
+            ).update(
+                {"bloqueado_hasta": func.now() + timedelta(seconds=settings.GENERACION_LEASE_SEGUNDOS)},
+                synchronize_session=False
+            )
+            db.commit()
+
+    def completar(self, trabajo_id: int, itinerario_id: int, itinerarios_lote: Optional[List[int]] = None):
+        with SessionLocal() as db:
+            db.query(TrabajoGeneracion).filter(TrabajoGeneracion.id == trabajo_id).update(
+                {"estado": 'completado', "bloqueado_hasta": None, "error": None},
+                synchronize_session=False
+            )
+            for destino in itinerarios_lote or [itinerario_id]:
+                bus_eventos.notificar(db, destino, "fin")
+            db.commit()
+
+    def fallar(self, trabajo_id: int, itinerario_id: int, error: str, intentos: int, max_intentos: int,
+               itinerarios_lote: Optional[List[int]] = None):
+        """Reintentar con backoff exponencial o marcar como fallido"""
+        with SessionLocal() as db:
+            if intentos >= max_intentos:
+                valores = {"estado": 'fallido', "bloqueado_hasta": None, "error": error}
+                for destino in itinerarios_lote or [itinerario_id]:
+                    bus_eventos.notificar(db, destino, "fin")
+                logger.error("❌ Trabajo %s fallido tras %s intentos: %s", trabajo_id, intentos, error)
+            else:
+                espera = settings.GENERACION_BACKOFF_SEGUNDOS * (2 ** (intentos - 1))
+                valores = {
+                    "estado": 'pendiente',
+                    "bloqueado_hasta": None,
+                    "error": error,
+                    "disponible_desde": func.now() + timedelta(seconds=espera)
+                }
+                logger.warning("⚠️ Trabajo %s reintentará en %ss: %s", trabajo_id, espera, error)
+
+            db.query(TrabajoGeneracion).filter(TrabajoGeneracion.id == trabajo_id).update(
+                valores, synchronize_session=False
+            )
+            db.commit()
+
+    def liberar(self, trabajo_id: int):
+        """Devolver un trabajo a la cola (apagado ordenado del worker)"""
+        with SessionLocal() as db:
+            db.query(TrabajoGeneracion).filter(
+                TrabajoGeneracion.id == trabajo_id,
+                TrabajoGeneracion.estado == 'en_proceso'
+            ).update(
+                {
+                    "estado": 'pendiente',
+                    "bloqueado_hasta": None,
+                    "intentos": TrabajoGeneracion.intentos - 1
+                },
+                synchronize_session=False
+            )
+            db.commit()
+
+    # ============================================
+    # CONSULTAS
+    # ============================================
+
+    def ordenes_sin_contenido(self, itinerario_id: int) -> List[int]:
+        """Órdenes cuyo contenido aún no se generó (para reanudar trabajos)"""
+        return self.ordenes_sin_contenido_lote([itinerario_id]).get(itinerario_id, [])
+
+    def ordenes_sin_contenido_lote(self, itinerario_ids: List[int]) -> Dict[int, List[int]]:
+        """Lo mismo para varios itinerarios en una consulta: {itinerario_id: [órdenes]}"""
+        with SessionLocal() as db:
+            filas = db.query(ItinerarioDetalle.itinerario_id, ItinerarioDetalle.orden).filter(
+                ItinerarioDetalle.itinerario_id.in_(itinerario_ids),
+                or_(
+                    ItinerarioDetalle.introduccion.is_(None),
+                    ItinerarioDetalle.introduccion.contains(PLACEHOLDER_GENERANDO)
+                )
+            ).all()
+            pendientes: Dict[int, List[int]] = {}
+            for itinerario_id, orden in filas:
+                pendientes.setdefault(itinerario_id, []).append(orden)
+            return pendientes
+
+    def tiene_trabajo_activo(self, itinerario_id: int) -> bool:
+        """¿Queda algún trabajo pendiente o en proceso para el itinerario?"""
+        with SessionLocal() as db:
+            return db.query(TrabajoGeneracion.id).filter(
+                or_(
+                    TrabajoGeneracion.itinerario_id == itinerario_id,
+                    TrabajoGeneracion.itinerarios_lote.contains([itinerario_id])
+                ),
+                TrabajoGeneracion.estado.in_(['pendiente', 'en_proceso'])
+            ).first() is not None
+
+    def estado_lote(self, trabajo_id: int) -> Optional[Dict[str, Any]]:
+        """Estado de un trabajo de lote y cuántas áreas faltan en cada itinerario"""
+        with SessionLocal() as db:
+            trabajo = db.query(TrabajoGeneracion).filter(
+                TrabajoGeneracion.id == trabajo_id,
+                TrabajoGeneracion.tipo == 'lote'
+            ).first()
+            if not trabajo:
+                return None
+            datos = {
+                "trabajo_id": trabajo.id,
+                "estado": trabajo.estado,
+                "intentos": trabajo.intentos,
+                "error": trabajo.error,
+                "itinerarios": list(trabajo.itinerarios_lote or []),
+            }
+        pendientes = self.ordenes_sin_contenido_lote(datos["itinerarios"])
+        datos["areas_pendientes"] = {str(i): len(pendientes.get(i, [])) for i in datos["itinerarios"]}
+        return datos
+
+    def profundidad(self) -> Dict[str, int]:
+        """Cantidad de trabajos por estado"""
+        with SessionLocal() as db:
+            filas = db.query(
+                TrabajoGeneracion.estado, func.count(TrabajoGeneracion.id)
+            ).group_by(TrabajoGeneracion.estado).all()
+            return {estado: int(cantidad) for estado, cantidad in filas}
+
+
+# ============================================
+# POOL DE WORKERS
+# ============================================
+
+class PoolTrabajadores:
+    """
+    N workers asyncio que consumen la cola. Se puede embeber en la API
+    (GENERACION_WORKERS_EMBEBIDOS) o correr aparte con worker_generacion.py
+    para escalar la generación independientemente de la API.
+    """
+
+    def __init__(self, num_workers: int):
+        self.num_workers = num_workers
+        self.prefijo = f"{socket.gethostname()}:{os.getpid()}"
+        self._tareas: List[asyncio.Task] = []
+        self._detener = asyncio.Event()
+
+    async def iniciar(self):
+        self._detener.clear()
+        for i in range(self.num_workers):
+            self._tareas.append(asyncio.create_task(self._bucle(f"{self.prefijo}:{i}")))
+        logger.info("👷 Pool de generación iniciado: %s workers (%s)", self.num_workers, self.prefijo)
+
+    async def detener(self):
+        self._detener.set()
+        for tarea in self._tareas:
+            tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self._tareas = []
+        logger.info("👷 Pool de generación detenido")
+
+    async def _bucle(self, worker: str):
+        while not self._detener.is_set():
+            try:
+                trabajo = await asyncio.to_thread(cola_generacion.reclamar, worker)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("❌ [%s] Error reclamando trabajo: %s", worker, e)
+                trabajo = None
+
+            if not trabajo:
+                try:
+                    await asyncio.wait_for(self._detener.wait(), timeout=settings.GENERACION_POLL_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._procesar(worker, trabajo)
+
+    async def _procesar(self, worker: str, trabajo: Dict[str, Any]):
+        from services.ia_service import ia_service
+
+        trabajo_id = trabajo["id"]
+        payload = trabajo["payload"]
+        latido = asyncio.create_task(self._latido(trabajo_id, worker))
+
+        try:
+            if trabajo["tipo"] == 'lote':
+                await self._procesar_lote(worker, trabajo)
+                return
+
+            # Reanudar: solo las áreas que siguen sin contenido
+            pendientes_bd = set(await asyncio.to_thread(cola_generacion.ordenes_sin_contenido, trabajo["itinerario_id"]))
+            areas = [a for a in payload["areas_pendientes"] if a["orden"] in pendientes_bd]
+
+            logger.info(
+                "👷 [%s] Trabajo %s (itinerario %s, intento %s): %s/%s áreas",
+                worker, trabajo_id, trabajo['itinerario_id'], trabajo['intentos'],
+                len(areas), len(payload['areas_pendientes'])
+            )
+
+            if areas:
+                await ia_service._generar_resto_areas_background(
+                    trabajo["itinerario_id"], areas, payload["areas_disponibles"],
+                    payload["visitante_nombre"], payload["intereses"], payload["nivel_detalle"]
+                )
+
+            # Las áreas que no se pudieron generar o guardar siguen vacías: reintentar
+            faltan = await asyncio.to_thread(cola_generacion.ordenes_sin_contenido, trabajo["itinerario_id"])
+            if faltan:
+                raise RuntimeError(f"Áreas sin contenido tras generar: órdenes {sorted(faltan)}")
+
+            await asyncio.to_thread(cola_generacion.completar, trabajo_id, trabajo["itinerario_id"])
+
+        except asyncio.CancelledError:
+            await asyncio.shield(asyncio.to_thread(cola_generacion.liberar, trabajo_id))
+            raise
+        except Exception as e:
+            await asyncio.to_thread(
+                cola_generacion.fallar, trabajo_id, trabajo["itinerario_id"], str(e),
+                trabajo["intentos"], trabajo["max_intentos"], trabajo.get("itinerarios_lote")
+            )
+        finally:
+            latido.cancel()
+
+    async def _procesar_lote(self, worker: str, trabajo: Dict[str, Any]):
+        from services.ia_service import ia_service
+
+        payload = trabajo["payload"]
+        pendientes_bd = await asyncio.to_thread(cola_generacion.ordenes_sin_contenido_lote, trabajo["itinerarios_lote"])
+
+        # Reanudar: por grupo, las áreas que le faltan a algún miembro
+        grupos = []
+        for grupo in payload["grupos"]:
+            faltan = {orden for m in grupo["miembros"] for orden in pendientes_bd.get(m["itinerario_id"], [])}
+            areas = [a for a in grupo["areas_pendientes"] if a["orden"] in faltan]
+            if areas:
+                grupos.append({**grupo, "areas_pendientes": areas})
+
+        logger.info(
+            "👷 [%s] Lote %s (intento %s): %s/%s grupos, %s itinerarios",
+            worker, trabajo['id'], trabajo['intentos'],
+            len(grupos), len(payload['grupos']), len(trabajo['itinerarios_lote'])
+        )
+
+        if grupos:
+            await ia_service._generar_lote_background(grupos, payload["areas_disponibles"])
+
+        faltan = await asyncio.to_thread(cola_generacion.ordenes_sin_contenido_lote, trabajo["itinerarios_lote"])
+        if faltan:
+            raise RuntimeError(f"Áreas sin contenido tras generar en {len(faltan)} itinerarios del lote")
+
+        await asyncio.to_thread(
+            cola_generacion.completar, trabajo["id"], trabajo["itinerario_id"], trabajo["itinerarios_lote"]
+        )
+
+    async def _latido(self, trabajo_id: int, worker: str):
+        intervalo = max(1, settings.GENERACION_LEASE_SEGUNDOS // 3)
+        while True:
+            await asyncio.sleep(intervalo)
+            try:
+                await asyncio.to_thread(cola_generacion.renovar, trabajo_id, worker)
+            except Exception as e:
+                logger.warning("⚠️ No se pudo renovar lease del trabajo %s: %s", trabajo_id, e)
+
+
+# Instancia
+cola_generacion = ColaGeneracion()
+
+# 🔥 Profundidad de la cola en /metrics (un GROUP BY por scrape)
+metricas.medidor(
+    "museo_cola_generacion_trabajos", "Trabajos de generación por estado", ("estado",),
+    lambda: {(estado,): cantidad for estado, cantidad in {
+        **{e: 0 for e in ESTADOS_TRABAJO}, **cola_generacion.profundidad()
+    }.items()}
+)
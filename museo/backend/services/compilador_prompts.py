@@ -0,0 +1,236 @@
+# services/compilador_prompts.py
+# 🔥 Compilador de prompts con prefijo estable (prompt caching)
+# DeepSeek cachea el prefijo común de los mensajes y Ollama reutiliza el KV
+# cache mientras el comienzo del prompt no cambie, así que el orden es:
+#   1. Prefijo: instrucciones fijas, formato JSON y nombre/descripción del
+#      área (igual para todos los visitantes del área y nivel)
+#   2. Contexto del KB: solo los k objetos, datos y pasajes más afines a los
+#      intereses (índice vectorial), recortados a KB_PRESUPUESTO_TOKENS;
+#      visitantes con los mismos intereses comparten también este bloque
+#   3. Visitante: nombre, intereses y bienvenida
+# El prompt queda del tamaño del original (solo entra lo seleccionado) y el
+# prefijo común sigue siendo reutilizable entre visitantes.
+#
+# Los tokens se cuentan localmente (aproximación tipo BPE, sin llamar a la IA).
+
+import logging
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+from config import get_settings
+from utils.cache_lru import CacheLRU
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_PIEZAS = re.compile(r"\w+|[^\w\s]")
+CARACTERES_POR_TOKEN = 4  # Palabras largas en español se parten en varios tokens
+
+
+def contar_tokens(texto: str) -> int:
+    """Tokens aproximados: cada signo es uno y cada palabra ~1 por cada 4 letras"""
+    return sum(
+        math.ceil(len(pieza) / CARACTERES_POR_TOKEN) if pieza[0].isalnum() or pieza[0] == "_" else 1
+        for pieza in _PIEZAS.findall(texto)
+    )
+
+
+def recortar(textos: List[str], presupuesto: int) -> Tuple[List[str], int]:
+    """Los primeros textos que caben en el presupuesto (el primero se corta por palabras si no cabe)"""
+    elegidos: List[str] = []
+    usados = 0
+    for texto in textos:
+        tokens = contar_tokens(texto)
+        if usados + tokens <= presupuesto:
+            elegidos.append(texto)
+            usados += tokens
+            continue
+        if not elegidos and presupuesto > 0:
+            palabras = texto.split()
+            while palabras and contar_tokens(" ".join(palabras)) > presupuesto:
+                palabras = palabras[: max(1, len(palabras) * 3 // 4)] if len(palabras) > 1 else []
+            if palabras:
+                recortado = " ".join(palabras) + "…"
+                elegidos.append(recortado)
+                usados += contar_tokens(recortado)
+        break
+    return elegidos, usados
+
+
+def _numerados(textos: List[str]) -> str:
+    return "\n".join(f"{i + 1}. {texto}" for i, texto in enumerate(textos))
+
+
+class PromptCompilado:
+    """Prefijo estable + sufijo por visitante"""
+
+    def __init__(self, prefijo: str, sufijo: str):
+        self.prefijo = prefijo
+        self.sufijo = sufijo
+
+    @property
+    def texto(self) -> str:
+        return self.prefijo + self.sufijo
+
+    @property
+    def tokens(self) -> int:
+        return contar_tokens(self.texto)
+
+
+# ============================================
+# BLOQUES FIJOS
+# ============================================
+
+INSTRUCCIONES_AREA = """Genera contenido educativo para un área del Museo Pumapungo.
+
+INSTRUCCIONES:
+* Si hay INFORMACIÓN REAL DEL MUSEO, USA esos objetos y datos y parafrasea el contexto para hacerlo accesible
+* Si no la hay, genera contenido apropiado sobre el contexto histórico/cultural del área
+* Dirígete al visitante por su nombre, escrito exactamente como aparece en VISITANTE, y conecta el contenido con sus intereses
+"""
+
+INSTRUCCIONES_ESTRUCTURA = """Selecciona areas para itinerario del Museo Pumapungo.
+TAREA: Selecciona 3-5 areas que sumen aprox el tiempo disponible del visitante. USA los tiempos indicados.
+
+Responde SOLO JSON:
+{
+  "titulo": "titulo",
+  "descripcion": "descripcion",
+  "duracion_total": minutos,
+  "areas": [{"area_codigo": "cod", "orden": 1, "tiempo_sugerido": min}]
+}
+"""
+
+
+def _formato_area(nivel: str, num_datos: int, num_obs: int) -> str:
+    return f"""
+Nivel: {nivel.upper()}
+Genera {num_datos} datos y {num_obs} observaciones.
+
+JSON:
+{{
+  "introduccion": "3-4 oraciones",
+  "historia_contextual": "6-8 lineas de contexto histórico/cultural",
+  "datos_curiosos": [{num_datos} datos curiosos],
+  "que_observar": [{num_obs} elementos a observar],
+  "recomendacion": "consejo práctico"
+}}
+"""
+
+
+class CompiladorPrompts:
+
+    def __init__(self, presupuesto_kb: Optional[int] = None):
+        self.presupuesto_kb = presupuesto_kb or settings.KB_PRESUPUESTO_TOKENS
+        # Prefijos ya compilados, por instancia (cada compilador tiene su presupuesto)
+        self._contextos = CacheLRU(max_items=512, ttl_segundos=float("inf"))
+        self._prefijos_area = CacheLRU(max_items=512, ttl_segundos=float("inf"))
+        self._prefijos_estructura = CacheLRU(max_items=64, ttl_segundos=float("inf"))
+
+    # ============================================
+    # ÁREA
+    # ============================================
+
+    def _contexto_kb(self, codigo: str, version_kb: str, objetos: Tuple[str, ...], datos: Tuple[str, ...],
+                     contexto: Tuple[str, ...]) -> str:
+        """
+        Bloque con los textos seleccionados del área, recortado al
+        presupuesto: objetos y datos se reparten la mitad, el contexto
+        histórico el resto.
+        """
+        clave = (codigo, version_kb, objetos, datos, contexto)
+        bloque = self._contextos.obtener(clave)
+        if bloque is None:
+            bloque = self._recortar_kb(codigo, objetos, datos, contexto)
+            self._contextos.guardar(clave, bloque)
+        return bloque
+
+    def _recortar_kb(self, codigo: str, objetos: Tuple[str, ...], datos: Tuple[str, ...],
+                     contexto: Tuple[str, ...]) -> str:
+        objetos_in, usados_obj = recortar(list(objetos), self.presupuesto_kb // 4)
+        datos_in, usados_datos = recortar(list(datos), self.presupuesto_kb // 4)
+        contexto_in, usados_ctx = recortar(list(contexto), self.presupuesto_kb - usados_obj - usados_datos)
+
+        descartados = len(objetos) + len(datos) + len(contexto) - len(objetos_in) - len(datos_in) - len(contexto_in)
+        if descartados:
+            logger.debug("✂️ KB de %s recortado a %d tokens (%d textos fuera)", codigo,
+                         usados_obj + usados_datos + usados_ctx, descartados)
+
+        return (
+            f"\nINFORMACIÓN REAL DEL MUSEO:\n\nOBJETOS DESTACADOS:\n{_numerados(objetos_in)}\n\n"
+            f"DATOS CURIOSOS REALES:\n{_numerados(datos_in)}\n\n"
+            f"CONTEXTO HISTÓRICO:\n" + "\n\n".join(contexto_in) + "\n"
+        )
+
+    def _prefijo_area(self, nivel: str, num_datos: int, num_obs: int, nombre: str, descripcion: str) -> str:
+        clave = (nivel, num_datos, num_obs, nombre, descripcion)
+        prefijo = self._prefijos_area.obtener(clave)
+        if prefijo is None:
+            prefijo = (
+                INSTRUCCIONES_AREA
+                + _formato_area(nivel, num_datos, num_obs)
+                + f"\nÁREA: {nombre}\nDESCRIPCIÓN: {descripcion}\n"
+            )
+            self._prefijos_area.guardar(clave, prefijo)
+        return prefijo
+
+    def area(self, area_info: Dict, info_kb: Optional[Dict], indice, version_kb: str, visitante: str,
+             intereses: List[str], nivel: str, num_datos: int, num_obs: int, primera: bool) -> PromptCompilado:
+        """
+        Prompt de un área. Con info_kb (KB suficiente) se agregan tras el
+        prefijo los num_obs objetos, num_datos datos y KB_PASAJES_CONTEXTO
+        pasajes más afines a los intereses (en orden original si no hay
+        intereses); sin KB solo van nombre y descripción del área.
+        """
+        codigo = area_info['codigo']
+        contexto_kb = ""
+
+        if info_kb:
+            seleccion = {}
+            for tipo, campo, k in (("objeto", "objetos_destacados", num_obs), ("dato", "datos_curiosos", num_datos),
+                                   ("contexto", "informacion_detallada", settings.KB_PASAJES_CONTEXTO)):
+                # Sin índice para el área se toman los primeros k del KB
+                seleccion[tipo] = tuple(indice.buscar(codigo, tipo, intereses, k) or info_kb[campo][:k])
+            contexto_kb = self._contexto_kb(
+                codigo, version_kb, seleccion["objeto"], seleccion["dato"], seleccion["contexto"]
+            )
+
+        prefijo = self._prefijo_area(
+            nivel, num_datos, num_obs, area_info['nombre'], area_info.get('descripcion') or 'Área del museo'
+        )
+        sufijo = (
+            contexto_kb
+            + f"\nVISITANTE: {visitante}\n"
+            f"INTERESES: {', '.join(intereses) if intereses else 'generales'}\n"
+            + ("⭐ PRIMERA ÁREA - Bienvenida cálida\n" if primera else "")
+        )
+        return PromptCompilado(prefijo, sufijo)
+
+    # ============================================
+    # ESTRUCTURA DEL ITINERARIO
+    # ============================================
+
+    def _prefijo_estructura(self, areas: Tuple[Tuple[str, str, int, int], ...]) -> str:
+        prefijo = self._prefijos_estructura.obtener(areas)
+        if prefijo is None:
+            areas_texto = "\n".join(f"- {codigo}: {nombre} ({minimo}-{maximo}min)" for codigo, nombre, minimo, maximo in areas)
+            prefijo = INSTRUCCIONES_ESTRUCTURA + f"\nAREAS:\n{areas_texto}\n"
+            self._prefijos_estructura.guardar(areas, prefijo)
+        return prefijo
+
+    def estructura(self, areas_disponibles: List[Dict], visitante: str, intereses: List[str],
+                   tiempo_disponible: int) -> PromptCompilado:
+        prefijo = self._prefijo_estructura(tuple(
+            (a['codigo'], a['nombre'], a['tiempo_minimo'], a['tiempo_maximo']) for a in areas_disponibles
+        ))
+        sufijo = (
+            f"\nVISITANTE: {visitante}\n"
+            f"INTERESES: {', '.join(intereses) if intereses else 'generales'}\n"
+            f"TIEMPO DISPONIBLE: {tiempo_disponible} minutos\n"
+        )
+        return PromptCompilado(prefijo, sufijo)
+
+
+# Instancia
+compilador_prompts = CompiladorPrompts()
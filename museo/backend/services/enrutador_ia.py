@@ -0,0 +1,354 @@
+# services/enrutador_ia.py
+# 🔥 Enrutador multi-proveedor de IA (Ollama + DeepSeek) con hedging y failover
+# - Orden de preferencia: AI_PROVEEDORES (p. ej. ["deepseek", "ollama"]);
+#   vacío = solo AI_PROVIDER, como antes.
+# - Por proveedor y tipo de prompt guarda la salud (EWMA de aciertos), la
+#   latencia (EWMA) y las últimas latencias para el percentil del hedge.
+# - Hedging: si el proveedor elegido no respondió al llegar a su p95, se
+#   lanza la misma petición al siguiente y gana la primera respuesta; la
+#   otra se cancela.
+# - Failover: si una llamada falla se pasa al siguiente proveedor en vez de
+#   caer al contenido genérico.
+# Los proveedores con salud baja pasan al final del orden (se siguen usando
+# como último recurso y así se detecta cuando se recuperan).
+# Circuit breaker y timeout por intento: services/resiliencia_ia.py. Con el
+# circuito abierto el proveedor no se llama; si no queda ninguno se lanza
+# CircuitoAbiertoError enseguida y ia_service usa el contenido de respaldo.
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from config import get_settings
+from utils.metricas import ia_duracion, ia_espera, metricas, registrar_uso_ia
+from services.programador_generacion import programador_generacion
+from services.proveedores_ia import ProveedorIA, crear_proveedor
+from services.resiliencia_ia import cuenta_como_fallo, resiliencia_ia
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+MUESTRAS_PERCENTIL = 20  # Mínimo de latencias antes de usar el percentil
+
+ia_hedges = metricas.contador(
+    "museo_ia_hedges_total", "Peticiones duplicadas (hedge) lanzadas a otro proveedor",
+    ("proveedor", "tipo")
+)
+ia_failovers = metricas.contador(
+    "museo_ia_failovers_total", "Llamadas reintentadas en otro proveedor tras un error",
+    ("desde", "hacia", "tipo")
+)
+
+
+class ErrorProveedoresIA(Exception):
+    """Ningún proveedor pudo responder"""
+
+
+class CircuitoAbiertoError(ErrorProveedoresIA):
+    """Todos los circuitos están abiertos: no se llamó a ningún proveedor"""
+
+
+class EstadoProveedor:
+    """Salud y latencia de un proveedor para un tipo de prompt"""
+
+    def __init__(self, alfa: float):
+        self.alfa = alfa
+        self.salud = 1.0
+        self.latencia_ewma: Optional[float] = None
+        self.latencias: deque = deque(maxlen=200)
+        self.ultimo_error: Optional[str] = None
+
+    def registrar(self, exito: bool, duracion: Optional[float] = None, error: Optional[str] = None):
+        self.salud = (1 - self.alfa) * self.salud + self.alfa * (1.0 if exito else 0.0)
+        if exito and duracion is not None:
+            self.latencias.append(duracion)
+            self.latencia_ewma = duracion if self.latencia_ewma is None else (
+                (1 - self.alfa) * self.latencia_ewma + self.alfa * duracion
+            )
+        if error:
+            self.ultimo_error = error
+
+    def percentil(self, p: float) -> Optional[float]:
+        if len(self.latencias) < MUESTRAS_PERCENTIL:
+            return None
+        ordenadas = sorted(self.latencias)
+        return ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))]
+
+
+class EnrutadorIA:
+
+    def __init__(self, nombres: Optional[List[str]] = None):
+        nombres = nombres or settings.AI_PROVEEDORES or [settings.AI_PROVIDER]
+        self.proveedores: List[ProveedorIA] = []
+        for nombre in dict.fromkeys(n.lower() for n in nombres):
+            try:
+                self.proveedores.append(crear_proveedor(nombre))
+            except ValueError as e:
+                # DeepSeek sin API key: se omite si hay otros proveedores
+                logger.warning("⚠️ Proveedor %s omitido: %s", nombre, e)
+        if not self.proveedores:
+            raise ValueError(f"Ningún proveedor de IA utilizable en {nombres}")
+
+        self._estados: Dict[Tuple[str, str], EstadoProveedor] = {}
+        if len(self.proveedores) > 1:
+            logger.info("🔀 Enrutador IA: %s", ' → '.join(p.nombre for p in self.proveedores))
+
+    @property
+    def principal(self) -> ProveedorIA:
+        return self.proveedores[0]
+
+    # ============================================
+    # ESTADO
+    # ============================================
+
+    def _estado(self, nombre: str, tipo: str) -> EstadoProveedor:
+        clave = (nombre, tipo)
+        if clave not in self._estados:
+            self._estados[clave] = EstadoProveedor(settings.AI_EWMA_ALFA)
+        return self._estados[clave]
+
+    def _ordenar(self, tipo: str) -> List[ProveedorIA]:
+        """Preferencia configurada; los de salud baja al final y sin los de circuito abierto"""
+        disponibles = [p for p in self.proveedores if resiliencia_ia.circuito(p.nombre).disponible()]
+        sanos = [p for p in disponibles if self._estado(p.nombre, tipo).salud >= settings.AI_SALUD_MINIMA]
+        return sanos + [p for p in disponibles if p not in sanos]
+
+    def _plazo_hedge(self, proveedor: ProveedorIA, tipo: str) -> float:
+        """p95 de las latencias recientes (o 2× la EWMA mientras hay pocas muestras)"""
+        estado = self._estado(proveedor.nombre, tipo)
+        plazo = estado.percentil(settings.AI_HEDGE_PERCENTIL)
+        if plazo is None:
+            plazo = 2 * estado.latencia_ewma if estado.latencia_ewma else settings.AI_HEDGE_INICIAL_SEGUNDOS
+        return min(max(plazo, settings.AI_HEDGE_MIN_SEGUNDOS), float(proveedor.timeout))
+
+    def estado(self) -> Dict[str, Any]:
+        """Salud y latencias por proveedor y tipo (para diagnóstico)"""
+        resultado: Dict[str, Any] = {}
+        for (nombre, tipo), estado in self._estados.items():
+            resultado.setdefault(nombre, {})[tipo] = {
+                "salud": round(estado.salud, 3),
+                "latencia_ewma_s": round(estado.latencia_ewma, 3) if estado.latencia_ewma else None,
+                "p95_s": estado.percentil(0.95),
+                "muestras": len(estado.latencias),
+                "ultimo_error": estado.ultimo_error,
+            }
+        return {
+            "orden": [p.nombre for p in self.proveedores],
+            "proveedores": resultado,
+            "resiliencia": resiliencia_ia.estado(),
+        }
+
+    # ============================================
+    # UN INTENTO CONTRA UN PROVEEDOR
+    # ============================================
+
+    def _tiempo_limite(self, proveedor: ProveedorIA, max_tokens: int) -> float:
+        return resiliencia_ia.tiempo_limite(proveedor.nombre, proveedor.timeout).calcular(max_tokens)
+
+    def _resultado(self, proveedor: ProveedorIA, tipo: str, error: Optional[BaseException],
+                   duracion: float, uso: Dict[str, int], texto: str = ""):
+        """Actualiza salud, circuito y tokens/s con el resultado de un intento"""
+        circuito = resiliencia_ia.circuito(proveedor.nombre)
+        if error is None:
+            circuito.exito()
+            self._estado(proveedor.nombre, tipo).registrar(True, duracion)
+            tokens = uso.get("completion_tokens") or len(texto) // 4
+            resiliencia_ia.tiempo_limite(proveedor.nombre, proveedor.timeout).registrar(tokens, duracion)
+            registrar_uso_ia(proveedor.nombre, proveedor.model, tipo, uso)
+        elif isinstance(error, asyncio.CancelledError):
+            circuito.liberar()
+        else:
+            self._estado(proveedor.nombre, tipo).registrar(False, error=str(error) or type(error).__name__)
+            if cuenta_como_fallo(error):
+                circuito.fallo()
+            else:
+                circuito.liberar()
+
+    async def _intento(
+        self, proveedor: ProveedorIA, prompt: str, max_tokens: int, temperature: Optional[float],
+        json_mode: bool, uso: Dict[str, int], tipo: str
+    ) -> str:
+        """Una llamada (el turno del circuito ya fue reservado por quien la lanza)"""
+        temp = temperature if temperature is not None else proveedor.temperature
+        limite = self._tiempo_limite(proveedor, max_tokens)
+        esperando = time.perf_counter()
+        inicio = esperando
+        resultado, error, texto = "error", None, ""
+
+        try:
+            # 🚦 Concurrencia y rate limit de ESTE proveedor
+            async with programador_generacion.limitador(proveedor.nombre):
+                inicio = time.perf_counter()
+                ia_espera.observar(inicio - esperando, proveedor.nombre, tipo)
+                try:
+                    texto = await asyncio.wait_for(
+                        proveedor.generar(prompt, max_tokens, temp, json_mode, uso=uso), timeout=limite
+                    )
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"sin respuesta en {limite:.0f}s ({max_tokens} tokens máx.)")
+                resultado = "ok"
+                return texto
+        except BaseException as e:
+            error = e
+            resultado = "cancelado" if isinstance(e, asyncio.CancelledError) else "error"
+            raise
+        finally:
+            duracion = time.perf_counter() - inicio
+            ia_duracion.observar(duracion, proveedor.nombre, proveedor.model, tipo, resultado)
+            self._resultado(proveedor, tipo, error, duracion, uso, texto)
+
+    # ============================================
+    # GENERACIÓN (hedging + failover)
+    # ============================================
+
+    async def generar(
+        self, prompt: str, max_tokens: int, temperature: Optional[float], json_mode: bool,
+        uso: Optional[Dict[str, int]] = None, tipo: str = "area", origen: Optional[Dict[str, str]] = None
+    ) -> str:
+        """`origen` recibe el proveedor y modelo que respondieron (tras hedge o failover)"""
+        candidatos = self._ordenar(tipo)
+        en_vuelo: Dict[asyncio.Future, Tuple[ProveedorIA, Dict[str, int], float]] = {}
+        errores: List[str] = []
+        siguiente = 0
+
+        def lanzar() -> Optional[ProveedorIA]:
+            """Siguiente candidato cuyo circuito deja pasar la llamada"""
+            nonlocal siguiente
+            while siguiente < len(candidatos):
+                proveedor = candidatos[siguiente]
+                siguiente += 1
+                if not resiliencia_ia.circuito(proveedor.nombre).permitir():
+                    errores.append(f"{proveedor.nombre}: circuito abierto")
+                    continue
+                uso_intento: Dict[str, int] = {}
+                tarea = asyncio.ensure_future(
+                    self._intento(proveedor, prompt, max_tokens, temperature, json_mode, uso_intento, tipo)
+                )
+                en_vuelo[tarea] = (proveedor, uso_intento, time.monotonic())
+                return proveedor
+            return None
+
+        if lanzar() is None:
+            raise CircuitoAbiertoError("; ".join(errores) or "todos los circuitos abiertos")
+
+        try:
+            while en_vuelo:
+                # Un solo hedge a la vez: con una llamada en vuelo se espera hasta su p95
+                plazo = None
+                if settings.AI_HEDGE_ACTIVO and len(en_vuelo) == 1 and siguiente < len(candidatos):
+                    proveedor, _, lanzado = next(iter(en_vuelo.values()))
+                    plazo = max(0.0, lanzado + self._plazo_hedge(proveedor, tipo) - time.monotonic())
+
+                hechas, _ = await asyncio.wait(list(en_vuelo), timeout=plazo, return_when=asyncio.FIRST_COMPLETED)
+
+                if not hechas:
+                    lento = next(iter(en_vuelo.values()))[0]
+                    cubierto = lanzar()
+                    if cubierto:
+                        ia_hedges.incrementar(cubierto.nombre, tipo)
+                        logger.info("⏱️ %s lento para '%s': hedge a %s", lento.nombre, tipo, cubierto.nombre)
+                    continue
+
+                for tarea in hechas:
+                    proveedor, uso_intento, _ = en_vuelo.pop(tarea)
+                    try:
+                        texto = tarea.result()
+                    except Exception as e:
+                        errores.append(f"{proveedor.nombre}: {e}")
+                        logger.warning("⚠️ %s falló (%s): %s", proveedor.nombre, tipo, e)
+                        continue
+                    if uso is not None:
+                        uso.update(uso_intento)
+                    if origen is not None:
+                        origen.update(proveedor=proveedor.nombre, modelo=proveedor.model)
+                    return texto
+
+                # Todas las terminadas fallaron: failover al siguiente
+                if not en_vuelo:
+                    cubierto = lanzar()
+                    if cubierto:
+                        ia_failovers.incrementar(proveedor.nombre, cubierto.nombre, tipo)
+        finally:
+            for tarea in en_vuelo:
+                tarea.cancel()
+
+        raise ErrorProveedoresIA("; ".join(errores) or "sin proveedores")
+
+    async def generar_stream(
+        self, prompt: str, max_tokens: int, temperature: Optional[float], json_mode: bool,
+        uso: Optional[Dict[str, int]] = None, tipo: str = "area", origen: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream con failover mientras no se haya entregado ningún fragmento.
+        Sin hedge: una vez que el cliente recibió texto no se puede cambiar de proveedor.
+        El tiempo límite adaptativo cubre el stream completo.
+        """
+        errores: List[str] = []
+        anterior: Optional[ProveedorIA] = None
+        for proveedor in self._ordenar(tipo):
+            if not resiliencia_ia.circuito(proveedor.nombre).permitir():
+                errores.append(f"{proveedor.nombre}: circuito abierto")
+                continue
+            if anterior:
+                ia_failovers.incrementar(anterior.nombre, proveedor.nombre, tipo)
+
+            temp = temperature if temperature is not None else proveedor.temperature
+            limite = self._tiempo_limite(proveedor, max_tokens)
+            uso_intento: Dict[str, int] = {}
+            partes: List[str] = []
+            esperando = time.perf_counter()
+            inicio = esperando
+            resultado, error = "error", None
+
+            try:
+                async with programador_generacion.limitador(proveedor.nombre):
+                    inicio = time.perf_counter()
+                    ia_espera.observar(inicio - esperando, proveedor.nombre, tipo)
+                    fragmentos = proveedor.generar_stream(prompt, max_tokens, temp, json_mode, uso=uso_intento).__aiter__()
+                    try:
+                        while True:
+                            restante = inicio + limite - time.perf_counter()
+                            if restante <= 0:
+                                raise TimeoutError(f"stream sin terminar en {limite:.0f}s ({max_tokens} tokens máx.)")
+                            try:
+                                fragmento = await asyncio.wait_for(fragmentos.__anext__(), timeout=restante)
+                            except StopAsyncIteration:
+                                break
+                            except asyncio.TimeoutError:
+                                raise TimeoutError(f"stream sin terminar en {limite:.0f}s ({max_tokens} tokens máx.)")
+                            partes.append(fragmento)
+                            yield fragmento
+                    finally:
+                        await fragmentos.aclose()
+                    resultado = "ok"
+            except Exception as e:
+                error = e
+                if partes:
+                    raise
+                errores.append(f"{proveedor.nombre}: {e}")
+                logger.warning("⚠️ %s falló antes del primer fragmento (%s): %s", proveedor.nombre, tipo, e)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                duracion = time.perf_counter() - inicio
+                ia_duracion.observar(duracion, proveedor.nombre, proveedor.model, tipo, resultado)
+                self._resultado(proveedor, tipo, error, duracion, uso_intento, "".join(partes))
+
+            if resultado == "ok":
+                if uso is not None:
+                    uso.update(uso_intento)
+                if origen is not None:
+                    origen.update(proveedor=proveedor.nombre, modelo=proveedor.model)
+                return
+            anterior = proveedor
+
+        if all("circuito abierto" in e for e in errores):
+            raise CircuitoAbiertoError("; ".join(errores) or "todos los circuitos abiertos")
+        raise ErrorProveedoresIA("; ".join(errores))
+
+    async def cerrar(self):
+        for proveedor in self.proveedores:
+            await proveedor.cerrar()
@@ -0,0 +1,148 @@
+# services/estadisticas_evaluaciones.py
+# 🔥 Estadísticas de evaluaciones calculadas en PostgreSQL
+# Un solo SELECT con avg() y count(*) FILTER (WHERE ...) en vez de traer
+# todas las filas de Evaluacion a Python. Admite rango de fechas y desglose
+# por área (áreas del itinerario evaluado).
+#
+# Los resultados se guardan en memoria con la versión de la tabla como parte
+# de la clave (contador que un trigger incrementa en INSERT/UPDATE/DELETE,
+# migraciones/012): siguen sirviéndose hasta que cambia alguna evaluación.
+
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from models import Area, Evaluacion, ItinerarioDetalle
+from schemas import EstadisticasEvaluacion
+from utils.cache_lru import CacheLRU
+
+logger = logging.getLogger(__name__)
+
+PREGUNTAS = (
+    "personalizado",
+    "buenas_decisiones",
+    "acompaniamiento",
+    "comprension",
+    "relevante",
+    "usaria_nuevamente",
+)
+
+
+def nivel_satisfaccion(calificacion_promedio: float) -> str:
+    if calificacion_promedio >= 4.5:
+        return "Excelente"
+    elif calificacion_promedio >= 3.5:
+        return "Buena"
+    elif calificacion_promedio >= 2.5:
+        return "Regular"
+    return "Necesita mejorar"
+
+
+class EstadisticasEvaluaciones:
+
+    def __init__(self):
+        self.cache = CacheLRU(max_items=128, ttl_segundos=24 * 3600)
+
+    # ============================================
+    # FORMATO DE RESPUESTA
+    # ============================================
+
+    @staticmethod
+    def armar(fila: Dict[str, Any]) -> Dict[str, Any]:
+        """Conteos agregados → campos de EstadisticasEvaluacion"""
+        total = int(fila.get("total_evaluaciones") or 0)
+        if not total:
+            return EstadisticasEvaluacion(
+                total_evaluaciones=0,
+                calificacion_promedio=0.0,
+                **{f"porcentaje_{p}": 0.0 for p in PREGUNTAS},
+                satisfaccion_general="Sin datos"
+            ).model_dump()
+
+        calificacion_promedio = float(fila["calificacion_promedio"])
+        return EstadisticasEvaluacion(
+            total_evaluaciones=total,
+            calificacion_promedio=round(calificacion_promedio, 2),
+            **{f"porcentaje_{p}": round(fila[p] / total * 100, 2) for p in PREGUNTAS},
+            satisfaccion_general=nivel_satisfaccion(calificacion_promedio)
+        ).model_dump()
+
+    # ============================================
+    # CONSULTAS
+    # ============================================
+
+    @staticmethod
+    def _agregados():
+        return [
+            func.count(Evaluacion.id).label("total_evaluaciones"),
+            func.avg(Evaluacion.calificacion_general).label("calificacion_promedio"),
+            *[func.count(Evaluacion.id).filter(getattr(Evaluacion, p)).label(p) for p in PREGUNTAS],
+        ]
+
+    @staticmethod
+    def _filtrar_fechas(consulta, desde: Optional[date], hasta: Optional[date]):
+        # fecha_creacion es un DateTime: "hasta" incluye todo ese día
+        if desde:
+            consulta = consulta.where(Evaluacion.fecha_creacion >= datetime.combine(desde, time.min))
+        if hasta:
+            consulta = consulta.where(Evaluacion.fecha_creacion < datetime.combine(hasta + timedelta(days=1), time.min))
+        return consulta
+
+    def _version(self, db: Session) -> Tuple:
+        """
+        Contador de versiones_tablas (una fila por PK). Sin la migración 012:
+        conteo, último id y última fecha; detecta altas y bajas, no ediciones.
+        """
+        try:
+            with db.begin_nested():
+                version = db.execute(
+                    text("SELECT version FROM versiones_tablas WHERE tabla = 'evaluaciones'")
+                ).scalar()
+            if version is not None:
+                return ("trigger", version)
+        except DBAPIError as e:
+            logger.debug("versiones_tablas no disponible (¿falta aplicar migraciones/012?): %s", e)
+
+        return tuple(db.execute(
+            select(func.count(Evaluacion.id), func.max(Evaluacion.id), func.max(Evaluacion.fecha_creacion))
+        ).one())
+
+    def resumen(self, db: Session, desde: Optional[date] = None, hasta: Optional[date] = None) -> Dict[str, Any]:
+        clave = ("resumen", self._version(db), desde, hasta)
+        resultado = self.cache.obtener(clave)
+        if resultado is None:
+            consulta = self._filtrar_fechas(select(*self._agregados()), desde, hasta)
+            resultado = self.armar(dict(db.execute(consulta).mappings().one()))
+            self.cache.guardar(clave, resultado)
+        return resultado
+
+    def por_area(self, db: Session, desde: Optional[date] = None, hasta: Optional[date] = None) -> List[Dict[str, Any]]:
+        """Una fila por área: evaluaciones de los itinerarios que la incluían"""
+        clave = ("por_area", self._version(db), desde, hasta)
+        resultado = self.cache.obtener(clave)
+        if resultado is None:
+            areas_itinerario = select(ItinerarioDetalle.itinerario_id, ItinerarioDetalle.area_id).distinct().subquery()
+            consulta = (
+                select(Area.id, Area.codigo, Area.nombre, *self._agregados())
+                .select_from(Evaluacion)
+                .join(areas_itinerario, areas_itinerario.c.itinerario_id == Evaluacion.itinerario_id)
+                .join(Area, Area.id == areas_itinerario.c.area_id)
+                .group_by(Area.id, Area.codigo, Area.nombre)
+                .order_by(func.count(Evaluacion.id).desc(), Area.codigo)
+            )
+            consulta = self._filtrar_fechas(consulta, desde, hasta)
+
+            resultado = [
+                {"area_id": fila["id"], "area_codigo": fila["codigo"], "area_nombre": fila["nombre"], **self.armar(fila)}
+                for fila in db.execute(consulta).mappings().all()
+            ]
+            self.cache.guardar(clave, resultado)
+        return resultado
+
+
+# Instancia
+estadisticas_evaluaciones = EstadisticasEvaluaciones()
@@ -0,0 +1,138 @@
+# services/estadisticas_materializadas.py
+# 🔥 Estadísticas del panel administrativo servidas desde vistas materializadas
+# (migraciones/003_estadisticas_materializadas.sql)
+# - Lectura: cada dashboard es una sola fila buscada por índice único, no
+#   importa cuántas filas tengan las tablas de origen.
+# - Refresco: los triggers marcan la vista como pendiente al escribir; un
+#   bucle asyncio en la API refresca las pendientes con CONCURRENTLY (las
+#   lecturas no se bloquean) y todas cada ESTADISTICAS_MAX_ANTIGUEDAD_SEGUNDOS.
+#   Un advisory lock evita que varios workers refresquen a la vez.
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from config import get_settings
+from database import engine
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+VISTAS = (
+    "mv_estadisticas_itinerarios",
+    "mv_estadisticas_visitantes",
+    "mv_estadisticas_evaluaciones",
+    "mv_estadisticas_intereses",
+    "mv_estadisticas_historial",
+)
+
+LOCK_REFRESCO = 7310001  # Clave de pg_try_advisory_lock
+
+
+class EstadisticasMaterializadas:
+
+    def __init__(self):
+        self._tarea: Optional[asyncio.Task] = None
+        self._detener = asyncio.Event()
+
+    # ============================================
+    # LECTURA (desde los routers)
+    # ============================================
+
+    def leer(self, db: Session, vista: str) -> Dict[str, Any]:
+        """La fila de la vista como dict (vacío si la vista aún no tiene datos)"""
+        if vista not in VISTAS:
+            raise ValueError(f"Vista de estadísticas desconocida: {vista}")
+        try:
+            fila = db.execute(text(f"SELECT * FROM {vista} WHERE id = 1")).mappings().first()
+        except DBAPIError as e:
+            logger.error("❌ No se pudo leer %s (¿falta aplicar migraciones/003?): %s", vista, e)
+            raise
+        return dict(fila) if fila else {}
+
+    # ============================================
+    # REFRESCO
+    # ============================================
+
+    def refrescar(self, forzar: bool = False) -> List[str]:
+        """
+        Refresca las vistas pendientes o vencidas (todas con forzar=True).
+        Devuelve las vistas refrescadas; lista vacía si otro proceso tiene el lock.
+        """
+        refrescadas = []
+        with engine.connect() as conn:
+            if not conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": LOCK_REFRESCO}).scalar():
+                return refrescadas
+            try:
+                vistas = conn.execute(text("""
+                    SELECT vista FROM estadisticas_vistas
+                    WHERE :forzar OR pendiente OR refrescada_en IS NULL
+                       OR refrescada_en < now() - make_interval(secs => :max_antiguedad)
+                """), {"forzar": forzar, "max_antiguedad": settings.ESTADISTICAS_MAX_ANTIGUEDAD_SEGUNDOS}).scalars().all()
+                conn.commit()
+
+                for vista in vistas:
+                    if vista not in VISTAS:
+                        continue
+                    # Se desmarca antes de refrescar: una escritura durante el
+                    # refresco la vuelve a marcar y entra en la siguiente vuelta
+                    conn.execute(text("UPDATE estadisticas_vistas SET pendiente = FALSE WHERE vista = :v"), {"v": vista})
+                    conn.commit()
+                    try:
+                        conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {vista}"))
+                        conn.execute(text("UPDATE estadisticas_vistas SET refrescada_en = now() WHERE vista = :v"), {"v": vista})
+                        conn.commit()
+                        refrescadas.append(vista)
+                    except DBAPIError as e:
+                        conn.rollback()
+                        conn.execute(text("UPDATE estadisticas_vistas SET pendiente = TRUE WHERE vista = :v"), {"v": vista})
+                        conn.commit()
+                        logger.error("❌ Error refrescando %s: %s", vista, e)
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": LOCK_REFRESCO})
+                conn.commit()
+
+        if refrescadas:
+            logger.debug("📊 Estadísticas refrescadas: %s", ", ".join(refrescadas))
+        return refrescadas
+
+    # ============================================
+    # BUCLE (embebido en la API)
+    # ============================================
+
+    async def iniciar(self):
+        if not settings.ESTADISTICAS_REFRESCO_ACTIVO or self._tarea:
+            return
+        self._detener.clear()
+        self._tarea = asyncio.create_task(self._bucle())
+        logger.info("📊 Refresco de estadísticas cada %.0fs", settings.ESTADISTICAS_REFRESCO_SEGUNDOS)
+
+    async def detener(self):
+        if not self._tarea:
+            return
+        self._detener.set()
+        self._tarea.cancel()
+        await asyncio.gather(self._tarea, return_exceptions=True)
+        self._tarea = None
+
+    async def _bucle(self):
+        while not self._detener.is_set():
+            try:
+                await asyncio.to_thread(self.refrescar)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("❌ Error en el refresco de estadísticas: %s", e)
+
+            try:
+                await asyncio.wait_for(self._detener.wait(), timeout=settings.ESTADISTICAS_REFRESCO_SEGUNDOS)
+            except asyncio.TimeoutError:
+                pass
+
+
+# Instancia
+estadisticas_materializadas = EstadisticasMaterializadas()
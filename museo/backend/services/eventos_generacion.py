@@ -0,0 +1,122 @@
+# services/eventos_generacion.py
+# 🔥 Eventos de generación para los streams SSE
+# Los workers (en la API o en worker_generacion.py) publican con NOTIFY dentro
+# de la misma transacción que guarda el área; cada proceso de la API tiene un
+# único hilo con LISTEN que reparte los eventos a los suscriptores SSE locales.
+# Así los clientes no consultan la BD en bucle para saber qué área está lista.
+
+import asyncio
+import json
+import logging
+import select
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import text
+
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CANAL = "generacion_itinerarios"
+
+
+class BusEventosGeneracion:
+
+    def __init__(self):
+        self._suscriptores: Dict[int, Set[asyncio.Queue]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+
+    # ============================================
+    # PUBLICAR (desde los workers)
+    # ============================================
+
+    def notificar(self, db, itinerario_id: int, tipo: str, orden: Optional[int] = None):
+        """
+        Encola un NOTIFY en la transacción de `db`: Postgres lo entrega
+        solo al hacer commit, así el evento nunca llega antes que el dato.
+        """
+        payload = json.dumps({"itinerario_id": itinerario_id, "tipo": tipo, "orden": orden})
+        db.execute(text("SELECT pg_notify(:canal, :payload)"), {"canal": CANAL, "payload": payload})
+
+    # ============================================
+    # SUSCRIBIR (desde los endpoints SSE)
+    # ============================================
+
+    @asynccontextmanager
+    async def suscribir(self, itinerario_id: int):
+        cola: asyncio.Queue = asyncio.Queue()
+        self._suscriptores.setdefault(itinerario_id, set()).add(cola)
+        try:
+            yield cola
+        finally:
+            colas = self._suscriptores.get(itinerario_id)
+            if colas is not None:
+                colas.discard(cola)
+                if not colas:
+                    del self._suscriptores[itinerario_id]
+
+    def _despachar(self, evento: Dict[str, Any]):
+        for cola in self._suscriptores.get(evento.get("itinerario_id"), ()):
+            cola.put_nowait(evento)
+
+    # ============================================
+    # ESCUCHA (un hilo por proceso de la API)
+    # ============================================
+
+    def iniciar(self):
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._escuchar, name="listen-generacion", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=5)
+        self._hilo = None
+
+    def _escuchar(self):
+        import psycopg2
+
+        while not self._detener.is_set():
+            conexion = None
+            try:
+                # Conexión dedicada fuera del pool: LISTEN la mantiene ocupada
+                conexion = psycopg2.connect(settings.DATABASE_URL_COMPUTED)
+                conexion.autocommit = True
+                with conexion.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CANAL}")
+                logger.info("👂 Escuchando eventos de generación (%s)", CANAL)
+
+                while not self._detener.is_set():
+                    if select.select([conexion], [], [], 1.0) == ([], [], []):
+                        continue
+                    conexion.poll()
+                    while conexion.notifies:
+                        aviso = conexion.notifies.pop(0)
+                        try:
+                            evento = json.loads(aviso.payload)
+                        except ValueError:
+                            continue
+                        self._loop.call_soon_threadsafe(self._despachar, evento)
+
+            except Exception as e:
+                logger.warning("⚠️ LISTEN de generación interrumpido: %s", e)
+                self._detener.wait(5)
+            finally:
+                if conexion is not None:
+                    try:
+                        conexion.close()
+                    except Exception:
+                        pass
+
+
+# Instancia
+bus_eventos = BusEventosGeneracion()
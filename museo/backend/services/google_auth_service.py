@@ -273,7 +273,7 @@ class GoogleAuthService:
                 
                 if coincidencias > 0:
                     areas_scores[codigo] += coincidencias
-                    logger.debug(f"🎯 '{channel}' → {codigo} ({self.AREAS_MUSEO[codigo]}) +{coincidencias}")
+                    logger.debug("🎯 '%s' → %s (%s) +%s", channel, codigo, self.AREAS_MUSEO[codigo], coincidencias)
         
         # Ordenar áreas por score
         areas_ordenadas = sorted(
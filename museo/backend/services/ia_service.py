@@ -2,16 +2,19 @@
 # 🔥 VERSIÓN HÍBRIDA: Ollama (local) + DeepSeek API (producción)
 # Usa AI_PROVIDER del .env para elegir el proveedor
 
-import requests
+import asyncio
 import json
 import logging
 import re
-import threading
-import time
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Awaitable
 from datetime import datetime
-from pathlib import Path
 from config import get_settings
+from services.enrutador_ia import EnrutadorIA, ErrorProveedoresIA
+from services.programador_generacion import programador_generacion
+from services.cache_contenido import MARCADOR_VISITANTE, PersonalizadorFragmentos, cache_contenido
+from services.planificador_itinerario import planificador_itinerario
+from services.almacen_kb import almacen_kb
+from services.compilador_prompts import compilador_prompts
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -22,201 +25,96 @@ class IAGenerativaService:
     Servicio HÍBRIDO con soporte dual:
     - AI_PROVIDER=ollama  → Usa Ollama local (desarrollo)
     - AI_PROVIDER=deepseek → Usa DeepSeek API (producción)
+    
+    🔥 Todas las llamadas a la IA son asíncronas (httpx.AsyncClient con pool),
+    así que no bloquean el event loop de uvicorn.
+    🔥 Con AI_PROVEEDORES=["deepseek","ollama"] las llamadas pasan por el
+    enrutador (services/enrutador_ia.py): hedge al p95 y failover.
     """
     
     def __init__(self):
-        # 🔥 NUEVO: Detectar proveedor
-        self.provider = getattr(settings, 'AI_PROVIDER', 'ollama').lower()
-        
-        if self.provider == "deepseek":
-            # ============================================
-            # CONFIGURACIÓN DEEPSEEK
-            # ============================================
-            self.api_key = settings.DEEPSEEK_API_KEY
-            self.model = getattr(settings, 'DEEPSEEK_MODEL', 'deepseek-chat')
-            self.base_url = getattr(settings, 'DEEPSEEK_BASE_URL', 'https://api.deepseek.com')
-            self.timeout = getattr(settings, 'AI_TIMEOUT', 420)
-            self.temperature = getattr(settings, 'AI_TEMPERATURE', 0.25)
-            
-            if not self.api_key:
-                logger.error("❌ DEEPSEEK_API_KEY no configurada!")
-                raise ValueError("DEEPSEEK_API_KEY es requerida cuando AI_PROVIDER=deepseek")
-            
-            logger.info(f"🤖 IA Provider: DEEPSEEK API ({self.model})")
-        else:
-            # ============================================
-            # CONFIGURACIÓN OLLAMA (por defecto)
-            # ============================================
-            self.base_url = settings.OLLAMA_BASE_URL
-            self.model = settings.OLLAMA_MODEL
-            self.timeout = settings.OLLAMA_TIMEOUT
-            self.temperature = getattr(settings, 'OLLAMA_TEMPERATURE', 0.7)
-            
-            logger.info(f"🤖 IA Provider: OLLAMA ({self.model})")
-        
-        # 🔥 CARGAR KNOWLEDGE BASE (funciona con ambos proveedores)
-        self.knowledge_base = self._cargar_knowledge_base()
+        # 🔥 Proveedores asíncronos con pool keep-alive; el primero es el principal
+        self.enrutador = EnrutadorIA()
+        self.proveedor = self.enrutador.principal
+        self.provider = self.proveedor.nombre
+        self.model = self.proveedor.model
+        self.base_url = self.proveedor.base_url
+        self.timeout = self.proveedor.timeout
+        self.temperature = self.proveedor.temperature
+        
+        logger.info("🤖 IA Provider: %s (%s)", self.provider.upper(), self.model)
+        
+        # 🔥 CARGAR KNOWLEDGE BASE (almacén con recarga en caliente)
+        almacen_kb.actual()
     
     # ============================================
     # 🔥 NUEVO: MÉTODO UNIFICADO PARA LLAMAR A LA IA
     # ============================================
     
-    def _llamar_ia(self, prompt: str, max_tokens: int = 1800, temperature: float = None, json_mode: bool = True) -> str:
+    async def _llamar_ia(
+        self, prompt: str, max_tokens: int = 1800, temperature: float = None, json_mode: bool = True,
+        al_fragmento: Optional[Callable[[str], Awaitable[None]]] = None, tipo: str = "area",
+        origen: Optional[Dict[str, str]] = None
+    ) -> str:
         """
         🔥 MÉTODO CENTRAL: Llama a Ollama o DeepSeek según AI_PROVIDER
-        Retorna el texto de respuesta de la IA
+        Retorna el texto de respuesta de la IA.
+        Con al_fragmento usa stream: true y entrega cada fragmento a medida que llega.
+        `tipo` (estructura / area / chat) etiqueta las métricas de /metrics.
+        `origen` recibe el proveedor y modelo que respondieron (pueden no ser
+        los principales si hubo hedge o failover).
         """
-        temp = temperature if temperature is not None else self.temperature
-        
-        if self.provider == "deepseek":
-            return self._llamar_deepseek(prompt, max_tokens, temp, json_mode)
-        else:
-            return self._llamar_ollama(prompt, max_tokens, temp, json_mode)
-    
-    def _llamar_deepseek(self, prompt: str, max_tokens: int, temperature: float, json_mode: bool) -> str:
-        """Llamada a DeepSeek API (compatible con OpenAI)"""
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": self.model,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "Eres un guía experto del Museo Pumapungo en Cuenca, Ecuador. Responde SOLO en JSON válido, sin texto adicional, sin markdown, sin ```json."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "max_tokens": max_tokens,
-            "temperature": temperature,
-            "stream": False
-        }
-        
-        if json_mode:
-            payload["response_format"] = {"type": "json_object"}
-        
-        try:
-            logger.info(f"📡 DeepSeek API: enviando request ({max_tokens} tokens max)...")
-            
-            response = requests.post(
-                f"{self.base_url}/v1/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=self.timeout
-            )
-            
-            response.raise_for_status()
-            data = response.json()
-            
-            texto = data["choices"][0]["message"]["content"]
-            tokens_usados = data.get("usage", {})
-            
-            logger.info(f"✅ DeepSeek respondió: {tokens_usados.get('total_tokens', '?')} tokens")
-            return texto
-            
-        except requests.exceptions.HTTPError as e:
-            error_detail = ""
-            try:
-                error_detail = e.response.json()
-            except:
-                error_detail = e.response.text
-            logger.error(f"❌ DeepSeek HTTP Error: {e.response.status_code} - {error_detail}")
-            raise
-        except Exception as e:
-            logger.error(f"❌ DeepSeek Error: {e}")
-            raise
+        # 🚦 El enrutador respeta la concurrencia y el rate limit de cada proveedor
+        # (temperature None = la propia de cada proveedor)
+        if al_fragmento is None:
+            return await self.enrutador.generar(prompt, max_tokens, temperature, json_mode, tipo=tipo, origen=origen)
+        
+        partes = []
+        async for fragmento in self.enrutador.generar_stream(prompt, max_tokens, temperature, json_mode,
+                                                             tipo=tipo, origen=origen):
+            partes.append(fragmento)
+            await al_fragmento(fragmento)
+        return "".join(partes)
     
-    def _llamar_ollama(self, prompt: str, max_tokens: int, temperature: float, json_mode: bool) -> str:
-        """Llamada a Ollama local"""
-        payload = {
-            "model": self.model,
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": temperature,
-                "num_predict": max_tokens
-            }
-        }
-        
-        if json_mode:
-            payload["format"] = "json"
-        
-        try:
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload,
-                timeout=self.timeout
-            )
-            
-            response.raise_for_status()
-            return response.json().get("response", "")
-            
-        except Exception as e:
-            logger.error(f"❌ Ollama Error: {e}")
-            raise
+    async def cerrar(self):
+        """Cerrar los pools HTTP de los proveedores (al apagar la aplicación)"""
+        await self.enrutador.cerrar()
     
     # ============================================
-    # KNOWLEDGE BASE (sin cambios)
+    # KNOWLEDGE BASE (services/almacen_kb.py)
     # ============================================
     
-    def _cargar_knowledge_base(self) -> Dict[str, Any]:
-        """Cargar información real del museo desde JSON"""
-        try:
-            posibles_rutas = [
-                Path("museo_knowledge.json"),
-                Path("../museo_knowledge.json"),
-                Path(__file__).parent.parent / "museo_knowledge.json",
-            ]
-            
-            for ruta in posibles_rutas:
-                if ruta.exists():
-                    logger.info(f"📚 Cargando knowledge base: {ruta}")
-                    with open(ruta, 'r', encoding='utf-8') as f:
-                        kb = json.load(f)
-                    
-                    areas_count = len(kb.get('areas', {}))
-                    logger.info(f"✅ Knowledge base cargada: {areas_count} areas")
-                    return kb
-            
-            logger.warning("⚠️ No se encontró museo_knowledge.json")
-            return {"areas": {}}
-        
-        except Exception as e:
-            logger.error(f"❌ Error cargando knowledge base: {e}")
-            return {"areas": {}}
+    def recargar_knowledge_base(self) -> Dict[str, Any]:
+        """
+        Volver a leer museo_knowledge.json sin esperar a la revisión periódica.
+        El cache de contenido no se vacía: sus claves incluyen la versión del KB.
+        """
+        kb = almacen_kb.recargar()
+        return {"areas_kb": len(kb), "version_kb": kb.version}
     
-    def _obtener_info_area(self, area_codigo: str) -> Dict[str, Any]:
-        """Obtener información REAL de un área del museo"""
-        if not self.knowledge_base or "areas" not in self.knowledge_base:
-            return {}
-        
-        area_info = self.knowledge_base["areas"].get(area_codigo, {})
+    def _obtener_info_area(self, area_codigo: str, kb=None) -> Dict[str, Any]:
+        """Obtener información REAL de un área del museo (estructura precompilada)"""
+        kb = kb or almacen_kb.actual()
+        area_info = kb.area(area_codigo)
         
         if area_info:
-            datos = len(area_info.get('datos_curiosos', []))
-            objetos = len(area_info.get('objetos_destacados', []))
-            info_det = len(area_info.get('informacion_detallada', []))
+            datos = len(area_info['datos_curiosos'])
+            objetos = len(area_info['objetos_destacados'])
             
-            if datos >= 3 and objetos >= 3 and info_det >= 2:
-                logger.info(f"✅ KB completo para {area_codigo}: {datos} datos, {objetos} objetos")
-                return area_info
+            if area_info['suficiente'] and len(area_info['informacion_detallada']) >= 2:
+                logger.debug("✅ KB completo para %s: %s datos, %s objetos", area_codigo, datos, objetos)
             else:
-                logger.warning(f"⚠️ KB insuficiente para {area_codigo}: {datos} datos, {objetos} objetos")
-                return area_info
+                logger.warning("⚠️ KB insuficiente para %s: %s datos, %s objetos", area_codigo, datos, objetos)
+            return area_info
         else:
-            logger.warning(f"⚠️ Sin KB para {area_codigo}")
+            logger.warning("⚠️ Sin KB para %s", area_codigo)
             return {}
     
     # ============================================
     # GENERACIÓN PROGRESIVA (actualizado para usar _llamar_ia)
     # ============================================
     
-    def generar_itinerario_progresivo(
+    async def generar_itinerario_progresivo(
         self,
         visitante_nombre: str,
         intereses: List[str],
@@ -224,28 +122,45 @@ class IAGenerativaService:
         nivel_detalle: str,
         areas_disponibles: List[Dict[str, Any]],
         incluir_descansos: bool = True,
-        db_session=None,
-        itinerario_id: int = None
+        al_evento: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None
     ) -> Dict[str, Any]:
-        """🔥 MÉTODO PROGRESIVO HÍBRIDO — Funciona con Ollama y DeepSeek"""
+        """
+        🔥 MÉTODO PROGRESIVO HÍBRIDO — Funciona con Ollama y DeepSeek
+        Genera estructura + primera área. Las áreas marcadas "generando" las
+        completa un worker de la cola persistente (services/cola_generacion.py).
+        
+        al_evento(tipo, datos) recibe "estructura", "fragmento" (texto parcial
+        de la primera área, vía stream) y "area" para transmitirlos por SSE.
+        """
         tiempo_inicio = datetime.now()
         
-        tiene_kb = bool(self.knowledge_base and self.knowledge_base.get("areas"))
-        logger.info(f"🚀 HÍBRIDO [{self.provider.upper()}]: Generando para {visitante_nombre} (nivel: {nivel_detalle}, KB: {tiene_kb})")
+        kb = almacen_kb.actual()
+        tiene_kb = bool(kb)
+        logger.info("🚀 HÍBRIDO [%s]: Generando para %s (nivel: %s, KB: %s)", self.provider.upper(), visitante_nombre, nivel_detalle, tiene_kb)
         
         # PASO 1: Generar estructura básica
         logger.info("📋 PASO 1: Generando estructura...")
-        estructura = self._generar_estructura_base(
+        estructura = await self._generar_estructura_base(
             visitante_nombre, intereses, tiempo_disponible, areas_disponibles
         )
         
+        if al_evento:
+            await al_evento("estructura", estructura)
+        
+        async def al_fragmento(texto):
+            await al_evento("fragmento", {"orden": estructura['areas'][0]['orden'], "texto": texto})
+        
         # PASO 2: Generar SOLO primera área con contenido completo
         logger.info("📝 PASO 2: Generando primera área completa...")
-        primera_area = self._generar_area_individual_hibrida(
+        primera_area = await self._generar_area_individual_hibrida(
             estructura['areas'][0], areas_disponibles,
-            visitante_nombre, intereses, nivel_detalle, es_primera=True
+            visitante_nombre, intereses, nivel_detalle, es_primera=True,
+            al_fragmento=al_fragmento if al_evento else None
         )
         
+        if al_evento:
+            await al_evento("area", primera_area)
+        
         # PASO 3: Marcar resto como "generando"
         areas_resultado = [primera_area]
         for area_estructura in estructura['areas'][1:]:
@@ -266,43 +181,33 @@ class IAGenerativaService:
             **estructura,
             "areas": areas_resultado,
             "metadata": {
-                "modelo": self.model,
-                "provider": self.provider,  # 🔥 NUEVO
+                # Quien generó la primera área (otro proveedor si hubo failover)
+                "modelo": primera_area.get("_modelo", self.model),
+                "provider": primera_area.get("_proveedor", self.provider),  # 🔥 NUEVO
                 "temperature": 0.1,
                 "nivel_detalle": nivel_detalle,
                 "tiempo_primera_area": f"{tiempo_primera:.2f}s",
                 "timestamp": tiempo_fin.isoformat(),
+                "planificador": getattr(settings, 'PLANIFICADOR_ESTRUCTURA', 'local') if tiempo_disponible else "todas_las_areas",
                 "usa_knowledge_base": tiene_kb,
-                "areas_kb": len(self.knowledge_base.get("areas", {})),
+                "areas_kb": len(kb),
+                "version_kb": kb.version,
                 "modo": "hibrido"
             }
         }
         
-        logger.info(f"✅ Primera área lista en {tiempo_primera:.1f}s [{self.provider}]")
-        
-        # PASO 4: Lanzar generación del resto en background
-        if db_session and itinerario_id:
-            logger.info(f"🔄 Lanzando generación background de {len(estructura['areas']) - 1} áreas...")
-            thread = threading.Thread(
-                target=self._generar_resto_areas_background,
-                args=(
-                    itinerario_id, estructura['areas'][1:], areas_disponibles,
-                    visitante_nombre, intereses, nivel_detalle, db_session
-                ),
-                daemon=True
-            )
-            thread.start()
+        logger.info("✅ Primera área lista en %.1fs [%s]", tiempo_primera, self.provider)
         
         return resultado
     
-    def _generar_estructura_base(
+    def estructura_local(
         self, visitante_nombre, intereses, tiempo_disponible, areas_disponibles
     ) -> Dict[str, Any]:
-        """Genera estructura básica"""
+        """Estructura sin IA: todas las áreas (sin límite de tiempo) o el planificador local"""
         
         # SI NO HAY LÍMITE DE TIEMPO, USAR TODAS LAS ÁREAS
         if not tiempo_disponible:
-            logger.info(f"✅ Sin límite de tiempo - Usando TODAS las {len(areas_disponibles)} áreas")
+            logger.info("✅ Sin límite de tiempo - Usando TODAS las %s áreas", len(areas_disponibles))
             
             areas_estructura = []
             duracion_total = 0
@@ -323,58 +228,55 @@ class IAGenerativaService:
                 "areas": areas_estructura
             }
         
-        # SI HAY LÍMITE DE TIEMPO, USAR IA PARA SELECCIONAR
-        areas_texto = "\n".join([
-            f"- {a['codigo']}: {a['nombre']} ({a['tiempo_minimo']}-{a['tiempo_maximo']}min)"
-            for a in areas_disponibles
-        ])
+        # CON LÍMITE DE TIEMPO: PLANIFICADOR LOCAL
+        plan = planificador_itinerario.planificar(areas_disponibles, intereses, tiempo_disponible)
+        if plan:
+            return {
+                "titulo": f"Recorrido de {plan['duracion_total']} minutos por el Museo Pumapungo",
+                "descripcion": f"Itinerario personalizado para {visitante_nombre} con {len(plan['areas'])} áreas seleccionadas según los intereses en {', '.join(intereses) if intereses else 'cultura andina'}, ordenadas para recorrer el museo con el menor desplazamiento posible.",
+                **plan
+            }
+        return self._estructura_fallback(areas_disponibles, tiempo_disponible)
+    
+    async def _generar_estructura_base(
+        self, visitante_nombre, intereses, tiempo_disponible, areas_disponibles
+    ) -> Dict[str, Any]:
+        """Genera estructura básica"""
         
-        intereses_texto = ", ".join(intereses) if intereses else "generales"
+        # Sin límite de tiempo o con el planificador local: sin IA
+        if not tiempo_disponible or getattr(settings, 'PLANIFICADOR_ESTRUCTURA', 'local') != "ia":
+            return self.estructura_local(visitante_nombre, intereses, tiempo_disponible, areas_disponibles)
         
-        prompt = f"""Selecciona areas para itinerario del Museo Pumapungo.
-
-VISITANTE: {visitante_nombre}
-INTERESES: {intereses_texto}
-AREAS: {areas_texto}
-TAREA: Selecciona 3-5 areas que sumen aprox {tiempo_disponible} minutos. USA los tiempos indicados.
-
-Responde SOLO JSON:
-{{
-  "titulo": "titulo",
-  "descripcion": "descripcion",
-  "duracion_total": minutos,
-  "areas": [{{"area_codigo": "cod", "orden": 1, "tiempo_sugerido": min}}]
-}}"""
+        # Prefijo estable (instrucciones + áreas) y datos del visitante al final
+        prompt = compilador_prompts.estructura(areas_disponibles, visitante_nombre, intereses, tiempo_disponible).texto
         
         try:
             # 🔥 USAR MÉTODO UNIFICADO
-            respuesta = self._llamar_ia(prompt, max_tokens=500, temperature=0.1)
+            respuesta = await self._llamar_ia(prompt, max_tokens=500, temperature=0.1, tipo="estructura")
             return self._extraer_json(respuesta)
             
         except Exception as e:
-            logger.error(f"❌ Error estructura: {e}")
+            logger.error("❌ Error estructura: %s", e)
             return self._estructura_fallback(areas_disponibles, tiempo_disponible)
 
-    def _generar_area_individual_hibrida(
+    async def _generar_area_individual_hibrida(
         self, area_estructura, areas_disponibles, visitante_nombre,
-        intereses, nivel_detalle, es_primera=False
+        intereses, nivel_detalle, es_primera=False, al_fragmento=None
     ) -> Dict[str, Any]:
         """🔥 VERSIÓN HÍBRIDA — Funciona con Ollama y DeepSeek"""
         area_codigo = area_estructura['area_codigo']
         area_info = next((a for a in areas_disponibles if a['codigo'] == area_codigo), None)
         
         if not area_info:
-            logger.error(f"❌ Área {area_codigo} no encontrada")
+            logger.error("❌ Área %s no encontrada", area_codigo)
             return {**area_estructura, "error": "Área no encontrada"}
         
-        # 1. Intentar KB
-        info_kb = self._obtener_info_area(area_codigo)
-        
-        # 2. Evaluar si es suficiente
-        datos_kb = info_kb.get('datos_curiosos', []) if info_kb else []
-        objetos_kb = info_kb.get('objetos_destacados', []) if info_kb else []
+        # 1. Intentar KB (un solo snapshot para todo el área)
+        kb = almacen_kb.actual()
+        info_kb = self._obtener_info_area(area_codigo, kb)
         
-        usa_kb = len(datos_kb) >= 3 and len(objetos_kb) >= 3
+        # 2. Evaluar si es suficiente (precalculado al compilar el KB)
+        usa_kb = bool(info_kb) and info_kb['suficiente']
         fuente = "knowledge_base" if usa_kb else "generativo"
         
         # Ajustar extensión
@@ -387,138 +289,215 @@ Responde SOLO JSON:
             num_observar = 4
             num_predict = 1800
         
-        # Construir prompt
-        if usa_kb:
-            prompt = self._construir_prompt_con_kb(
-                area_info, info_kb, visitante_nombre, intereses,
-                nivel_detalle, num_datos, num_observar, es_primera
-            )
-        else:
-            prompt = self._construir_prompt_generativo(
-                area_info, visitante_nombre, intereses,
-                nivel_detalle, num_datos, num_observar, es_primera
-            )
+        # Intereses normalizados: mismo prompt (y misma clave de cache) sin importar el orden
+        intereses = cache_contenido.normalizar_intereses(intereses)
+        
+        # Construir prompt: instrucciones y área en el prefijo (cacheable), KB elegido y visitante al final.
+        # El nombre va como marcador: el contenido se cachea sin datos del visitante y
+        # el nombre real se pone al entregarlo
+        compilado = compilador_prompts.area(
+            area_info, info_kb if usa_kb else None, kb.indice, kb.version, MARCADOR_VISITANTE,
+            intereses, nivel_detalle, num_datos, num_observar, es_primera
+        )
+        prompt = compilado.texto
+        logger.debug("🧾 Prompt %s: ~%d tokens (prefijo %d caracteres)", area_codigo, compilado.tokens, len(compilado.prefijo))
+        
+        # 🔥 Cache de contenido (memoria → BD): se busca con el proveedor principal y
+        # se guarda con el que respondió, así no se mezclan salidas de distintos modelos
+        clave_cache = cache_contenido.huella(prompt, self.provider, self.model, num_predict, kb.version)
+        cacheado = await asyncio.to_thread(cache_contenido.obtener, clave_cache, visitante_nombre)
+        if cacheado:
+            logger.info("⚡ '%s' desde cache", area_info['nombre'])
+            return {
+                **area_estructura,
+                **cacheado,
+                "generando": False,
+                "_fuente": fuente,
+                "_cache": True,
+                "_proveedor": self.provider,
+                "_modelo": self.model
+            }
         
         try:
-            logger.info(f"📝 Generando '{area_info['nombre']}' ({fuente}, {nivel_detalle}) [{self.provider}]...")
+            logger.info("📝 Generando '%s' (%s, %s) [%s]...", area_info['nombre'], fuente, nivel_detalle, self.provider)
             
             # 🔥 USAR MÉTODO UNIFICADO
-            respuesta = self._llamar_ia(prompt, max_tokens=num_predict, temperature=0.2)
+            origen = {"proveedor": self.provider, "modelo": self.model}
+            stream = PersonalizadorFragmentos(al_fragmento, visitante_nombre) if al_fragmento else None
+            respuesta = await self._llamar_ia(
+                prompt, max_tokens=num_predict, temperature=0.2, al_fragmento=stream, tipo="area", origen=origen
+            )
+            if stream:
+                await stream.vaciar()
             contenido = self._extraer_json(respuesta)
             
-            logger.info(f"✅ '{area_info['nombre']}' generada ({len(contenido.get('datos_curiosos', []))} datos)")
+            logger.info("✅ '%s' generada (%d datos) [%s]", area_info['nombre'],
+                        len(contenido.get('datos_curiosos', [])), origen["proveedor"])
+            
+            if (origen["proveedor"], origen["modelo"]) != (self.provider, self.model):
+                clave_cache = cache_contenido.huella(
+                    prompt, origen["proveedor"], origen["modelo"], num_predict, kb.version
+                )
+            await asyncio.to_thread(
+                cache_contenido.guardar, clave_cache, area_codigo,
+                origen["proveedor"], origen["modelo"], contenido
+            )
             
             return {
                 **area_estructura,
-                **contenido,
+                **cache_contenido.personalizar(contenido, visitante_nombre),
                 "generando": False,
-                "_fuente": fuente
+                "_fuente": fuente,
+                "_proveedor": origen["proveedor"],
+                "_modelo": origen["modelo"]
             }
             
+        except ErrorProveedoresIA as e:
+            # 🔌 Ningún proveedor disponible (circuitos abiertos o todos fallaron):
+            # contenido ya generado para esta área con otros intereses, o el del KB
+            logger.warning("🔌 IA no disponible para %s: %s", area_codigo, e)
+            respaldo = await asyncio.to_thread(cache_contenido.obtener_respaldo, area_codigo, visitante_nombre)
+            if respaldo:
+                return {**area_estructura, **respaldo, "generando": False, "_fuente": "cache_respaldo", "_cache": True}
+            return self._area_fallback(area_estructura, area_info, info_kb)
+            
         except Exception as e:
-            logger.error(f"❌ Error {area_codigo}: {e}")
-            return self._area_fallback(area_estructura, area_info)
+            logger.error("❌ Error %s: %s", area_codigo, e)
+            return self._area_fallback(area_estructura, area_info, info_kb)
     
-    def _construir_prompt_con_kb(self, area_info, info_kb, visitante, intereses, nivel, num_datos, num_obs, primera):
-        """Prompt cuando HAY knowledge base"""
-        objetos = "\n".join([f"{i+1}. {obj}" for i, obj in enumerate(info_kb.get('objetos_destacados', [])[:num_obs])])
-        datos = "\n".join([f"{i+1}. {dato}" for i, dato in enumerate(info_kb.get('datos_curiosos', [])[:num_datos])])
-        contexto = "\n\n".join(info_kb.get('informacion_detallada', [])[:3])
+    async def _generar_resto_areas_background(self, itinerario_id, areas_pendientes, areas_disponibles,
+                                             visitante_nombre, intereses, nivel_detalle):
+        """
+        🔥 Ejecutado por los workers de la cola — lanza TODAS las áreas pendientes a la vez.
+        El limitador del proveedor acota cuántas llamadas están en vuelo y
+        cada área se guarda en BD en cuanto llega.
+        """
+        total = len(areas_pendientes) + 1
+        guardadas = 0
         
-        return f"""Genera contenido educativo para {area_info['nombre']} del Museo Pumapungo.
-
-VISITANTE: {visitante}
-INTERESES: {", ".join(intereses)}
-{'⭐ PRIMERA ÁREA - Bienvenida cálida' if primera else ''}
-
-INFORMACIÓN REAL DEL MUSEO:
-
-OBJETOS DESTACADOS:
-{objetos}
-
-DATOS CURIOSOS REALES:
-{datos}
-
-CONTEXTO HISTÓRICO:
-{contexto}
-
-INSTRUCCIONES:
-* USA los objetos y datos listados arriba
-* Parafrasea el contexto para hacerlo accesible
-* Genera {num_datos} datos y {num_obs} observaciones
-* Nivel: {nivel.upper()}
-
-JSON:
-{{
-  "introduccion": "3-4 oraciones",
-  "historia_contextual": "6-8 lineas basadas en contexto",
-  "datos_curiosos": [{num_datos} items de DATOS CURIOSOS],
-  "que_observar": [{num_obs} items de OBJETOS DESTACADOS],
-  "recomendacion": "consejo práctico"
-}}"""
+        logger.info("🔄 Background [%s]: %s áreas en paralelo", self.provider, len(areas_pendientes))
+        
+        def trabajo(area_pendiente):
+            return lambda: self._generar_area_individual_hibrida(
+                area_pendiente, areas_disponibles, visitante_nombre,
+                intereses, nivel_detalle, False
+            )
+        
+        async def al_completar(area_completa):
+            nonlocal guardadas
+            await asyncio.to_thread(self._guardar_area_generada, itinerario_id, area_completa)
+            guardadas += 1
+            logger.debug("✅ [%d/%d] guardada (orden %s)", guardadas + 1, total, area_completa['orden'])
+        
+        await programador_generacion.ejecutar_todas(
+            [trabajo(area) for area in areas_pendientes],
+            al_completar
+        )
+        
+        logger.info("🎉 Completado itinerario %s [%s]", itinerario_id, self.provider)
     
-    def _construir_prompt_generativo(self, area_info, visitante, intereses, nivel, num_datos, num_obs, primera):
-        """Prompt cuando NO hay KB suficiente"""
-        return f"""Genera contenido educativo para {area_info['nombre']} del Museo Pumapungo.
-
-ÁREA: {area_info['nombre']}
-DESCRIPCIÓN: {area_info.get('descripcion', 'Área del museo')}
-VISITANTE: {visitante}
-INTERESES: {", ".join(intereses)}
-{'⭐ PRIMERA ÁREA' if primera else ''}
-
-TAREA:
-Genera contenido educativo apropiado para un museo sobre:
-* Contexto histórico/cultural del área
-* {num_datos} datos interesantes y educativos
-* {num_obs} cosas importantes que observar
-* Recomendación práctica
-
-Nivel: {nivel.upper()}
-
-JSON:
-{{
-  "introduccion": "3-4 oraciones sobre qué verá",
-  "historia_contextual": "6-8 lineas de contexto histórico/cultural",
-  "datos_curiosos": [{num_datos} datos educativos relevantes],
-  "que_observar": [{num_obs} elementos importantes a observar],
-  "recomendacion": "consejo práctico"
-}}"""
+    def _guardar_area_generada(self, itinerario_id: int, area_completa: Dict[str, Any]):
+        """
+        Guardar el contenido de un área con una sesión propia (corre en un hilo).
+        Si no se pudo guardar lanza la excepción: el área queda sin contenido y
+        el trabajo de la cola la detecta al terminar y se reintenta.
+        """
+        from database import SessionLocal
+        from models import ItinerarioDetalle
+        from services.eventos_generacion import bus_eventos
+        
+        db = SessionLocal()
+        try:
+            detalle = db.query(ItinerarioDetalle).filter(
+                ItinerarioDetalle.itinerario_id == itinerario_id,
+                ItinerarioDetalle.orden == area_completa['orden']
+            ).first()
+            
+            if not detalle:
+                raise LookupError(f"Detalle orden {area_completa['orden']} no existe en itinerario {itinerario_id}")
+            
+            detalle.introduccion = area_completa.get('introduccion')
+            detalle.historia_contextual = area_completa.get('historia_contextual')
+            detalle.datos_curiosos = area_completa.get('datos_curiosos', [])
+            detalle.que_observar = area_completa.get('que_observar', [])
+            detalle.recomendacion = area_completa.get('recomendacion')
+            bus_eventos.notificar(db, itinerario_id, "area", area_completa['orden'])
+            db.commit()
+        except Exception as e:
+            logger.error("❌ Error guardando área orden %s: %s", area_completa.get('orden'), e)
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    
+    # ============================================
+    # LOTES (grupos escolares / operadores)
+    # ============================================
     
-    def _generar_resto_areas_background(self, itinerario_id, areas_pendientes, areas_disponibles,
-                                       visitante_nombre, intereses, nivel_detalle, db_session):
-        """Background thread — funciona con ambos proveedores"""
+    async def _generar_lote_background(self, grupos: List[Dict[str, Any]], areas_disponibles: List[Dict[str, Any]]):
+        """
+        🔥 Trabajo 'lote' de la cola: cada área se genera UNA vez por grupo
+        (mismos intereses, tiempo y nivel) con el marcador como nombre y se
+        copia a todos los miembros con el nombre de cada uno.
+        """
+        def trabajo(grupo, area_pendiente):
+            async def generar():
+                area = await self._generar_area_individual_hibrida(
+                    area_pendiente, areas_disponibles, MARCADOR_VISITANTE,
+                    grupo["intereses"], grupo["nivel_detalle"], False
+                )
+                return grupo, area
+            return generar
+        
+        async def al_completar(resultado):
+            grupo, area_completa = resultado
+            await asyncio.to_thread(self._guardar_area_lote, grupo, area_completa)
+        
+        await programador_generacion.ejecutar_todas(
+            [trabajo(grupo, area) for grupo in grupos for area in grupo["areas_pendientes"]],
+            al_completar
+        )
+        
+        logger.info("🎉 Lote completado: %s grupos [%s]", len(grupos), self.provider)
+    
+    def _guardar_area_lote(self, grupo: Dict[str, Any], area_completa: Dict[str, Any]) -> int:
+        """
+        Guardar un área en todos los itinerarios del grupo con una sola sesión
+        (corre en un hilo). Los errores se propagan igual que en _guardar_area_generada.
+        """
+        from database import SessionLocal
         from models import ItinerarioDetalle
+        from services.eventos_generacion import bus_eventos
         
-        logger.info(f"🔄 Background [{self.provider}]: {len(areas_pendientes)} áreas")
+        nombres = {m["itinerario_id"]: m["visitante_nombre"] for m in grupo["miembros"]}
+        contenido = {
+            campo: area_completa.get(campo)
+            for campo in ("introduccion", "historia_contextual", "datos_curiosos", "que_observar", "recomendacion")
+        }
         
-        for idx, area_pendiente in enumerate(areas_pendientes, start=2):
-            try:
-                area_completa = self._generar_area_individual_hibrida(
-                    area_pendiente, areas_disponibles, visitante_nombre,
-                    intereses, nivel_detalle, False
-                )
-                
-                detalle = db_session.query(ItinerarioDetalle).filter(
-                    ItinerarioDetalle.itinerario_id == itinerario_id,
-                    ItinerarioDetalle.orden == area_completa['orden']
-                ).first()
-                
-                if detalle:
-                    detalle.introduccion = area_completa.get('introduccion')
-                    detalle.historia_contextual = area_completa.get('historia_contextual')
-                    detalle.datos_curiosos = area_completa.get('datos_curiosos', [])
-                    detalle.que_observar = area_completa.get('que_observar', [])
-                    detalle.recomendacion = area_completa.get('recomendacion')
-                    db_session.commit()
-                    logger.info(f"✅ [{idx}/{len(areas_pendientes)+1}] guardada")
-                
-                time.sleep(1)  # Menor delay con DeepSeek (es más rápido)
-            except Exception as e:
-                logger.error(f"❌ Error área {idx}: {e}")
-                db_session.rollback()
-        
-        logger.info(f"🎉 Completado itinerario {itinerario_id} [{self.provider}]")
+        db = SessionLocal()
+        try:
+            detalles = db.query(ItinerarioDetalle).filter(
+                ItinerarioDetalle.itinerario_id.in_(list(nombres)),
+                ItinerarioDetalle.orden == area_completa['orden']
+            ).all()
+            
+            for detalle in detalles:
+                propio = cache_contenido.personalizar(contenido, nombres[detalle.itinerario_id])
+                detalle.introduccion = propio["introduccion"]
+                detalle.historia_contextual = propio["historia_contextual"]
+                detalle.datos_curiosos = propio["datos_curiosos"] or []
+                detalle.que_observar = propio["que_observar"] or []
+                detalle.recomendacion = propio["recomendacion"]
+                bus_eventos.notificar(db, detalle.itinerario_id, "area", area_completa['orden'])
+            db.commit()
+            return len(detalles)
+        except Exception as e:
+            logger.error("❌ Error guardando área orden %s del lote: %s", area_completa.get('orden'), e)
+            db.rollback()
+            raise
+        finally:
+            db.close()
     
     # ============================================
     # UTILIDADES (sin cambios significativos)
@@ -536,13 +515,16 @@ JSON:
             ]
         }
     
-    def _area_fallback(self, area_estructura, area_info):
+    def _area_fallback(self, area_estructura, area_info, info_kb=None):
+        """Contenido sin IA: textos del knowledge base si los hay, si no genérico"""
+        info_kb = info_kb or {}
+        historia = info_kb.get('historia') or " ".join(info_kb.get('informacion_detallada', [])[:2])
         return {
             **area_estructura,
             "introduccion": f"Bienvenido a {area_info['nombre']}",
-            "historia_contextual": area_info.get('descripcion', 'Área del museo'),
-            "datos_curiosos": ["Área fascinante del museo"],
-            "que_observar": ["Observa los detalles"],
+            "historia_contextual": historia or area_info.get('descripcion', 'Área del museo'),
+            "datos_curiosos": info_kb.get('datos_curiosos', [])[:4] or ["Área fascinante del museo"],
+            "que_observar": info_kb.get('objetos_destacados', [])[:4] or ["Observa los detalles"],
             "recomendacion": "Tómate tu tiempo",
             "generando": False
         }
@@ -567,91 +549,46 @@ JSON:
         
         raise ValueError("No se pudo extraer JSON")
     
-    def verificar_conexion(self) -> Dict[str, Any]:
+    async def verificar_conexion(self) -> Dict[str, Any]:
         """🔥 ACTUALIZADO: Verificar conexión según proveedor"""
-        tiene_kb = bool(self.knowledge_base and self.knowledge_base.get("areas"))
-        
-        if self.provider == "deepseek":
-            try:
-                # Verificar con una llamada pequeña
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                response = requests.post(
-                    f"{self.base_url}/v1/chat/completions",
-                    headers=headers,
-                    json={
-                        "model": self.model,
-                        "messages": [{"role": "user", "content": "ping"}],
-                        "max_tokens": 5
-                    },
-                    timeout=10
-                )
-                response.raise_for_status()
-                
-                return {
-                    "conectado": True,
-                    "provider": "deepseek",
-                    "modelo": self.model,
-                    "modelo_configurado": self.model,
-                    "modelo_disponible": True,
-                    "knowledge_base_cargada": tiene_kb,
-                    "areas_kb": len(self.knowledge_base.get("areas", {})),
-                    "modo": "hibrido"
-                }
-            except Exception as e:
-                return {
-                    "conectado": False,
-                    "provider": "deepseek",
-                    "error": str(e),
-                    "modelo_configurado": self.model,
-                    "modelo_disponible": False
-                }
-        else:
-            # Ollama
-            try:
-                response = requests.get(f"{self.base_url}/api/tags", timeout=5)
-                response.raise_for_status()
-                
-                modelos = response.json().get("models", [])
-                modelo_disponible = any(
-                    self.model in m.get("name", "") for m in modelos
-                )
-                
-                return {
-                    "conectado": True,
-                    "provider": "ollama",
-                    "modelo": self.model,
-                    "modelo_configurado": self.model,
-                    "modelo_disponible": modelo_disponible,
-                    "knowledge_base_cargada": tiene_kb,
-                    "areas_kb": len(self.knowledge_base.get("areas", {})),
-                    "modo": "hibrido"
-                }
-            except Exception as e:
-                return {
-                    "conectado": False,
-                    "provider": "ollama",
-                    "error": str(e),
-                    "modelo_configurado": self.model,
-                    "modelo_disponible": False
-                }
+        kb = almacen_kb.actual()
+        tiene_kb = bool(kb)
+        
+        try:
+            estado = await self.proveedor.verificar()
+            
+            return {
+                "conectado": True,
+                "provider": self.provider,
+                "modelo": self.model,
+                "modelo_configurado": self.model,
+                "modelo_disponible": estado.get("modelo_disponible", False),
+                "knowledge_base_cargada": tiene_kb,
+                "areas_kb": len(kb),
+                "version_kb": kb.version,
+                "modo": "hibrido"
+            }
+        except Exception as e:
+            return {
+                "conectado": False,
+                "provider": self.provider,
+                "error": str(e),
+                "modelo_configurado": self.model,
+                "modelo_disponible": False
+            }
 
-    def generar_itinerario(
+    async def generar_itinerario(
         self, visitante_nombre, intereses, tiempo_disponible,
         nivel_detalle, areas_disponibles, incluir_descansos=True
     ) -> Dict[str, Any]:
         """Método alias para compatibilidad"""
-        return self.generar_itinerario_progresivo(
+        return await self.generar_itinerario_progresivo(
             visitante_nombre=visitante_nombre,
             intereses=intereses,
             tiempo_disponible=tiempo_disponible,
             nivel_detalle=nivel_detalle,
             areas_disponibles=areas_disponibles,
-            incluir_descansos=incluir_descansos,
-            db_session=None,
-            itinerario_id=None
+            incluir_descansos=incluir_descansos
         )
 
 
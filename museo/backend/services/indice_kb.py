@@ -0,0 +1,309 @@
+# services/indice_kb.py
+# 🔥 Índice vectorial de los pasajes del knowledge base (museo_knowledge.json)
+# Se construye offline (construir_indice_kb.py) y se abre como matriz NumPy
+# memory-mapped; el vocabulario/IDF también se leen del artefacto, así que
+# los workers no vuelven a ajustar TF-IDF. Cada pasaje es un objeto destacado, un dato curioso o un
+# párrafo de información detallada de un área.
+#
+# Vectores: modelo de embeddings local (sentence-transformers, opcional) o,
+# si no está configurado/instalado, TF-IDF calculado aquí mismo con NumPy.
+# Todas las filas están normalizadas (L2), así que el coseno es un producto punto.
+
+import hashlib
+import json
+import logging
+import math
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import get_settings
+from utils.cache_lru import CacheLRU
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Campo del knowledge base → tipo de pasaje
+CAMPOS_PASAJES = {
+    "objetos_destacados": "objeto",
+    "datos_curiosos": "dato",
+    "informacion_detallada": "contexto",
+}
+
+STOPWORDS = {
+    "que", "del", "los", "las", "una", "uno", "por", "con", "para", "como", "mas", "sus",
+    "son", "fue", "era", "este", "esta", "estos", "estas", "entre", "sobre", "desde",
+    "tambien", "muy", "sin", "hasta", "donde", "cuando", "ser", "han", "hay", "tiene",
+    "cada", "otros", "otras", "todo", "todos", "sido", "puede", "pero", "porque", "les",
+}
+
+
+def checksum_kb(kb: Dict[str, Any]) -> str:
+    """
+    Huella del contenido del knowledge base (independiente del formato del
+    archivo). Solo cuenta "areas": procesar_pdfs_museo.py reescribe
+    fecha_procesamiento en cada corrida aunque ningún PDF haya cambiado, y la
+    versión derivada de esta huella es parte de las claves de cache, de las
+    plantillas y del índice vectorial.
+    """
+    contenido = kb.get("areas") or {}
+    return hashlib.sha256(json.dumps(contenido, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def huella_archivo(ruta: Path) -> str:
+    """sha256 de los bytes del archivo (por bloques, sin parsear el JSON)"""
+    digest = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def tokenizar(texto: str) -> List[str]:
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return [t for t in re.findall(r"[a-z0-9]+", texto) if len(t) >= 3 and t not in STOPWORDS]
+
+
+def extraer_pasajes(kb: Dict[str, Any]) -> List[Dict[str, Any]]:
+    pasajes = []
+    for codigo, area in (kb.get("areas") or {}).items():
+        for campo, tipo in CAMPOS_PASAJES.items():
+            for posicion, texto in enumerate(area.get(campo) or []):
+                if isinstance(texto, str) and texto.strip():
+                    pasajes.append({"area": codigo, "tipo": tipo, "posicion": posicion, "texto": texto.strip()})
+    return pasajes
+
+
+# ============================================
+# VECTORIZADORES
+# ============================================
+
+class VectorizadorTFIDF:
+    """TF-IDF (tf sublineal, idf suavizado) sin dependencias fuera de NumPy"""
+
+    metodo = "tfidf"
+
+    def __init__(self, vocabulario: Dict[str, int], idf: np.ndarray):
+        self.vocabulario = vocabulario
+        self.idf = idf
+
+    @classmethod
+    def ajustar(cls, textos: List[str]) -> "VectorizadorTFIDF":
+        documentos = [set(tokenizar(t)) for t in textos]
+        df = Counter(token for doc in documentos for token in doc)
+        vocabulario = {token: i for i, token in enumerate(sorted(df))}
+        n = len(textos)
+        idf = np.array(
+            [math.log((1 + n) / (1 + df[token])) + 1.0 for token in sorted(df)],
+            dtype=np.float32
+        )
+        return cls(vocabulario, idf)
+
+    def transformar(self, textos: List[str]) -> np.ndarray:
+        matriz = np.zeros((len(textos), len(self.vocabulario)), dtype=np.float32)
+        for fila, texto in enumerate(textos):
+            for token, cantidad in Counter(tokenizar(texto)).items():
+                columna = self.vocabulario.get(token)
+                if columna is not None:
+                    matriz[fila, columna] = 1.0 + math.log(cantidad)
+        matriz *= self.idf
+        normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+        return matriz / np.where(normas == 0, 1.0, normas)
+
+    def guardar(self, directorio: Path):
+        (directorio / "vocabulario.json").write_text(json.dumps(self.vocabulario, ensure_ascii=False), encoding="utf-8")
+        np.save(directorio / "idf.npy", self.idf)
+
+    @classmethod
+    def abrir(cls, directorio: Path) -> "VectorizadorTFIDF":
+        vocabulario = json.loads((directorio / "vocabulario.json").read_text(encoding="utf-8"))
+        return cls(vocabulario, np.load(directorio / "idf.npy"))
+
+
+class VectorizadorEmbeddings:
+    """Modelo local de sentence-transformers (CPU). Dependencia opcional."""
+
+    metodo = "embeddings"
+
+    def __init__(self, modelo: str):
+        from sentence_transformers import SentenceTransformer  # opcional
+
+        self.modelo = modelo
+        self._modelo = SentenceTransformer(modelo, device="cpu")
+
+    def transformar(self, textos: List[str]) -> np.ndarray:
+        return self._modelo.encode(textos, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+def crear_vectorizador(textos: List[str], modelo: Optional[str]):
+    if modelo:
+        try:
+            return VectorizadorEmbeddings(modelo)
+        except Exception as e:
+            logger.warning("⚠️ Modelo de embeddings '%s' no disponible (%s), usando TF-IDF", modelo, e)
+    return VectorizadorTFIDF.ajustar(textos)
+
+
+# ============================================
+# ÍNDICE
+# ============================================
+
+class IndiceKB:
+
+    def __init__(self):
+        self.vectores: Optional[np.ndarray] = None
+        self.pasajes: List[Dict[str, Any]] = []
+        self.vectorizador = None
+        self.checksum: Optional[str] = None
+        self._filas: Dict[Tuple[str, str], np.ndarray] = {}
+        # Por instancia: un lru_cache en el método viviría en la clase y
+        # retendría índices viejos tras una recarga
+        self._consultas = CacheLRU(max_items=256, ttl_segundos=float("inf"))
+
+    @property
+    def directorio(self) -> Path:
+        ruta = Path(settings.KB_INDICE_DIR)
+        return ruta if ruta.is_absolute() else Path(__file__).parent.parent / ruta
+
+    # ============================================
+    # CONSTRUCCIÓN (offline)
+    # ============================================
+
+    def construir(self, kb: Dict[str, Any], directorio: Optional[Path] = None, modelo: Optional[str] = None,
+                  huella: Optional[str] = None) -> Path:
+        """
+        Vectorizar todos los pasajes y escribir el índice en disco. huella es
+        la del archivo de origen (huella_archivo): con ella los workers saben
+        que el artefacto corresponde al JSON sin tener que leerlo.
+        """
+        directorio = Path(directorio or self.directorio)
+        directorio.mkdir(parents=True, exist_ok=True)
+        modelo = settings.KB_EMBEDDINGS_MODELO if modelo is None else modelo
+
+        pasajes = extraer_pasajes(kb)
+        textos = [p["texto"] for p in pasajes]
+        vectorizador = crear_vectorizador(textos, modelo)
+        vectores = vectorizador.transformar(textos)
+
+        np.save(directorio / "vectores.npy", vectores)
+        (directorio / "pasajes.json").write_text(json.dumps(pasajes, ensure_ascii=False), encoding="utf-8")
+        if isinstance(vectorizador, VectorizadorTFIDF):
+            vectorizador.guardar(directorio)
+
+        meta = {
+            "metodo": vectorizador.metodo,
+            "modelo": getattr(vectorizador, "modelo", None),
+            "checksum_kb": checksum_kb(kb),
+            "huella_archivo": huella,
+            "pasajes": len(pasajes),
+            "dimension": int(vectores.shape[1]) if vectores.ndim == 2 else 0,
+        }
+        (directorio / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+        logger.info("🧮 Índice KB construido: %s pasajes, %s (%s dims) en %s", meta['pasajes'], meta['metodo'], meta['dimension'], directorio)
+        return directorio
+
+    # ============================================
+    # CARGA
+    # ============================================
+
+    def leer_meta(self) -> Optional[Dict[str, Any]]:
+        """meta.json del índice construido (None si no hay o es ilegible)"""
+        try:
+            return json.loads((self.directorio / "meta.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def abrir(self, checksum: str) -> bool:
+        """Abrir el índice de disco (mmap) si corresponde a esa versión del KB"""
+        self.checksum = checksum
+        try:
+            return self._abrir(self.directorio)
+        except Exception as e:
+            logger.warning("⚠️ No se pudo abrir el índice KB: %s", e)
+            return False
+
+    def preparar(self, kb: Dict[str, Any], checksum: Optional[str] = None):
+        """
+        Abrir el índice de disco si corresponde a este knowledge base.
+        Si falta o está desactualizado se construye en memoria con TF-IDF.
+        """
+        if self.abrir(checksum or checksum_kb(kb)):
+            return
+
+        logger.warning("⚠️ Índice KB ausente o desactualizado: construyendo TF-IDF en memoria (ejecuta construir_indice_kb.py)")
+        self.pasajes = extraer_pasajes(kb)
+        textos = [p["texto"] for p in self.pasajes]
+        self.vectorizador = VectorizadorTFIDF.ajustar(textos)
+        self.vectores = self.vectorizador.transformar(textos)
+        self._indexar_filas()
+
+    def _abrir(self, directorio: Path) -> bool:
+        ruta_meta = directorio / "meta.json"
+        if not ruta_meta.exists():
+            return False
+
+        meta = json.loads(ruta_meta.read_text(encoding="utf-8"))
+        if meta.get("checksum_kb") != self.checksum:
+            return False
+
+        if meta["metodo"] == "embeddings":
+            vectorizador = VectorizadorEmbeddings(meta["modelo"])
+        else:
+            vectorizador = VectorizadorTFIDF.abrir(directorio)
+
+        self.vectores = np.load(directorio / "vectores.npy", mmap_mode="r")
+        self.pasajes = json.loads((directorio / "pasajes.json").read_text(encoding="utf-8"))
+        self.vectorizador = vectorizador
+        self._indexar_filas()
+
+        logger.info("🧮 Índice KB abierto (mmap): %s pasajes, %s", len(self.pasajes), meta['metodo'])
+        return True
+
+    def _indexar_filas(self):
+        grupos: Dict[Tuple[str, str], List[int]] = {}
+        for fila, pasaje in enumerate(self.pasajes):
+            grupos.setdefault((pasaje["area"], pasaje["tipo"]), []).append(fila)
+        self._filas = {clave: np.array(filas, dtype=np.int64) for clave, filas in grupos.items()}
+        self._consultas.limpiar()
+
+    # ============================================
+    # BÚSQUEDA
+    # ============================================
+
+    def _vector_consulta(self, consulta: str) -> np.ndarray:
+        vector = self._consultas.obtener(consulta)
+        if vector is None:
+            vector = self.vectorizador.transformar([consulta])[0]
+            self._consultas.guardar(consulta, vector)
+        return vector
+
+    def buscar(self, area_codigo: str, tipo: str, intereses: List[str], k: int) -> List[str]:
+        """
+        Los k pasajes de ese tipo y área más parecidos a los intereses.
+        Sin intereses (o sin términos conocidos) conserva el orden original.
+        """
+        filas = self._filas.get((area_codigo, tipo))
+        if filas is None or k <= 0:
+            return []
+
+        consulta = " ".join(sorted(intereses or []))
+        consulta_vector = self._vector_consulta(consulta) if consulta else None
+
+        if consulta_vector is None or not np.any(consulta_vector):
+            elegidas = filas[:k]
+        else:
+            puntajes = np.asarray(self.vectores[filas]) @ consulta_vector
+            # Orden estable: empates conservan el orden del knowledge base
+            elegidas = filas[np.argsort(-puntajes, kind="stable")[:k]]
+
+        return [self.pasajes[fila]["texto"] for fila in elegidas]
+
+
+# Instancia
+indice_kb = IndiceKB()
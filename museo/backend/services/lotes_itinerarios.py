@@ -0,0 +1,198 @@
+# services/lotes_itinerarios.py
+# 🔥 Itinerarios en lote para grupos escolares y operadores turísticos
+# Una sola transacción para N visitantes:
+#   - visitantes, perfiles y áreas se leen con una consulta cada uno
+#   - las solicitudes con la misma (intereses, tiempo, nivel, descansos,
+#     áreas a evitar) forman un grupo: la estructura se planifica una vez
+#     por grupo con el planificador local (sin IA)
+#   - itinerarios y detalles entran con un INSERT multi-fila cada uno
+#   - un único trabajo 'lote' en la cola genera el contenido de cada área
+#     una vez por grupo y lo copia a todos sus miembros
+# El router valida horarios y visitantes; aquí no se lanza HTTPException.
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from models import Area, Itinerario, ItinerarioDetalle, Perfil, Visitante
+from schemas import SolicitudItinerario
+from services.cache_contenido import MARCADOR_VISITANTE, cache_contenido
+from services.cola_generacion import cola_generacion
+from services.ia_service import ia_service
+from services.persistencia_itinerarios import persistencia_itinerarios
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_AREA = (
+    "id", "codigo", "nombre", "descripcion", "categoria", "subcategoria",
+    "tiempo_minimo", "tiempo_maximo", "piso", "zona", "orden_recomendado"
+)
+
+AREA_GENERANDO = {
+    "introduccion": "⏳ Generando contenido detallado...",
+    "historia_contextual": None,
+    "datos_curiosos": [],
+    "que_observar": [],
+    "recomendacion": None,
+    "generando": True
+}
+
+
+def clave_grupo(solicitud: SolicitudItinerario, tiempo_final: Optional[int]) -> Tuple:
+    """Solicitudes con la misma clave reciben la misma estructura y contenido"""
+    return (
+        tuple(sorted(set(solicitud.intereses))),
+        tiempo_final,
+        solicitud.nivel_detalle.value,
+        solicitud.incluir_descansos,
+        tuple(sorted(set(solicitud.areas_evitar or []))),
+    )
+
+
+def nombre_completo(visitante: Visitante) -> str:
+    return f"{visitante.nombre} {visitante.apellido or ''}".strip()
+
+
+class GeneradorLotes:
+
+    def _areas_del_grupo(self, areas: List[Dict[str, Any]], clave: Tuple) -> List[Dict[str, Any]]:
+        """Mismo filtro que /itinerarios/generar, sobre las áreas ya cargadas"""
+        intereses, tiempo, _, _, evitar = clave
+        elegidas = areas
+        if tiempo is not None and intereses:
+            elegidas = [a for a in elegidas if a["categoria"] in intereses]
+        if evitar:
+            elegidas = [a for a in elegidas if a["id"] not in evitar]
+        return elegidas
+
+    def crear(
+        self,
+        db: Session,
+        solicitudes: List[SolicitudItinerario],
+        visitantes: Dict[int, Visitante],
+        tiempos: Dict[Optional[int], Optional[int]]
+    ) -> Dict[str, Any]:
+        """
+        Crea itinerarios, detalles y el trabajo del lote en la sesión y hace
+        commit. `tiempos` mapea el tiempo solicitado al ajustado por horario.
+        Lanza LookupError si algún grupo no tiene áreas disponibles.
+        """
+        # 1. Perfiles (los que faltan, en bloque)
+        ids = [s.visitante_id for s in solicitudes]
+        perfiles = {p.visitante_id: p for p in db.query(Perfil).filter(Perfil.visitante_id.in_(ids)).all()}
+        nuevos = [
+            Perfil(
+                visitante_id=s.visitante_id,
+                intereses=s.intereses,
+                tiempo_disponible=tiempos[s.tiempo_disponible],
+                nivel_detalle=s.nivel_detalle.value,
+                incluir_descansos=s.incluir_descansos
+            )
+            for s in solicitudes if s.visitante_id not in perfiles
+        ]
+        if nuevos:
+            db.add_all(nuevos)
+            db.flush()
+            perfiles.update({p.visitante_id: p for p in nuevos})
+
+        # 2. Áreas activas (una consulta para todo el lote)
+        areas = [
+            {campo: getattr(area, campo) for campo in CAMPOS_AREA}
+            for area in db.query(Area).filter(Area.activa == True).order_by(Area.orden_recomendado).all()
+        ]
+        mapa_areas = {a["codigo"]: a["id"] for a in areas}
+
+        # 3. Agrupar y planificar una estructura por grupo
+        grupos: Dict[Tuple, Dict[str, Any]] = {}
+        for solicitud in solicitudes:
+            clave = clave_grupo(solicitud, tiempos[solicitud.tiempo_disponible])
+            if clave not in grupos:
+                disponibles = self._areas_del_grupo(areas, clave)
+                if not disponibles:
+                    raise LookupError(f"No hay áreas disponibles para los intereses {list(clave[0])}")
+                grupos[clave] = {
+                    "solicitudes": [],
+                    "estructura": ia_service.estructura_local(
+                        MARCADOR_VISITANTE, solicitud.intereses, clave[1], disponibles
+                    ),
+                }
+            grupos[clave]["solicitudes"].append(solicitud)
+
+        logger.info("👥 Lote de %s solicitudes → %s grupos distintos", len(solicitudes), len(grupos))
+
+        # 4. Itinerarios (INSERT multi-fila con RETURNING al hacer flush)
+        itinerarios: List[Itinerario] = []
+        pendientes: List[Tuple[Itinerario, Tuple, str]] = []
+        for clave, grupo in grupos.items():
+            for solicitud in grupo["solicitudes"]:
+                nombre = nombre_completo(visitantes[solicitud.visitante_id])
+                estructura = cache_contenido.personalizar(
+                    {k: grupo["estructura"][k] for k in ("titulo", "descripcion")}, nombre
+                )
+                itinerario = Itinerario(
+                    perfil_id=perfiles[solicitud.visitante_id].id,
+                    titulo=estructura["titulo"],
+                    descripcion=estructura["descripcion"],
+                    duracion_total=grupo["estructura"].get("duracion_total", 60),
+                    estado='generado',
+                    modelo_ia_usado=ia_service.model,
+                    prompt_usado="Itinerario en lote",
+                    tipo_entrada=solicitud.tipo_entrada,
+                    acompañantes=solicitud.acompañantes,
+                )
+                itinerarios.append(itinerario)
+                pendientes.append((itinerario, clave, nombre))
+        db.add_all(itinerarios)
+        db.flush()
+
+        # 5. Detalles de todos los itinerarios en un solo INSERT
+        filas = []
+        miembros: Dict[Tuple, List[Dict[str, Any]]] = {clave: [] for clave in grupos}
+        for itinerario, clave, nombre in pendientes:
+            areas_estructura = [{**a, **AREA_GENERANDO} for a in grupos[clave]["estructura"]["areas"]]
+            filas.extend(persistencia_itinerarios.filas_detalles(itinerario.id, areas_estructura, mapa_areas))
+            miembros[clave].append({"itinerario_id": itinerario.id, "visitante_nombre": nombre})
+        if filas:
+            db.execute(insert(ItinerarioDetalle).values(filas))
+
+        # 6. Un solo trabajo para todo el lote
+        payload_grupos = [
+            {
+                "intereses": list(clave[0]),
+                "nivel_detalle": clave[2],
+                "miembros": miembros[clave],
+                "areas_pendientes": [
+                    {"area_codigo": a["area_codigo"], "orden": a["orden"], "tiempo_sugerido": a.get("tiempo_sugerido")}
+                    for a in grupo["estructura"]["areas"]
+                ],
+            }
+            for clave, grupo in grupos.items()
+        ]
+        trabajo = cola_generacion.encolar_lote(db, [i.id for i in itinerarios], payload_grupos, areas)
+
+        db.commit()
+
+        # Recargar todos (fechas del servidor) en una consulta, en el orden de la solicitud
+        ids_itinerarios = [i.id for i in itinerarios]
+        recargados = {
+            i.id: i for i in
+            db.query(Itinerario).filter(Itinerario.id.in_(ids_itinerarios)).populate_existing().all()
+        }
+        por_visitante = {p.id: v for v, p in perfiles.items()}
+        orden = {visitante_id: posicion for posicion, visitante_id in enumerate(ids)}
+
+        return {
+            "trabajo_id": trabajo.id,
+            "total_itinerarios": len(itinerarios),
+            "grupos_distintos": len(grupos),
+            "itinerarios": sorted(
+                (recargados[i] for i in ids_itinerarios),
+                key=lambda i: orden[por_visitante[i.perfil_id]]
+            ),
+        }
+
+
+# Instancia
+generador_lotes = GeneradorLotes()
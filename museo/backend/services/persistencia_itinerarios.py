@@ -0,0 +1,110 @@
+# services/persistencia_itinerarios.py
+# 🔥 Guardado en bloque de los detalles de un itinerario generado
+# - Las áreas se resuelven con un mapa código → id ya en memoria (sin una
+#   consulta por área).
+# - Todos los detalles entran con un único INSERT ... VALUES (...), (...).
+# - No hace commit: el router confirma itinerario + detalles + trabajo de la
+#   cola en una sola transacción.
+# - marcar_fallido: cierra el itinerario 'en_proceso' si la generación falla.
+
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, selectinload
+
+from models import Itinerario, ItinerarioDetalle
+
+logger = logging.getLogger(__name__)
+
+
+def _campo_json(valor: Any) -> Any:
+    """Algunos modelos devuelven las listas como texto JSON"""
+    if isinstance(valor, str):
+        try:
+            return json.loads(valor)
+        except ValueError:
+            return None
+    return valor
+
+
+class PersistenciaItinerarios:
+    """Escritura y lectura en bloque de itinerarios generados"""
+
+    def filas_detalles(
+        self,
+        itinerario_id: int,
+        areas_generadas: List[Dict[str, Any]],
+        mapa_areas: Dict[str, int]
+    ) -> List[Dict[str, Any]]:
+        """Filas de itinerario_detalles para las áreas de la estructura (omite códigos desconocidos)"""
+        filas = []
+        for area_data in areas_generadas:
+            area_id = mapa_areas.get(area_data.get('area_codigo'))
+            if area_id is None:
+                logger.warning("⚠️ Área %s no encontrada, omitiendo...", area_data.get('area_codigo'))
+                continue
+
+            filas.append({
+                "itinerario_id": itinerario_id,
+                "area_id": area_id,
+                "orden": area_data['orden'],
+                "tiempo_sugerido": area_data.get('tiempo_sugerido') or 20,
+                "introduccion": area_data.get('introduccion'),
+                "recomendacion": area_data.get('recomendacion'),
+                "historia_contextual": area_data.get('historia_contextual'),
+                "datos_curiosos": _campo_json(area_data.get('datos_curiosos')) or [],
+                "que_observar": _campo_json(area_data.get('que_observar')) or [],
+                "puntos_clave": area_data.get('puntos_clave') or [],
+                "visitado": False,
+                "skip": False,
+            })
+        return filas
+
+    def insertar_detalles(
+        self,
+        db: Session,
+        itinerario_id: int,
+        areas_generadas: List[Dict[str, Any]],
+        mapa_areas: Dict[str, int]
+    ) -> int:
+        """Inserta todos los detalles en una sola sentencia dentro de la transacción actual"""
+        filas = self.filas_detalles(itinerario_id, areas_generadas, mapa_areas)
+        if filas:
+            db.execute(insert(ItinerarioDetalle).values(filas))
+        return len(filas)
+
+    def cargar_itinerario_completo(self, db: Session, itinerario_id: int) -> Optional[Itinerario]:
+        """Itinerario con detalles y áreas ya cargados (para responder ItinerarioCompleto)"""
+        return (
+            db.query(Itinerario)
+            .options(selectinload(Itinerario.detalles).joinedload(ItinerarioDetalle.area))
+            .populate_existing()
+            .filter(Itinerario.id == itinerario_id)
+            .first()
+        )
+
+    def marcar_fallido(self, db: Session, itinerario_id: int, detalle: str):
+        """
+        Pasar a 'cancelado' (el estado terminal que admite la tabla) un itinerario
+        que sigue 'en_proceso' porque su generación falló; si no, quedaría así
+        para siempre. Confirma con su propio commit (llamar después del rollback)
+        y no lanza: se usa dentro del manejo de errores de los routers.
+        """
+        try:
+            db.query(Itinerario).filter(
+                Itinerario.id == itinerario_id,
+                Itinerario.estado == 'en_proceso'
+            ).update({
+                "estado": 'cancelado',
+                "descripcion": f"❌ No se pudo generar el itinerario: {detalle}"
+            }, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error("❌ No se pudo marcar el itinerario %s como fallido: %s", itinerario_id, e)
+
+
+# Instancia
+persistencia_itinerarios = PersistenciaItinerarios()
@@ -0,0 +1,165 @@
+# services/planificador_itinerario.py
+# 🔥 Planificador local (determinístico) de la estructura del itinerario
+# Reemplaza la llamada a la IA de _generar_estructura_base cuando hay límite de tiempo.
+#
+# Problema: elegir 3-5 áreas y su tiempo (entre tiempo_minimo y tiempo_maximo)
+# sin pasar el presupuesto, maximizando la cobertura de intereses y
+# minimizando la caminata entre pisos y zonas.
+# Con las pocas áreas del museo se enumeran todos los subconjuntos: es exacto
+# y tarda microsegundos.
+
+import logging
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MIN_AREAS = 3
+MAX_AREAS = 5
+MAX_AREAS_ENUMERACION = 16  # Sobre esto se preseleccionan las más relevantes
+
+COSTO_CAMBIO_PISO = 3  # Por piso subido o bajado
+COSTO_CAMBIO_ZONA = 1
+
+
+class PlanificadorItinerario:
+
+    # ============================================
+    # MÉTRICAS
+    # ============================================
+
+    @staticmethod
+    def _tiempo_min(area: Dict[str, Any]) -> int:
+        return area.get('tiempo_minimo') or 10
+
+    @staticmethod
+    def _tiempo_max(area: Dict[str, Any]) -> int:
+        return max(area.get('tiempo_maximo') or 25, PlanificadorItinerario._tiempo_min(area))
+
+    @staticmethod
+    def _piso(area: Dict[str, Any]) -> int:
+        return area.get('piso') if area.get('piso') is not None else 1
+
+    @staticmethod
+    def _clave_recorrido(area: Dict[str, Any]) -> Tuple:
+        """Orden de visita: por piso, luego zona, luego orden recomendado"""
+        return (
+            PlanificadorItinerario._piso(area),
+            area.get('zona') or "",
+            area.get('orden_recomendado') if area.get('orden_recomendado') is not None else 999,
+            area.get('codigo') or ""
+        )
+
+    def costo_caminata(self, recorrido: List[Dict[str, Any]]) -> int:
+        costo = 0
+        for anterior, siguiente in zip(recorrido, recorrido[1:]):
+            costo += abs(self._piso(siguiente) - self._piso(anterior)) * COSTO_CAMBIO_PISO
+            if (siguiente.get('zona') or "") != (anterior.get('zona') or ""):
+                costo += COSTO_CAMBIO_ZONA
+        return costo
+
+    def _puntaje(self, subconjunto, intereses: set, presupuesto: int) -> Tuple:
+        categorias = {(a.get('categoria') or "").lower() for a in subconjunto}
+        cobertura = len(categorias & intereses)
+        coincidencias = sum(1 for a in subconjunto if (a.get('categoria') or "").lower() in intereses)
+        tiempo_usado = min(sum(self._tiempo_max(a) for a in subconjunto), presupuesto)
+        recorrido = sorted(subconjunto, key=self._clave_recorrido)
+        orden_total = sum(self._clave_recorrido(a)[2] for a in subconjunto)
+
+        # Tupla lexicográfica: mayor es mejor
+        return (cobertura, coincidencias, tiempo_usado, -self.costo_caminata(recorrido), -orden_total)
+
+    # ============================================
+    # ASIGNACIÓN DE TIEMPOS
+    # ============================================
+
+    def _asignar_tiempos(self, recorrido, intereses: set, presupuesto: int) -> List[int]:
+        """
+        Parte del mínimo de cada área y reparte el sobrante, primero a las
+        áreas de interés, sin superar el máximo de cada una.
+        """
+        tiempos = [self._tiempo_min(a) for a in recorrido]
+        sobrante = presupuesto - sum(tiempos)
+
+        prioridad = sorted(
+            range(len(recorrido)),
+            key=lambda i: ((recorrido[i].get('categoria') or "").lower() not in intereses, i)
+        )
+        for i in prioridad:
+            if sobrante <= 0:
+                break
+            extra = min(self._tiempo_max(recorrido[i]) - tiempos[i], sobrante)
+            tiempos[i] += extra
+            sobrante -= extra
+
+        return tiempos
+
+    # ============================================
+    # PLANIFICAR
+    # ============================================
+
+    def planificar(
+        self,
+        areas_disponibles: List[Dict[str, Any]],
+        intereses: Optional[List[str]],
+        tiempo_disponible: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Retorna {"areas": [...], "duracion_total": N} o None si no hay áreas.
+        Cada área: {"area_codigo", "orden", "tiempo_sugerido"}.
+        """
+        if not areas_disponibles:
+            return None
+
+        intereses_set = {i.strip().lower() for i in (intereses or []) if i}
+        candidatas = list(areas_disponibles)
+
+        if len(candidatas) > MAX_AREAS_ENUMERACION:
+            candidatas = sorted(
+                candidatas,
+                key=lambda a: ((a.get('categoria') or "").lower() not in intereses_set, self._clave_recorrido(a)[2])
+            )[:MAX_AREAS_ENUMERACION]
+
+        mejor, mejor_puntaje = None, None
+        max_k = min(MAX_AREAS, len(candidatas))
+        min_k = min(MIN_AREAS, max_k)
+
+        # Se prueba 3-5 áreas; si el tiempo no alcanza, se baja hasta 1
+        for limite_inferior in range(min_k, 0, -1):
+            for k in range(limite_inferior, max_k + 1):
+                for subconjunto in combinations(candidatas, k):
+                    if sum(self._tiempo_min(a) for a in subconjunto) > tiempo_disponible:
+                        continue
+                    puntaje = self._puntaje(subconjunto, intereses_set, tiempo_disponible)
+                    if mejor_puntaje is None or puntaje > mejor_puntaje:
+                        mejor, mejor_puntaje = subconjunto, puntaje
+            if mejor:
+                break
+
+        if not mejor:
+            # Ni una sola área cabe en su tiempo mínimo: la más corta, recortada
+            area = min(candidatas, key=self._tiempo_min)
+            return {
+                "areas": [{"area_codigo": area['codigo'], "orden": 1, "tiempo_sugerido": tiempo_disponible}],
+                "duracion_total": tiempo_disponible
+            }
+
+        recorrido = sorted(mejor, key=self._clave_recorrido)
+        tiempos = self._asignar_tiempos(recorrido, intereses_set, tiempo_disponible)
+
+        logger.info(
+            "🧭 Planificador local: %s áreas, %s/%s min, caminata=%s",
+            len(recorrido), sum(tiempos), tiempo_disponible, self.costo_caminata(recorrido)
+        )
+
+        return {
+            "areas": [
+                {"area_codigo": area['codigo'], "orden": i, "tiempo_sugerido": tiempo}
+                for i, (area, tiempo) in enumerate(zip(recorrido, tiempos), 1)
+            ],
+            "duracion_total": sum(tiempos)
+        }
+
+
+# Instancia
+planificador_itinerario = PlanificadorItinerario()
@@ -0,0 +1,278 @@
+# services/plantillas_itinerario.py
+# 🔥 Plantillas de itinerario precalculadas (tabla plantillas_itinerario)
+# - precalcular(): toma las K combinaciones (intereses, tiempo, nivel) más
+#   frecuentes en perfiles/itinerarios y genera para cada una el itinerario
+#   completo: estructura + contenido de todas las áreas. Lo corre
+#   precalcular_plantillas.py fuera de línea (cron, después de cambiar el KB).
+# - obtener(): /itinerarios/generar busca la plantilla por clave con un solo
+#   UPDATE ... RETURNING (lectura + contador de usos).
+# - personalizar(): copia con el nombre del visitante. Las plantillas se
+#   generan con el marcador {{visitante}}; solo si la IA no lo usó en la
+#   bienvenida se le pide un saludo corto (PLANTILLAS_SALUDO_IA).
+#
+# La clave incluye las áreas elegibles y la versión del KB: al cambiar un
+# área o el knowledge base la plantilla vieja deja de coincidir.
+
+import asyncio
+import hashlib
+import json
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from config import get_settings
+from models import Area, Itinerario, Perfil, PlantillaItinerario
+from services.almacen_kb import almacen_kb
+from services.cache_contenido import MARCADOR_VISITANTE, cache_contenido
+from services.ia_service import ia_service
+from services.lotes_itinerarios import CAMPOS_AREA
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+FUENTES_VALIDAS = ("knowledge_base", "generativo")  # Sin fallback ni respaldo en una plantilla
+
+
+def tiempo_estandar(duracion: Optional[int]) -> Optional[int]:
+    """Presupuesto estándar más chico que cubre la duración (None = sin límite)"""
+    if duracion is None:
+        return None
+    for tiempo in sorted(settings.PLANTILLAS_TIEMPOS):
+        if duracion <= tiempo:
+            return tiempo
+    return None
+
+
+def filtrar_areas(areas: List[Dict[str, Any]], intereses: List[str], tiempo: Optional[int]) -> List[Dict[str, Any]]:
+    """Mismo criterio que /itinerarios/generar (sin áreas a evitar)"""
+    if tiempo is not None and intereses:
+        return [a for a in areas if a["categoria"] in intereses]
+    return areas
+
+
+class PlantillasItinerario:
+
+    # ============================================
+    # CLAVE
+    # ============================================
+
+    def clave(self, intereses: List[str], tiempo: Optional[int], nivel: str,
+              areas_disponibles: List[Dict[str, Any]], version_kb: str) -> str:
+        firma_areas = [
+            (a["codigo"], a.get("tiempo_minimo"), a.get("tiempo_maximo"), a.get("piso"), a.get("zona"))
+            for a in areas_disponibles
+        ]
+        base = json.dumps(
+            [cache_contenido.normalizar_intereses(intereses), tiempo, nivel, firma_areas, version_kb],
+            ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+    # ============================================
+    # SERVIR (dentro de la transacción del request)
+    # ============================================
+
+    def obtener(self, db: Session, clave: str) -> Optional[Dict[str, Any]]:
+        """
+        Contenido de la plantilla (o None). No hace commit: va con el del
+        itinerario. El savepoint evita que un error (p. ej. migración 009 sin
+        aplicar) deje abortada la transacción del request.
+        """
+        tabla = PlantillaItinerario.__table__
+        try:
+            with db.begin_nested():
+                return db.execute(
+                    tabla.update()
+                    .where(tabla.c.clave == clave)
+                    .values(usos=tabla.c.usos + 1, ultimo_uso=func.now())
+                    .returning(tabla.c.contenido)
+                ).scalar()
+        except Exception as e:
+            logger.warning("⚠️ Plantillas no disponibles: %s", e)
+            return None
+
+    async def personalizar(
+        self, contenido: Dict[str, Any], visitante_nombre: str, intereses: List[str], nivel_detalle: str
+    ) -> Dict[str, Any]:
+        """Resultado con la forma de generar_itinerario_progresivo, todo el contenido listo"""
+        inicio = datetime.now()
+        resultado = cache_contenido.personalizar(contenido, visitante_nombre)
+        areas = resultado["areas"]
+
+        saludo_ia = False
+        if areas and MARCADOR_VISITANTE not in (contenido["areas"][0].get("introduccion") or "") \
+                and settings.PLANTILLAS_SALUDO_IA:
+            saludo = await self._saludo(visitante_nombre, intereses, areas[0])
+            if saludo:
+                areas[0]["introduccion"] = f"{saludo} {areas[0].get('introduccion') or ''}".strip()
+                saludo_ia = True
+
+        for area in areas:
+            area["generando"] = False
+
+        fin = datetime.now()
+        return {
+            **resultado,
+            "metadata": {
+                "modelo": ia_service.model,
+                "provider": ia_service.provider,
+                "temperature": 0.2,
+                "nivel_detalle": nivel_detalle,
+                "tiempo_primera_area": f"{(fin - inicio).total_seconds():.2f}s",
+                "timestamp": fin.isoformat(),
+                "modo": "plantilla",
+                "saludo_ia": saludo_ia,
+                "areas_kb": len(almacen_kb.actual()),
+            }
+        }
+
+    async def _saludo(self, visitante_nombre: str, intereses: List[str], primera_area: Dict[str, Any]) -> Optional[str]:
+        """Bienvenida breve con el nombre del visitante (única llamada a la IA)"""
+        prompt = (
+            "Escribe una bienvenida de 1-2 oraciones al Museo Pumapungo.\n"
+            f"VISITANTE: {visitante_nombre}\n"
+            f"INTERESES: {', '.join(intereses) if intereses else 'generales'}\n"
+            f"PRIMERA ÁREA: {primera_area.get('area_codigo')}\n\n"
+            'JSON:\n{"saludo": "texto"}'
+        )
+        try:
+            respuesta = await ia_service._llamar_ia(prompt, max_tokens=120, temperature=0.4, tipo="saludo")
+            return (ia_service._extraer_json(respuesta).get("saludo") or "").strip() or None
+        except Exception as e:
+            logger.warning("⚠️ Saludo con IA no disponible, se usa la plantilla tal cual: %s", e)
+            return None
+
+    # ============================================
+    # PRECÁLCULO (fuera de línea)
+    # ============================================
+
+    def combinaciones_frecuentes(self, db: Session, top_k: int) -> List[Dict[str, Any]]:
+        """Las top_k combinaciones (intereses, tiempo estándar, nivel) de los itinerarios generados"""
+        filas = (
+            db.query(Perfil.intereses, Perfil.nivel_detalle, Itinerario.duracion_total, func.count(Itinerario.id))
+            .join(Itinerario, Itinerario.perfil_id == Perfil.id)
+            .group_by(Perfil.intereses, Perfil.nivel_detalle, Itinerario.duracion_total)
+            .all()
+        )
+
+        conteo: Counter = Counter()
+        originales: Dict[tuple, List[str]] = {}
+        for intereses, nivel, duracion, cantidad in filas:
+            normalizados = tuple(cache_contenido.normalizar_intereses(intereses))
+            clave = (normalizados, tiempo_estandar(duracion), nivel or "normal")
+            conteo[clave] += cantidad
+            originales.setdefault(clave, sorted(set(intereses or [])))
+
+        return [
+            {"intereses": originales[clave], "tiempo": clave[1], "nivel_detalle": clave[2], "frecuencia": frecuencia}
+            for clave, frecuencia in conteo.most_common(top_k)
+        ]
+
+    async def construir(
+        self, intereses: List[str], tiempo: Optional[int], nivel: str, areas_activas: List[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """Itinerario completo con el marcador como nombre; None si alguna área no se pudo generar"""
+        disponibles = filtrar_areas(areas_activas, intereses, tiempo)
+        if not disponibles:
+            return None
+
+        estructura = ia_service.estructura_local(MARCADOR_VISITANTE, intereses, tiempo, disponibles)
+        areas = await asyncio.gather(*[
+            ia_service._generar_area_individual_hibrida(
+                area, disponibles, MARCADOR_VISITANTE, intereses, nivel, es_primera=(i == 0)
+            )
+            for i, area in enumerate(estructura["areas"])
+        ])
+
+        if any(area.get("_fuente") not in FUENTES_VALIDAS for area in areas):
+            return None
+
+        return {
+            "titulo": estructura["titulo"],
+            "descripcion": estructura["descripcion"],
+            "duracion_total": estructura.get("duracion_total"),
+            "areas": [{k: v for k, v in area.items() if not k.startswith("_")} for area in areas],
+        }
+
+    async def precalcular(self, top_k: Optional[int] = None, forzar: bool = False) -> Dict[str, int]:
+        """Genera las plantillas de las combinaciones más frecuentes (corre fuera de la API)"""
+        from database import SessionLocal
+
+        top_k = top_k or settings.PLANTILLAS_TOP_K
+        version_kb = almacen_kb.actual().version
+
+        with SessionLocal() as db:
+            combinaciones = self.combinaciones_frecuentes(db, top_k)
+            areas_activas = [
+                {campo: getattr(area, campo) for campo in CAMPOS_AREA}
+                for area in db.query(Area).filter(Area.activa == True).order_by(Area.orden_recomendado).all()
+            ]
+            existentes = {clave for (clave,) in db.query(PlantillaItinerario.clave).all()}
+
+        resumen = {"combinaciones": len(combinaciones), "generadas": 0, "existentes": 0, "fallidas": 0}
+        for combinacion in combinaciones:
+            intereses, tiempo, nivel = combinacion["intereses"], combinacion["tiempo"], combinacion["nivel_detalle"]
+            clave = self.clave(intereses, tiempo, nivel, filtrar_areas(areas_activas, intereses, tiempo), version_kb)
+            etiqueta = f"{intereses} / {tiempo or 'sin límite'} / {nivel}"
+
+            if clave in existentes and not forzar:
+                resumen["existentes"] += 1
+                continue
+
+            contenido = await self.construir(intereses, tiempo, nivel, areas_activas)
+            if contenido is None:
+                logger.warning("⚠️ Plantilla %s sin generar (áreas o IA no disponibles)", etiqueta)
+                resumen["fallidas"] += 1
+                continue
+
+            await asyncio.to_thread(
+                self.guardar, clave, intereses, tiempo, nivel, version_kb, contenido, combinacion["frecuencia"]
+            )
+            resumen["generadas"] += 1
+            logger.info("🧩 Plantilla %s: %s áreas (frecuencia %s)", etiqueta, len(contenido['areas']), combinacion['frecuencia'])
+
+        return resumen
+
+    def guardar(self, clave: str, intereses: List[str], tiempo: Optional[int], nivel: str,
+                version_kb: str, contenido: Dict[str, Any], frecuencia: int):
+        from database import SessionLocal
+
+        with SessionLocal() as db:
+            stmt = insert(PlantillaItinerario).values(
+                clave=clave,
+                intereses=intereses,
+                tiempo_disponible=tiempo,
+                nivel_detalle=nivel,
+                version_kb=version_kb,
+                contenido=contenido,
+                frecuencia=frecuencia
+            )
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[PlantillaItinerario.clave],
+                set_={
+                    "contenido": stmt.excluded.contenido,
+                    "frecuencia": stmt.excluded.frecuencia,
+                    "fecha_creacion": func.now()
+                }
+            ))
+            db.commit()
+
+    def purgar_obsoletas(self) -> int:
+        """Borrar plantillas de otras versiones del knowledge base"""
+        from database import SessionLocal
+
+        with SessionLocal() as db:
+            eliminadas = db.query(PlantillaItinerario).filter(
+                PlantillaItinerario.version_kb != almacen_kb.actual().version
+            ).delete(synchronize_session=False)
+            db.commit()
+        return eliminadas
+
+
+# Instancia
+plantillas_itinerario = PlantillasItinerario()
@@ -0,0 +1,113 @@
+# services/programador_generacion.py
+# 🔥 Programador de generación con concurrencia acotada por proveedor de IA
+# Limita llamadas simultáneas (semáforo) y respeta el rate limit (requests/minuto)
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List
+
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class LimitadorProveedor:
+    """
+    Controla el acceso a un proveedor de IA:
+    - max_paralelo: llamadas en vuelo al mismo tiempo
+    - max_por_minuto: inicios de llamada por minuto (0 = sin límite)
+    """
+
+    def __init__(self, nombre: str, max_paralelo: int, max_por_minuto: int = 0):
+        self.nombre = nombre
+        self.max_paralelo = max(1, max_paralelo)
+        self.intervalo_minimo = 60.0 / max_por_minuto if max_por_minuto > 0 else 0.0
+        self._semaforo = asyncio.Semaphore(self.max_paralelo)
+        self._lock_tasa = asyncio.Lock()
+        self._proximo_inicio = 0.0
+        self.en_vuelo = 0
+
+    async def _esperar_turno(self):
+        """Espaciar los inicios de llamada según el rate limit"""
+        if not self.intervalo_minimo:
+            return
+
+        async with self._lock_tasa:
+            ahora = time.monotonic()
+            espera = self._proximo_inicio - ahora
+            self._proximo_inicio = max(ahora, self._proximo_inicio) + self.intervalo_minimo
+
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+    async def __aenter__(self):
+        await self._semaforo.acquire()
+        try:
+            await self._esperar_turno()
+        except BaseException:
+            self._semaforo.release()
+            raise
+        self.en_vuelo += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.en_vuelo -= 1
+        self._semaforo.release()
+        return False
+
+
+class ProgramadorGeneracion:
+    """
+    Reparte el trabajo de generación respetando los límites de cada proveedor.
+    Un limitador por proveedor, compartido por todas las tareas del proceso.
+    """
+
+    def __init__(self):
+        self._limitadores: Dict[str, LimitadorProveedor] = {}
+
+    def limitador(self, proveedor: str) -> LimitadorProveedor:
+        proveedor = proveedor.lower()
+
+        if proveedor not in self._limitadores:
+            max_paralelo = getattr(settings, f"AI_MAX_PARALELO_{proveedor.upper()}", settings.AI_MAX_PARALELO)
+            max_por_minuto = getattr(settings, f"AI_MAX_REQUESTS_POR_MINUTO_{proveedor.upper()}", 0)
+            self._limitadores[proveedor] = LimitadorProveedor(proveedor, max_paralelo, max_por_minuto)
+            logger.info("🚦 Limitador %s: %s en paralelo, %s req/min", proveedor, max_paralelo, max_por_minuto or '∞')
+
+        return self._limitadores[proveedor]
+
+    async def ejecutar_todas(
+        self,
+        trabajos: Iterable[Callable[[], Awaitable[Any]]],
+        al_completar: Callable[[Any], Awaitable[None]]
+    ) -> List[Any]:
+        """
+        Lanza todos los trabajos a la vez y llama `al_completar` con cada
+        resultado en cuanto termina (sin esperar al resto).
+        La concurrencia real la acota el limitador dentro de cada llamada a la IA.
+        Los errores de un trabajo se registran sin detener al resto: quien
+        llama verifica después qué quedó guardado.
+        """
+        tareas = [asyncio.ensure_future(trabajo()) for trabajo in trabajos]
+        resultados = []
+
+        for siguiente in asyncio.as_completed(tareas):
+            try:
+                resultado = await siguiente
+            except Exception as e:
+                logger.error("❌ Trabajo de generación falló: %s", e)
+                continue
+
+            resultados.append(resultado)
+            try:
+                await al_completar(resultado)
+            except Exception as e:
+                logger.error("❌ Error procesando resultado: %s", e)
+
+        return resultados
+
+
+# Instancia
+programador_generacion = ProgramadorGeneracion()
@@ -0,0 +1,300 @@
+# services/proveedores_ia.py
+# 🔥 Capa asíncrona de proveedores de IA (Ollama + DeepSeek)
+# Cada proveedor mantiene un httpx.AsyncClient con pool de conexiones keep-alive
+
+import httpx
+import json
+import logging
+from typing import AsyncIterator, Dict, Any, Optional
+
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "Eres un guía experto del Museo Pumapungo en Cuenca, Ecuador. "
+    "Responde SOLO en JSON válido, sin texto adicional, sin markdown, sin ```json."
+)
+
+
+class ProveedorIA:
+    """
+    Proveedor base: un cliente HTTP asíncrono reutilizable por proveedor.
+    El cliente se crea de forma perezosa (dentro del event loop que lo usa)
+    y conserva las conexiones abiertas entre llamadas.
+    """
+
+    nombre = "base"
+
+    def __init__(self, base_url: str, model: str, timeout: float, temperature: float):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.temperature = temperature
+        self._cliente: Optional[httpx.AsyncClient] = None
+
+    # ============================================
+    # CLIENTE HTTP CON POOL
+    # ============================================
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Content-Type": "application/json"}
+
+    @property
+    def cliente(self) -> httpx.AsyncClient:
+        if self._cliente is None or self._cliente.is_closed:
+            self._cliente = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self._headers(),
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=settings.AI_MAX_CONEXIONES,
+                    max_keepalive_connections=settings.AI_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.AI_KEEPALIVE_EXPIRY
+                )
+            )
+            logger.info("🔌 Pool HTTP creado para %s (%s)", self.nombre, self.base_url)
+        return self._cliente
+
+    async def cerrar(self):
+        if self._cliente is not None and not self._cliente.is_closed:
+            await self._cliente.aclose()
+            logger.info("🔌 Pool HTTP cerrado para %s", self.nombre)
+        self._cliente = None
+
+    # ============================================
+    # INTERFAZ
+    # ============================================
+
+    async def generar(
+        self, prompt: str, max_tokens: int, temperature: float, json_mode: bool,
+        uso: Optional[Dict[str, int]] = None
+    ) -> str:
+        """Texto de la respuesta. Si se pasa `uso`, se completa con prompt_tokens / completion_tokens"""
+        raise NotImplementedError
+
+    def generar_stream(
+        self, prompt: str, max_tokens: int, temperature: float, json_mode: bool,
+        uso: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """Igual que generar(), pero entrega el texto por fragmentos (stream: true)"""
+        raise NotImplementedError
+
+    async def verificar(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class ProveedorDeepSeek(ProveedorIA):
+    """DeepSeek API (compatible con OpenAI)"""
+
+    nombre = "deepseek"
+
+    def __init__(self, api_key: str, base_url: str, model: str, timeout: float, temperature: float):
+        if not api_key:
+            logger.error("❌ DEEPSEEK_API_KEY no configurada!")
+            raise ValueError("DEEPSEEK_API_KEY es requerida cuando AI_PROVIDER=deepseek")
+        self.api_key = api_key
+        super().__init__(base_url, model, timeout, temperature)
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def _payload(self, prompt: str, max_tokens: int, temperature: float, json_mode: bool, stream: bool) -> Dict[str, Any]:
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": stream
+        }
+
+        if stream:
+            # El último evento trae "usage" (con choices vacío)
+            payload["stream_options"] = {"include_usage": True}
+
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+
+        return payload
+
+    @staticmethod
+    def _registrar_uso(uso: Optional[Dict[str, int]], datos: Optional[Dict[str, Any]]):
+        if uso is not None and datos:
+            uso["prompt_tokens"] = int(datos.get("prompt_tokens") or 0)
+            uso["completion_tokens"] = int(datos.get("completion_tokens") or 0)
+            # Parte del prompt servida por el context caching de DeepSeek (prefijo repetido)
+            uso["prompt_cache_hit_tokens"] = int(datos.get("prompt_cache_hit_tokens") or 0)
+
+    async def generar(
+        self, prompt: str, max_tokens: int, temperature: float, json_mode: bool,
+        uso: Optional[Dict[str, int]] = None
+    ) -> str:
+        payload = self._payload(prompt, max_tokens, temperature, json_mode, stream=False)
+
+        try:
+            logger.debug("📡 DeepSeek API: enviando request (%s tokens max)...", max_tokens)
+
+            response = await self.cliente.post("/v1/chat/completions", json=payload)
+            response.raise_for_status()
+            data = response.json()
+
+            texto = data["choices"][0]["message"]["content"]
+            tokens_usados = data.get("usage", {})
+            self._registrar_uso(uso, tokens_usados)
+
+            logger.debug("✅ DeepSeek respondió: %s tokens", tokens_usados.get('total_tokens', '?'))
+            return texto
+
+        except httpx.HTTPStatusError as e:
+            try:
+                error_detail = e.response.json()
+            except Exception:
+                error_detail = e.response.text
+            logger.error("❌ DeepSeek HTTP Error: %s - %s", e.response.status_code, error_detail)
+            raise
+        except Exception as e:
+            logger.error("❌ DeepSeek Error: %s", e)
+            raise
+
+    async def generar_stream(
+        self, prompt: str, max_tokens: int, temperature: float, json_mode: bool,
+        uso: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        payload = self._payload(prompt, max_tokens, temperature, json_mode, stream=True)
+
+        logger.debug("📡 DeepSeek API (stream): enviando request (%s tokens max)...", max_tokens)
+
+        # Respuesta SSE: líneas "data: {...}" y un "data: [DONE]" final
+        async with self.cliente.stream("POST", "/v1/chat/completions", json=payload) as response:
+            response.raise_for_status()
+            async for linea in response.aiter_lines():
+                if not linea.startswith("data:"):
+                    continue
+                datos = linea[5:].strip()
+                if datos == "[DONE]":
+                    break
+                evento = json.loads(datos)
+                self._registrar_uso(uso, evento.get("usage"))
+                opciones = evento.get("choices") or []
+                delta = opciones[0].get("delta", {}) if opciones else {}
+                if delta.get("content"):
+                    yield delta["content"]
+
+    async def verificar(self) -> Dict[str, Any]:
+        response = await self.cliente.post(
+            "/v1/chat/completions",
+            json={
+                "model": self.model,
+                "messages": [{"role": "user", "content": "ping"}],
+                "max_tokens": 5
+            },
+            timeout=10
+        )
+        response.raise_for_status()
+        return {"modelo_disponible": True}
+
+
+class ProveedorOllama(ProveedorIA):
+    """Ollama local"""
+
+    nombre = "ollama"
+
+    def _payload(self, prompt: str, max_tokens: int, temperature: float, json_mode: bool, stream: bool) -> Dict[str, Any]:
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": temperature,
+                "num_predict": max_tokens
+            }
+        }
+
+        if json_mode:
+            payload["format"] = "json"
+
+        return payload
+
+    @staticmethod
+    def _registrar_uso(uso: Optional[Dict[str, int]], datos: Dict[str, Any]):
+        # Ollama informa los tokens en el objeto final (prompt_eval_count / eval_count)
+        if uso is not None and "eval_count" in datos:
+            uso["prompt_tokens"] = int(datos.get("prompt_eval_count") or 0)
+            uso["completion_tokens"] = int(datos.get("eval_count") or 0)
+
+    async def generar(
+        self, prompt: str, max_tokens: int, temperature: float, json_mode: bool,
+        uso: Optional[Dict[str, int]] = None
+    ) -> str:
+        payload = self._payload(prompt, max_tokens, temperature, json_mode, stream=False)
+
+        try:
+            response = await self.cliente.post("/api/generate", json=payload)
+            response.raise_for_status()
+            datos = response.json()
+            self._registrar_uso(uso, datos)
+            return datos.get("response", "")
+
+        except Exception as e:
+            logger.error("❌ Ollama Error: %s", e)
+            raise
+
+    async def generar_stream(
+        self, prompt: str, max_tokens: int, temperature: float, json_mode: bool,
+        uso: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        payload = self._payload(prompt, max_tokens, temperature, json_mode, stream=True)
+
+        # Respuesta NDJSON: un objeto por línea hasta "done": true
+        async with self.cliente.stream("POST", "/api/generate", json=payload) as response:
+            response.raise_for_status()
+            async for linea in response.aiter_lines():
+                if not linea.strip():
+                    continue
+                datos = json.loads(linea)
+                if datos.get("response"):
+                    yield datos["response"]
+                if datos.get("done"):
+                    self._registrar_uso(uso, datos)
+                    break
+
+    async def verificar(self) -> Dict[str, Any]:
+        response = await self.cliente.get("/api/tags", timeout=5)
+        response.raise_for_status()
+
+        modelos = response.json().get("models", [])
+        return {
+            "modelo_disponible": any(self.model in m.get("name", "") for m in modelos)
+        }
+
+
+# ============================================
+# FÁBRICA
+# ============================================
+
+def crear_proveedor(nombre: str) -> ProveedorIA:
+    """Construye el proveedor indicado a partir de la configuración"""
+    nombre = (nombre or "ollama").lower()
+
+    if nombre == "deepseek":
+        return ProveedorDeepSeek(
+            api_key=settings.DEEPSEEK_API_KEY,
+            base_url=settings.DEEPSEEK_BASE_URL,
+            model=settings.DEEPSEEK_MODEL,
+            timeout=settings.AI_TIMEOUT,
+            temperature=settings.AI_TEMPERATURE
+        )
+
+    return ProveedorOllama(
+        base_url=settings.OLLAMA_BASE_URL,
+        model=settings.OLLAMA_MODEL,
+        timeout=settings.OLLAMA_TIMEOUT,
+        temperature=settings.OLLAMA_TEMPERATURE
+    )
@@ -0,0 +1,180 @@
+# services/resiliencia_ia.py
+# 🔥 Circuit breaker y timeouts adaptativos por proveedor de IA
+# Los usa services/enrutador_ia.py en cada intento:
+# - CircuitoProveedor: cerrado → (N fallos seguidos) → abierto → (enfriamiento)
+#   → semiabierto (una llamada de prueba) → cerrado si responde, abierto con
+#   el doble de enfriamiento si vuelve a fallar. Abierto = no se llama: el
+#   enrutador pasa al siguiente proveedor o falla enseguida y ia_service usa
+#   el contenido cacheado o el de respaldo armado con el knowledge base.
+# - TiempoLimiteAdaptativo: el timeout de cada llamada sale de max_tokens y
+#   de los tokens/segundo observados (EWMA), en vez del AI_TIMEOUT fijo: un
+#   prompt de estructura de 500 tokens no espera lo mismo que un área
+#   "profundo" de 3000.
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from config import get_settings
+from utils.metricas import metricas
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CERRADO = "cerrado"
+SEMIABIERTO = "semiabierto"
+ABIERTO = "abierto"
+
+_VALOR_ESTADO = {CERRADO: 0, SEMIABIERTO: 1, ABIERTO: 2}
+
+MIN_TOKENS_MUESTRA = 50  # Respuestas más cortas no dicen nada de la velocidad
+
+
+def cuenta_como_fallo(error: BaseException) -> bool:
+    """Errores del proveedor (caída, timeout, 5xx, 429); un 4xx es culpa de la petición"""
+    if isinstance(error, httpx.HTTPStatusError):
+        codigo = error.response.status_code
+        return codigo >= 500 or codigo == 429
+    return True
+
+
+# ============================================
+# CIRCUIT BREAKER
+# ============================================
+
+class CircuitoProveedor:
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.estado = CERRADO
+        self.fallos_seguidos = 0
+        self.enfriamiento = settings.AI_CIRCUITO_ENFRIAMIENTO_SEGUNDOS
+        self.abierto_hasta = 0.0
+        self._pruebas_en_vuelo = 0
+        self._lock = threading.Lock()
+
+    def permitir(self) -> bool:
+        """¿Se puede llamar ahora? En semiabierto reserva el turno de prueba"""
+        with self._lock:
+            if self.estado == CERRADO:
+                return True
+            if self.estado == ABIERTO:
+                if time.monotonic() < self.abierto_hasta:
+                    return False
+                self.estado = SEMIABIERTO
+                logger.info("🟡 Circuito %s: semiabierto (llamada de prueba)", self.nombre)
+            if self._pruebas_en_vuelo >= settings.AI_CIRCUITO_PRUEBAS:
+                return False
+            self._pruebas_en_vuelo += 1
+            return True
+
+    def disponible(self) -> bool:
+        """Como permitir() pero sin reservar nada (para ordenar candidatos)"""
+        with self._lock:
+            return self.estado != ABIERTO or time.monotonic() >= self.abierto_hasta
+
+    def exito(self):
+        with self._lock:
+            if self.estado != CERRADO:
+                logger.info("🟢 Circuito %s: cerrado", self.nombre)
+            self.estado = CERRADO
+            self.fallos_seguidos = 0
+            self.enfriamiento = settings.AI_CIRCUITO_ENFRIAMIENTO_SEGUNDOS
+            self._pruebas_en_vuelo = 0
+
+    def fallo(self):
+        with self._lock:
+            if self.estado == SEMIABIERTO:
+                # La prueba falló: volver a abrir con enfriamiento creciente
+                self._pruebas_en_vuelo = max(0, self._pruebas_en_vuelo - 1)
+                self.enfriamiento = min(self.enfriamiento * 2, settings.AI_CIRCUITO_ENFRIAMIENTO_MAX_SEGUNDOS)
+                self._abrir()
+                return
+            self.fallos_seguidos += 1
+            if self.estado == CERRADO and self.fallos_seguidos >= settings.AI_CIRCUITO_FALLOS:
+                self._abrir()
+
+    def liberar(self):
+        """Intento cancelado (p. ej. perdió un hedge): sin resultado, solo libera el turno"""
+        with self._lock:
+            if self.estado == SEMIABIERTO:
+                self._pruebas_en_vuelo = max(0, self._pruebas_en_vuelo - 1)
+
+    def _abrir(self):
+        self.estado = ABIERTO
+        self.abierto_hasta = time.monotonic() + self.enfriamiento
+        logger.warning("🔴 Circuito %s: abierto por %.0fs", self.nombre, self.enfriamiento)
+
+
+# ============================================
+# TIMEOUT ADAPTATIVO
+# ============================================
+
+class TiempoLimiteAdaptativo:
+    """timeout = base + max_tokens / (tokens/s observados) × margen, acotado"""
+
+    def __init__(self, maximo: float):
+        self.maximo = float(maximo)
+        self.tokens_por_segundo: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def registrar(self, tokens: int, duracion: float):
+        if tokens < MIN_TOKENS_MUESTRA or duracion <= 0:
+            return
+        tps = tokens / duracion
+        with self._lock:
+            alfa = settings.AI_EWMA_ALFA
+            self.tokens_por_segundo = tps if self.tokens_por_segundo is None else (
+                (1 - alfa) * self.tokens_por_segundo + alfa * tps
+            )
+
+    def calcular(self, max_tokens: int) -> float:
+        tps = self.tokens_por_segundo or settings.AI_TOKENS_POR_SEGUNDO_INICIAL
+        segundos = settings.AI_TIMEOUT_BASE_SEGUNDOS + max_tokens / tps * settings.AI_TIMEOUT_MARGEN
+        return min(max(segundos, settings.AI_TIMEOUT_MIN_SEGUNDOS), self.maximo)
+
+
+# ============================================
+# REGISTRO POR PROVEEDOR
+# ============================================
+
+class ResilienciaIA:
+
+    def __init__(self):
+        self.circuitos: Dict[str, CircuitoProveedor] = {}
+        self.tiempos: Dict[str, TiempoLimiteAdaptativo] = {}
+
+    def circuito(self, nombre: str) -> CircuitoProveedor:
+        if nombre not in self.circuitos:
+            self.circuitos[nombre] = CircuitoProveedor(nombre)
+        return self.circuitos[nombre]
+
+    def tiempo_limite(self, nombre: str, maximo: float) -> TiempoLimiteAdaptativo:
+        if nombre not in self.tiempos:
+            self.tiempos[nombre] = TiempoLimiteAdaptativo(maximo)
+        return self.tiempos[nombre]
+
+    def estado(self) -> Dict[str, Dict]:
+        return {
+            nombre: {
+                "circuito": circuito.estado,
+                "fallos_seguidos": circuito.fallos_seguidos,
+                "reabre_en_s": round(max(0.0, circuito.abierto_hasta - time.monotonic()), 1)
+                if circuito.estado == ABIERTO else None,
+                "tokens_por_segundo": round(self.tiempos[nombre].tokens_por_segundo, 1)
+                if nombre in self.tiempos and self.tiempos[nombre].tokens_por_segundo else None,
+            }
+            for nombre, circuito in self.circuitos.items()
+        }
+
+
+# Instancia
+resiliencia_ia = ResilienciaIA()
+
+metricas.medidor(
+    "museo_ia_circuito_estado", "Estado del circuit breaker (0 cerrado, 1 semiabierto, 2 abierto)", ("proveedor",),
+    lambda: {(nombre,): _VALOR_ESTADO[c.estado] for nombre, c in resiliencia_ia.circuitos.items()}
+)
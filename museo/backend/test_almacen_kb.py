@@ -0,0 +1,66 @@
+# test_almacen_kb.py
+# Carga del knowledge base en los workers: con el artefacto de
+# construir_indice_kb.py no se parsea el JSON ni se ajusta TF-IDF
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append('.')
+
+from config import get_settings
+from services import almacen_kb as modulo_almacen
+from services.almacen_kb import AlmacenKnowledgeBase, compilar_area
+from services.indice_kb import VectorizadorTFIDF
+
+settings = get_settings()
+
+RUTA_KB = Path(__file__).parent.parent / "museo_knowledge.json"
+
+
+@pytest.fixture
+def kb_temporal(tmp_path, monkeypatch):
+    ruta = tmp_path / "museo_knowledge.json"
+    ruta.write_bytes(RUTA_KB.read_bytes())
+    monkeypatch.setattr(settings, "KB_RUTA", str(ruta))
+    monkeypatch.setattr(settings, "KB_INDICE_DIR", str(tmp_path / "indice_kb"))
+    return ruta
+
+
+def _sin_compilar(monkeypatch):
+    def prohibido(*args, **kwargs):
+        raise AssertionError("el worker no debe parsear el JSON ni ajustar TF-IDF")
+
+    monkeypatch.setattr(modulo_almacen.json, "load", prohibido)
+    monkeypatch.setattr(VectorizadorTFIDF, "ajustar", prohibido)
+
+
+def test_worker_abre_el_artefacto_sin_leer_el_json(kb_temporal, monkeypatch):
+    AlmacenKnowledgeBase().construir(kb_temporal)
+    _sin_compilar(monkeypatch)
+
+    snapshot = AlmacenKnowledgeBase().actual()
+
+    assert snapshot.precompilado
+    assert snapshot._offsets is None  # El binario se abre en la primera lectura
+
+    kb = json.loads(kb_temporal.read_text(encoding="utf-8"))
+    codigo, area = next(iter(kb["areas"].items()))
+    assert snapshot.area(codigo) == compilar_area(codigo, area)
+    assert len(snapshot) == len(kb["areas"])
+    assert snapshot.indice.vectorizador is not None
+
+
+def test_artefacto_viejo_compila_en_el_proceso(kb_temporal):
+    AlmacenKnowledgeBase().construir(kb_temporal)
+    kb = json.loads(kb_temporal.read_text(encoding="utf-8"))
+    codigo = next(iter(kb["areas"]))
+    kb["areas"][codigo]["nombre"] = "Nombre cambiado"
+    kb_temporal.write_text(json.dumps(kb, ensure_ascii=False), encoding="utf-8")
+
+    snapshot = AlmacenKnowledgeBase().actual()
+
+    assert not snapshot.precompilado
+    assert snapshot.area(codigo)["nombre"] == "Nombre cambiado"
@@ -0,0 +1,40 @@
+# test_cache_contenido.py
+# El nombre del visitante solo entra por el marcador: el texto generado no se reescribe
+
+import asyncio
+import sys
+
+sys.path.append('.')
+
+from services.cache_contenido import MARCADOR_VISITANTE, PersonalizadorFragmentos, cache_contenido
+
+
+def test_personalizar_no_toca_palabras_iguales_al_nombre():
+    contenido = {
+        "introduccion": f"Hola {MARCADOR_VISITANTE}, mira la Rosa de los vientos.",
+        "datos_curiosos": ["El Sol y la Luz guiaban las fiestas."],
+    }
+
+    otro = cache_contenido.personalizar(contenido, "Luz")
+
+    assert otro["introduccion"] == "Hola Luz, mira la Rosa de los vientos."
+    assert otro["datos_curiosos"] == ["El Sol y la Luz guiaban las fiestas."]
+    assert MARCADOR_VISITANTE in contenido["introduccion"]  # El original queda intacto
+
+
+def test_stream_con_marcador_partido():
+    recibidos = []
+
+    async def destino(texto):
+        recibidos.append(texto)
+
+    async def enviar():
+        stream = PersonalizadorFragmentos(destino, "Rosa")
+        for fragmento in ['{"introduccion": "Hola {', '{visi', 'tante}}, bienvenida', '"}', "{"]:
+            await stream(fragmento)
+        await stream.vaciar()
+
+    asyncio.run(enviar())
+
+    assert "".join(recibidos) == '{"introduccion": "Hola Rosa, bienvenida"}{'
+    assert not any("{{" in texto for texto in recibidos)
@@ -0,0 +1,71 @@
+# test_compilador_prompts.py
+# Tamaño de los prompts de área: el contexto del KB no debe inflarlos
+# (solo entran los textos seleccionados, recortados a KB_PRESUPUESTO_TOKENS)
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.append('.')
+
+from config import get_settings
+from services.almacen_kb import compilar_area
+from services.compilador_prompts import CompiladorPrompts, contar_tokens
+
+settings = get_settings()
+
+RUTA_KB = Path(__file__).parent.parent / "museo_knowledge.json"
+MAX_TOKENS_PROMPT_AREA = 600  # Prompt original con KB: ~510-550 tokens
+
+
+class IndiceVacio:
+    """Sin índice: el compilador toma los primeros k textos del área"""
+
+    def buscar(self, area_codigo, tipo, intereses, k):
+        return []
+
+
+def _prompt(compilador, info, nivel="profundo", num_datos=7, num_obs=8):
+    return compilador.area(info, info, IndiceVacio(), "v1", "Ana", ["arte", "historia"],
+                           nivel, num_datos, num_obs, True)
+
+
+def test_prompts_del_kb_no_superan_el_maximo():
+    kb = json.loads(RUTA_KB.read_text(encoding="utf-8"))
+    compilador = CompiladorPrompts()
+
+    for codigo, area in kb["areas"].items():
+        info = compilar_area(codigo, area)
+        if not info["suficiente"]:
+            continue
+        tokens = _prompt(compilador, info).tokens
+        assert tokens <= MAX_TOKENS_PROMPT_AREA, f"{codigo}: {tokens} tokens"
+
+
+def test_contexto_recortado_al_presupuesto():
+    largo = "cerámica cañari " * 200
+    info = {
+        "codigo": "X-01", "nombre": "Área de prueba", "descripcion": "",
+        "objetos_destacados": [largo] * 20, "datos_curiosos": [largo] * 20,
+        "informacion_detallada": [largo] * 20, "suficiente": True,
+    }
+    compilador = CompiladorPrompts()
+    sin_kb = compilador.area(info, None, IndiceVacio(), "v1", "Ana", ["arte", "historia"],
+                             "profundo", 7, 8, True).tokens
+
+    # Encabezados del bloque (~20 tokens) + textos dentro del presupuesto
+    assert _prompt(compilador, info).tokens <= sin_kb + settings.KB_PRESUPUESTO_TOKENS + 30
+
+
+def test_prefijo_comun_entre_visitantes():
+    info = {
+        "codigo": "X-01", "nombre": "Área de prueba", "descripcion": "Descripción",
+        "objetos_destacados": ["a", "b", "c"], "datos_curiosos": ["d", "e", "f"],
+        "informacion_detallada": ["g"], "suficiente": True,
+    }
+    compilador = CompiladorPrompts()
+    uno = compilador.area(info, info, IndiceVacio(), "v1", "Ana", ["arte"], "normal", 4, 4, True)
+    otro = compilador.area(info, info, IndiceVacio(), "v1", "Luis", ["música"], "normal", 4, 4, False)
+
+    assert uno.prefijo == otro.prefijo
+    assert contar_tokens(uno.prefijo) > 0
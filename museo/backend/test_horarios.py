@@ -115,6 +115,10 @@ def main():
     martes_9 = datetime(2026, 1, 27, 9, 0)
     test_caso("Martes 9:00 - Horario óptimo", martes_9, None)
     
+    # CASO 12: Domingo después del cierre - el lunes cierra, reabre el martes
+    domingo_17 = datetime(2026, 2, 1, 17, 0)
+    test_caso("Domingo 17:00 - Después del cierre (reabre el Martes)", domingo_17)
+    
     print("\n" + "="*70)
     print("✅ TESTS COMPLETADOS")
     print("="*70)
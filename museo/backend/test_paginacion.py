@@ -0,0 +1,64 @@
+# test_paginacion.py
+# Paginación por keyset con claves que admiten NULL: recorrer todas las
+# páginas debe devolver cada fila una sola vez, también las que no tienen fecha
+
+import sys
+from datetime import datetime, timedelta
+
+sys.path.append('.')
+
+from fastapi import Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Evaluacion
+from utils.paginacion import CABECERA_CURSOR, paginar_keyset
+
+
+def _sesion_con_evaluaciones(fechas):
+    engine = create_engine("sqlite://")
+    Evaluacion.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    for fecha in fechas:
+        db.add(Evaluacion(
+            itinerario_id=1, calificacion_general=5, personalizado=True, buenas_decisiones=True,
+            acompaniamiento=True, comprension=True, relevante=True, usaria_nuevamente=True,
+            fecha_creacion=fecha,
+        ))
+    db.commit()
+
+    # El default de Python reemplaza a None al insertar; filas sin fecha como las de la BD real
+    sin_fecha = [i + 1 for i, fecha in enumerate(fechas) if fecha is None]
+    db.query(Evaluacion).filter(Evaluacion.id.in_(sin_fecha)).update({"fecha_creacion": None})
+    db.commit()
+    return db
+
+
+def _todas_las_paginas(db, limit):
+    vistos, cursor = [], None
+    while True:
+        response = Response()
+        pagina = paginar_keyset(
+            db.query(Evaluacion), [Evaluacion.fecha_creacion, Evaluacion.id], limit, response, cursor=cursor
+        )
+        vistos.extend(e.id for e in pagina)
+        cursor = response.headers.get(CABECERA_CURSOR)
+        if not cursor:
+            return vistos
+
+
+def test_pagina_despues_de_filas_sin_fecha():
+    base = datetime(2026, 1, 1)
+    fechas = [base, None, base + timedelta(days=1), None, None, base + timedelta(days=2), base]
+    db = _sesion_con_evaluaciones(fechas)
+
+    for limit in (1, 2, 3):
+        vistos = _todas_las_paginas(db, limit)
+        assert sorted(vistos) == list(range(1, len(fechas) + 1)), f"limit={limit}: {vistos}"
+
+
+def test_filas_sin_fecha_van_al_final():
+    base = datetime(2026, 1, 1)
+    db = _sesion_con_evaluaciones([None, base, None, base + timedelta(days=1)])
+
+    assert _todas_las_paginas(db, 2) == [4, 2, 3, 1]
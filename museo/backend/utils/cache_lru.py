@@ -0,0 +1,72 @@
+# utils/cache_lru.py
+# Cache en memoria con expiración (TTL) y desalojo LRU, seguro entre hilos
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class CacheLRU:
+    """
+    Diccionario acotado: al superar max_items se descarta el menos usado.
+    Cada entrada expira ttl_segundos después de guardarse.
+    """
+
+    def __init__(self, max_items: int = 512, ttl_segundos: float = 3600):
+        self.max_items = max_items
+        self.ttl_segundos = ttl_segundos
+        self._datos: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def obtener(self, clave: Hashable) -> Optional[Any]:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.misses += 1
+                return None
+
+            valor, expira = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                self.misses += 1
+                return None
+
+            self._datos.move_to_end(clave)
+            self.hits += 1
+            return valor
+
+    def guardar(self, clave: Hashable, valor: Any, ttl_segundos: Optional[float] = None):
+        ttl = self.ttl_segundos if ttl_segundos is None else ttl_segundos
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_items:
+                self._datos.popitem(last=False)
+
+    def eliminar_si(self, condicion: Callable[[Hashable, Any], bool]) -> int:
+        """Eliminar las entradas que cumplan la condición (clave, valor)"""
+        with self._lock:
+            claves = [c for c, (v, _) in self._datos.items() if condicion(c, v)]
+            for clave in claves:
+                del self._datos[clave]
+            return len(claves)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+    def estadisticas(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "items": len(self._datos),
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total * 100, 2) if total else 0.0
+        }
@@ -0,0 +1,203 @@
+# utils/calendario_museo.py
+# 🔥 Calendario del museo precalculado (migraciones/010_calendario_museo.sql)
+# - Lee el horario semanal y las excepciones (feriados / eventos especiales)
+#   de la BD cada HORARIOS_RECARGA_SEGUNDOS; sin tablas o sin BD usa
+#   HORARIOS_MUSEO de utils/horarios_museo.py.
+# - Construye un índice con el horario de cada día y la lista ordenada de
+#   aperturas de los próximos HORARIOS_MESES_PRECALCULO meses: el horario de
+#   hoy es una búsqueda en un dict y la próxima apertura un bisect, sin
+#   recorrer días en cada request.
+# - Fechas fuera de la ventana (pruebas, consultas históricas) usan un índice
+#   chico construido a demanda y memorizado.
+# El índice se reemplaza de una vez; las lecturas en curso terminan con el anterior.
+
+import bisect
+import logging
+import threading
+import time as reloj
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from config import get_settings
+from utils.cache_lru import CacheLRU
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+DIAS_INDICE_TEMPORAL = 35
+
+Semana = Tuple[Optional[Tuple[time, time]], ...]  # 7 entradas, 0 = lunes; None = cerrado
+
+
+class DiaMuseo(NamedTuple):
+    fecha: date
+    apertura: Optional[time]  # None = cerrado todo el día
+    cierre: Optional[time]
+    tipo: str = "regular"  # regular | feriado | evento
+    motivo: Optional[str] = None
+
+    @property
+    def abierto(self) -> bool:
+        return self.apertura is not None
+
+    @property
+    def inicio(self) -> datetime:
+        return datetime.combine(self.fecha, self.apertura)
+
+    @property
+    def fin(self) -> datetime:
+        return datetime.combine(self.fecha, self.cierre)
+
+
+def dia_regular(semana: Semana, fecha: date) -> DiaMuseo:
+    horario = semana[fecha.weekday()]
+    return DiaMuseo(fecha, *(horario or (None, None)))
+
+
+class IndiceHorarios:
+    """Horario de cada día de [desde, hasta) y aperturas ordenadas para bisect"""
+
+    def __init__(self, semana: Semana, excepciones: Dict[date, DiaMuseo], desde: date, hasta: date,
+                 fuente: str = "bd"):
+        self.semana = semana
+        self.excepciones = excepciones
+        self.desde = desde
+        self.hasta = hasta
+        self.fuente = fuente
+
+        self.dias: Dict[date, DiaMuseo] = {}
+        self.aperturas: List[datetime] = []
+        self.abiertos: List[DiaMuseo] = []
+        for n in range((hasta - desde).days):
+            fecha = desde + timedelta(days=n)
+            dia = excepciones.get(fecha) or dia_regular(semana, fecha)
+            self.dias[fecha] = dia
+            if dia.abierto:
+                self.aperturas.append(dia.inicio)
+                self.abiertos.append(dia)
+
+    def cubre(self, fecha: date) -> bool:
+        return self.desde <= fecha < self.hasta
+
+    def dia(self, fecha: date) -> DiaMuseo:
+        return self.dias.get(fecha) or self.excepciones.get(fecha) or dia_regular(self.semana, fecha)
+
+    def siguiente_apertura(self, momento: datetime) -> Optional[DiaMuseo]:
+        """Primer día cuya apertura es posterior a `momento` (None si no hay en la ventana)"""
+        i = bisect.bisect_right(self.aperturas, momento)
+        return self.abiertos[i] if i < len(self.abiertos) else None
+
+
+class CalendarioMuseo:
+
+    def __init__(self):
+        self._indice: Optional[IndiceHorarios] = None
+        self._ultima_carga = 0.0
+        self._lock = threading.Lock()
+        # Índices de fechas fuera del rango precalculado; se vacía en cada recarga
+        self._temporales = CacheLRU(max_items=64, ttl_segundos=float("inf"))
+
+    # ============================================
+    # ACCESO
+    # ============================================
+
+    def actual(self) -> IndiceHorarios:
+        """Índice vigente; relee la BD como mucho cada HORARIOS_RECARGA_SEGUNDOS"""
+        if self._indice is None or reloj.monotonic() - self._ultima_carga >= settings.HORARIOS_RECARGA_SEGUNDOS:
+            self._cargar()
+        return self._indice
+
+    def indice(self, momento: datetime) -> IndiceHorarios:
+        """Índice que cubre la fecha de `momento`"""
+        indice = self.actual()
+        if indice.cubre(momento.date()):
+            return indice
+        return self._indice_temporal(indice, momento.date())
+
+    def recargar(self) -> IndiceHorarios:
+        """Releer horarios y excepciones ya (p. ej. al iniciar la API)"""
+        self._cargar(forzar=True)
+        return self._indice
+
+    def _indice_temporal(self, base: IndiceHorarios, fecha: date) -> IndiceHorarios:
+        indice = self._temporales.obtener(fecha)
+        if indice is None:
+            indice = IndiceHorarios(
+                base.semana, base.excepciones, fecha, fecha + timedelta(days=DIAS_INDICE_TEMPORAL), base.fuente
+            )
+            self._temporales.guardar(fecha, indice)
+        return indice
+
+    # ============================================
+    # CARGA
+    # ============================================
+
+    def _leer_bd(self) -> Tuple[Semana, Dict[date, DiaMuseo]]:
+        from database import SessionLocal
+        from models import ExcepcionHorario, HorarioSemanal
+
+        with SessionLocal() as db:
+            semanales = {h.dia_semana: h for h in db.query(HorarioSemanal).all()}
+            excepciones = db.query(ExcepcionHorario).all()
+
+        if len(semanales) < 7:
+            raise LookupError(f"horarios_semanales tiene {len(semanales)} de 7 días")
+
+        semana = tuple(
+            (semanales[d].apertura, semanales[d].cierre) if semanales[d].apertura and semanales[d].cierre else None
+            for d in range(7)
+        )
+        return semana, {
+            e.fecha: DiaMuseo(
+                e.fecha,
+                None if e.cerrado else e.apertura,
+                None if e.cerrado else e.cierre,
+                e.tipo,
+                e.motivo
+            )
+            for e in excepciones
+        }
+
+    def _cargar(self, forzar: bool = False):
+        from utils.horarios_museo import HORARIOS_MUSEO, obtener_hora_ecuador
+
+        with self._lock:
+            # Otro hilo pudo haber recargado mientras esperábamos el lock
+            if not forzar and self._indice is not None and \
+                    reloj.monotonic() - self._ultima_carga < settings.HORARIOS_RECARGA_SEGUNDOS:
+                return
+            self._ultima_carga = reloj.monotonic()
+
+            anterior = self._indice
+            try:
+                semana, excepciones = self._leer_bd()
+                fuente = "bd"
+            except Exception as e:
+                if anterior is not None:
+                    # BD caída: se conserva lo último leído y solo se corre la ventana
+                    logger.warning("⚠️ No se pudo releer el calendario del museo: %s", e)
+                    semana, excepciones, fuente = anterior.semana, anterior.excepciones, anterior.fuente
+                else:
+                    logger.warning("⚠️ Calendario del museo no disponible (¿falta aplicar migraciones/010?), "
+                                   "se usa el horario fijo: %s", e)
+                    semana = tuple(
+                        (h["apertura"], h["cierre"]) if h else None
+                        for h in (HORARIOS_MUSEO.get(d) for d in range(7))
+                    )
+                    excepciones, fuente = {}, "predeterminado"
+
+            # Desde ayer: una consulta poco después de medianoche sigue cubierta
+            desde = obtener_hora_ecuador().date() - timedelta(days=1)
+            hasta = desde + timedelta(days=31 * max(1, settings.HORARIOS_MESES_PRECALCULO) + 1)
+            self._indice = IndiceHorarios(semana, excepciones, desde, hasta, fuente)
+            self._temporales.limpiar()
+
+            if anterior is None or anterior.semana != semana or anterior.excepciones != excepciones:
+                logger.info(
+                    "📅 Calendario del museo (%s): %s días de apertura hasta %s, %s excepciones",
+                    fuente, len(self._indice.abiertos), hasta.isoformat(), len(excepciones)
+                )
+
+
+# Instancia
+calendario_museo = CalendarioMuseo()
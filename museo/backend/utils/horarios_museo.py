@@ -1,12 +1,18 @@
 # utils/horarios_museo.py
 # ✅ CON INFORMACIÓN COMPLETA DE DÍAS HÁBILES
 # ✅ CORREGIDO: Usa zona horaria de Ecuador (UTC-5)
+# 🔥 Horarios y feriados desde utils/calendario_museo.py (índice
+#    precalculado); HORARIOS_MUSEO queda como respaldo sin BD. Los textos
+#    largos se arman una vez por combinación y se memorizan.
 
 from datetime import datetime, time, timedelta
+from functools import lru_cache
 from typing import Dict, Optional, Tuple
 import logging
 import pytz
 
+from utils.calendario_museo import DiaMuseo, Semana, calendario_museo
+
 logger = logging.getLogger(__name__)
 
 # ============================================
@@ -16,6 +22,7 @@ ZONA_HORARIA_ECUADOR = pytz.timezone('America/Guayaquil')
 
 # ============================================
 # HORARIOS DEL MUSEO PUMAPUNGO
+# (respaldo si la tabla horarios_semanales no está disponible)
 # ============================================
 
 HORARIOS_MUSEO = {
@@ -50,8 +57,9 @@ def obtener_hora_ecuador() -> datetime:
 
 
 def obtener_horario_dia(dia_semana: int) -> Optional[Dict]:
-    """Obtiene el horario de un día específico"""
-    return HORARIOS_MUSEO.get(dia_semana)
+    """Obtiene el horario regular de un día de la semana (sin feriados)"""
+    horario = calendario_museo.actual().semana[dia_semana] if 0 <= dia_semana <= 6 else None
+    return {"apertura": horario[0], "cierre": horario[1]} if horario else None
 
 
 def obtener_nombre_dia(dia_semana: int) -> str:
@@ -59,29 +67,118 @@ def obtener_nombre_dia(dia_semana: int) -> str:
     return DIAS_SEMANA.get(dia_semana, "Desconocido")
 
 
+@lru_cache(maxsize=1024)
 def formatear_tiempo_espera(minutos: int) -> str:
     """Convierte minutos a formato legible"""
+    minutos = int(minutos)
     if minutos >= 60:
-        horas = int(minutos // 60)
-        mins = int(minutos % 60)
+        horas = minutos // 60
+        mins = minutos % 60
         
         if mins > 0:
             return f"{horas} hora{'s' if horas > 1 else ''} y {mins} minuto{'s' if mins != 1 else ''}"
         else:
             return f"{horas} hora{'s' if horas > 1 else ''}"
     else:
-        return f"{int(minutos)} minuto{'s' if minutos != 1 else ''}"
+        return f"{minutos} minuto{'s' if minutos != 1 else ''}"
+
+
+def _hhmm(hora: time) -> str:
+    return hora.strftime('%H:%M')
+
+
+@lru_cache(maxsize=16)
+def _texto_horarios(semana: Semana, plural: bool, separador: str) -> str:
+    """Días consecutivos con el mismo horario en una línea ("Martes a Viernes: 08:00 - 17:00")"""
+    grupos = []
+    for dia in range(7):
+        if grupos and grupos[-1][1] == semana[dia]:
+            grupos[-1][0].append(dia)
+        else:
+            grupos.append(([dia], semana[dia]))
+
+    lineas = []
+    for dias, horario in grupos:
+        nombres = [obtener_nombre_dia(d) for d in (dias[0], dias[-1])]
+        if plural:
+            nombres = [n if n.endswith("s") else f"{n}s" for n in nombres]
+        if len(dias) == 1:
+            etiqueta = nombres[0]
+        else:
+            etiqueta = f"{nombres[0]} {'y' if len(dias) == 2 else 'a'} {nombres[1]}"
+        lineas.append(f"• {etiqueta}: {f'{_hhmm(horario[0])} - {_hhmm(horario[1])}' if horario else 'Cerrado'}")
+    return separador.join(lineas)
 
 
 def obtener_horarios_completos() -> str:
     """
     Retorna los horarios completos del museo formateados
     """
+    return "📅 Horarios del museo:\n\n" + _texto_horarios(calendario_museo.actual().semana, False, "\n")
+
+
+# ============================================
+# MENSAJES (memorizados por combinación)
+# ============================================
+
+def _proxima_visita(proxima: Optional[DiaMuseo], fecha_actual: datetime) -> Tuple[str, Optional[str]]:
+    """Cuándo volver y etiqueta del horario: ("mañana (Martes)", "de mañana (Martes)")"""
+    if proxima is None:
+        return "otro día", None
+    nombre = obtener_nombre_dia(proxima.fecha.weekday())
+    if proxima.fecha == fecha_actual.date() + timedelta(days=1):
+        return f"mañana ({nombre})", f"de mañana ({nombre})"
+    return f"el {nombre} {proxima.fecha.strftime('%d/%m')}", f"del {nombre} {proxima.fecha.strftime('%d/%m')}"
+
+
+def _info_proxima(proxima: Optional[DiaMuseo]) -> Dict:
+    return {
+        "proxima_apertura": proxima.fecha.strftime("%Y-%m-%d") if proxima else None,
+        "horario_manana": {
+            "apertura": _hhmm(proxima.apertura),
+            "cierre": _hhmm(proxima.cierre)
+        } if proxima else None
+    }
+
+
+@lru_cache(maxsize=512)
+def _mensaje_volver(encabezado: str, cuando: str, consejo: str, etiqueta: Optional[str],
+                    apertura: Optional[str], cierre: Optional[str], horarios: str) -> str:
+    partes = [encabezado, f"📅 Te recomendamos volver {cuando}", consejo]
+    if etiqueta:
+        partes.append(f"🕐 Horario {etiqueta}: {apertura} - {cierre}")
+    partes.append(horarios)
+    return "\n\n".join(partes)
+
+
+def _recomendar_volver(encabezado: str, consejo: str, proxima: Optional[DiaMuseo],
+                       fecha_actual: datetime, cuando: Optional[str] = None) -> str:
+    cuando_proxima, etiqueta = _proxima_visita(proxima, fecha_actual)
+    return _mensaje_volver(
+        encabezado, cuando or cuando_proxima, consejo, etiqueta,
+        _hhmm(proxima.apertura) if proxima else None,
+        _hhmm(proxima.cierre) if proxima else None,
+        obtener_horarios_completos()
+    )
+
+
+@lru_cache(maxsize=1024)
+def _mensaje_antes_apertura(nombre_dia: str, apertura: str, cierre: str, minutos: int, motivo: Optional[str]) -> str:
     return (
-        "📅 Horarios del museo:\n\n"
-        "• Lunes: Cerrado\n"
-        "• Martes a Viernes: 08:00 - 17:00\n"
-        "• Sábado y Domingo: 10:00 - 16:00"
+        f"⏰ El museo aún no está abierto\n\n"
+        f"📅 Hoy {nombre_dia} abrimos a las {apertura}\n\n"
+        f"🕐 Faltan aproximadamente {formatear_tiempo_espera(minutos)}\n\n"
+        f"💡 Vuelve más tarde para disfrutar tu visita\n\n"
+        f"📋 Horario de hoy{f' ({motivo})' if motivo else ''}: {apertura} - {cierre}"
+    )
+
+
+@lru_cache(maxsize=1024)
+def _mensaje_abierto(minutos: int, cierre: str, motivo: Optional[str]) -> str:
+    return (
+        f"✅ El museo está abierto\n\n"
+        f"⏰ Tienes {minutos} minutos hasta el cierre ({cierre})"
+        + (f"\n\n📌 Hoy: {motivo}" if motivo else "")
     )
 
 
@@ -91,125 +188,95 @@ def validar_horario_museo(
     """
     Valida si el museo está abierto en este momento
     ✅ CORREGIDO: Usa hora de Ecuador si no se pasa fecha
+    🔥 Consulta el calendario precalculado (feriados y eventos incluidos)
     """
     if fecha_hora_actual is None:
         fecha_hora_actual = obtener_hora_ecuador()  # ✅ Hora de Ecuador, no UTC
 
-    dia_semana = fecha_hora_actual.weekday()
-    hora_actual = fecha_hora_actual.time()
-
-    nombre_dia = obtener_nombre_dia(dia_semana)
-    horario_hoy = obtener_horario_dia(dia_semana)
+    indice = calendario_museo.indice(fecha_hora_actual)
+    hoy = indice.dia(fecha_hora_actual.date())
+    nombre_dia = obtener_nombre_dia(fecha_hora_actual.weekday())
+    especial = {"motivo": hoy.motivo} if hoy.tipo != "regular" else {}
 
     # ============================================
-    # CASO 1: LUNES (CERRADO)
+    # CASO 1: DÍA CERRADO (LUNES, FERIADO O EVENTO)
     # ============================================
-    if horario_hoy is None:
-        dias_hasta_apertura = 1
-        fecha_apertura = fecha_hora_actual + timedelta(days=dias_hasta_apertura)
-        horario_manana = obtener_horario_dia(fecha_apertura.weekday())
-
-        mensaje = (
-            f"🚫 El museo está cerrado los {nombre_dia}\n\n"
-            f"📅 Te recomendamos volver mañana ({obtener_nombre_dia(fecha_apertura.weekday())})\n\n"
-            f"Podrás disfrutar el museo con calma y aprovechar todas las áreas.\n\n"
-            f"🕐 Horario de mañana ({obtener_nombre_dia(fecha_apertura.weekday())}): "
-            f"{horario_manana['apertura'].strftime('%H:%M')} - {horario_manana['cierre'].strftime('%H:%M')}\n\n"
-            f"{obtener_horarios_completos()}"
+    if not hoy.abierto:
+        proxima = indice.siguiente_apertura(fecha_hora_actual)
+
+        if hoy.tipo == "regular":
+            encabezado = f"🚫 El museo está cerrado los {nombre_dia}"
+            razon = "cerrado_lunes" if fecha_hora_actual.weekday() == 0 else "cerrado_dia"
+        else:
+            encabezado = f"🚫 Hoy el museo está cerrado{f' por {hoy.motivo}' if hoy.motivo else ''}"
+            razon = f"cerrado_{hoy.tipo}"
+
+        mensaje = _recomendar_volver(
+            encabezado,
+            "Podrás disfrutar el museo con calma y aprovechar todas las áreas.",
+            proxima, fecha_hora_actual
         )
 
         return False, mensaje, {
-            "razon": "cerrado_lunes",
+            "razon": razon,
             "dia_actual": nombre_dia,
-            "proxima_apertura": fecha_apertura.strftime("%Y-%m-%d"),
-            "horario_manana": {
-                "apertura": horario_manana['apertura'].strftime('%H:%M'),
-                "cierre": horario_manana['cierre'].strftime('%H:%M')
-            }
+            **especial,
+            **_info_proxima(proxima)
         }
 
     # ============================================
     # CASO 2: ANTES DE LA APERTURA
     # ============================================
-    if hora_actual < horario_hoy['apertura']:
-        minutos_para_abrir = (
-            datetime.combine(fecha_hora_actual.date(), horario_hoy['apertura']) -
-            datetime.combine(fecha_hora_actual.date(), hora_actual)
-        ).total_seconds() / 60
-
-        tiempo_texto = formatear_tiempo_espera(minutos_para_abrir)
-
-        mensaje = (
-            f"⏰ El museo aún no está abierto\n\n"
-            f"📅 Hoy {nombre_dia} abrimos a las {horario_hoy['apertura'].strftime('%H:%M')}\n\n"
-            f"🕐 Faltan aproximadamente {tiempo_texto}\n\n"
-            f"💡 Vuelve más tarde para disfrutar tu visita\n\n"
-            f"📋 Horario de hoy: {horario_hoy['apertura'].strftime('%H:%M')} - "
-            f"{horario_hoy['cierre'].strftime('%H:%M')}"
+    if fecha_hora_actual < hoy.inicio:
+        minutos_para_abrir = int((hoy.inicio - fecha_hora_actual).total_seconds() / 60)
+
+        mensaje = _mensaje_antes_apertura(
+            nombre_dia, _hhmm(hoy.apertura), _hhmm(hoy.cierre), minutos_para_abrir, hoy.motivo
         )
 
         return False, mensaje, {
             "razon": "antes_apertura",
             "dia_actual": nombre_dia,
-            "hora_apertura": horario_hoy['apertura'].strftime('%H:%M'),
-            "hora_cierre": horario_hoy['cierre'].strftime('%H:%M'),
-            "minutos_para_abrir": int(minutos_para_abrir)
+            **especial,
+            "hora_apertura": _hhmm(hoy.apertura),
+            "hora_cierre": _hhmm(hoy.cierre),
+            "minutos_para_abrir": minutos_para_abrir
         }
 
     # ============================================
     # CASO 3: DESPUÉS DEL CIERRE
     # ============================================
-    if hora_actual >= horario_hoy['cierre']:
-        dias_hasta_apertura = 1
-        fecha_apertura = fecha_hora_actual + timedelta(days=dias_hasta_apertura)
-
-        while obtener_horario_dia(fecha_apertura.weekday()) is None:
-            dias_hasta_apertura += 1
-            fecha_apertura = fecha_hora_actual + timedelta(days=dias_hasta_apertura)
-
-        horario_manana = obtener_horario_dia(fecha_apertura.weekday())
-        nombre_dia_manana = obtener_nombre_dia(fecha_apertura.weekday())
-
-        mensaje = (
-            f"🌙 El museo ya cerró por hoy\n\n"
-            f"📅 Te recomendamos volver mañana ({nombre_dia_manana})\n\n"
-            f"Podrás disfrutar el museo con más tiempo para explorar.\n\n"
-            f"🕐 Horario de mañana ({nombre_dia_manana}): "
-            f"{horario_manana['apertura'].strftime('%H:%M')} - {horario_manana['cierre'].strftime('%H:%M')}\n\n"
-            f"{obtener_horarios_completos()}"
+    if fecha_hora_actual >= hoy.fin:
+        proxima = indice.siguiente_apertura(fecha_hora_actual)
+
+        mensaje = _recomendar_volver(
+            "🌙 El museo ya cerró por hoy",
+            "Podrás disfrutar el museo con más tiempo para explorar.",
+            proxima, fecha_hora_actual
         )
 
         return False, mensaje, {
             "razon": "despues_cierre",
             "dia_actual": nombre_dia,
-            "hora_cierre": horario_hoy['cierre'].strftime('%H:%M'),
-            "proxima_apertura": fecha_apertura.strftime("%Y-%m-%d"),
-            "horario_manana": {
-                "apertura": horario_manana['apertura'].strftime('%H:%M'),
-                "cierre": horario_manana['cierre'].strftime('%H:%M')
-            }
+            **especial,
+            "hora_cierre": _hhmm(hoy.cierre),
+            **_info_proxima(proxima)
         }
 
     # ============================================
     # CASO 4: ABIERTO
     # ============================================
-    minutos_hasta_cierre = (
-        datetime.combine(fecha_hora_actual.date(), horario_hoy['cierre']) -
-        datetime.combine(fecha_hora_actual.date(), hora_actual)
-    ).total_seconds() / 60
+    minutos_hasta_cierre = int((hoy.fin - fecha_hora_actual).total_seconds() / 60)
 
-    mensaje = (
-        f"✅ El museo está abierto\n\n"
-        f"⏰ Tienes {int(minutos_hasta_cierre)} minutos hasta el cierre "
-        f"({horario_hoy['cierre'].strftime('%H:%M')})"
-    )
+    mensaje = _mensaje_abierto(minutos_hasta_cierre, _hhmm(hoy.cierre), hoy.motivo)
 
     return True, mensaje, {
         "razon": "abierto",
         "dia_actual": nombre_dia,
-        "hora_apertura": horario_hoy['apertura'].strftime('%H:%M'),
-        "hora_cierre": horario_hoy['cierre'].strftime('%H:%M'),
-        "minutos_hasta_cierre": int(minutos_hasta_cierre)
+        **especial,
+        "hora_apertura": _hhmm(hoy.apertura),
+        "hora_cierre": _hhmm(hoy.cierre),
+        "minutos_hasta_cierre": minutos_hasta_cierre
     }
 
 
@@ -253,28 +320,28 @@ def ajustar_itinerario_por_tiempo(
     # CASO 1: Menos de 30 minutos para cerrar
     # ============================================
     if minutos_disponibles < TIEMPO_MINIMO_VISITA:
-        dias_hasta_apertura = 1
-        fecha_apertura = fecha_hora_actual + timedelta(days=dias_hasta_apertura)
-
-        while obtener_horario_dia(fecha_apertura.weekday()) is None:
-            dias_hasta_apertura += 1
-            fecha_apertura = fecha_hora_actual + timedelta(days=dias_hasta_apertura)
-
-        horario_manana = obtener_horario_dia(fecha_apertura.weekday())
-        nombre_dia_manana = obtener_nombre_dia(fecha_apertura.weekday())
+        proxima = calendario_museo.indice(fecha_hora_actual).siguiente_apertura(fecha_hora_actual)
 
-        mensaje = (
+        mensaje = _recomendar_volver(
             f"🚫 El museo cerrará muy pronto (en {minutos_disponibles} minutos)\n\n"
-            f"😔 No hay tiempo suficiente para una visita significativa\n\n"
-            f"📅 Te recomendamos volver en otro momento\n\n"
-            f"Podrás disfrutar el museo con calma y aprovechar todas las áreas.\n\n"
-            f"🕐 Horario de mañana ({nombre_dia_manana}): "
-            f"{horario_manana['apertura'].strftime('%H:%M')} - {horario_manana['cierre'].strftime('%H:%M')}\n\n"
-            f"{obtener_horarios_completos()}"
+            f"😔 No hay tiempo suficiente para una visita significativa",
+            "Podrás disfrutar el museo con calma y aprovechar todas las áreas.",
+            proxima, fecha_hora_actual, cuando="en otro momento"
         )
 
         return False, None, mensaje
 
+    return _ajustar_duracion(duracion_solicitada, minutos_disponibles, info['hora_cierre'])
+
+
+@lru_cache(maxsize=4096)
+def _ajustar_duracion(
+    duracion_solicitada: Optional[int],
+    minutos_disponibles: int,
+    hora_cierre: str
+) -> Tuple[bool, Optional[int], str]:
+    """Decisión y mensaje para un museo abierto con al menos TIEMPO_MINIMO_VISITA minutos"""
+
     # ============================================
     # CASO 2: Sin límite de tiempo solicitado
     # ============================================
@@ -291,7 +358,7 @@ def ajustar_itinerario_por_tiempo(
             duracion_ajustada = int(minutos_disponibles * 0.8)
             mensaje = (
                 f"⏰ Tiempo limitado\n\n"
-                f"El museo cerrará a las {info['hora_cierre']} (en {minutos_disponibles} minutos).\n\n"
+                f"El museo cerrará a las {hora_cierre} (en {minutos_disponibles} minutos).\n\n"
                 f"😊 No podrás ver todas las áreas, pero te crearé un itinerario personalizado con las más relevantes.\n\n"
                 f"💡 Tiempo disponible: {minutos_disponibles} minutos\n\n"
                 f"📍 Áreas sugeridas: Las más importantes para ti"
@@ -339,8 +406,6 @@ def obtener_mensaje_horarios() -> str:
     """Retorna un mensaje formateado con todos los horarios"""
     return (
         "📅 Horarios del Museo Pumapungo:\n\n"
-        "• Lunes: Cerrado\n\n"
-        "• Martes a Viernes: 08:00 - 17:00\n\n"
-        "• Sábados y Domingos: 10:00 - 16:00\n\n"
-        "🎫 Entrada gratuita"
-    )
\ No newline at end of file
+        + _texto_horarios(calendario_museo.actual().semana, True, "\n\n")
+        + "\n\n🎫 Entrada gratuita"
+    )
@@ -0,0 +1,238 @@
+# utils/metricas.py
+# 🔥 Métricas de latencia en formato de texto de Prometheus (GET /metrics)
+# Registro en memoria del proceso, sin dependencias ni servicios externos:
+# se puede probar con `curl localhost:8000/metrics`.
+#   - museo_http_duracion_segundos: por método, ruta (plantilla) y estado
+#   - museo_ia_*: duración, espera en el limitador y tokens por llamada a la IA
+#   - museo_db_pool_*: espera al obtener conexión y uso del pool
+#   - museo_cola_generacion_trabajos: trabajos por estado (se consulta al exponer)
+#
+# Con varios workers de gunicorn cada proceso expone sus propias métricas.
+
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BUCKETS_IA = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+BUCKETS_ESPERA = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas(nombres: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _numero(valor: float) -> str:
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    return repr(float(valor))
+
+
+# ============================================
+# TIPOS DE MÉTRICA
+# ============================================
+
+class Metrica:
+    tipo = "untyped"
+
+    def __init__(self, nombre: str, descripcion: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def _clave(self, valores: Sequence[str]) -> Tuple[str, ...]:
+        if len(valores) != len(self.etiquetas):
+            raise ValueError(f"{self.nombre}: se esperaban etiquetas {self.etiquetas}")
+        return tuple(str(v) for v in valores)
+
+    def encabezado(self) -> List[str]:
+        return [f"# HELP {self.nombre} {self.descripcion}", f"# TYPE {self.nombre} {self.tipo}"]
+
+    def lineas(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Contador(Metrica):
+    tipo = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def incrementar(self, *valores: str, cantidad: float = 1.0):
+        clave = self._clave(valores)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0.0) + cantidad
+
+    def lineas(self) -> Iterable[str]:
+        with self._lock:
+            copia = list(self._valores.items())
+        for clave, valor in copia:
+            yield f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}"
+
+
+class Histograma(Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, descripcion: str, etiquetas: Sequence[str] = (), buckets: Sequence[float] = BUCKETS_HTTP):
+        super().__init__(nombre, descripcion, etiquetas)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[Tuple[str, ...], list] = {}  # clave → [conteos por bucket..., suma]
+
+    def observar(self, valor: float, *valores: str):
+        clave = self._clave(valores)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [0] * len(self.buckets) + [0.0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[i] += 1
+                    break
+            serie[-1] += valor
+
+    def lineas(self) -> Iterable[str]:
+        with self._lock:
+            copia = [(clave, list(serie)) for clave, serie in self._series.items()]
+        for clave, serie in copia:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, serie):
+                acumulado += conteo
+                le = f'le="{_numero(limite)}"'
+                yield f"{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, le)} {acumulado}"
+            yield f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(serie[-1])}"
+            yield f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {acumulado}"
+
+
+class Medidor(Metrica):
+    """Gauge calculado al exponer: la función devuelve {(etiquetas...): valor}"""
+    tipo = "gauge"
+
+    def __init__(self, nombre: str, descripcion: str, etiquetas: Sequence[str], funcion: Callable[[], Dict[Tuple[str, ...], float]]):
+        super().__init__(nombre, descripcion, etiquetas)
+        self.funcion = funcion
+
+    def lineas(self) -> Iterable[str]:
+        try:
+            valores = self.funcion()
+        except Exception as e:
+            logger.warning("⚠️ No se pudo calcular %s: %s", self.nombre, e)
+            return
+        for clave, valor in valores.items():
+            yield f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}"
+
+
+# ============================================
+# REGISTRO
+# ============================================
+
+class RegistroMetricas:
+
+    def __init__(self):
+        self._metricas: Dict[str, Metrica] = {}
+
+    def _registrar(self, metrica: Metrica) -> Metrica:
+        self._metricas.setdefault(metrica.nombre, metrica)
+        return self._metricas[metrica.nombre]
+
+    def contador(self, nombre: str, descripcion: str, etiquetas: Sequence[str] = ()) -> Contador:
+        return self._registrar(Contador(nombre, descripcion, etiquetas))
+
+    def histograma(self, nombre: str, descripcion: str, etiquetas: Sequence[str] = (), buckets: Sequence[float] = BUCKETS_HTTP) -> Histograma:
+        return self._registrar(Histograma(nombre, descripcion, etiquetas, buckets))
+
+    def medidor(self, nombre: str, descripcion: str, etiquetas: Sequence[str], funcion: Callable) -> Medidor:
+        return self._registrar(Medidor(nombre, descripcion, etiquetas, funcion))
+
+    def exponer(self) -> str:
+        """Todas las métricas en formato de texto 0.0.4"""
+        salida: List[str] = []
+        for metrica in self._metricas.values():
+            salida.extend(metrica.encabezado())
+            salida.extend(metrica.lineas())
+        return "\n".join(salida) + "\n"
+
+
+metricas = RegistroMetricas()
+
+# ============================================
+# MÉTRICAS DE LA APLICACIÓN
+# ============================================
+
+http_duracion = metricas.histograma(
+    "museo_http_duracion_segundos", "Duración de las peticiones HTTP",
+    ("metodo", "ruta", "estado"), BUCKETS_HTTP
+)
+ia_duracion = metricas.histograma(
+    "museo_ia_duracion_segundos", "Duración de cada llamada al proveedor de IA",
+    ("proveedor", "modelo", "tipo", "resultado"), BUCKETS_IA
+)
+ia_espera = metricas.histograma(
+    "museo_ia_espera_segundos", "Espera en el limitador de concurrencia/rate limit antes de llamar a la IA",
+    ("proveedor", "tipo"), BUCKETS_ESPERA
+)
+ia_tokens = metricas.contador(
+    "museo_ia_tokens_total", "Tokens reportados por el proveedor (usage)",
+    ("proveedor", "modelo", "tipo", "clase")
+)
+db_espera_conexion = metricas.histograma(
+    "museo_db_pool_espera_segundos", "Espera para obtener una conexión del pool de SQLAlchemy",
+    (), BUCKETS_ESPERA
+)
+
+MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def registrar_uso_ia(proveedor: str, modelo: str, tipo: str, uso: Dict[str, int]):
+    """uso: {"prompt_tokens": n, "completion_tokens": m, "prompt_cache_hit_tokens": c} (lo que informe el proveedor)"""
+    for clase in ("prompt_tokens", "completion_tokens", "prompt_cache_hit_tokens"):
+        if uso.get(clase):
+            ia_tokens.incrementar(proveedor, modelo, tipo, clase.replace("_tokens", ""), cantidad=uso[clase])
+
+
+# ============================================
+# MIDDLEWARE HTTP (ASGI puro: no envuelve la respuesta, sirve para SSE)
+# ============================================
+
+class MiddlewareMetricas:
+
+    def __init__(self, app, excluir: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.excluir = set(excluir)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") in self.excluir:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        estado = {"codigo": 500}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["codigo"] = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            # Plantilla de la ruta (/itinerarios/{itinerario_id}), no el path real
+            ruta = scope.get("route")
+            http_duracion.observar(
+                time.perf_counter() - inicio,
+                scope.get("method", ""),
+                getattr(ruta, "path", "sin_ruta"),
+                str(estado["codigo"])
+            )
@@ -0,0 +1,157 @@
+# utils/paginacion.py
+# 🔥 Paginación por keyset (cursor) para los listados
+# En vez de OFFSET (que recorre y descarta todas las filas anteriores), cada
+# página continúa desde la última fila de la anterior: WHERE (fecha, id) < (...)
+# sobre un índice compuesto con el mismo orden. El costo es igual en la
+# página 1 que en la 10.000.
+#
+# Las claves de fecha que admiten NULL se ordenan como coalesce(fecha, año 1)
+# (clave_orden): con NULL la comparación de filas da NULL y el listado se
+# cortaba en la primera fila sin fecha. En orden descendente esas filas van
+# al final; los índices de models.py usan la misma expresión.
+#
+# El cursor es opaco para el cliente (JSON en base64url) y viaja en la
+# cabecera X-Siguiente-Cursor, así la respuesta sigue siendo la misma lista.
+# Con total=true se agrega X-Total-Estimado, tomado del planificador de
+# PostgreSQL (EXPLAIN), sin COUNT(*).
+
+import base64
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import func, literal, literal_column, tuple_
+from sqlalchemy.orm import Query as ConsultaORM
+
+logger = logging.getLogger(__name__)
+
+CABECERA_CURSOR = "X-Siguiente-Cursor"
+CABECERA_TOTAL = "X-Total-Estimado"
+
+# Reemplazo de NULL en claves de fecha, menor que cualquier fecha real. Sin
+# tipo: PostgreSQL lo convierte al de la columna (date, timestamp o timestamptz)
+FECHA_SIN_VALOR = {datetime: "'0001-01-01 00:00:00+00'", date: "'0001-01-01'"}
+
+
+# ============================================
+# CURSOR OPACO
+# ============================================
+
+def _serializar(valor: Any) -> Any:
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+def codificar_cursor(valores: Sequence[Any]) -> str:
+    crudo = json.dumps([_serializar(v) for v in valores], separators=(",", ":"))
+    return base64.urlsafe_b64encode(crudo.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str, columnas: Sequence) -> List[Any]:
+    """Valores del cursor convertidos al tipo de cada columna; 400 si no es válido"""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(valores, list) or len(valores) != len(columnas):
+            raise ValueError("cantidad de valores")
+
+        convertidos = []
+        for valor, columna in zip(valores, columnas):
+            tipo = columna.type.python_type
+            if valor is None:
+                convertidos.append(None)
+            elif tipo is datetime:
+                convertidos.append(datetime.fromisoformat(valor))
+            elif tipo is date:
+                convertidos.append(date.fromisoformat(valor))
+            else:
+                convertidos.append(tipo(valor))
+        return convertidos
+    except (ValueError, TypeError, UnicodeDecodeError, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+
+
+# ============================================
+# KEYSET
+# ============================================
+
+def _sin_valor(columna):
+    """Literal que ocupa el lugar de NULL en la clave; None si la columna no admite NULL"""
+    if not getattr(columna, "nullable", False):
+        return None
+    texto = FECHA_SIN_VALOR.get(columna.type.python_type)
+    if texto is None:
+        raise ValueError(f"La clave de paginación {columna} admite NULL y no es una fecha")
+    return literal_column(texto)
+
+
+def clave_orden(columna):
+    """Expresión de orden sin NULL de la columna (la misma en consultas e índices)"""
+    sin_valor = _sin_valor(columna)
+    return columna if sin_valor is None else func.coalesce(columna, sin_valor)
+
+
+def _despues_de(columnas: Sequence, valores: Sequence[Any], descendente: bool):
+    """(c1, c2, ...) < / > (v1, v2, ...): comparación de filas que PostgreSQL resuelve con el índice compuesto"""
+    fila = tuple_(*[clave_orden(c) for c in columnas])
+    limite = tuple_(*[
+        _sin_valor(c) if v is None and _sin_valor(c) is not None else literal(v, c.type)
+        for c, v in zip(columnas, valores)
+    ])
+    return fila < limite if descendente else fila > limite
+
+
+def estimar_total(query: ConsultaORM) -> Optional[int]:
+    """Filas estimadas por el planificador (EXPLAIN), sin recorrer la tabla"""
+    try:
+        sentencia = query.order_by(None).statement
+        conexion = query.session.connection()
+        compilada = sentencia.compile(dialect=conexion.dialect)
+        plan = conexion.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compilada}", compilada.params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logger.warning("⚠️ No se pudo estimar el total: %s", e)
+        return None
+
+
+def paginar_keyset(
+    query: ConsultaORM,
+    columnas: Sequence,
+    limit: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    descendente: bool = True,
+    total: bool = False,
+) -> list:
+    """
+    Ordena por `columnas` (la última debe ser única, p. ej. el id) y devuelve
+    una página. Con cursor continúa después de él; sin cursor acepta `skip`
+    por compatibilidad. Deja el cursor siguiente en la cabecera si hay más filas.
+    """
+    if total:
+        estimado = estimar_total(query)
+        if estimado is not None:
+            response.headers[CABECERA_TOTAL] = str(estimado)
+
+    if cursor:
+        query = query.filter(_despues_de(columnas, decodificar_cursor(cursor, columnas), descendente))
+    elif skip:
+        query = query.offset(skip)
+
+    claves = [clave_orden(c) for c in columnas]
+    orden = [c.desc() if descendente else c.asc() for c in claves]
+    filas = query.order_by(*orden).limit(limit + 1).all()
+
+    if len(filas) > limit:
+        filas = filas[:limit]
+        if filas:  # limit=0 no deja fila de la que continuar
+            ultima = filas[-1]
+            response.headers[CABECERA_CURSOR] = codificar_cursor([getattr(ultima, c.key) for c in columnas])
+
+    return filas
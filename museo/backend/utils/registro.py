@@ -0,0 +1,131 @@
+# utils/registro.py
+# 🔥 Configuración de logging para la API y los procesos auxiliares
+# - Los handlers reales (consola, texto o JSON con python-json-logger) corren
+#   en un hilo aparte (QueueListener): el request solo encola el registro.
+# - Niveles por módulo (LOG_NIVELES_MODULOS) y muestreo de INFO/DEBUG en
+#   rutas calientes (LOG_MUESTREO); WARNING o más siempre se escriben.
+# - El filtro de muestreo está en el QueueHandler: lo descartado ni se
+#   formatea ni se encola.
+#
+# Uso (una vez, al arrancar el proceso):
+#   from utils.registro import configurar_logging
+#   configurar_logging()
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from typing import Dict, Optional
+
+from pythonjsonlogger import jsonlogger
+
+from config import get_settings
+
+settings = get_settings()
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+# ============================================
+# FILTRO DE MUESTREO
+# ============================================
+
+class FiltroMuestreo(logging.Filter):
+    """
+    Deja pasar solo una fracción de los registros INFO/DEBUG de los loggers
+    configurados. La regla más específica gana: {"routers": 0.1,
+    "routers.ia": 1.0} muestrea todos los routers menos routers.ia.
+    """
+
+    def __init__(self, tasas: Dict[str, float]):
+        super().__init__()
+        self.tasas = tasas
+        self._por_logger: Dict[str, float] = {}
+
+    def _tasa(self, nombre: str) -> float:
+        tasa = self._por_logger.get(nombre)
+        if tasa is None:
+            tasa = 1.0
+            partes = nombre.split(".")
+            for i in range(len(partes), 0, -1):
+                prefijo = ".".join(partes[:i])
+                if prefijo in self.tasas:
+                    tasa = self.tasas[prefijo]
+                    break
+            self._por_logger[nombre] = tasa
+        return tasa
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        tasa = self._tasa(record.name)
+        return tasa >= 1.0 or random.random() < tasa
+
+
+# ============================================
+# HANDLER NO BLOQUEANTE
+# ============================================
+
+class QueueHandlerDiferido(logging.handlers.QueueHandler):
+    """
+    QueueHandler que no formatea en el hilo del request: solo resuelve el
+    mensaje (msg % args, para no depender de objetos que cambien después).
+    El formato (JSON, traceback) lo hace el QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _formateador() -> logging.Formatter:
+    if settings.LOG_JSON:
+        return jsonlogger.JsonFormatter(
+            "%(asctime)s %(levelname)s %(name)s %(message)s",
+            rename_fields={"asctime": "fecha", "levelname": "nivel", "name": "modulo", "message": "mensaje"},
+            json_ensure_ascii=False,
+        )
+    return logging.Formatter(settings.LOG_FORMAT, datefmt=settings.LOG_DATE_FORMAT)
+
+
+# ============================================
+# CONFIGURACIÓN
+# ============================================
+
+def configurar_logging(nivel: Optional[str] = None) -> None:
+    """Instala el QueueHandler en el logger raíz (idempotente)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    salida = logging.StreamHandler(sys.stdout)
+    salida.setFormatter(_formateador())
+
+    cola: queue.SimpleQueue = queue.SimpleQueue()
+    handler = QueueHandlerDiferido(cola)
+    if settings.LOG_MUESTREO:
+        handler.addFilter(FiltroMuestreo(settings.LOG_MUESTREO))
+
+    raiz = logging.getLogger()
+    for anterior in list(raiz.handlers):
+        raiz.removeHandler(anterior)
+    raiz.addHandler(handler)
+    raiz.setLevel(getattr(logging, (nivel or settings.LOG_LEVEL).upper(), logging.INFO))
+
+    for modulo, nivel_modulo in settings.LOG_NIVELES_MODULOS.items():
+        logging.getLogger(modulo).setLevel(getattr(logging, nivel_modulo.upper(), logging.INFO))
+
+    _listener = logging.handlers.QueueListener(cola, salida, respect_handler_level=True)
+    _listener.start()
+    atexit.register(detener_logging)
+
+
+def detener_logging() -> None:
+    """Vacía la cola y detiene el hilo del listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
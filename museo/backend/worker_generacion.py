@@ -0,0 +1,57 @@
+# worker_generacion.py
+# 🔥 Proceso independiente de workers de generación
+# Consume la cola persistente (tabla trabajos_generacion), así se puede
+# escalar la generación por separado de los workers de la API.
+#
+# Uso:
+#   python worker_generacion.py              # GENERACION_WORKERS workers
+#   python worker_generacion.py --workers 8
+#
+# Para que la API no procese trabajos, configurar GENERACION_WORKERS_EMBEBIDOS=0
+
+import argparse
+import asyncio
+import logging
+import signal
+
+from config import get_settings
+from utils.registro import configurar_logging
+
+configurar_logging()
+
+from services.cola_generacion import PoolTrabajadores
+from services.ia_service import ia_service
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+async def ejecutar(num_workers: int):
+    pool = PoolTrabajadores(num_workers)
+    detener = asyncio.Event()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, detener.set)
+        except NotImplementedError:
+            pass  # Windows: se usa KeyboardInterrupt
+
+    await pool.iniciar()
+    try:
+        await detener.wait()
+    finally:
+        logger.info("🛑 Deteniendo workers de generación...")
+        await pool.detener()
+        await ia_service.cerrar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Workers de generación de itinerarios")
+    parser.add_argument("--workers", type=int, default=settings.GENERACION_WORKERS)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(ejecutar(args.workers))
+    except KeyboardInterrupt:
+        pass
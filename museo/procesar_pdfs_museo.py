@@ -7,20 +7,37 @@ INSTRUCCIONES:
 2. Pon todos los PDFs en: C:\\Users\\Tania\\Documents\\Tesis\\museo\\pdfs_museo\\
 3. Ejecuta: python procesar_pdfs_museo.py
 4. Se generará: museo_knowledge.json
+
+PIPELINE (incremental):
+1. Extracción: las páginas de cada PDF se leen en paralelo (pool de procesos)
+2. Clasificación: los chunks se envían a Ollama con varias llamadas simultáneas
+3. Unión: se combinan los resultados en el orden de los PDFs y se genera el JSON
+
+En CARPETA_CACHE se guarda un manifiesto con el hash de cada PDF y el
+resultado de cada chunk (por hash de su contenido). Al volver a ejecutar solo
+se procesan los PDFs y chunks nuevos o modificados.
+
+Opciones:
+  python procesar_pdfs_museo.py --pdfs ruta/a/pdfs --procesos 4 --llamadas 3
+  python procesar_pdfs_museo.py --forzar      # Ignorar el cache y reprocesar todo
 """
 
 import os
 import json
 import re
+import argparse
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
 
 # Instalar si no tienes: pip install pypdf pdfplumber
 try:
     import pdfplumber
-    print("✅ pdfplumber disponible")
 except ImportError:
     print("❌ Instala pdfplumber: pip install pdfplumber")
     exit(1)
@@ -31,6 +48,14 @@ OLLAMA_URL = "http://localhost:11434"
 MODELO = "deepseek-r1:7b"
 OUTPUT_FILE = "museo_knowledge.json"
 
+# 🔥 Pipeline paralelo e incremental
+CARPETA_CACHE = "cache_procesamiento"  # Manifiesto + resultados por chunk
+PAGINAS_POR_TAREA = 20  # Páginas que extrae cada tarea del pool de procesos
+PROCESOS_EXTRACCION = max(1, (os.cpu_count() or 2) - 1)
+LLAMADAS_PARALELAS = 3  # Llamadas simultáneas a Ollama (ver OLLAMA_NUM_PARALLEL)
+MAX_CHARS_CHUNK = 15000
+VERSION_PROMPT = "1"  # Cambiarla invalida los resultados cacheados de todos los chunks
+
 # Áreas del Museo Pumapungo (basado en tu BD)
 AREAS_MUSEO = {
     "ARQ-01": "Sala Arqueológica Cañari",
@@ -43,40 +68,72 @@ AREAS_MUSEO = {
 }
 
 
-def extraer_texto_pdf(ruta_pdf: str) -> str:
-    """Extraer texto de un PDF"""
-    try:
-        print(f"  📄 Leyendo: {os.path.basename(ruta_pdf)}")
-        texto_completo = []
-        
-        with pdfplumber.open(ruta_pdf) as pdf:
-            print(f"     Páginas: {len(pdf.pages)}")
-            
-            for i, pagina in enumerate(pdf.pages, 1):
-                texto = pagina.extract_text()
-                if texto:
-                    texto_completo.append(texto)
-                
-                # Mostrar progreso cada 10 páginas
-                if i % 10 == 0:
-                    print(f"     Procesadas {i}/{len(pdf.pages)} páginas...")
-        
-        texto_final = "\n\n".join(texto_completo)
-        print(f"  ✅ Extraídos {len(texto_final)} caracteres")
-        return texto_final
-    
-    except Exception as e:
-        print(f"  ❌ Error: {e}")
-        return ""
-
-
-def dividir_texto_en_chunks(texto: str, max_chars: int = 15000) -> List[str]:
+# ============================================
+# ETAPA 1: EXTRACCIÓN (pool de procesos)
+# ============================================
+
+def hash_archivo(ruta: Path) -> str:
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def contar_paginas(ruta_pdf: str) -> int:
+    with pdfplumber.open(ruta_pdf) as pdf:
+        return len(pdf.pages)
+
+
+def extraer_paginas(ruta_pdf: str, inicio: int, fin: int) -> Tuple[int, List[str]]:
+    """Extraer el texto de las páginas [inicio, fin) — se ejecuta en un proceso del pool"""
+    textos = []
+    with pdfplumber.open(ruta_pdf) as pdf:
+        for pagina in pdf.pages[inicio:fin]:
+            texto = pagina.extract_text()
+            if texto:
+                textos.append(texto)
+    return inicio, textos
+
+
+def extraer_textos_pdfs(pdfs: List[Path], procesos: int) -> Dict[str, str]:
+    """Extraer el texto de varios PDFs repartiendo rangos de páginas entre procesos"""
+    textos_por_pdf: Dict[str, Dict[int, List[str]]] = {pdf.name: {} for pdf in pdfs}
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        # Contar páginas en paralelo, luego repartir rangos
+        totales = dict(zip(pdfs, pool.map(contar_paginas, [str(p) for p in pdfs])))
+
+        futuros = {}
+        for pdf, total in totales.items():
+            print(f"  📄 {pdf.name}: {total} páginas")
+            for inicio in range(0, total, PAGINAS_POR_TAREA):
+                futuro = pool.submit(extraer_paginas, str(pdf), inicio, min(inicio + PAGINAS_POR_TAREA, total))
+                futuros[futuro] = pdf.name
+
+        for futuro in as_completed(futuros):
+            nombre = futuros[futuro]
+            try:
+                inicio, textos = futuro.result()
+                textos_por_pdf[nombre][inicio] = textos
+            except Exception as e:
+                print(f"  ❌ Error extrayendo páginas de {nombre}: {e}")
+
+    resultado = {}
+    for nombre, rangos in textos_por_pdf.items():
+        paginas = [texto for inicio in sorted(rangos) for texto in rangos[inicio]]
+        resultado[nombre] = "\n\n".join(paginas)
+        print(f"  ✅ {nombre}: {len(resultado[nombre])} caracteres")
+    return resultado
+
+
+def dividir_texto_en_chunks(texto: str, max_chars: int = MAX_CHARS_CHUNK) -> List[str]:
     """Dividir texto largo en chunks manejables"""
     # Dividir por párrafos
     parrafos = texto.split('\n\n')
     chunks = []
     chunk_actual = ""
-    
+
     for parrafo in parrafos:
         if len(chunk_actual) + len(parrafo) < max_chars:
             chunk_actual += parrafo + "\n\n"
@@ -84,37 +141,39 @@ def dividir_texto_en_chunks(texto: str, max_chars: int = 15000) -> List[str]:
             if chunk_actual:
                 chunks.append(chunk_actual)
             chunk_actual = parrafo + "\n\n"
-    
+
     if chunk_actual:
         chunks.append(chunk_actual)
-    
+
     return chunks
 
 
-def analizar_texto_con_ia(texto: str, nombre_pdf: str) -> Dict[str, Any]:
-    """Usar Ollama para extraer información estructurada del texto"""
-    
-    # Dividir si es muy largo
-    chunks = dividir_texto_en_chunks(texto, max_chars=15000)
-    
-    if len(chunks) > 1:
-        print(f"  🔍 Analizando {len(chunks)} secciones con IA...")
-    else:
-        print(f"  🔍 Analizando texto con IA...")
-    
+def hash_chunk(chunk: str) -> str:
+    """Identidad del chunk: contenido + modelo + versión del prompt"""
+    return hashlib.sha256(f"{MODELO}|{VERSION_PROMPT}|{chunk}".encode("utf-8")).hexdigest()
+
+
+# ============================================
+# ETAPA 2: CLASIFICACIÓN (llamadas concurrentes a Ollama)
+# ============================================
+
+_sesion_local = threading.local()
+
+
+def _sesion_http() -> requests.Session:
+    """Una sesión keep-alive por hilo"""
+    if not hasattr(_sesion_local, "sesion"):
+        sesion = requests.Session()
+        sesion.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        _sesion_local.sesion = sesion
+    return _sesion_local.sesion
+
+
+def construir_prompt(chunk: str) -> str:
     # Lista de áreas para el prompt
     areas_lista = "\n".join([f"- {codigo}: {nombre}" for codigo, nombre in AREAS_MUSEO.items()])
-    
-    informacion_extraida = {
-        "areas": {},
-        "general": []
-    }
-    
-    for i, chunk in enumerate(chunks, 1):
-        if len(chunks) > 1:
-            print(f"     Sección {i}/{len(chunks)}...")
-        
-        prompt = f"""Eres un experto analizando documentación del Museo Pumapungo de Cuenca, Ecuador.
+
+    return f"""Eres un experto analizando documentación del Museo Pumapungo de Cuenca, Ecuador.
 
 ÁREAS DEL MUSEO:
 {areas_lista}
@@ -150,123 +209,240 @@ REGLAS:
 3. Identifica claramente a qué área pertenece cada información
 4. Si no estás seguro del área, ponlo en "informacion_general"
 """
-        
+
+
+def clasificar_chunk(chunk: str) -> Optional[Dict[str, Any]]:
+    """Usar Ollama para extraer información estructurada de un chunk"""
+    response = _sesion_http().post(
+        f"{OLLAMA_URL}/api/generate",
+        json={
+            "model": MODELO,
+            "prompt": construir_prompt(chunk),
+            "stream": False,
+            "options": {
+                "temperature": 0.1,  # Más determinístico
+                "num_predict": 4000
+            }
+        },
+        timeout=300  # 5 minutos
+    )
+
+    if response.status_code != 200:
+        raise RuntimeError(f"Error en API: {response.status_code}")
+
+    respuesta_ia = response.json().get("response", "")
+
+    # Extraer JSON
+    try:
+        # Intentar parsear directamente
+        return json.loads(respuesta_ia)
+    except ValueError:
+        # Buscar JSON dentro del texto
+        match = re.search(r'\{.*\}', respuesta_ia, re.DOTALL)
+        if match:
+            return json.loads(match.group(0))
+    return None
+
+
+class CacheChunks:
+    """Resultados de clasificación por hash de chunk + manifiesto de PDFs"""
+
+    def __init__(self, carpeta: str):
+        self.carpeta = Path(carpeta)
+        self.carpeta_chunks = self.carpeta / "chunks"
+        self.carpeta_chunks.mkdir(parents=True, exist_ok=True)
+        self.ruta_manifiesto = self.carpeta / "manifest.json"
+        self.manifiesto = self._leer_json(self.ruta_manifiesto) or {"pdfs": {}}
+
+    @staticmethod
+    def _leer_json(ruta: Path) -> Optional[Dict[str, Any]]:
         try:
-            response = requests.post(
-                f"{OLLAMA_URL}/api/generate",
-                json={
-                    "model": MODELO,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.1,  # Más determinístico
-                        "num_predict": 4000
-                    }
-                },
-                timeout=300  # 5 minutos
-            )
-            
-            if response.status_code == 200:
-                resultado = response.json()
-                respuesta_ia = resultado.get("response", "")
-                
-                # Extraer JSON
-                try:
-                    # Intentar parsear directamente
-                    data = json.loads(respuesta_ia)
-                except:
-                    # Buscar JSON dentro del texto
-                    match = re.search(r'\{.*\}', respuesta_ia, re.DOTALL)
-                    if match:
-                        data = json.loads(match.group(0))
-                    else:
-                        print(f"     ⚠️ No se pudo extraer JSON de la sección {i}")
-                        continue
-                
-                # Agregar información extraída
-                if "areas_identificadas" in data:
-                    for area_info in data["areas_identificadas"]:
-                        codigo = area_info.get("area_codigo")
-                        if codigo in AREAS_MUSEO:
-                            if codigo not in informacion_extraida["areas"]:
-                                informacion_extraida["areas"][codigo] = {
-                                    "nombre": AREAS_MUSEO[codigo],
-                                    "segmentos": [],
-                                    "temas": [],
-                                    "objetos": [],
-                                    "datos_historicos": []
-                                }
-                            
-                            # Agregar información
-                            informacion_extraida["areas"][codigo]["segmentos"].extend(
-                                area_info.get("segmentos_texto", [])
-                            )
-                            informacion_extraida["areas"][codigo]["temas"].extend(
-                                area_info.get("temas", [])
-                            )
-                            informacion_extraida["areas"][codigo]["objetos"].extend(
-                                area_info.get("objetos_mencionados", [])
-                            )
-                            informacion_extraida["areas"][codigo]["datos_historicos"].extend(
-                                area_info.get("datos_historicos", [])
-                            )
-                
-                if "informacion_general" in data:
-                    informacion_extraida["general"].extend(data["informacion_general"])
-                
-                print(f"     ✅ Sección {i} analizada")
-            
-            else:
-                print(f"     ❌ Error en API: {response.status_code}")
-        
-        except Exception as e:
-            print(f"     ❌ Error analizando sección {i}: {e}")
+            with open(ruta, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _escribir_json(ruta: Path, datos: Any):
+        temporal = ruta.with_suffix(ruta.suffix + ".tmp")
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(datos, f, indent=2, ensure_ascii=False)
+        os.replace(temporal, ruta)
+
+    def resultado(self, clave: str) -> Optional[Dict[str, Any]]:
+        return self._leer_json(self.carpeta_chunks / f"{clave}.json")
+
+    def guardar_resultado(self, clave: str, datos: Dict[str, Any]):
+        self._escribir_json(self.carpeta_chunks / f"{clave}.json", datos)
+
+    def pdf_vigente(self, nombre: str, hash_pdf: str) -> Optional[List[str]]:
+        """Chunks del PDF si no cambió desde la última ejecución y todos tienen resultado"""
+        entrada = self.manifiesto["pdfs"].get(nombre)
+        if not entrada or entrada.get("hash") != hash_pdf:
+            return None
+        if not all((self.carpeta_chunks / f"{c}.json").exists() for c in entrada["chunks"]):
+            return None
+        return entrada["chunks"]
+
+    def registrar_pdf(self, nombre: str, hash_pdf: str, chunks: List[str]):
+        self.manifiesto["pdfs"][nombre] = {
+            "hash": hash_pdf,
+            "chunks": chunks,
+            "fecha": datetime.now().isoformat()
+        }
+
+    def guardar_manifiesto(self, nombres_actuales: List[str]):
+        # Olvidar PDFs que ya no están en la carpeta
+        self.manifiesto["pdfs"] = {
+            nombre: entrada for nombre, entrada in self.manifiesto["pdfs"].items()
+            if nombre in nombres_actuales
+        }
+        self._escribir_json(self.ruta_manifiesto, self.manifiesto)
+
+
+def clasificar_chunks(chunks: Dict[str, str], cache: CacheChunks, llamadas: int) -> int:
+    """Clasificar en paralelo los chunks sin resultado en cache. Retorna cuántos fallaron."""
+    if not chunks:
+        return 0
+
+    print(f"  🔍 Clasificando {len(chunks)} chunks con {llamadas} llamadas simultáneas...")
+    fallidos = 0
+    completados = 0
+
+    with ThreadPoolExecutor(max_workers=llamadas) as pool:
+        futuros = {pool.submit(clasificar_chunk, texto): clave for clave, texto in chunks.items()}
+
+        for futuro in as_completed(futuros):
+            clave = futuros[futuro]
+            completados += 1
+            try:
+                datos = futuro.result()
+                if datos is None:
+                    print(f"     ⚠️ [{completados}/{len(chunks)}] No se pudo extraer JSON del chunk {clave[:8]}")
+                    fallidos += 1
+                    continue
+                cache.guardar_resultado(clave, datos)
+                print(f"     ✅ [{completados}/{len(chunks)}] Chunk {clave[:8]} analizado")
+            except Exception as e:
+                print(f"     ❌ [{completados}/{len(chunks)}] Error analizando chunk {clave[:8]}: {e}")
+                fallidos += 1
+
+    return fallidos
+
+
+# ============================================
+# ETAPA 3: UNIÓN
+# ============================================
+
+def agregar_resultado(knowledge_base: Dict[str, Any], data: Dict[str, Any]):
+    """Agregar al knowledge base la información clasificada de un chunk"""
+    for area_info in data.get("areas_identificadas", []):
+        codigo = area_info.get("area_codigo")
+        if codigo not in knowledge_base["areas"]:
             continue
-    
-    return informacion_extraida
+
+        area = knowledge_base["areas"][codigo]
+        area["informacion_detallada"].extend(area_info.get("segmentos_texto", []))
+        area["objetos_destacados"].extend(area_info.get("objetos_mencionados", []))
+        area["datos_curiosos"].extend(area_info.get("datos_historicos", []))
+        area["temas_principales"].extend(area_info.get("temas", []))
 
 
-def procesar_todos_los_pdfs():
+def procesar_todos_los_pdfs(carpeta_pdfs: str = CARPETA_PDFS, procesos: int = PROCESOS_EXTRACCION,
+                            llamadas: int = LLAMADAS_PARALELAS, forzar: bool = False):
     """Procesar todos los PDFs de la carpeta"""
-    
+
     print("=" * 80)
     print("🏛️  PROCESADOR DE PDFs - MUSEO PUMAPUNGO")
     print("=" * 80)
     print()
-    
+
     # Verificar carpeta
-    if not os.path.exists(CARPETA_PDFS):
-        print(f"❌ La carpeta no existe: {CARPETA_PDFS}")
+    if not os.path.exists(carpeta_pdfs):
+        print(f"❌ La carpeta no existe: {carpeta_pdfs}")
         print(f"   Crea la carpeta y pon los PDFs ahí")
         return
-    
-    # Buscar PDFs
-    pdfs = list(Path(CARPETA_PDFS).glob("*.pdf"))
-    
+
+    # Buscar PDFs (.pdf y .PDF)
+    pdfs = sorted(p for p in Path(carpeta_pdfs).iterdir() if p.suffix.lower() == ".pdf")
+
     if not pdfs:
-        print(f"❌ No se encontraron PDFs en: {CARPETA_PDFS}")
+        print(f"❌ No se encontraron PDFs en: {carpeta_pdfs}")
         return
-    
+
     print(f"📚 Encontrados {len(pdfs)} PDFs")
     print()
-    
-    # Verificar Ollama
-    try:
-        response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=5)
-        if response.status_code != 200:
-            print("❌ Ollama no está corriendo")
-            print("   Inicia Ollama primero")
-            return
-        print("✅ Ollama conectado")
-    except:
-        print("❌ No se puede conectar con Ollama")
-        print("   Asegúrate de que Ollama esté corriendo")
-        return
-    
-    print()
-    print("🚀 Iniciando procesamiento...")
+
+    cache = CacheChunks(CARPETA_CACHE)
+
+    # Detectar qué PDFs cambiaron desde la última ejecución
+    hashes = {pdf.name: hash_archivo(pdf) for pdf in pdfs}
+    chunks_por_pdf: Dict[str, List[str]] = {}
+    pendientes_extraccion = []
+
+    for pdf in pdfs:
+        vigentes = None if forzar else cache.pdf_vigente(pdf.name, hashes[pdf.name])
+        if vigentes is not None:
+            chunks_por_pdf[pdf.name] = vigentes
+        else:
+            pendientes_extraccion.append(pdf)
+
+    print(f"♻️  Sin cambios: {len(pdfs) - len(pendientes_extraccion)} PDFs | 🆕 Nuevos o modificados: {len(pendientes_extraccion)}")
     print()
-    
+
+    # ETAPA 1: Extraer texto solo de los PDFs nuevos o modificados
+    chunks_pendientes: Dict[str, str] = {}
+    if pendientes_extraccion:
+        print(f"🚀 Extrayendo texto con {procesos} procesos...")
+        textos = extraer_textos_pdfs(pendientes_extraccion, procesos)
+        print()
+
+        for pdf in pendientes_extraccion:
+            texto = textos.get(pdf.name, "")
+            if not texto or len(texto) < 100:
+                print(f"  ⚠️ {pdf.name}: PDF vacío o sin texto extraíble")
+                chunks_por_pdf[pdf.name] = []
+                continue
+
+            claves = []
+            for chunk in dividir_texto_en_chunks(texto):
+                clave = hash_chunk(chunk)
+                claves.append(clave)
+                # Un chunk idéntico ya clasificado (en otro PDF o versión) no se repite
+                if forzar or cache.resultado(clave) is None:
+                    chunks_pendientes[clave] = chunk
+            chunks_por_pdf[pdf.name] = claves
+
+    # ETAPA 2: Clasificar solo los chunks sin resultado
+    if chunks_pendientes:
+        # Verificar Ollama
+        try:
+            response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=5)
+            if response.status_code != 200:
+                print("❌ Ollama no está corriendo")
+                print("   Inicia Ollama primero")
+                return
+            print("✅ Ollama conectado")
+        except requests.RequestException:
+            print("❌ No se puede conectar con Ollama")
+            print("   Asegúrate de que Ollama esté corriendo")
+            return
+
+        fallidos = clasificar_chunks(chunks_pendientes, cache, llamadas)
+        if fallidos:
+            print(f"  ⚠️ {fallidos} chunks sin resultado: se reintentarán en la próxima ejecución")
+        print()
+
+    # Registrar en el manifiesto solo los PDFs con todos sus chunks resueltos
+    for pdf in pendientes_extraccion:
+        claves = chunks_por_pdf[pdf.name]
+        if all(cache.resultado(clave) is not None for clave in claves):
+            cache.registrar_pdf(pdf.name, hashes[pdf.name], claves)
+    cache.guardar_manifiesto([pdf.name for pdf in pdfs])
+
+    # ETAPA 3: Unir resultados en el orden de los PDFs
+    print("🧩 Uniendo resultados...")
+
     # Base de conocimiento
     knowledge_base = {
         "museo": "Museo Pumapungo",
@@ -275,7 +451,7 @@ def procesar_todos_los_pdfs():
         "total_pdfs": len(pdfs),
         "areas": {}
     }
-    
+
     # Inicializar áreas
     for codigo, nombre in AREAS_MUSEO.items():
         knowledge_base["areas"][codigo] = {
@@ -288,61 +464,33 @@ def procesar_todos_los_pdfs():
             "temas_principales": [],
             "informacion_detallada": []
         }
-    
-    # Procesar cada PDF
-    for i, pdf_path in enumerate(pdfs, 1):
-        print(f"📖 PDF {i}/{len(pdfs)}: {pdf_path.name}")
-        print("-" * 80)
-        
-        # Extraer texto
-        texto = extraer_texto_pdf(str(pdf_path))
-        
-        if not texto or len(texto) < 100:
-            print("  ⚠️ PDF vacío o sin texto extraíble")
-            print()
-            continue
-        
-        # Analizar con IA
-        info_extraida = analizar_texto_con_ia(texto, pdf_path.name)
-        
-        # Agregar a knowledge base
-        for codigo, area_info in info_extraida["areas"].items():
-            if codigo in knowledge_base["areas"]:
-                knowledge_base["areas"][codigo]["informacion_detallada"].extend(
-                    area_info["segmentos"]
-                )
-                knowledge_base["areas"][codigo]["objetos_destacados"].extend(
-                    area_info["objetos"]
-                )
-                knowledge_base["areas"][codigo]["datos_curiosos"].extend(
-                    area_info["datos_historicos"]
-                )
-                knowledge_base["areas"][codigo]["temas_principales"].extend(
-                    area_info["temas"]
-                )
-        
-        print()
-    
-    # Limpiar duplicados
+
+    for pdf in pdfs:
+        for clave in chunks_por_pdf.get(pdf.name, []):
+            data = cache.resultado(clave)
+            if data:
+                agregar_resultado(knowledge_base, data)
+
+    # Limpiar duplicados (conservando el orden para que el resultado sea estable)
     print("🧹 Limpiando duplicados...")
     for codigo in knowledge_base["areas"]:
         area = knowledge_base["areas"][codigo]
-        area["objetos_destacados"] = list(set(area["objetos_destacados"]))
-        area["datos_curiosos"] = list(set(area["datos_curiosos"]))
-        area["temas_principales"] = list(set(area["temas_principales"]))
-    
+        area["objetos_destacados"] = list(dict.fromkeys(area["objetos_destacados"]))
+        area["datos_curiosos"] = list(dict.fromkeys(area["datos_curiosos"]))
+        area["temas_principales"] = list(dict.fromkeys(area["temas_principales"]))
+
     # Guardar resultado
     print(f"💾 Guardando resultado en: {OUTPUT_FILE}")
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(knowledge_base, f, indent=2, ensure_ascii=False)
-    
+    CacheChunks._escribir_json(Path(OUTPUT_FILE), knowledge_base)
+
     print()
     print("=" * 80)
     print("✅ PROCESAMIENTO COMPLETADO")
     print("=" * 80)
     print()
     print(f"📊 Resumen:")
-    print(f"   - PDFs procesados: {len(pdfs)}")
+    print(f"   - PDFs procesados: {len(pendientes_extraccion)} (de {len(pdfs)})")
+    print(f"   - Chunks enviados a la IA: {len(chunks_pendientes)}")
     print(f"   - Áreas con información:")
     for codigo, area in knowledge_base["areas"].items():
         total_info = (
@@ -352,12 +500,20 @@ def procesar_todos_los_pdfs():
         )
         if total_info > 0:
             print(f"     • {codigo} - {area['nombre']}: {total_info} items")
-    
+
     print()
     print(f"📁 Archivo generado: {OUTPUT_FILE}")
     print(f"   Cópialo a tu carpeta del backend para usarlo en el sistema")
+    print(f"   y reconstruye el índice: python construir_indice_kb.py")
     print()
 
 
 if __name__ == "__main__":
-    procesar_todos_los_pdfs()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Procesar los PDFs del museo y generar museo_knowledge.json")
+    parser.add_argument("--pdfs", default=CARPETA_PDFS, help="Carpeta con los PDFs")
+    parser.add_argument("--procesos", type=int, default=PROCESOS_EXTRACCION, help="Procesos para extraer páginas")
+    parser.add_argument("--llamadas", type=int, default=LLAMADAS_PARALELAS, help="Llamadas simultáneas a Ollama")
+    parser.add_argument("--forzar", action="store_true", help="Reprocesar todo ignorando el cache")
+    args = parser.parse_args()
+
+    procesar_todos_los_pdfs(args.pdfs, args.procesos, args.llamadas, args.forzar)